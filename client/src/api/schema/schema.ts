@@ -125,6 +125,26 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/api/configuration/toolbox/memory": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        /**
+         * Return the memory used by the tools of the toolbox
+         * @description Return the number of loaded tools and the estimated memory used by fully loaded lazy tools.
+         */
+        get: operations["tool_memory_usage_api_configuration_toolbox_memory_get"];
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/api/configuration/toolbox": {
         parameters: {
             query?: never;
@@ -18574,6 +18594,47 @@ export interface operations {
             };
         };
     };
+    tool_memory_usage_api_configuration_toolbox_memory_get: {
+        parameters: {
+            query?: never;
+            header?: {
+                /** @description The user ID that will be used to effectively make this API call. Only admins and designated users can make API calls on behalf of other users. */
+                "run-as"?: string | null;
+            };
+            path?: never;
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            /** @description Number of loaded tools and memory used by fully loaded lazy tools */
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": Record<string, never>;
+                };
+            };
+            /** @description Request Error */
+            "4XX": {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["MessageExceptionModel"];
+                };
+            };
+            /** @description Server Error */
+            "5XX": {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["MessageExceptionModel"];
+                };
+            };
+        };
+    };
     reload_toolbox_api_configuration_toolbox_put: {
         parameters: {
             query?: never;
@@ -23638,6 +23699,10 @@ export interface operations {
                  * @description Legacy name for the `dataset_details` parameter.
                  */
                 details?: string | null;
+                /** @description Only return contents following the item with this `hid` in the requested order. Pass the `hid` of the last item of the previous page instead of an `offset` to page through large histories. Only `hid` and `update_time` ordering are supported. */
+                after_hid?: number | null;
+                /** @description The `update_time` of the last item of the previous page, required together with `after_hid` when ordering by `update_time`. */
+                after_update_time?: string | null;
                 /**
                  * @deprecated
                  * @description A comma-separated list of encoded `HDA/HDCA` IDs. If this list is provided, only information about the specific datasets will be returned. Also, setting this value will return `all` details of the content item.
@@ -24868,6 +24933,10 @@ export interface operations {
                  * @description Legacy name for the `dataset_details` parameter.
                  */
                 details?: string | null;
+                /** @description Only return contents following the item with this `hid` in the requested order. Pass the `hid` of the last item of the previous page instead of an `offset` to page through large histories. Only `hid` and `update_time` ordering are supported. */
+                after_hid?: number | null;
+                /** @description The `update_time` of the last item of the previous page, required together with `after_hid` when ordering by `update_time`. */
+                after_update_time?: string | null;
                 /**
                  * @deprecated
                  * @description A comma-separated list of encoded `HDA/HDCA` IDs. If this list is provided, only information about the specific datasets will be returned. Also, setting this value will return `all` details of the content item.
@@ -88,6 +88,11 @@ from galaxy.model.base import (
     SharedModelMapping,
 )
 from galaxy.model.database_heartbeat import DatabaseHeartbeat
+from galaxy.model.database_notify import (
+    database_notifications_supported,
+    DatabaseNotificationListener,
+    install_database_notifications,
+)
 from galaxy.model.database_utils import (
     database_exists,
     is_one_database,
@@ -150,6 +155,7 @@ from galaxy.tools.data_manager.manager import DataManagers
 from galaxy.tools.error_reports import ErrorReports
 from galaxy.tools.evaluation import ToolTemplatingException
 from galaxy.tools.search import ToolBoxSearch
+from galaxy.tools.search.memory import InMemoryToolBoxSearch
 from galaxy.tools.special_tools import load_lib_tools
 from galaxy.tours import (
     build_tours_registry,
@@ -387,10 +393,14 @@ class MinimalGalaxyApplication(BasicSharedApp, HaltableContainer, SentryClientMi
         self.container_finder = containers.ContainerFinder(app_info, mulled_resolution_cache=mulled_resolution_cache)
         self._set_enabled_container_types()
         index_help = getattr(self.config, "index_tool_help", True)
-        self.toolbox_search = self._register_singleton(
-            ToolBoxSearch,
-            ToolBoxSearch(self.toolbox, index_dir=self.config.tool_search_index_dir, index_help=index_help),
-        )
+        toolbox_search: ToolBoxSearch
+        if self.config.tool_search_backend == "memory":
+            toolbox_search = InMemoryToolBoxSearch(self.toolbox, index_help=index_help)
+        else:
+            toolbox_search = ToolBoxSearch(
+                self.toolbox, index_dir=self.config.tool_search_index_dir, index_help=index_help
+            )
+        self.toolbox_search = self._register_singleton(ToolBoxSearch, toolbox_search)
 
     @property
     def toolbox(self) -> tools.ToolBox:
@@ -515,6 +525,11 @@ class MinimalGalaxyApplication(BasicSharedApp, HaltableContainer, SentryClientMi
             combined_install_database,
             self.config.thread_local_log,
         )
+        if self.config.enable_database_notifications:
+            if database_notifications_supported(engine):
+                install_database_notifications(self.model)
+            else:
+                log.warning("Database notifications are only supported on PostgreSQL, handlers will poll the database")
 
         if combined_install_database:
             log.info("Install database targeting Galaxy's database configuration.")  # TODO this message is ambiguous
@@ -840,6 +855,11 @@ class UniverseApplication(StructuredApp, GalaxyManagerApplication):
             self.haltables.append(("HistoryAuditTablePruneTask", self.prune_history_audit_task.shutdown))
         self.proxy_manager = ProxyManager(self.config)
 
+        self.database_notification_listener: Optional[DatabaseNotificationListener] = None
+        if self.config.enable_database_notifications and database_notifications_supported(self.model.engine):
+            self.database_notification_listener = DatabaseNotificationListener(self.model.engine)
+            self.haltables.append(("database notification listener", self.database_notification_listener.shutdown))
+
         # Must be initialized after job_config.
         self.workflow_scheduling_manager = scheduling_manager.WorkflowSchedulingManager(self)
 
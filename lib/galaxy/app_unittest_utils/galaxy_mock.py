@@ -240,6 +240,7 @@ class MockAppConfig(GalaxyDataTestConfig, CommonConfigurationMixin):
 
         self.umask = 0o77
         self.flush_per_n_datasets = 0
+        self.bulk_insert_discovered_datasets = False
 
         # Compliance related config
         self.redact_email_in_job_name = False
@@ -259,6 +260,11 @@ class MockAppConfig(GalaxyDataTestConfig, CommonConfigurationMixin):
 
         # set by MockDir
         self.enable_tool_document_cache = False
+        self.tool_parse_processes = 0
+        self.enable_toolbox_snapshot = False
+        self.toolbox_snapshot_file = os.path.join(self.root, "toolbox_snapshot.json.gz")
+        self.enable_lazy_tool_loading = False
+        self.lazy_tool_cache_size = 500
         self.tool_cache_data_dir = os.path.join(self.root, "tool_cache")
         self.external_chown_script = None
         self.check_job_script_integrity = False
@@ -284,6 +290,8 @@ class MockAppConfig(GalaxyDataTestConfig, CommonConfigurationMixin):
         self.integrated_tool_panel_config = None
         self.vault_config_file = kwargs.get("vault_config_file")
         self.max_discovered_files = 10000
+        self.workflow_scheduling_workers = 0
+        self.tool_execution_flush_batch_size = 1000
         self.display_builtin_converters = True
         self.enable_notification_system = True
 
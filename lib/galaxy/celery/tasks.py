@@ -1,10 +1,13 @@
 import json
 from concurrent.futures import TimeoutError
+from datetime import timedelta
 from functools import lru_cache
 from pathlib import Path
 from typing import (
     Any,
     Callable,
+    Dict,
+    List,
     Optional,
 )
 
@@ -35,10 +38,12 @@ from galaxy.managers.notification import NotificationManager
 from galaxy.managers.tool_data import ToolDataImportManager
 from galaxy.metadata.set_metadata import set_metadata_portable
 from galaxy.model import (
+    History,
     Job,
     User,
 )
 from galaxy.model.base import transaction
+from galaxy.model.orm.now import now
 from galaxy.model.scoped_session import galaxy_scoped_session
 from galaxy.objectstore import BaseObjectStore
 from galaxy.objectstore.caching import check_caches
@@ -93,6 +98,35 @@ def recalculate_user_disk_usage(
         log.error("Recalculate user disk usage task received without user_id.")
 
 
+@galaxy_task(action="reconcile users' disk usage")
+def reconcile_users_disk_usage(
+    session: galaxy_scoped_session, object_store: BaseObjectStore, config: GalaxyAppConfiguration
+) -> List[Dict[str, Any]]:
+    """Correct drift of the disk usage recorded for users with recently changed histories.
+
+    Returns a drift report with an entry per user and quota source that was off.
+    """
+    since = now() - timedelta(seconds=config.disk_usage_reconcile_interval)
+    stmt = select(History.user_id).where(History.user_id.isnot(None), History.update_time >= since).distinct()
+    report = []
+    for user_id in session.scalars(stmt).all():
+        user = session.get(User, user_id)
+        if not user:
+            continue
+        for drift in user.reconcile_disk_usage(object_store):
+            log.warning(
+                "Disk usage of user %s for quota source %s drifted by %d bytes (recorded %d, calculated %d), corrected",
+                user_id,
+                drift.quota_source_label or "default",
+                drift.drift,
+                drift.recorded_disk_usage,
+                drift.calculated_disk_usage,
+            )
+            report.append({"user_id": user_id, **drift.model_dump()})
+    log.info("Reconciled disk usage, found drift in %d quota source usage(s)", len(report))
+    return report
+
+
 @galaxy_task(ignore_result=True, action="purge a history dataset")
 def purge_hda(hda_manager: HDAManager, hda_id: int, task_user_id: Optional[int] = None):
     hda = hda_manager.by_id(hda_id)
@@ -295,6 +295,7 @@ class Meryldb(CompressedArchive):
     """MerylDB is a tar.gz archive, with 128 files. 64 data files and 64 index files."""
 
     file_ext = "meryldb"
+    sniff_tar = True
 
     def sniff(self, filename: str) -> bool:
         """
@@ -325,6 +326,7 @@ class Visium(CompressedArchive):
     """Visium is a tar.gz archive with at least a 'Spatial' subfolder, a filtered h5 file and a raw h5 file."""
 
     file_ext = "visium.tar.gz"
+    sniff_tar = True
 
     def sniff(self, filename: str) -> bool:
         """
@@ -479,6 +481,8 @@ class BamNative(CompressedArchive, _BamOrSam):
     edam_data = "data_0863"
     file_ext = "unsorted.bam"
     sort_flag: Optional[str] = None
+    # BGZF decompressed
+    sniff_magic = b"BAM\1"
 
     MetadataElement(name="columns", default=12, desc="Number of columns", readonly=True, visible=False, no_value=0)
     MetadataElement(
@@ -1156,10 +1160,11 @@ class H5(Binary):
 
     file_ext = "h5"
     edam_format = "format_3590"
+    sniff_magic = binascii.unhexlify("894844460d0a1a0a")
 
     def __init__(self, **kwd):
         super().__init__(**kwd)
-        self._magic = binascii.unhexlify("894844460d0a1a0a")
+        self._magic = self.sniff_magic
 
     def sniff(self, filename: str) -> bool:
         # The first 8 bytes of any hdf5 file are 0x894844460d0a1a0a
@@ -2394,6 +2399,7 @@ class SQlite(Binary):
     )
     file_ext = "sqlite"
     edam_format = "format_3621"
+    sniff_magic = b"SQLite format 3\0"
 
     def init_meta(self, dataset: HasMetadata, copy_from: Optional[HasMetadata] = None) -> None:
         Binary.init_meta(self, dataset, copy_from=copy_from)
@@ -3506,6 +3512,7 @@ class PostgresqlArchive(CompressedArchive):
         visible=True,
     )
     file_ext = "postgresql"
+    sniff_tar = True
 
     def set_meta(self, dataset: DatasetProtocol, overwrite: bool = True, **kwd) -> None:
         super().set_meta(dataset, overwrite=overwrite, **kwd)
@@ -3562,6 +3569,7 @@ class MongoDBArchive(CompressedArchive):
         visible=True,
     )
     file_ext = "mongodb"
+    sniff_tar = True
 
     def set_meta(self, dataset: DatasetProtocol, overwrite: bool = True, **kwd) -> None:
         super().set_meta(dataset, overwrite=overwrite, **kwd)
@@ -3638,6 +3646,7 @@ class Fast5Archive(CompressedArchive):
         name="fast5_count", default="0", param=MetadataParameter, desc="Read Count", readonly=True, visible=True
     )
     file_ext = "fast5.tar"
+    sniff_tar = True
 
     def set_meta(self, dataset: DatasetProtocol, overwrite: bool = True, **kwd) -> None:
         super().set_meta(dataset, overwrite=overwrite, **kwd)
@@ -4120,6 +4129,7 @@ class BafTar(CompressedArchive):
     edam_data = "data_2536"  # mass spectrometry data
     edam_format = "format_3712"  # TODO: add more raw formats to EDAM?
     file_ext = "brukerbaf.d.tar"
+    sniff_tar = True
 
     def get_signature_file(self) -> str:
         return "analysis.baf"
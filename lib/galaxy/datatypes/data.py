@@ -1,6 +1,8 @@
+import io
 import logging
 import mimetypes
 import os
+import re
 import shutil
 import string
 import tempfile
@@ -14,6 +16,7 @@ from typing import (
     Iterable,
     List,
     Optional,
+    Pattern,
     Tuple,
     TYPE_CHECKING,
     Union,
@@ -187,6 +190,29 @@ def _get_file_size(data):
     return file_size
 
 
+COMPRESSED_MAGICS = (util.gzip_magic, util.bz2_magic, util.xz_magic, b"PK\x03\x04")
+
+
+def get_ranged_fileobj(data: HasFileName) -> IO[str]:
+    """Open a dataset as text for random access (e.g. reading a chunk at an offset).
+
+    Datasets in object stores supporting ranged reads are not pulled into the
+    object store cache, only the parts of the file that are read are fetched.
+    Compressed files are decompressed like ``compression_utils.get_fileobj``
+    does, this requires the whole file.
+    """
+    dataset = getattr(data, "dataset", None)
+    if dataset is None or not hasattr(dataset, "open_ranged_file"):
+        return compression_utils.get_fileobj(data.get_file_name())
+    fh = dataset.open_ranged_file()
+    magic = fh.read(max(len(m) for m in COMPRESSED_MAGICS))
+    if magic.startswith(COMPRESSED_MAGICS):
+        fh.close()
+        return compression_utils.get_fileobj(data.get_file_name())
+    fh.seek(0)
+    return io.TextIOWrapper(fh, encoding="utf-8")
+
+
 @p_dataproviders.decorators.has_dataproviders
 class Data(metaclass=DataMeta):
     """
@@ -229,6 +255,13 @@ class Data(metaclass=DataMeta):
     # The dataset contains binary data --> do not space_to_tab or convert newlines, etc.
     # Allow binary file uploads of this type when True.
     is_binary: Union[bool, Literal["maybe"]] = True
+    # Preconditions for sniffing, used to skip running the sniffer on files that can't match:
+    # bytes the (decompressed) content of files of this datatype starts with ...
+    sniff_magic: Optional[bytes] = None
+    # ... a pattern the first line of files of this datatype matches ...
+    sniff_first_line: Optional[Pattern[str]] = None
+    # ... and whether files of this datatype are (possibly compressed) tar archives.
+    sniff_tar: bool = False
     # Composite datatypes
     composite_type: Optional[str] = None
     composite_files: Dict[str, Any] = {}
@@ -425,7 +458,7 @@ class Data(metaclass=DataMeta):
     def _serve_raw(
         self, dataset: DatasetHasHidProtocol, to_ext: Optional[str], headers: Headers, **kwd
     ) -> Tuple[IO, Headers]:
-        headers["Content-Length"] = str(os.stat(dataset.get_file_name()).st_size)
+        headers["Content-Length"] = str(_get_file_size(dataset))
         headers["content-type"] = (
             "application/octet-stream"  # force octet-stream so Safari doesn't append mime extensions to filename
         )
@@ -437,7 +470,8 @@ class Data(metaclass=DataMeta):
             filename_pattern=kwd.get("filename_pattern"),
         )
         headers["Content-Disposition"] = f'attachment; filename="{filename}"'
-        return open(dataset.get_file_name(), mode="rb"), headers
+        # Doesn't wait for datasets in remote object stores to be pulled into the cache completely.
+        return dataset.dataset.open_file(), headers
 
     def to_archive(self, dataset: DatasetProtocol, name: str = "") -> Iterable:
         """
@@ -1247,6 +1281,7 @@ class Nexus(Text):
     edam_data = "data_0872"
     edam_format = "format_1912"
     file_ext = "nex"
+    sniff_first_line = re.compile("#NEXUS", re.IGNORECASE)
 
     def sniff_prefix(self, file_prefix: FilePrefix) -> bool:
         """All Nexus Files Simply puts a '#NEXUS' in its first line"""
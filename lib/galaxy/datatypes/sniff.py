@@ -11,15 +11,24 @@ import re
 import shutil
 import struct
 import tempfile
+import threading
+import time
 import zipfile
+from collections import (
+    defaultdict,
+    OrderedDict,
+)
 from functools import partial
 from typing import (
     Callable,
     Dict,
     IO,
     Iterable,
+    List,
     NamedTuple,
     Optional,
+    Pattern,
+    Tuple,
     TYPE_CHECKING,
     Union,
 )
@@ -53,6 +62,10 @@ log = logging.getLogger(__name__)
 
 SNIFF_PREFIX_BYTES = int(os.environ.get("GALAXY_SNIFF_PREFIX_BYTES", None) or 2**20)
 BINARY_MIMETYPES = {"application/pdf", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"}
+# Sniffers taking longer than this (in seconds) for a single file are logged.
+SLOW_SNIFF_SECONDS = 1.0
+# Number of sniff orders (e.g. of reloaded datatype registries) a SniffIndex is kept for.
+SNIFF_INDEX_CACHE_SIZE = 8
 
 
 def get_test_fname(fname):
@@ -618,6 +631,8 @@ class FilePrefix:
         self.contents_header_bytes = contents_header_bytes
         self._is_binary = None
         self._file_size = None
+        self._first_line = None
+        self._is_tar = None
 
     @property
     def binary(self):
@@ -649,6 +664,19 @@ class FilePrefix:
         rval = io.StringIO(self.contents_header)
         return rval
 
+    @property
+    def first_line(self) -> Optional[str]:
+        """First line of the (decompressed) file, ``None`` if the file isn't UTF-8 encoded."""
+        if self._first_line is None and self.non_utf8_error is None and self.contents_header is not None:
+            self._first_line = self.string_io().readline()
+        return self._first_line
+
+    @property
+    def is_tar(self) -> bool:
+        if self._is_tar is None:
+            self._is_tar = is_tar(self.filename)
+        return self._is_tar
+
     def text_io(self, *args, **kwargs) -> io.TextIOWrapper:
         return io.TextIOWrapper(io.BytesIO(self.contents_header_bytes), *args, **kwargs)
 
@@ -693,51 +721,171 @@ def _get_file_prefix(filename_or_file_prefix: Union[str, FilePrefix], auto_decom
     return filename_or_file_prefix
 
 
-def run_sniffers_raw(file_prefix: FilePrefix, sniff_order: Iterable["Data"]):
-    """Run through sniffers specified by sniff_order, return None of None match."""
-    fname = file_prefix.filename
-    file_ext = None
-    for datatype in sniff_order:
-        """
-        Some classes may not have a sniff function, which is ok.  In fact,
-        Binary, Data, Tabular and Text are examples of classes that should never
-        have a sniff function. Since these classes are default classes, they contain
-        few rules to filter out data of other formats, so they should be called
-        from this function after all other datatypes in sniff_order have not been
-        successfully discovered.
-        """
-        datatype_compressed = getattr(datatype, "compressed", False)
-        if datatype_compressed and not file_prefix.compressed_format and not datatype.file_ext.endswith(".tar"):
-            # we don't auto-detect tar as compressed
-            continue
-        if not datatype_compressed and file_prefix.compressed_format:
-            continue
-        if file_prefix.binary != datatype.is_binary and not datatype.is_binary == "maybe":
-            # Binary detection doesn't match datatype ...
-            compressed_data_for_compressed_text_datatype = (
-                file_prefix.binary and file_prefix.compressed_format and datatype_compressed and not datatype.is_binary
+class SniffTimings:
+    """Accumulate the time spent in the sniffer of each datatype, to find slow sniffers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+
+    def record(self, file_ext: str, seconds: float) -> None:
+        with self._lock:
+            self.seconds[file_ext] += seconds
+            self.calls[file_ext] += 1
+
+    def slowest(self, n: int = 10) -> List[Tuple[str, float, int]]:
+        """Return ``(file_ext, seconds, calls)`` of the ``n`` sniffers with the most time spent."""
+        with self._lock:
+            ranked = sorted(self.seconds.items(), key=lambda item: item[1], reverse=True)[:n]
+            return [(file_ext, seconds, self.calls[file_ext]) for file_ext, seconds in ranked]
+
+    def reset(self) -> None:
+        with self._lock:
+            self.seconds.clear()
+            self.calls.clear()
+
+
+SNIFF_TIMINGS = SniffTimings()
+
+
+class _Sniffer(NamedTuple):
+    datatype: "Data"
+    # ``sniff_prefix`` (if ``prefix`` is set, called with the ``FilePrefix``) or ``sniff`` of the datatype
+    sniff: Callable[..., bool]
+    prefix: bool
+    compressed_format: Optional[str]
+    magic: Optional[bytes]
+    first_line: Optional[Pattern[str]]
+    tar: bool
+
+
+class SniffIndex:
+    """Sniffers of a ``sniff_order``, indexed by the preconditions of their datatypes.
+
+    Which sniffers can match a file only depends on whether the file is compressed
+    and binary, and on the ``sniff_magic``, ``sniff_first_line`` and ``sniff_tar``
+    preconditions of the datatypes, which are checked against the :class:`FilePrefix`
+    shared by all sniffers. Only the remaining candidates are run, in ``sniff_order``.
+    """
+
+    def __init__(
+        self, sniff_order: Iterable["Data"], use_preconditions: bool = True, timings: Optional[SniffTimings] = None
+    ):
+        # Some classes may not have a sniff function, which is ok.  In fact,
+        # Binary, Data, Tabular and Text are examples of classes that should never
+        # have a sniff function. Since these classes are default classes, they contain
+        # few rules to filter out data of other formats, so they should be called
+        # from this function after all other datatypes in sniff_order have not been
+        # successfully discovered.
+        self.sniffers: List[_Sniffer] = []
+        for datatype in sniff_order:
+            sniff = getattr(datatype, "sniff_prefix", None)
+            prefix = sniff is not None
+            if sniff is None:
+                sniff = getattr(datatype, "sniff", None)
+                if sniff is None:
+                    continue
+            self.sniffers.append(
+                _Sniffer(
+                    datatype,
+                    sniff,
+                    prefix,
+                    getattr(datatype, "compressed_format", None),
+                    getattr(datatype, "sniff_magic", None) if use_preconditions else None,
+                    getattr(datatype, "sniff_first_line", None) if use_preconditions else None,
+                    getattr(datatype, "sniff_tar", False) if use_preconditions else False,
+                )
             )
-            if not compressed_data_for_compressed_text_datatype:
-                # ... and mismatch is not due to compressed text data for a compressed text datatype
-                continue
-        try:
-            if hasattr(datatype, "sniff_prefix"):
-                datatype_compressed_format = getattr(datatype, "compressed_format", None)
-                if file_prefix.compressed_format and datatype_compressed_format:
-                    # Compare the compressed format detected
-                    # to the expected.
-                    if file_prefix.compressed_format != datatype_compressed_format:
+        self.timings = SNIFF_TIMINGS if timings is None else timings
+        self._candidates: Dict[Tuple[bool, bool], List[_Sniffer]] = {}
+
+    def _static_candidates(self, compressed: bool, binary: bool) -> List[_Sniffer]:
+        key = (compressed, binary)
+        candidates = self._candidates.get(key)
+        if candidates is None:
+            candidates = []
+            for sniffer in self.sniffers:
+                datatype = sniffer.datatype
+                datatype_compressed = getattr(datatype, "compressed", False)
+                if datatype_compressed and not compressed and not datatype.file_ext.endswith(".tar"):
+                    # we don't auto-detect tar as compressed
+                    continue
+                if not datatype_compressed and compressed:
+                    continue
+                if binary != datatype.is_binary and not datatype.is_binary == "maybe":
+                    # Binary detection doesn't match datatype ...
+                    compressed_data_for_compressed_text_datatype = (
+                        binary and compressed and datatype_compressed and not datatype.is_binary
+                    )
+                    if not compressed_data_for_compressed_text_datatype:
+                        # ... and mismatch is not due to compressed text data for a compressed text datatype
                         continue
-                if datatype.sniff_prefix(file_prefix):
-                    file_ext = datatype.file_ext
-                    break
-            elif hasattr(datatype, "sniff") and datatype.sniff(fname):
-                file_ext = datatype.file_ext
-                break
-        except Exception:
-            pass
+                candidates.append(sniffer)
+            self._candidates[key] = candidates
+        return candidates
+
+    def candidates(self, file_prefix: FilePrefix) -> Iterable[_Sniffer]:
+        """Yield the sniffers that may match ``file_prefix``."""
+        for sniffer in self._static_candidates(bool(file_prefix.compressed_format), file_prefix.binary):
+            if sniffer.prefix and file_prefix.compressed_format and sniffer.compressed_format:
+                # Compare the compressed format detected
+                # to the expected.
+                if file_prefix.compressed_format != sniffer.compressed_format:
+                    continue
+            if sniffer.magic is not None and not file_prefix.startswith_bytes(sniffer.magic):
+                continue
+            if sniffer.first_line is not None:
+                first_line = file_prefix.first_line
+                if first_line is None or not sniffer.first_line.match(first_line):
+                    continue
+            if sniffer.tar and not file_prefix.is_tar:
+                continue
+            yield sniffer
+
+    def sniff(self, file_prefix: FilePrefix) -> Optional[str]:
+        """Return the extension of the first datatype whose sniffer matches, ``None`` if none match."""
+        for sniffer in self.candidates(file_prefix):
+            datatype = sniffer.datatype
+            start = time.perf_counter()
+            try:
+                matched = sniffer.sniff(file_prefix if sniffer.prefix else file_prefix.filename)
+            except Exception:
+                matched = False
+            seconds = time.perf_counter() - start
+            self.timings.record(datatype.file_ext, seconds)
+            if seconds > SLOW_SNIFF_SECONDS:
+                log.debug("Sniffing '%s' as %s took %.3f seconds", file_prefix.filename, datatype.file_ext, seconds)
+            if matched:
+                return datatype.file_ext
+        return None
+
+
+_sniff_indexes: "OrderedDict[Tuple[int, ...], SniffIndex]" = OrderedDict()
+_sniff_indexes_lock = threading.Lock()
+
+
+def get_sniff_index(sniff_order: Iterable["Data"]) -> SniffIndex:
+    """Return a (cached) :class:`SniffIndex` for ``sniff_order``."""
+    sniff_order = list(sniff_order)
+    # The index references the datatypes, so their ids can't be reused while it is cached.
+    key = tuple(map(id, sniff_order))
+    with _sniff_indexes_lock:
+        index = _sniff_indexes.get(key)
+        if index is None:
+            index = SniffIndex(sniff_order)
+            _sniff_indexes[key] = index
+            if len(_sniff_indexes) > SNIFF_INDEX_CACHE_SIZE:
+                _sniff_indexes.popitem(last=False)
+        else:
+            _sniff_indexes.move_to_end(key)
+    return index
 
-    return file_ext
+
+def run_sniffers_raw(file_prefix: FilePrefix, sniff_order: Union[SniffIndex, Iterable["Data"]]):
+    """Run through sniffers specified by sniff_order, return None of None match."""
+    index = sniff_order if isinstance(sniff_order, SniffIndex) else get_sniff_index(sniff_order)
+    return index.sniff(file_prefix)
 
 
 def zip_single_fileobj(path: StrPath) -> IO[bytes]:
@@ -824,8 +972,8 @@ def handle_compressed_file(
     if is_compressed and is_valid:
         if ext in AUTO_DETECT_EXTENSIONS:
             # attempt to sniff for a keep-compressed datatype (observing the sniff order)
-            sniff_datatypes = filter(lambda d: getattr(d, "compressed", False), datatypes_registry.sniff_order)
-            sniffed_ext = run_sniffers_raw(file_prefix, sniff_datatypes)
+            # (only keep-compressed datatypes are candidates for compressed files)
+            sniffed_ext = run_sniffers_raw(file_prefix, datatypes_registry.sniff_order)
             if sniffed_ext:
                 ext = sniffed_ext
                 keep_compressed = True
@@ -32,6 +32,7 @@ from galaxy.datatypes import (
 from galaxy.datatypes.binary import _BamOrSam
 from galaxy.datatypes.data import (
     DatatypeValidation,
+    get_ranged_fileobj,
     Text,
 )
 from galaxy.datatypes.dataproviders.column import (
@@ -156,7 +157,7 @@ class TabularData(Text):
         )
 
     def _read_chunk(self, trans, dataset: HasFileName, offset: int, ck_size: Optional[int] = None):
-        with compression_utils.get_fileobj(dataset.get_file_name()) as f:
+        with get_ranged_fileobj(dataset) as f:
             f.seek(offset)
             try:
                 ck_data = f.read(ck_size or trans.app.config.display_chunk_size)
@@ -14,6 +14,10 @@ from typing import (
     Union,
 )
 
+from sqlalchemy import (
+    insert,
+    inspect,
+)
 from sqlalchemy.orm.scoping import ScopedSession
 
 from galaxy.model import (
@@ -94,6 +98,10 @@ class PermissionProvider(AbstractPermissionProvider):
         if (permissions := self.permissions) is not UNSET:
             self._security_agent.set_all_dataset_permissions(primary_data.dataset, permissions, new=True, flush=False)
 
+    def set_default_hdas_permissions(self, hdas):
+        if (permissions := self.permissions) is not UNSET:
+            self._security_agent.set_new_datasets_permissions([hda.dataset for hda in hdas], permissions)
+
     def copy_dataset_permissions(self, init_from, primary_data):
         self._security_agent.copy_dataset_permissions(init_from.dataset, primary_data.dataset, flush=False)
 
@@ -229,6 +237,7 @@ class JobContext(BaseJobContext):
         final_job_state,
         max_discovered_files: Optional[int],
         flush_per_n_datasets=None,
+        bulk_persistence=False,
     ):
         self.tool = tool
         self._metadata_source_provider = metadata_source_provider
@@ -242,6 +251,7 @@ class JobContext(BaseJobContext):
         self._object_store = object_store
         self.final_job_state = final_job_state
         self._flush_per_n_datasets = flush_per_n_datasets
+        self._bulk_persistence = bulk_persistence
         self.max_discovered_files = float("inf") if max_discovered_files is None else max_discovered_files
         self.discovered_file_count = 0
         self._tag_handler = None
@@ -282,6 +292,10 @@ class JobContext(BaseJobContext):
     def flush_per_n_datasets(self) -> Optional[int]:
         return self._flush_per_n_datasets
 
+    @property
+    def bulk_persistence(self) -> bool:
+        return self._bulk_persistence
+
     @property
     def input_dbkey(self) -> str:
         return self._input_dbkey
@@ -335,6 +349,16 @@ class JobContext(BaseJobContext):
         assoc.job = self.job
         self.sa_session.add(assoc)
 
+    def add_output_dataset_associations(self, associations):
+        if not self.bulk_persistence:
+            return super().add_output_dataset_associations(associations)
+        job = self.job
+        rows = [{"job_id": job.id, "dataset_id": dataset.id, "name": name} for name, dataset in associations]
+        if rows:
+            self.sa_session.execute(insert(JobToOutputDatasetAssociation), rows)
+            if "output_datasets" not in inspect(job).unloaded:
+                self.sa_session.expire(job, ["output_datasets"])
+
     def add_library_dataset_to_folder(self, library_folder, ld):
         trans = self.work_context
         ldda = ld.library_dataset_dataset_association
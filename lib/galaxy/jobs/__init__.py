@@ -53,6 +53,13 @@ from galaxy.job_execution.setup import (
     TOOL_PROVIDED_JOB_METADATA_FILE,
     TOOL_PROVIDED_JOB_METADATA_KEYS,
 )
+from galaxy.jobs.finishing import (
+    DB_FLUSH,
+    DISCOVERY,
+    FinishingStageTimer,
+    METADATA_LOAD,
+    OBJECT_STORE_PUSH,
+)
 from galaxy.jobs.mapper import (
     JobMappingException,
     JobRunnerMapper,
@@ -1017,6 +1024,7 @@ class MinimalJobWrapper(HasResourceParameters):
         # resolved
         self._job_io = None
         self.tool_provided_job_metadata = None
+        self.finishing_stage_timer = FinishingStageTimer()
         self.params = None
         if job.params:
             self.params = loads(job.params)
@@ -1471,9 +1479,11 @@ class MinimalJobWrapper(HasResourceParameters):
                         dep_job_assoc.job,
                         "Execution of this dataset's job is paused because its input datasets are in an error state.",
                     )
+            old_state = job.state
             job.set_final_state(
                 job.states.ERROR, supports_skip_locked=self.app.application_stack.supports_skip_locked()
             )
+            self._job_state_changed(job, old_state, job.states.ERROR)
             job.command_line = self.command_line
             job.info = message
             # TODO: Put setting the stdout, stderr, and exit code in one place
@@ -1542,7 +1552,9 @@ class MinimalJobWrapper(HasResourceParameters):
         self.sa_session.refresh(job)
         if info is not None:
             job.info = info
-        job.set_state(model.Job.states.RESUBMITTED)
+        old_state = job.state
+        if job.set_state(model.Job.states.RESUBMITTED):
+            self._job_state_changed(job, old_state, model.Job.states.RESUBMITTED)
         self.sa_session.add(job)
         with transaction(self.sa_session):
             self.sa_session.commit()
@@ -1567,14 +1579,19 @@ class MinimalJobWrapper(HasResourceParameters):
             return
         if info:
             job.info = info
+        old_state = job.state
         state_changed = job.set_state(state)
         self.sa_session.add(job)
         if state_changed:
+            self._job_state_changed(job, old_state, state)
             job.update_output_states(self.app.application_stack.supports_skip_locked())
         if flush:
             with transaction(self.sa_session):
                 self.sa_session.commit()
 
+    def _job_state_changed(self, job, old_state, new_state):
+        """Hook called after this wrapper moved ``job`` from ``old_state`` to ``new_state``."""
+
     def get_state(self) -> str:
         job = self.get_job()
         self.sa_session.refresh(job)
@@ -1884,7 +1901,8 @@ class MinimalJobWrapper(HasResourceParameters):
         extended_metadata = self.external_output_metadata.extended
 
         # We collect the stderr from tools that write their stderr to galaxy.json
-        tool_provided_metadata = self.get_tool_provided_job_metadata()
+        with self.finishing_stage_timer.stage(METADATA_LOAD):
+            tool_provided_metadata = self.get_tool_provided_job_metadata()
 
         # Check the tool's stdout, stderr, and exit code for errors, but only
         # if the job has not already been marked as having an error.
@@ -1939,7 +1957,9 @@ class MinimalJobWrapper(HasResourceParameters):
                     user=job.user,
                     tag_handler=self.app.tag_handler.create_tag_handler_session(job.galaxy_session),
                 )
-                import_model_store.perform_import(history=job.history, job=job)
+                # Importing the populated outputs discovers datasets written by the metadata script.
+                with self.finishing_stage_timer.stage(DISCOVERY):
+                    import_model_store.perform_import(history=job.history, job=job)
                 if job.state == job.states.ERROR:
                     final_job_state = job.state
             except store.FileTracebackException as e:
@@ -1960,7 +1980,8 @@ class MinimalJobWrapper(HasResourceParameters):
         if not extended_metadata:
             # importing metadata will discover outputs if extended metadata
             try:
-                self.discover_outputs(job, inp_data, out_data, out_collections, final_job_state=final_job_state)
+                with self.finishing_stage_timer.stage(DISCOVERY):
+                    self.discover_outputs(job, inp_data, out_data, out_collections, final_job_state=final_job_state)
             except MaxDiscoveredFilesExceededError as e:
                 final_job_state = job.states.ERROR
                 job.job_messages = [
@@ -1990,7 +2011,10 @@ class MinimalJobWrapper(HasResourceParameters):
                     output_name = dataset_assoc.name
 
                     # Handles retry internally on error for instance...
-                    self._finish_dataset(output_name, dataset, job, context, final_job_state, remote_metadata_directory)
+                    with self.finishing_stage_timer.stage(METADATA_LOAD):
+                        self._finish_dataset(
+                            output_name, dataset, job, context, final_job_state, remote_metadata_directory
+                        )
                 if (
                     not final_job_state == job.states.ERROR
                     and not dataset_assoc.dataset.dataset.state == job.states.ERROR
@@ -2073,12 +2097,15 @@ class MinimalJobWrapper(HasResourceParameters):
         # differently and deadlocks can occur (one thread updates user and
         # waits on invocation and the other updates invocation and waits on
         # user).
-        with transaction(self.sa_session):
+        with self.finishing_stage_timer.stage(DB_FLUSH), transaction(self.sa_session):
             self.sa_session.commit()
 
         # Finally set the job state.  This should only happen *after* all
         # dataset creation, and will allow us to eliminate force_history_refresh.
+        old_state = job.state
         job.set_final_state(final_job_state, supports_skip_locked=self.app.application_stack.supports_skip_locked())
+        self._job_state_changed(job, old_state, final_job_state)
+        self.finishing_stage_timer.add_metrics(job)
         if not job.tasks:
             # If job was composed of tasks, don't attempt to recollect statistics
             self._collect_metrics(job, job_metrics_directory)
@@ -2469,7 +2496,8 @@ class MinimalJobWrapper(HasResourceParameters):
         if dataset not in job.output_library_datasets:
             purged = dataset.purged
             if not purged and not clean_only:
-                self.object_store.update_from_file(dataset, create=True)
+                with self.finishing_stage_timer.stage(OBJECT_STORE_PUSH):
+                    self.object_store.update_from_file(dataset, create=True)
             else:
                 # If the dataset is purged and Galaxy is configured to write directly
                 # to the object store from jobs - be sure that file is cleaned up. This
@@ -2586,6 +2614,10 @@ class JobWrapper(MinimalJobWrapper):
         """
         return self.job_runner_mapper.get_job_destination(self.params)
 
+    def _job_state_changed(self, job, old_state, new_state):
+        # Keep the handler's job counts for concurrency limits up to date
+        self.queue.job_state_changed(job, old_state, new_state)
+
     def set_job_destination(self, job_destination, external_id=None, flush=True, job=None):
         """
         Persist job destination params in the database for recovery.
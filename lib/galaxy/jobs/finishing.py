@@ -0,0 +1,116 @@
+"""
+Finish jobs outside of job runner worker threads and time the stages of finishing a job.
+
+Finishing a job (collecting its outputs, loading metadata, discovering datasets
+and pushing them to the object store) can take much longer than submitting or
+checking jobs. If ``job_finishing_workers`` is set, job runners hand their
+``finish_job`` work items to a :class:`JobFinishingExecutor` shared by all
+runners of a handler, so that a slow job only occupies one of the finishing
+workers and finishing can be scaled independently of submission.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor,
+)
+from contextlib import contextmanager
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+)
+
+log = logging.getLogger(__name__)
+
+# Plugin name finishing stage timings are recorded under as job metrics.
+FINISHING_METRICS_PLUGIN = "finishing"
+
+STDOUT_COLLECTION = "stdout_collection"
+METADATA_LOAD = "metadata_load"
+DISCOVERY = "discovery"
+OBJECT_STORE_PUSH = "object_store_push"
+DB_FLUSH = "db_flush"
+FINISHING_STAGES = (STDOUT_COLLECTION, METADATA_LOAD, DISCOVERY, OBJECT_STORE_PUSH, DB_FLUSH)
+
+
+class FinishingStageTimer:
+    """Accumulate the wall clock time spent in each stage of finishing a job.
+
+    Stages may be nested, time spent in an inner stage (e.g. pushing a dataset
+    to the object store during discovery) is only attributed to the inner
+    stage, so the recorded stage durations add up to the total time measured.
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self._stack: List[str] = []
+        self._last = 0.0
+
+    def _charge(self, now: float):
+        if self._stack:
+            stage = self._stack[-1]
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + now - self._last
+        self._last = now
+
+    @contextmanager
+    def stage(self, name: str):
+        self._charge(time.perf_counter())
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._charge(time.perf_counter())
+            self._stack.pop()
+
+    def add_metrics(self, has_metrics):
+        """Record the accumulated stage durations (in seconds) as job metrics."""
+        for stage, seconds in self.seconds.items():
+            has_metrics.add_metric(FINISHING_METRICS_PLUGIN, f"{stage}_seconds", round(seconds, 3))
+
+
+class JobFinishingExecutor:
+    """Bounded pool of workers dedicated to finishing jobs."""
+
+    def __init__(self, nworkers: int):
+        self.nworkers = nworkers
+        self._executor = ThreadPoolExecutor(max_workers=nworkers, thread_name_prefix="JobFinishingExecutor")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._futures: Set[Future] = set()
+
+    @property
+    def pending(self) -> int:
+        """Number of submitted finishing work items that have not completed yet."""
+        return self._pending
+
+    def submit(self, func: Callable, *args):
+        with self._lock:
+            self._pending += 1
+        future = self._executor.submit(func, *args)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+            self._futures.discard(future)
+        exception: Optional[BaseException] = None if future.cancelled() else future.exception()
+        if exception is not None:
+            log.error("Unhandled exception finishing job", exc_info=exception)
+
+    def shutdown(self):
+        log.info("Shutting down job finishing executor, %d work item(s) pending", self._pending)
+        # Jobs that haven't started finishing are recovered on the next startup.
+        # (ThreadPoolExecutor.shutdown only accepts cancel_futures on Python >= 3.9)
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+        self._executor.shutdown(wait=True)
@@ -3,9 +3,10 @@ Galaxy job handler, prepares, runs, tracks, and finishes Galaxy jobs
 """
 
 import datetime
+import math
 import os
 import time
-from collections import defaultdict
+from functools import partial
 from queue import (
     Empty,
     Queue,
@@ -13,6 +14,7 @@ from queue import (
 from typing import (
     Dict,
     List,
+    Optional,
     Tuple,
     Type,
     Union,
@@ -22,7 +24,6 @@ from sqlalchemy.exc import OperationalError
 from sqlalchemy.sql.expression import (
     and_,
     func,
-    not_,
     null,
     or_,
     select,
@@ -36,12 +37,23 @@ from galaxy.jobs import (
     JobWrapper,
     TaskWrapper,
 )
+from galaxy.jobs.finishing import JobFinishingExecutor
+from galaxy.jobs.job_counts import JobCountStore
 from galaxy.jobs.mapper import JobNotReadyException
+from galaxy.jobs.readiness import (
+    order_jobs_for_dispatch,
+    WaitingJobsIndex,
+)
 from galaxy.managers.jobs import get_jobs_to_check_at_startup
 from galaxy.model.base import (
     check_database_connection,
     transaction,
 )
+from galaxy.model.database_notify import (
+    JOB_CHANNEL,
+    monitor_sleep_interval,
+    MonitorWakeup,
+)
 from galaxy.structured_app import MinimalManagerApp
 from galaxy.util import unicodify
 from galaxy.util.custom_logging import get_logger
@@ -256,11 +268,19 @@ class JobHandlerQueue(BaseJobHandlerQueue):
         # self.queue contains tuples: (job_id, tool_id)
 
         # Initialize structures for handling job limits
+        if self.app.config.cache_user_job_count:
+            self.job_counts = JobCountStore(reconcile_interval=self.app.config.cache_user_job_count_reconcile_interval)
+        else:
+            # Cleared (and thereby recounted) on every iteration
+            self.job_counts = JobCountStore(reconcile_interval=math.inf, count_users=False)
         self.__clear_job_count()
         # Contains job ids for jobs that are waiting (only use from monitor thread)
         self.waiting_jobs: List[int] = []
         # Contains wrappers of jobs that are limited or ready (so they aren't created unnecessarily/multiple times)
         self.job_wrappers: Dict[int, JobWrapper] = {}
+        # Quota checks answered from the per-cycle cache of WaitingJobsIndex vs. computed
+        self.quota_check_hits = 0
+        self.quota_check_misses = 0
         name = "JobHandlerQueue.monitor_thread"
         self._init_monitor_thread(name, target=self.__monitor, config=app.config)
         self.job_grabber = None
@@ -275,6 +295,8 @@ class JobHandlerQueue(BaseJobHandlerQueue):
                 self_handler_tags=self.app.job_config.self_handler_tags,
                 handler_tags=self.app.job_config.handler_tags,
             )
+        self.notification_listener = getattr(app, "database_notification_listener", None)
+        self.notification_wakeup: Optional[MonitorWakeup] = None
 
     def start(self):
         """
@@ -285,8 +307,22 @@ class JobHandlerQueue(BaseJobHandlerQueue):
         self.__check_jobs_at_startup()
         # Start the queue
         self.monitor_thread.start()
+        if self.notification_listener is not None:
+            self.notification_wakeup = MonitorWakeup(
+                self.sleeper,
+                handler_tags=self.__notification_handler_tags,
+                get_timer=partial(
+                    self.app.execution_timer_factory.get_timer,
+                    "internal.galaxy.jobs.handlers.wake_to_dispatch",
+                    "Job handler monitor step after database notification complete.",
+                ),
+            )
+            self.notification_listener.subscribe(JOB_CHANNEL, self.notification_wakeup)
         log.info("job handler queue started")
 
+    def __notification_handler_tags(self):
+        return {self.app.config.server_name, *self.app.job_config.self_handler_tags}
+
     def job_wrapper(self, job, use_persisted_destination=False):
         return JobWrapper(job, self, use_persisted_destination=use_persisted_destination)
 
@@ -385,7 +421,13 @@ class JobHandlerQueue(BaseJobHandlerQueue):
                 # With sqlite backends we can run into locked databases occasionally
                 # To avoid that the monitor step locks again we backoff a little longer.
                 self._monitor_sleep(5)
-            self._monitor_sleep(self.app.config.job_handler_monitor_sleep)
+            self._monitor_sleep(
+                monitor_sleep_interval(
+                    self.notification_listener,
+                    self.app.config.job_handler_monitor_sleep,
+                    self.app.config.database_notifications_poll_interval,
+                )
+            )
 
     def __monitor_step(self):
         """
@@ -394,6 +436,7 @@ class JobHandlerQueue(BaseJobHandlerQueue):
         monitor_step_timer = self.app.execution_timer_factory.get_timer(
             "internal.galaxy.jobs.handlers.monitor_step", "Job handler monitor step complete."
         )
+        wake_to_dispatch_timer = self.notification_wakeup.pop_timer() if self.notification_wakeup else None
         if self.job_grabber is not None:
             self.job_grabber.grab_unhandled_items()
         try:
@@ -403,6 +446,8 @@ class JobHandlerQueue(BaseJobHandlerQueue):
         finally:
             self.sa_session.remove()
         log.trace(monitor_step_timer.to_str())
+        if wake_to_dispatch_timer is not None:
+            log.debug(wake_to_dispatch_timer.to_str())
 
     def __handle_waiting_jobs(self):
         """
@@ -480,8 +525,9 @@ class JobHandlerQueue(BaseJobHandlerQueue):
                     .filter(ranked.c.rank <= self.app.job_config.handler_ready_window_size)
                     .all()
                 )
-            # Filter jobs with invalid input states
-            jobs_to_check = self.__filter_jobs_with_invalid_input_states(jobs_to_check)
+            # Load the inputs of all new jobs at once and filter jobs with invalid input states
+            waiting_jobs_index = WaitingJobsIndex(self.sa_session, jobs_to_check)
+            jobs_to_check = self.__filter_jobs_with_invalid_input_states(jobs_to_check, waiting_jobs_index)
             # Fetch all "resubmit" jobs
             resubmit_jobs = (
                 self.sa_session.query(model.Job)
@@ -498,8 +544,7 @@ class JobHandlerQueue(BaseJobHandlerQueue):
         else:
             # Get job objects and append to watch queue for any which were
             # previously waiting
-            for job_id in self.waiting_jobs:
-                jobs_to_check.append(self.sa_session.query(model.Job).get(job_id))
+            job_ids_to_check = list(self.waiting_jobs)
             try:
                 while 1:
                     message = self.queue.get_nowait()
@@ -507,10 +552,12 @@ class JobHandlerQueue(BaseJobHandlerQueue):
                         raise StopSignalException()
                     # Unpack the message
                     job_id, tool_id = message
-                    # Get the job object and append to watch queue
-                    jobs_to_check.append(self.sa_session.query(model.Job).get(job_id))
+                    # Append to watch queue, job objects are loaded in bulk below
+                    job_ids_to_check.append(job_id)
             except Empty:
                 pass
+            jobs_to_check = WaitingJobsIndex.load_jobs(self.sa_session, job_ids_to_check)
+            waiting_jobs_index = WaitingJobsIndex(self.sa_session, jobs_to_check)
         # Ensure that we get new job counts on each iteration
         self.__clear_job_count()
         # Check resubmit jobs first so that limits of new jobs will still be enforced
@@ -519,17 +566,23 @@ class JobHandlerQueue(BaseJobHandlerQueue):
             # Reassemble resubmit job destination from persisted value
             jw = self.__recover_job_wrapper(job)
             if jw.is_ready_for_resubmission(job):
-                self.increase_running_job_count(job.user_id, jw.job_destination.id)
+                self.increase_running_job_count(job.user_id, jw.job_destination.id, job_id=job.id)
                 self.dispatcher.put(jw)
         # Iterate over new and waiting jobs and look for any that are
-        # ready to run
+        # ready to run, interleaving the jobs of different users
         new_waiting_jobs = []
-        for job in jobs_to_check:
+        ready_job_ids = []
+        for job in order_jobs_for_dispatch(jobs_to_check):
             try:
                 # Check the job's dependencies, requeue if they're not done.
                 # Some of these states will only happen when using the in-memory job queue
                 if job.copied_from_job_id:
-                    copied_from_job = self.sa_session.query(model.Job).get(job.copied_from_job_id)
+                    copied_from_job = waiting_jobs_index.copied_from_job(job)
+                    if copied_from_job is None:
+                        log.warning(
+                            "(%d) Job was copied from job %s which no longer exists", job.id, job.copied_from_job_id
+                        )
+                        continue
                     job.numeric_metrics = copied_from_job.numeric_metrics
                     job.text_metrics = copied_from_job.text_metrics
                     job.dependencies = copied_from_job.dependencies
@@ -545,7 +598,7 @@ class JobHandlerQueue(BaseJobHandlerQueue):
                     job.job_runner_name = copied_from_job.job_runner_name
                     job.job_runner_external_id = copied_from_job.job_runner_external_id
                     continue
-                job_state = self.__check_job_state(job)
+                job_state = self.__check_job_state(job, waiting_jobs_index)
                 if job_state == JOB_WAIT:
                     new_waiting_jobs.append(job.id)
                 elif job_state == JOB_INPUT_ERROR:
@@ -553,6 +606,7 @@ class JobHandlerQueue(BaseJobHandlerQueue):
                 elif job_state == JOB_INPUT_DELETED:
                     log.info("(%d) Job unable to run: one or more inputs deleted" % job.id)
                 elif job_state == JOB_READY:
+                    ready_job_ids.append(job.id)
                     self.dispatcher.put(self.job_wrappers.pop(job.id))
                     log.info("(%d) Job dispatched" % job.id)
                 elif job_state == JOB_DELETED:
@@ -587,71 +641,47 @@ class JobHandlerQueue(BaseJobHandlerQueue):
         # Remove cached wrappers for any jobs that are no longer being tracked
         for id in set(self.job_wrappers.keys()) - set(new_waiting_jobs):
             del self.job_wrappers[id]
+        self.__record_quota_checks(waiting_jobs_index)
+        # We record the input dataset versions, now that we know the inputs are ready
+        waiting_jobs_index.record_input_dataset_versions(ready_job_ids)
         # Commit updated state
         with transaction(self.sa_session):
             self.sa_session.commit()
 
-    def __filter_jobs_with_invalid_input_states(self, jobs):
+    def __record_quota_checks(self, waiting_jobs_index: WaitingJobsIndex):
+        hits = waiting_jobs_index.quota_check_hits
+        misses = waiting_jobs_index.quota_check_misses
+        if not (hits or misses):
+            return
+        self.quota_check_hits += hits
+        self.quota_check_misses += misses
+        execution_timer_factory = getattr(self.app, "execution_timer_factory", None)
+        statsd_client = getattr(execution_timer_factory, "galaxy_statsd_client", None)
+        if statsd_client:
+            statsd_client.incr("internal.galaxy.jobs.handlers.quota_check_hits", hits)
+            statsd_client.incr("internal.galaxy.jobs.handlers.quota_check_misses", misses)
+        log.trace(
+            "Checked quota of %d job(s) with %d quota calculation(s), handler quota checks %s",
+            hits + misses,
+            misses,
+            self.metrics(),
+        )
+
+    def metrics(self) -> Dict[str, float]:
+        """Return the quota checks of this handler and the share answered without a quota calculation."""
+        checks = self.quota_check_hits + self.quota_check_misses
+        return {
+            "quota_check_hits": self.quota_check_hits,
+            "quota_check_misses": self.quota_check_misses,
+            "quota_check_hit_rate": round(self.quota_check_hits / checks, 3) if checks else 0.0,
+        }
+
+    def __filter_jobs_with_invalid_input_states(self, jobs, waiting_jobs_index: WaitingJobsIndex):
         """
         Takes  list of jobs and filters out jobs whose input datasets are in invalid state and
         set these jobs and their dependent jobs to paused.
         """
-        job_ids_to_check = [j.id for j in jobs]
-        queries = []
-        for job_to_input, input_association in [
-            (model.JobToInputDatasetAssociation, model.HistoryDatasetAssociation),
-            (model.JobToInputLibraryDatasetAssociation, model.LibraryDatasetDatasetAssociation),
-        ]:
-            q = (
-                self.sa_session.query(
-                    model.Job.id,
-                    input_association.deleted,
-                    input_association._state,
-                    input_association.name,
-                    model.Dataset.deleted,
-                    model.Dataset.purged,
-                    model.Dataset.state,
-                )
-                .join(job_to_input.job)
-                .join(input_association)
-                .join(model.Dataset)
-                .filter(model.Job.id.in_(job_ids_to_check))
-                .filter(
-                    or_(
-                        model.Dataset.deleted == true(),
-                        not_(
-                            or_(
-                                model.Dataset.state == model.Dataset.states.OK,
-                                model.Dataset.state == model.Dataset.states.DEFERRED,
-                            )
-                        ),
-                        input_association.deleted == true(),
-                        input_association._state.in_(
-                            (input_association.states.FAILED_METADATA, input_association.states.SETTING_METADATA)
-                        ),
-                    )
-                )
-                .all()
-            )
-            queries.extend(q)
-        jobs_to_pause = defaultdict(list)
-        jobs_to_fail = defaultdict(list)
-        jobs_to_ignore = defaultdict(list)
-        for job_id, hda_deleted, hda_state, hda_name, dataset_deleted, dataset_purged, dataset_state in queries:
-            if hda_deleted or dataset_deleted:
-                if dataset_purged:
-                    # If the dataset has been purged we can't resume the job by undeleting the input
-                    jobs_to_fail[job_id].append(f"Input dataset '{hda_name}' was deleted before the job started")
-                else:
-                    jobs_to_pause[job_id].append(f"Input dataset '{hda_name}' was deleted before the job started")
-            elif hda_state == model.HistoryDatasetAssociation.states.FAILED_METADATA:
-                jobs_to_pause[job_id].append(f"Input dataset '{hda_name}' failed to properly set metadata")
-            elif dataset_state == model.Dataset.states.PAUSED:
-                jobs_to_pause[job_id].append(f"Input dataset '{hda_name}' was paused before the job started")
-            elif dataset_state == model.Dataset.states.ERROR:
-                jobs_to_pause[job_id].append(f"Input dataset '{hda_name}' is in error state")
-            elif dataset_state != model.Dataset.states.OK:
-                jobs_to_ignore[job_id].append(f"Input dataset '{hda_name}' is in {dataset_state} state")
+        jobs_to_pause, jobs_to_fail, jobs_to_ignore = waiting_jobs_index.invalid_input_states()
         for job_id in sorted(jobs_to_pause):
             pause_message = ", ".join(jobs_to_pause[job_id])
             pause_message = f"{pause_message}. To resume this job fix the input dataset(s)."
@@ -671,7 +701,7 @@ class JobHandlerQueue(BaseJobHandlerQueue):
         jobs_to_ignore.update(jobs_to_fail)
         return [j for j in jobs if j.id not in jobs_to_ignore]
 
-    def __check_job_state(self, job):
+    def __check_job_state(self, job, waiting_jobs_index: WaitingJobsIndex):
         """
         Check if a job is ready to run by verifying that each of its input
         datasets is ready (specifically in the OK state). If any input dataset
@@ -682,7 +712,7 @@ class JobHandlerQueue(BaseJobHandlerQueue):
         datasets are still being prepared.
         """
         if not self.track_jobs_in_database:
-            in_memory_not_ready_state = self.__verify_in_memory_job_inputs(job)
+            in_memory_not_ready_state = self.__verify_in_memory_job_inputs(job, waiting_jobs_index)
             if in_memory_not_ready_state:
                 return in_memory_not_ready_state
 
@@ -699,18 +729,16 @@ class JobHandlerQueue(BaseJobHandlerQueue):
         # If state == JOB_READY, assume job_destination also set - otherwise
         # in case of various error or cancelled states do not assume
         # destination has been set.
-        state, job_destination = self.__verify_job_ready(job, job_wrapper)
+        state, job_destination = self.__verify_job_ready(job, job_wrapper, waiting_jobs_index)
 
         if state == JOB_READY:
             # PASS.  increase usage by one job (if caching) so that multiple jobs aren't dispatched on this queue iteration
-            self.increase_running_job_count(job.user_id, job_destination.id)
-            for job_to_input_dataset_association in job.input_datasets:
-                # We record the input dataset version, now that we know the inputs are ready
-                if job_to_input_dataset_association.dataset:
-                    job_to_input_dataset_association.dataset_version = job_to_input_dataset_association.dataset.version
+            self.increase_running_job_count(job.user_id, job_destination.id, job_id=job.id)
+            if job.user_id is None and job.session_id:
+                waiting_jobs_index.increase_session_job_count(job.session_id)
         return state
 
-    def __verify_job_ready(self, job, job_wrapper):
+    def __verify_job_ready(self, job, job_wrapper, waiting_jobs_index: WaitingJobsIndex):
         """Compute job destination and verify job is ready at that
         destination by checking job limits and quota. If this method
         return a job state of JOB_READY - it MUST also return a job
@@ -743,8 +771,10 @@ class JobHandlerQueue(BaseJobHandlerQueue):
         state = self.__check_destination_jobs(job, job_wrapper)
 
         if state == JOB_READY:
-            state = self.__check_user_jobs(job, job_wrapper)
-        if state == JOB_READY and self.app.quota_agent.is_over_quota(self.app, job, job_destination):
+            state = self.__check_user_jobs(job, job_wrapper, waiting_jobs_index)
+        if state == JOB_READY and waiting_jobs_index.is_over_quota(
+            self.app.quota_agent, self.app, job, job_destination
+        ):
             return JOB_USER_OVER_QUOTA, job_destination
         # Check total walltime limits
         if state == JOB_READY and "delta" in self.app.job_config.limits.total_walltime:
@@ -783,7 +813,7 @@ class JobHandlerQueue(BaseJobHandlerQueue):
 
         return state, job_destination
 
-    def __verify_in_memory_job_inputs(self, job):
+    def __verify_in_memory_job_inputs(self, job, waiting_jobs_index: WaitingJobsIndex):
         """Perform the same checks that happen via SQL for in-memory managed
         jobs.
         """
@@ -791,159 +821,99 @@ class JobHandlerQueue(BaseJobHandlerQueue):
             return JOB_DELETED
         elif job.state == model.Job.states.ERROR:
             return JOB_ADMIN_DELETED
-        for dataset_assoc in job.input_datasets + job.input_library_datasets:
-            idata = dataset_assoc.dataset
-            if not idata:
-                continue
+        problem, message = waiting_jobs_index.in_memory_input_state(
+            job, self.app.datatypes_registry.set_external_metadata_tool.id
+        )
+        if problem == "deleted":
             # don't run jobs for which the input dataset was deleted
-            if idata.deleted:
-                self.job_wrappers.pop(job.id, self.job_wrapper(job)).fail(
-                    f"input data {idata.hid} (file: {idata.get_file_name()}) was deleted before the job started"
-                )
-                return JOB_INPUT_DELETED
+            self.job_wrappers.pop(job.id, self.job_wrapper(job)).fail(message)
+            return JOB_INPUT_DELETED
+        elif problem == "error":
             # an error in the input data causes us to bail immediately
-            elif idata.state == idata.states.ERROR:
-                self.job_wrappers.pop(job.id, self.job_wrapper(job)).fail(f"input data {idata.hid} is in error state")
-                return JOB_INPUT_ERROR
-            elif idata.state == idata.states.FAILED_METADATA:
-                self.job_wrappers.pop(job.id, self.job_wrapper(job)).fail(
-                    f"input data {idata.hid} failed to properly set metadata"
-                )
-                return JOB_INPUT_ERROR
-            elif idata.state != idata.states.OK and not (
-                idata.state == idata.states.SETTING_METADATA
-                and job.tool_id is not None
-                and job.tool_id == self.app.datatypes_registry.set_external_metadata_tool.id
-            ):
-                # need to requeue
-                return JOB_WAIT
+            self.job_wrappers.pop(job.id, self.job_wrapper(job)).fail(message)
+            return JOB_INPUT_ERROR
+        elif problem == "wait":
+            # need to requeue
+            return JOB_WAIT
 
         # All inputs ready to go.
         return None
 
     def __clear_job_count(self):
-        self.user_job_count = None
-        self.user_job_count_per_destination = None
-        self.total_job_count_per_destination = None
+        if not self.app.config.cache_user_job_count:
+            # Only jobs dispatched during this iteration are tracked, the rest is queried per user below
+            self.job_counts.clear()
+            self.__user_job_count_from_database = {}
+            self.__user_job_count_per_destination_from_database = {}
 
     def get_user_job_count(self, user_id):
-        self.__cache_user_job_count()
         # This could have been incremented by a previous job dispatched on this iteration, even if we're not caching
-        rval = self.user_job_count.get(user_id, 0)
+        rval = self.job_counts.user_job_count(self.sa_session, user_id)
         if not self.app.config.cache_user_job_count:
-            result = self.sa_session.execute(
-                select(func.count(model.Job.table.c.id)).where(
-                    and_(
-                        model.Job.table.c.state.in_(
-                            (model.Job.states.QUEUED, model.Job.states.RUNNING, model.Job.states.RESUBMITTED)
-                        ),
-                        (model.Job.table.c.user_id == user_id),
+            if user_id not in self.__user_job_count_from_database:
+                result = self.sa_session.execute(
+                    select(func.count(model.Job.table.c.id)).where(
+                        and_(
+                            model.Job.table.c.state.in_(
+                                (model.Job.states.QUEUED, model.Job.states.RUNNING, model.Job.states.RESUBMITTED)
+                            ),
+                            (model.Job.table.c.user_id == user_id),
+                        )
                     )
                 )
-            )
-            for row in result:
-                # there should only be one row
-                rval += row[0]
+                self.__user_job_count_from_database[user_id] = result.scalar() or 0
+            rval += self.__user_job_count_from_database[user_id]
         return rval
 
-    def __cache_user_job_count(self):
-        # Cache the job count if necessary
-        if self.user_job_count is None and self.app.config.cache_user_job_count:
-            self.user_job_count = {}
-            query = self.sa_session.execute(
-                select(model.Job.table.c.user_id, func.count(model.Job.table.c.user_id))
-                .where(
-                    and_(
-                        model.Job.table.c.state.in_(
-                            (model.Job.states.QUEUED, model.Job.states.RUNNING, model.Job.states.RESUBMITTED)
-                        ),
-                        (model.Job.table.c.user_id != null()),
-                    )
-                )
-                .group_by(model.Job.table.c.user_id)
-            )
-            for row in query:
-                self.user_job_count[row[0]] = row[1]
-        elif self.user_job_count is None:
-            self.user_job_count = {}
-
     def get_user_job_count_per_destination(self, user_id):
-        self.__cache_user_job_count_per_destination()
-        cached = self.user_job_count_per_destination.get(user_id, {})
-        if self.app.config.cache_user_job_count:
-            rval = cached
-        else:
+        rval = self.job_counts.user_job_count_per_destination(self.sa_session, user_id)
+        if not self.app.config.cache_user_job_count:
             # The cached count is still used even when we're not caching, it is
             # incremented when a job is run by this handler to ensure that
             # multiple jobs can't get past the limits in one iteration of the
             # queue.
-            rval = {}
-            rval.update(cached)
-            result = self.sa_session.execute(
-                select(
-                    model.Job.table.c.destination_id, func.count(model.Job.table.c.destination_id).label("job_count")
-                )
-                .where(
-                    and_(
-                        model.Job.table.c.state.in_((model.Job.states.QUEUED, model.Job.states.RUNNING)),
-                        (model.Job.table.c.user_id == user_id),
+            if user_id not in self.__user_job_count_per_destination_from_database:
+                result = self.sa_session.execute(
+                    select(
+                        model.Job.table.c.destination_id,
+                        func.count(model.Job.table.c.destination_id).label("job_count"),
+                    )
+                    .where(
+                        and_(
+                            model.Job.table.c.state.in_((model.Job.states.QUEUED, model.Job.states.RUNNING)),
+                            (model.Job.table.c.user_id == user_id),
+                        )
                     )
+                    .group_by(model.Job.table.c.destination_id)
                 )
-                .group_by(model.Job.table.c.destination_id)
-            )
-            for row in result.mappings():
+                self.__user_job_count_per_destination_from_database[user_id] = {
+                    row["destination_id"]: row["job_count"] for row in result.mappings()
+                }
+            for destination_id, job_count in self.__user_job_count_per_destination_from_database[user_id].items():
                 # Add the count from the database to the cached count
-                rval[row["destination_id"]] = rval.get(row["destination_id"], 0) + row["job_count"]
+                rval[destination_id] = rval.get(destination_id, 0) + job_count
         return rval
 
-    def __cache_user_job_count_per_destination(self):
-        # Cache the job count if necessary
-        if self.user_job_count_per_destination is None and self.app.config.cache_user_job_count:
-            self.user_job_count_per_destination = {}
-            result = self.sa_session.execute(
-                select(
-                    model.Job.table.c.user_id,
-                    model.Job.table.c.destination_id,
-                    func.count(model.Job.table.c.user_id).label("job_count"),
-                )
-                .where(and_(model.Job.table.c.state.in_((model.Job.states.QUEUED, model.Job.states.RUNNING))))
-                .group_by(model.Job.table.c.user_id, model.Job.table.c.destination_id)
-            )
-            for row in result.mappings():
-                if row["user_id"] not in self.user_job_count_per_destination:
-                    self.user_job_count_per_destination[row["user_id"]] = {}
-                self.user_job_count_per_destination[row["user_id"]][row["destination_id"]] = row["job_count"]
-        elif self.user_job_count_per_destination is None:
-            self.user_job_count_per_destination = {}
-
-    def increase_running_job_count(self, user_id, destination_id):
-        if (
-            self.app.job_config.limits.registered_user_concurrent_jobs
-            or self.app.job_config.limits.anonymous_user_concurrent_jobs
-            or self.app.job_config.limits.destination_user_concurrent_jobs
-        ):
-            if self.user_job_count is None:
-                self.user_job_count = {}
-            if self.user_job_count_per_destination is None:
-                self.user_job_count_per_destination = {}
-            self.user_job_count[user_id] = self.user_job_count.get(user_id, 0) + 1
-            if user_id not in self.user_job_count_per_destination:
-                self.user_job_count_per_destination[user_id] = {}
-            self.user_job_count_per_destination[user_id][destination_id] = (
-                self.user_job_count_per_destination[user_id].get(destination_id, 0) + 1
-            )
-        if self.app.job_config.limits.destination_total_concurrent_jobs:
-            if self.total_job_count_per_destination is None:
-                self.total_job_count_per_destination = {}
-            self.total_job_count_per_destination[destination_id] = (
-                self.total_job_count_per_destination.get(destination_id, 0) + 1
-            )
+    def increase_running_job_count(self, user_id, destination_id, job_id=None):
+        limits = self.app.job_config.limits
+        count_user = bool(
+            limits.registered_user_concurrent_jobs
+            or limits.anonymous_user_concurrent_jobs
+            or limits.destination_user_concurrent_jobs
+        )
+        if count_user or limits.destination_total_concurrent_jobs:
+            self.job_counts.job_dispatched(user_id, destination_id, count_user=count_user, job_id=job_id)
+
+    def job_state_changed(self, job, old_state, new_state):
+        """Called by job wrappers after moving ``job`` from ``old_state`` to ``new_state``."""
+        if self.app.config.cache_user_job_count:
+            self.job_counts.job_state_changed(job.user_id, job.destination_id, old_state, new_state, job_id=job.id)
 
-    def __check_user_jobs(self, job, job_wrapper):
+    def __check_user_jobs(self, job, job_wrapper, waiting_jobs_index: WaitingJobsIndex):
         # TODO: Update output datasets' _state = LIMITED or some such new
         # state, so the UI can reflect what jobs are waiting due to concurrency
         # limits
-        if job.user:
+        if job.user_id:
             # Check the hard limit first
             if self.app.job_config.limits.registered_user_concurrent_jobs:
                 count = self.get_user_job_count(job.user_id)
@@ -970,22 +940,10 @@ class JobHandlerQueue(BaseJobHandlerQueue):
                             count += count_per_id.get(id, 0)
                         if count >= self.app.job_config.limits.destination_user_concurrent_jobs[tag]:
                             return JOB_WAIT
-        elif job.galaxy_session:
+        elif job.session_id:
             # Anonymous users only get the hard limit
             if self.app.job_config.limits.anonymous_user_concurrent_jobs:
-                count = (
-                    self.sa_session.query(model.Job)
-                    .enable_eagerloads(False)
-                    .filter(
-                        and_(
-                            model.Job.session_id == job.galaxy_session.id,
-                            or_(
-                                model.Job.state == model.Job.states.RUNNING, model.Job.state == model.Job.states.QUEUED
-                            ),
-                        )
-                    )
-                    .count()
-                )
+                count = waiting_jobs_index.session_job_count(job.session_id)
                 if count >= self.app.job_config.limits.anonymous_user_concurrent_jobs:
                     return JOB_WAIT
         else:
@@ -994,26 +952,11 @@ class JobHandlerQueue(BaseJobHandlerQueue):
             )
         return JOB_READY
 
-    def __cache_total_job_count_per_destination(self):
-        # Cache the job count if necessary
-        if self.total_job_count_per_destination is None:
-            self.total_job_count_per_destination = {}
-            result = self.sa_session.execute(
-                select(
-                    model.Job.table.c.destination_id, func.count(model.Job.table.c.destination_id).label("job_count")
-                )
-                .where(and_(model.Job.table.c.state.in_((model.Job.states.QUEUED, model.Job.states.RUNNING))))
-                .group_by(model.Job.table.c.destination_id)
-            )
-            for row in result.mappings():
-                self.total_job_count_per_destination[row["destination_id"]] = row["job_count"]
-
     def get_total_job_count_per_destination(self):
-        self.__cache_total_job_count_per_destination()
         # Always use caching (at worst a job will have to wait one iteration,
         # and this would be more fair anyway as it ensures FIFO scheduling,
         # insofar as FIFO would be fair...)
-        return self.total_job_count_per_destination
+        return self.job_counts.total_job_count_per_destination(self.sa_session)
 
     def __check_destination_jobs(self, job, job_wrapper):
         if self.app.job_config.limits.destination_total_concurrent_jobs:
@@ -1200,6 +1143,12 @@ class DefaultJobDispatcher:
         # dict by the plugin.
         self.app.job_config.convert_legacy_destinations(self.job_runners)
         log.debug(f"Loaded job runners plugins: {':'.join(self.job_runners.keys())}")
+        self.finishing_executor = None
+        if self.app.config.job_finishing_workers:
+            self.finishing_executor = JobFinishingExecutor(self.app.config.job_finishing_workers)
+            log.debug(f"Finishing jobs with {self.app.config.job_finishing_workers} dedicated worker(s)")
+            for runner in self.job_runners.values():
+                runner.finishing_executor = self.finishing_executor
 
     def start(self):
         for runner in self.job_runners.values():
@@ -1290,5 +1239,7 @@ class DefaultJobDispatcher:
             except Exception:
                 failures.append(name)
                 log.exception("Failed to shutdown runner %s", name)
+        if self.finishing_executor is not None:
+            self.finishing_executor.shutdown()
         if failures:
             raise Exception(f"Failed to shutdown runners: {', '.join(failures)}")
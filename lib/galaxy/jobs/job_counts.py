@@ -0,0 +1,202 @@
+"""
+Counts of active jobs per user and destination used to enforce job concurrency limits.
+"""
+
+import logging
+import threading
+import time
+from typing import (
+    Dict,
+    Optional,
+    Tuple,
+)
+
+from sqlalchemy import (
+    func,
+    null,
+    select,
+)
+
+from galaxy import model
+
+log = logging.getLogger(__name__)
+
+# States counted against a user's overall concurrent job limit.
+USER_COUNTED_STATES = (model.Job.states.QUEUED, model.Job.states.RUNNING, model.Job.states.RESUBMITTED)
+# States counted against the per-destination concurrent job limits.
+DESTINATION_COUNTED_STATES = (model.Job.states.QUEUED, model.Job.states.RUNNING)
+
+
+class JobCountStore:
+    """Incrementally maintained active job counts for a job handler.
+
+    Counts are loaded with a full recount of the ``job`` table the first time
+    they are needed and again whenever ``reconcile_interval`` seconds have
+    elapsed. In between, the handler records dispatched jobs with
+    :meth:`job_dispatched` and job wrappers record jobs leaving an active state
+    with :meth:`job_state_changed`, so that limits can be checked with dictionary
+    lookups instead of ``GROUP BY`` queries. Jobs dispatched or finished by other
+    handlers are picked up at the next reconciliation.
+
+    Dispatched jobs stay in the ``new`` state until their runner queues them,
+    the recount includes the jobs this handler dispatched that are still
+    ``new`` so they aren't dropped from the counts and decremented later.
+
+    If ``count_users`` is ``False`` only the total counts per destination are
+    recounted, user counts then only reflect jobs recorded as dispatched.
+    """
+
+    def __init__(self, reconcile_interval: float = 0, count_users: bool = True):
+        self.reconcile_interval = reconcile_interval
+        self.count_users = count_users
+        self._lock = threading.Lock()
+        self._last_reconcile: Optional[float] = None
+        self._user_job_count: Dict[int, int] = {}
+        self._user_job_count_per_destination: Dict[int, Dict[str, int]] = {}
+        self._total_job_count_per_destination: Dict[str, int] = {}
+        # Jobs dispatched by this handler that haven't changed state yet: job id -> (user id, destination id, counted user)
+        self._dispatched: Dict[int, Tuple[Optional[int], str, bool]] = {}
+
+    def clear(self):
+        """Drop all counts, forcing a recount the next time counts are requested."""
+        with self._lock:
+            self._last_reconcile = None
+            self._user_job_count = {}
+            self._user_job_count_per_destination = {}
+            self._total_job_count_per_destination = {}
+            self._dispatched = {}
+
+    def needs_reconcile(self) -> bool:
+        return self._last_reconcile is None or time.monotonic() - self._last_reconcile >= self.reconcile_interval
+
+    def reconcile(self, sa_session):
+        """Replace the counts with a full recount from the database."""
+        user_job_count: Dict[int, int] = {}
+        user_job_count_per_destination: Dict[int, Dict[str, int]] = {}
+        total_job_count_per_destination: Dict[str, int] = {}
+        job_table = model.Job.table
+        if self.count_users:
+            result = sa_session.execute(
+                select(job_table.c.user_id, func.count(job_table.c.user_id))
+                .where(job_table.c.state.in_(USER_COUNTED_STATES), job_table.c.user_id != null())
+                .group_by(job_table.c.user_id)
+            )
+            for user_id, job_count in result:
+                user_job_count[user_id] = job_count
+        result = sa_session.execute(
+            select(job_table.c.user_id, job_table.c.destination_id, func.count(job_table.c.id))
+            .where(job_table.c.state.in_(DESTINATION_COUNTED_STATES))
+            .group_by(job_table.c.user_id, job_table.c.destination_id)
+        )
+        for user_id, destination_id, job_count in result:
+            if self.count_users:
+                user_job_count_per_destination.setdefault(user_id, {})[destination_id] = job_count
+            total_job_count_per_destination[destination_id] = (
+                total_job_count_per_destination.get(destination_id, 0) + job_count
+            )
+        with self._lock:
+            dispatched = dict(self._dispatched)
+        in_flight = set()
+        if dispatched:
+            result = sa_session.execute(
+                select(job_table.c.id).where(
+                    job_table.c.id.in_(list(dispatched)), job_table.c.state == model.Job.states.NEW
+                )
+            )
+            in_flight = set(result.scalars())
+        for job_id in in_flight:
+            user_id, destination_id, count_user = dispatched[job_id]
+            if self.count_users and count_user and user_id is not None:
+                user_job_count[user_id] = user_job_count.get(user_id, 0) + 1
+                per_destination = user_job_count_per_destination.setdefault(user_id, {})
+                per_destination[destination_id] = per_destination.get(destination_id, 0) + 1
+            total_job_count_per_destination[destination_id] = total_job_count_per_destination.get(destination_id, 0) + 1
+        with self._lock:
+            for job_id in dispatched.keys() - in_flight:
+                # Queued or finished (possibly by another process), counted from the database from now on.
+                self._dispatched.pop(job_id, None)
+            if self._last_reconcile is not None:
+                self._log_drift(total_job_count_per_destination)
+            if self.count_users:
+                self._user_job_count = user_job_count
+                self._user_job_count_per_destination = user_job_count_per_destination
+            self._total_job_count_per_destination = total_job_count_per_destination
+            self._last_reconcile = time.monotonic()
+
+    def _log_drift(self, total_job_count_per_destination: Dict[str, int]):
+        for destination_id in set(total_job_count_per_destination) | set(self._total_job_count_per_destination):
+            tracked = self._total_job_count_per_destination.get(destination_id, 0)
+            actual = total_job_count_per_destination.get(destination_id, 0)
+            if tracked != actual:
+                log.debug("Reconciled job count for destination '%s' from %d to %d", destination_id, tracked, actual)
+
+    def _ensure_reconciled(self, sa_session):
+        if self.needs_reconcile():
+            self.reconcile(sa_session)
+
+    def user_job_count(self, sa_session, user_id: Optional[int]) -> int:
+        self._ensure_reconciled(sa_session)
+        return self._user_job_count.get(user_id, 0) if user_id is not None else 0
+
+    def user_job_count_per_destination(self, sa_session, user_id: Optional[int]) -> Dict[str, int]:
+        self._ensure_reconciled(sa_session)
+        with self._lock:
+            return dict(self._user_job_count_per_destination.get(user_id, {})) if user_id is not None else {}
+
+    def total_job_count_per_destination(self, sa_session) -> Dict[str, int]:
+        self._ensure_reconciled(sa_session)
+        with self._lock:
+            return dict(self._total_job_count_per_destination)
+
+    def job_dispatched(
+        self, user_id: Optional[int], destination_id: str, count_user: bool = True, job_id: Optional[int] = None
+    ):
+        """Record a job that was just dispatched to ``destination_id``.
+
+        Dispatched jobs are counted right away so that several jobs can't get
+        past the limits in one iteration of the handler queue.
+        """
+        with self._lock:
+            if job_id is not None:
+                self._dispatched[job_id] = (user_id, destination_id, count_user)
+            if count_user and user_id is not None:
+                self._user_job_count[user_id] = self._user_job_count.get(user_id, 0) + 1
+                per_destination = self._user_job_count_per_destination.setdefault(user_id, {})
+                per_destination[destination_id] = per_destination.get(destination_id, 0) + 1
+            self._total_job_count_per_destination[destination_id] = (
+                self._total_job_count_per_destination.get(destination_id, 0) + 1
+            )
+
+    def job_state_changed(
+        self, user_id: Optional[int], destination_id: Optional[str], old_state, new_state, job_id: Optional[int] = None
+    ):
+        """Record a job that moved from ``old_state`` to ``new_state``.
+
+        Only transitions out of the counted states are applied here, jobs are
+        added to the counts when they are dispatched. A dispatched job that
+        fails before reaching a counted state is removed from the counts again.
+        """
+        with self._lock:
+            dispatched = self._dispatched.pop(job_id, None) if job_id is not None else None
+            if dispatched is not None and old_state not in USER_COUNTED_STATES + DESTINATION_COUNTED_STATES:
+                if new_state not in USER_COUNTED_STATES + DESTINATION_COUNTED_STATES:
+                    self._undo_dispatch(*dispatched)
+                return
+            if user_id is not None and old_state in USER_COUNTED_STATES and new_state not in USER_COUNTED_STATES:
+                _decrement(self._user_job_count, user_id)
+            if old_state in DESTINATION_COUNTED_STATES and new_state not in DESTINATION_COUNTED_STATES:
+                if user_id is not None and user_id in self._user_job_count_per_destination:
+                    _decrement(self._user_job_count_per_destination[user_id], destination_id)
+                _decrement(self._total_job_count_per_destination, destination_id)
+
+    def _undo_dispatch(self, user_id: Optional[int], destination_id: str, count_user: bool):
+        if count_user and user_id is not None:
+            _decrement(self._user_job_count, user_id)
+            if user_id in self._user_job_count_per_destination:
+                _decrement(self._user_job_count_per_destination[user_id], destination_id)
+        _decrement(self._total_job_count_per_destination, destination_id)
+
+
+def _decrement(counts: dict, key):
+    if counts.get(key, 0) > 0:
+        counts[key] -= 1
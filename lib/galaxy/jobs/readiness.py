@@ -0,0 +1,304 @@
+"""
+Batched readiness evaluation for jobs waiting in a job handler queue.
+
+Instead of lazy-loading ``job.input_datasets``, ``job.user`` and friends for
+every waiting job, :class:`WaitingJobsIndex` loads everything the handler needs
+to decide whether the jobs of one monitor cycle are ready with a handful of
+bulk queries and answers the per-job questions from in-memory dictionaries.
+"""
+
+import logging
+from collections import defaultdict
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from sqlalchemy import (
+    func,
+    null,
+    select,
+    update,
+)
+from sqlalchemy.orm import (
+    scoped_session,
+    selectinload,
+    Session,
+)
+
+from galaxy import model
+from galaxy.quota import QuotaAgent
+from galaxy.util import chunk_iterable
+
+log = logging.getLogger(__name__)
+
+# Maximum number of ids sent in a single ``IN`` clause.
+IN_CLAUSE_CHUNK_SIZE = 1000
+
+DATASET_READY_STATES = (model.Dataset.states.OK, model.Dataset.states.DEFERRED)
+
+
+class JobInput(NamedTuple):
+    """State of a single (history or library) input dataset of a waiting job."""
+
+    association_id: int
+    is_library: bool
+    hid: Optional[int]
+    name: Optional[str]
+    deleted: bool
+    association_state: Optional[str]
+    dataset_deleted: bool
+    dataset_purged: bool
+    dataset_state: Optional[str]
+    version: Optional[int]
+
+    @property
+    def state(self) -> Optional[str]:
+        # Mirrors DatasetInstance.state, association specific states take precedence.
+        return self.association_state or self.dataset_state
+
+
+class InputStateProblems(NamedTuple):
+    """Messages for jobs that cannot run (yet) because of their inputs, keyed by job id."""
+
+    pause: Dict[int, List[str]]
+    fail: Dict[int, List[str]]
+    ignore: Dict[int, List[str]]
+
+
+def job_owner(job: model.Job) -> Tuple[str, Optional[int]]:
+    """Key identifying the user (or anonymous session) a job belongs to."""
+    if job.user_id is not None:
+        return ("user", job.user_id)
+    return ("session", job.session_id)
+
+
+def order_jobs_for_dispatch(jobs: Iterable[model.Job]) -> List[model.Job]:
+    """Order ``jobs`` so that every owner's n-th job comes before any owner's (n+1)-th job.
+
+    Within an owner jobs remain in submission (id) order, so a single user with
+    thousands of queued jobs cannot starve users that submitted only a few.
+    """
+    position_per_owner: Dict[Tuple[str, Optional[int]], int] = defaultdict(int)
+    keyed = []
+    for job in sorted(jobs, key=lambda j: j.id):
+        owner = job_owner(job)
+        keyed.append((position_per_owner[owner], job.id, job))
+        position_per_owner[owner] += 1
+    keyed.sort(key=lambda t: (t[0], t[1]))
+    return [job for _, _, job in keyed]
+
+
+class WaitingJobsIndex:
+    """In-memory index over the inputs and owners of the jobs checked in one handler cycle."""
+
+    def __init__(self, sa_session: Union[Session, scoped_session], jobs: Sequence[model.Job]):
+        self.sa_session = sa_session
+        self.jobs = list(jobs)
+        self.job_ids = [job.id for job in self.jobs]
+        self.inputs: Dict[int, List[JobInput]] = defaultdict(list)
+        self._copied_from_jobs: Optional[Dict[int, model.Job]] = None
+        self._session_job_counts: Optional[Dict[int, int]] = None
+        self._over_quota: Dict[Tuple[Optional[int], Optional[int], Optional[str]], bool] = {}
+        self.quota_check_hits = 0
+        self.quota_check_misses = 0
+        self._load_inputs()
+
+    @classmethod
+    def load_jobs(cls, sa_session: Union[Session, scoped_session], job_ids: Sequence[int]) -> List[model.Job]:
+        """Load jobs by id in bulk, preserving the order of ``job_ids`` and skipping missing ids.
+
+        Collections accessed while building job wrappers are loaded eagerly so
+        that they do not cost an additional query per job.
+        """
+        jobs_by_id: Dict[int, model.Job] = {}
+        for chunk in chunk_iterable(job_ids, IN_CLAUSE_CHUNK_SIZE):
+            stmt = select(model.Job).where(model.Job.id.in_(chunk)).options(selectinload(model.Job.tasks))
+            for job in sa_session.scalars(stmt):
+                jobs_by_id[job.id] = job
+        return [jobs_by_id[job_id] for job_id in job_ids if job_id in jobs_by_id]
+
+    def _load_inputs(self):
+        dataset_table = model.Dataset.table
+        hda_table = model.HistoryDatasetAssociation.table
+        ldda_table = model.LibraryDatasetDatasetAssociation.table
+        for is_library, job_to_input_table, input_table, dataset_id_column, hid, version in (
+            (
+                False,
+                model.JobToInputDatasetAssociation.table,
+                hda_table,
+                model.JobToInputDatasetAssociation.table.c.dataset_id,
+                hda_table.c.hid,
+                hda_table.c.version,
+            ),
+            (
+                True,
+                model.JobToInputLibraryDatasetAssociation.table,
+                ldda_table,
+                model.JobToInputLibraryDatasetAssociation.table.c.ldda_id,
+                null(),
+                null(),
+            ),
+        ):
+            for chunk in chunk_iterable(self.job_ids, IN_CLAUSE_CHUNK_SIZE):
+                stmt = (
+                    select(
+                        job_to_input_table.c.job_id,
+                        job_to_input_table.c.id,
+                        hid,
+                        input_table.c.name,
+                        input_table.c.deleted,
+                        input_table.c._state,
+                        dataset_table.c.deleted,
+                        dataset_table.c.purged,
+                        dataset_table.c.state,
+                        version,
+                    )
+                    .select_from(job_to_input_table)
+                    .join(input_table, input_table.c.id == dataset_id_column)
+                    .join(dataset_table, dataset_table.c.id == input_table.c.dataset_id)
+                    .where(job_to_input_table.c.job_id.in_(chunk))
+                    .order_by(job_to_input_table.c.id)
+                )
+                for row in self.sa_session.execute(stmt):
+                    self.inputs[row[0]].append(
+                        JobInput(
+                            association_id=row[1],
+                            is_library=is_library,
+                            hid=row[2],
+                            name=row[3],
+                            deleted=bool(row[4]),
+                            association_state=row[5],
+                            dataset_deleted=bool(row[6]),
+                            dataset_purged=bool(row[7]),
+                            dataset_state=row[8],
+                            version=row[9],
+                        )
+                    )
+
+    def invalid_input_states(self) -> InputStateProblems:
+        """Classify jobs whose inputs were deleted, failed or are not ready yet.
+
+        Jobs in ``pause`` can be resumed once the inputs are fixed, jobs in ``fail``
+        can never run (an input was purged) and jobs in ``ignore`` should simply
+        be checked again on a later cycle.
+        """
+        problems = InputStateProblems(defaultdict(list), defaultdict(list), defaultdict(list))
+        states = model.HistoryDatasetAssociation.states
+        for job_id in self.job_ids:
+            for job_input in self.inputs.get(job_id, ()):
+                if not (
+                    job_input.deleted
+                    or job_input.dataset_deleted
+                    or job_input.dataset_state not in DATASET_READY_STATES
+                    or job_input.association_state in (states.FAILED_METADATA, states.SETTING_METADATA)
+                ):
+                    continue
+                name = job_input.name
+                if job_input.deleted or job_input.dataset_deleted:
+                    message = f"Input dataset '{name}' was deleted before the job started"
+                    if job_input.dataset_purged:
+                        # If the dataset has been purged we can't resume the job by undeleting the input
+                        problems.fail[job_id].append(message)
+                    else:
+                        problems.pause[job_id].append(message)
+                elif job_input.association_state == states.FAILED_METADATA:
+                    problems.pause[job_id].append(f"Input dataset '{name}' failed to properly set metadata")
+                elif job_input.dataset_state == model.Dataset.states.PAUSED:
+                    problems.pause[job_id].append(f"Input dataset '{name}' was paused before the job started")
+                elif job_input.dataset_state == model.Dataset.states.ERROR:
+                    problems.pause[job_id].append(f"Input dataset '{name}' is in error state")
+                elif job_input.dataset_state != model.Dataset.states.OK:
+                    problems.ignore[job_id].append(f"Input dataset '{name}' is in {job_input.dataset_state} state")
+        return problems
+
+    def in_memory_input_state(
+        self, job: model.Job, set_metadata_tool_id: Optional[str]
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Check the inputs of a job managed by the in-memory queue.
+
+        Returns a ``(problem, message)`` tuple where ``problem`` is ``None`` if
+        all inputs are ready, ``"wait"`` if the job needs to be requeued or one
+        of ``"deleted"`` and ``"error"`` if the job should be failed with
+        ``message``.
+        """
+        for job_input in self.inputs.get(job.id, ()):
+            label = job_input.hid if job_input.hid is not None else job_input.name
+            if job_input.deleted:
+                return "deleted", f"input data {label} was deleted before the job started"
+            state = job_input.state
+            if state == model.Dataset.states.ERROR:
+                return "error", f"input data {label} is in error state"
+            elif state == model.HistoryDatasetAssociation.states.FAILED_METADATA:
+                return "error", f"input data {label} failed to properly set metadata"
+            elif state not in DATASET_READY_STATES and not (
+                state == model.HistoryDatasetAssociation.states.SETTING_METADATA
+                and job.tool_id is not None
+                and job.tool_id == set_metadata_tool_id
+            ):
+                return "wait", None
+        return None, None
+
+    def record_input_dataset_versions(self, job_ids: Iterable[int]):
+        """Record the version of each history input of ``job_ids`` now that the inputs are known to be ready."""
+        mappings = [
+            {"id": job_input.association_id, "dataset_version": job_input.version}
+            for job_id in job_ids
+            for job_input in self.inputs.get(job_id, ())
+            if not job_input.is_library and job_input.version is not None
+        ]
+        if mappings:
+            self.sa_session.execute(update(model.JobToInputDatasetAssociation), mappings)
+
+    def copied_from_job(self, job: model.Job) -> Optional[model.Job]:
+        if self._copied_from_jobs is None:
+            copied_from_job_ids = {j.copied_from_job_id for j in self.jobs if j.copied_from_job_id}
+            self._copied_from_jobs = {j.id: j for j in self.load_jobs(self.sa_session, sorted(copied_from_job_ids))}
+        if job.copied_from_job_id is None:
+            return None
+        return self._copied_from_jobs.get(job.copied_from_job_id)
+
+    def session_job_count(self, session_id: int) -> int:
+        """Number of queued or running jobs of an anonymous ``session_id``, counted once per cycle."""
+        if self._session_job_counts is None:
+            self._session_job_counts = {}
+            session_ids = sorted({j.session_id for j in self.jobs if j.user_id is None and j.session_id})
+            for chunk in chunk_iterable(session_ids, IN_CLAUSE_CHUNK_SIZE):
+                stmt = (
+                    select(model.Job.session_id, func.count(model.Job.id))
+                    .where(
+                        model.Job.session_id.in_(chunk),
+                        model.Job.state.in_((model.Job.states.QUEUED, model.Job.states.RUNNING)),
+                    )
+                    .group_by(model.Job.session_id)
+                )
+                for row in self.sa_session.execute(stmt):
+                    self._session_job_counts[row[0]] = row[1]
+        return self._session_job_counts.get(session_id, 0)
+
+    def increase_session_job_count(self, session_id: int):
+        """Account for a job of an anonymous ``session_id`` dispatched during this cycle."""
+        self.session_job_count(session_id)
+        assert self._session_job_counts is not None
+        self._session_job_counts[session_id] = self._session_job_counts.get(session_id, 0) + 1
+
+    def is_over_quota(self, quota_agent: QuotaAgent, app, job: model.Job, job_destination) -> bool:
+        """Check quota once per user (or anonymous history) and quota source label per cycle.
+
+        Disk usage only grows when jobs finish, dispatching jobs during the cycle
+        doesn't change the outcome for the remaining jobs of the same user.
+        """
+        label = quota_agent.quota_source_label_for_destination(app, job_destination)
+        key = (job.user_id, job.history_id if job.user_id is None else None, label)
+        if key in self._over_quota:
+            self.quota_check_hits += 1
+        else:
+            self.quota_check_misses += 1
+            self._over_quota[key] = quota_agent.is_over_quota(app, job, job_destination)
+        return self._over_quota[key]
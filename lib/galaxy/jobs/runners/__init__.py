@@ -18,6 +18,7 @@ from queue import (
 from typing import (
     Any,
     Dict,
+    List,
     Optional,
     TYPE_CHECKING,
     Union,
@@ -34,6 +35,10 @@ from galaxy.job_execution.output_collect import (
     read_exit_code_from,
 )
 from galaxy.jobs.command_factory import build_command
+from galaxy.jobs.finishing import (
+    JobFinishingExecutor,
+    STDOUT_COLLECTION,
+)
 from galaxy.jobs.runners.util import runner_states
 from galaxy.jobs.runners.util.env import env_to_statement
 from galaxy.jobs.runners.util.job_script import (
@@ -100,6 +105,8 @@ class RunnerParams(ParamsWithSpecs):
 
 class BaseJobRunner:
     runner_name = "BaseJobRunner"
+    # Set by the job dispatcher if jobs should be finished outside of the runner's worker threads.
+    finishing_executor: Optional[JobFinishingExecutor] = None
 
     start_methods = ["_init_monitor_thread", "_init_worker_threads"]
     DEFAULT_SPECS = dict(recheck_missing_job_retries=dict(map=int, valid=lambda x: int(x) >= 0, default=0))
@@ -148,46 +155,53 @@ class BaseJobRunner:
     def run_next(self):
         """Run the next item in the work queue (a job waiting to run)"""
         while self._should_stop is False:
-            with self.app.model.session():  # Create a Session instance and ensure it's closed.
-                try:
-                    (method, arg) = self.work_queue.get(timeout=1)
-                except Empty:
-                    continue
-                if method is STOP_SIGNAL:
-                    return
-                # id and name are collected first so that the call of method() is the last exception.
-                try:
-                    if isinstance(arg, AsynchronousJobState):
-                        job_id = arg.job_wrapper.get_id_tag()
-                    else:
-                        # arg should be a JobWrapper/TaskWrapper
-                        job_id = arg.get_id_tag()
-                except Exception:
-                    job_id = UNKNOWN
-                try:
-                    name = method.__name__
-                except Exception:
-                    name = UNKNOWN
+            try:
+                (method, arg) = self.work_queue.get(timeout=1)
+            except Empty:
+                continue
+            if method is STOP_SIGNAL:
+                return
+            if self.finishing_executor is not None and method == getattr(self, "finish_job", None):
+                # Finishing can take a long time, don't let it hold up the runner's workers.
+                self.finishing_executor.submit(self._run_work_item, method, arg)
+            else:
+                self._run_work_item(method, arg)
 
-                # Ensure a Job object belongs to a session
-                self._ensure_db_session(arg)
+    def _run_work_item(self, method, arg):
+        with self.app.model.session():  # Create a Session instance and ensure it's closed.
+            # id and name are collected first so that the call of method() is the last exception.
+            try:
+                if isinstance(arg, AsynchronousJobState):
+                    job_id = arg.job_wrapper.get_id_tag()
+                else:
+                    # arg should be a JobWrapper/TaskWrapper
+                    job_id = arg.get_id_tag()
+            except Exception:
+                job_id = UNKNOWN
+            try:
+                name = method.__name__
+            except Exception:
+                name = UNKNOWN
 
-                try:
-                    action_str = f"galaxy.jobs.runners.{self.__class__.__name__.lower()}.{name}"
-                    action_timer = self.app.execution_timer_factory.get_timer(
-                        f"internals.{action_str}", f"job runner action {action_str} for job ${{job_id}} executed"
-                    )
-                    method(arg)
-                    log.trace(action_timer.to_str(job_id=job_id))
-                except Exception:
-                    log.exception(f"({job_id}) Unhandled exception calling {name}")
-                    if not isinstance(arg, JobState):
-                        job_state = JobState(job_wrapper=arg, job_destination={})
-                    else:
-                        job_state = arg
-                    if method != self.fail_job:
-                        # Prevent fail_job cycle in the work_queue
-                        self.work_queue.put((self.fail_job, job_state))
+            # Ensure a Job object belongs to a session
+            self._ensure_db_session(arg)
+
+            try:
+                action_str = f"galaxy.jobs.runners.{self.__class__.__name__.lower()}.{name}"
+                action_timer = self.app.execution_timer_factory.get_timer(
+                    f"internals.{action_str}", f"job runner action {action_str} for job ${{job_id}} executed"
+                )
+                method(arg)
+                log.trace(action_timer.to_str(job_id=job_id))
+            except Exception:
+                log.exception(f"({job_id}) Unhandled exception calling {name}")
+                if not isinstance(arg, JobState):
+                    job_state = JobState(job_wrapper=arg, job_destination={})
+                else:
+                    job_state = arg
+                if method != self.fail_job:
+                    # Prevent fail_job cycle in the work_queue
+                    self.work_queue.put((self.fail_job, job_state))
 
     def _ensure_db_session(self, arg: Union["JobWrapper", "JobState"]) -> None:
         """Ensure Job object belongs to current session."""
@@ -634,10 +648,11 @@ class BaseJobRunner:
             tool_stdout_path = os.path.join(outputs_directory, "tool_stdout")
             tool_stderr_path = os.path.join(outputs_directory, "tool_stderr")
             try:
-                with open(tool_stdout_path, "rb") as stdout_file:
-                    tool_stdout = self._job_io_for_db(stdout_file)
-                with open(tool_stderr_path, "rb") as stderr_file:
-                    tool_stderr = self._job_io_for_db(stderr_file)
+                with job_wrapper.finishing_stage_timer.stage(STDOUT_COLLECTION):
+                    with open(tool_stdout_path, "rb") as stdout_file:
+                        tool_stdout = self._job_io_for_db(stdout_file)
+                    with open(tool_stderr_path, "rb") as stderr_file:
+                        tool_stderr = self._job_io_for_db(stderr_file)
             except FileNotFoundError:
                 if job.state in (model.Job.states.DELETING, model.Job.states.DELETED):
                     # We killed the job, so we may not even have the tool stdout / tool stderr
@@ -839,6 +854,9 @@ class AsynchronousJobRunner(BaseJobRunner, Monitors):
         # to 'watched' and then manage the watched jobs.
         self.watched = []
         self.monitor_queue = Queue()
+        # External job states fetched for all watched jobs at the start of a
+        # check_watched_items cycle, see check_watched_items_batch.
+        self.watched_item_states = {}
 
     def _init_monitor_thread(self):
         name = f"{self.runner_name}.monitor_thread"
@@ -899,14 +917,39 @@ class AsynchronousJobRunner(BaseJobRunner, Monitors):
         states. Subclasses can opt to override this directly (as older job runners will
         initially) or just override check_watched_item and allow the list processing to
         reuse the logic here.
+
+        Before the items are checked one by one, check_watched_items_batch is
+        called once for all watched items, its result is available for the
+        duration of the cycle via get_watched_item_state.
         """
         new_watched = []
-        for async_job_state in self.watched:
-            new_async_job_state = self.check_watched_item(async_job_state)
-            if new_async_job_state:
-                new_watched.append(new_async_job_state)
+        self.watched_item_states = self.check_watched_items_batch(self.watched)
+        try:
+            for async_job_state in self.watched:
+                new_async_job_state = self.check_watched_item(async_job_state)
+                if new_async_job_state:
+                    new_watched.append(new_async_job_state)
+        finally:
+            self.watched_item_states = {}
         self.watched = new_watched
 
+    def check_watched_items_batch(self, job_states: List[AsynchronousJobState]) -> Dict[str, Any]:
+        """
+        Fetch the state of all watched jobs from the external job manager at once.
+
+        Runners that can query many jobs with a single call (e.g. ``squeue`` or
+        ``qstat``) should override this and return a dictionary mapping external
+        job ids to the state reported for them, check_watched_item can then
+        look the state up with get_watched_item_state instead of querying each
+        job individually. Jobs missing from the result are left for
+        check_watched_item to deal with.
+        """
+        return {}
+
+    def get_watched_item_state(self, job_state: AsynchronousJobState, default=None):
+        """Return the state fetched by check_watched_items_batch for ``job_state`` in the current cycle."""
+        return self.watched_item_states.get(job_state.job_id, default)
+
     # Subclasses should implement this unless they override check_watched_items all together.
     def check_watched_item(self, job_state):
         raise NotImplementedError()
@@ -927,9 +970,12 @@ class AsynchronousJobRunner(BaseJobRunner, Monitors):
         collect_output_success = True
         while which_try < self.app.config.retry_job_output_collection + 1:
             try:
-                with open(job_state.output_file, "rb") as stdout_file, open(job_state.error_file, "rb") as stderr_file:
-                    stdout = self._job_io_for_db(stdout_file)
-                    stderr = self._job_io_for_db(stderr_file)
+                with job_state.job_wrapper.finishing_stage_timer.stage(STDOUT_COLLECTION):
+                    with open(job_state.output_file, "rb") as stdout_file, open(
+                        job_state.error_file, "rb"
+                    ) as stderr_file:
+                        stdout = self._job_io_for_db(stdout_file)
+                        stderr = self._job_io_for_db(stderr_file)
                 break
             except Exception as e:
                 if which_try == self.app.config.retry_job_output_collection:
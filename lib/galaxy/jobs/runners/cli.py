@@ -2,6 +2,7 @@
 Job control via a command line interface (e.g. qsub/qstat), possibly over a remote connection (e.g. ssh).
 """
 
+import json
 import logging
 import time
 
@@ -152,61 +153,74 @@ class ShellJobRunner(AsynchronousJobRunner):
             log.error(stderr)
             return returncode, cmd_out.stdout
 
-    def check_watched_items(self):
+    def check_watched_items_batch(self, job_states):
         """
-        Called by the monitor thread to look at each watched job and deal
-        with state changes.
+        Query the status of all watched jobs with one ``get_status`` command per
+        distinct shell and job plugin configuration.
         """
-        new_watched = []
-
-        job_states = self.__get_job_states()
-
-        for ajs in self.watched:
-            external_job_id = ajs.job_id
-            id_tag = ajs.job_wrapper.get_id_tag()
-            old_state = ajs.old_state
-            state = job_states.get(external_job_id, None)
-            if state is None:
-                if ajs.job_wrapper.get_state() == model.Job.states.DELETED:
-                    continue
-
-                log.debug(f"({id_tag}/{external_job_id}) job not found in batch state check")
-                shell_params, job_params = self.parse_destination_params(ajs.job_destination.params)
-                shell, job_interface = self.get_cli_plugins(shell_params, job_params)
-                cmd_out = shell.execute(job_interface.get_single_status(external_job_id))
-                state = job_interface.parse_single_status(cmd_out.stdout, external_job_id)
-                if not state == model.Job.states.OK:
-                    log.warning(
-                        f"({id_tag}/{external_job_id}) job not found in batch state check, but found in individual state check"
-                    )
-            job_state = ajs.job_wrapper.get_state()
-            if state != old_state:
-                log.debug(f"({id_tag}/{external_job_id}) state change: from {old_state} to {state}")
-                if state == model.Job.states.ERROR and job_state != model.Job.states.STOPPED:
-                    # Try to find out the reason for exiting - this needs to happen before change_state
-                    # otherwise jobs depending on resubmission outputs see that job as failed and pause.
-                    self.__handle_out_of_memory(ajs, external_job_id)
-                    self.work_queue.put((self.mark_as_failed, ajs))
-                    # Don't add the job to the watched items once it fails, deals with https://github.com/galaxyproject/galaxy/issues/7820
-                    continue
-                if not state == model.Job.states.OK:
-                    # No need to change_state when the state is OK, this will be handled by `self.finish_job`
-                    ajs.job_wrapper.change_state(state)
-            if state == model.Job.states.RUNNING and not ajs.running:
-                ajs.running = True
-            ajs.old_state = state
-            if state == model.Job.states.OK or job_state == model.Job.states.STOPPED:
-                external_metadata = not asbool(
-                    ajs.job_wrapper.job_destination.params.get("embed_metadata_in_job", DEFAULT_EMBED_METADATA_IN_JOB)
+        groups = {}
+        for ajs in job_states:
+            shell_params, job_params = self.parse_destination_params(ajs.job_destination.params)
+            key = json.dumps([shell_params, job_params], sort_keys=True)
+            if key not in groups:
+                groups[key] = (shell_params, job_params, [])
+            groups[key][2].append(ajs.job_id)
+        states = {}
+        for shell_params, job_params, job_ids in groups.values():
+            shell, job_interface = self.get_cli_plugins(shell_params, job_params)
+            cmd_out = shell.execute(job_interface.get_status(job_ids))
+            assert cmd_out.returncode == 0, cmd_out.stderr
+            states.update(job_interface.parse_status(cmd_out.stdout, job_ids))
+        return states
+
+    def check_watched_item(self, ajs):
+        """
+        Deal with state changes of a watched job, using the state fetched by
+        ``check_watched_items_batch`` if the job was found in the batch state check.
+        """
+        external_job_id = ajs.job_id
+        id_tag = ajs.job_wrapper.get_id_tag()
+        old_state = ajs.old_state
+        state = self.get_watched_item_state(ajs)
+        if state is None:
+            if ajs.job_wrapper.get_state() == model.Job.states.DELETED:
+                return None
+
+            log.debug(f"({id_tag}/{external_job_id}) job not found in batch state check")
+            shell_params, job_params = self.parse_destination_params(ajs.job_destination.params)
+            shell, job_interface = self.get_cli_plugins(shell_params, job_params)
+            cmd_out = shell.execute(job_interface.get_single_status(external_job_id))
+            state = job_interface.parse_single_status(cmd_out.stdout, external_job_id)
+            if not state == model.Job.states.OK:
+                log.warning(
+                    f"({id_tag}/{external_job_id}) job not found in batch state check, but found in individual state check"
                 )
-                if external_metadata:
-                    self.work_queue.put((self.handle_metadata_externally, ajs))
-                log.debug(f"({id_tag}/{external_job_id}) job execution finished, running job wrapper finish method")
-                self.work_queue.put((self.finish_job, ajs))
-            else:
-                new_watched.append(ajs)
-        # Replace the watch list with the updated version
-        self.watched = new_watched
+        job_state = ajs.job_wrapper.get_state()
+        if state != old_state:
+            log.debug(f"({id_tag}/{external_job_id}) state change: from {old_state} to {state}")
+            if state == model.Job.states.ERROR and job_state != model.Job.states.STOPPED:
+                # Try to find out the reason for exiting - this needs to happen before change_state
+                # otherwise jobs depending on resubmission outputs see that job as failed and pause.
+                self.__handle_out_of_memory(ajs, external_job_id)
+                self.work_queue.put((self.mark_as_failed, ajs))
+                # Don't add the job to the watched items once it fails, deals with https://github.com/galaxyproject/galaxy/issues/7820
+                return None
+            if not state == model.Job.states.OK:
+                # No need to change_state when the state is OK, this will be handled by `self.finish_job`
+                ajs.job_wrapper.change_state(state)
+        if state == model.Job.states.RUNNING and not ajs.running:
+            ajs.running = True
+        ajs.old_state = state
+        if state == model.Job.states.OK or job_state == model.Job.states.STOPPED:
+            external_metadata = not asbool(
+                ajs.job_wrapper.job_destination.params.get("embed_metadata_in_job", DEFAULT_EMBED_METADATA_IN_JOB)
+            )
+            if external_metadata:
+                self.work_queue.put((self.handle_metadata_externally, ajs))
+            log.debug(f"({id_tag}/{external_job_id}) job execution finished, running job wrapper finish method")
+            self.work_queue.put((self.finish_job, ajs))
+            return None
+        return ajs
 
     def handle_metadata_externally(self, ajs):
         self._handle_metadata_externally(ajs.job_wrapper, resolve_requirements=True)
@@ -223,28 +237,6 @@ class ShellJobRunner(AsynchronousJobRunner):
                 ajs.runner_state = JobState.runner_states.MEMORY_LIMIT_REACHED
                 ajs.fail_message = "Tool failed due to insufficient memory. Try with more memory."
 
-    def __get_job_states(self):
-        job_destinations = {}
-        job_states = {}
-        # unique the list of destinations
-        for ajs in self.watched:
-            if ajs.job_destination.id not in job_destinations:
-                job_destinations[ajs.job_destination.id] = dict(
-                    job_destination=ajs.job_destination, job_ids=[ajs.job_id]
-                )
-            else:
-                job_destinations[ajs.job_destination.id]["job_ids"].append(ajs.job_id)
-        # check each destination for the listed job ids
-        for v in job_destinations.values():
-            job_destination = v["job_destination"]
-            job_ids = v["job_ids"]
-            shell_params, job_params = self.parse_destination_params(job_destination.params)
-            shell, job_interface = self.get_cli_plugins(shell_params, job_params)
-            cmd_out = shell.execute(job_interface.get_status(job_ids))
-            assert cmd_out.returncode == 0, cmd_out.stderr
-            job_states.update(job_interface.parse_status(cmd_out.stdout, job_ids))
-        return job_states
-
     def stop_job(self, job_wrapper):
         """Attempts to delete a dispatched job"""
         job = job_wrapper.get_job()
@@ -88,6 +88,9 @@ class ConfigurationManager:
         confs = self._app.toolbox.dynamic_confs(include_migrated_tool_conf=True)
         return list(map(tool_conf_to_dict, confs))
 
+    def tool_memory_usage(self) -> Dict[str, Any]:
+        return self._app.toolbox.tool_memory_usage()
+
     def reload_toolbox(self):
         self._app.queue_worker.send_control_task("reload_toolbox")
 
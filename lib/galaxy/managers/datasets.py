@@ -34,6 +34,7 @@ from galaxy.model import (
     DatasetInstance,
 )
 from galaxy.model.base import transaction
+from galaxy.model.security import DatasetPermissionResolver
 from galaxy.schema.tasks import (
     ComputeDatasetHashTaskRequest,
     PurgeDatasetsTaskRequest,
@@ -118,14 +119,21 @@ class DatasetManager(base.ModelManager[Dataset], secured.AccessibleManagerMixin,
         """
         if self.user_manager.is_admin(user, trans=kwargs.get("trans")):
             return True
-        if self.has_access_permission(item, user):
+        if self.has_access_permission(item, user, permission_resolver=kwargs.get("permission_resolver")):
             return True
         return False
 
-    def has_access_permission(self, dataset, user):
+    def has_access_permission(
+        self, dataset, user, permission_resolver: Optional[DatasetPermissionResolver] = None
+    ) -> bool:
         """
         Return T/F if the user has role-based access to the dataset.
+
+        Listings pass a ``permission_resolver`` so that the permissions of all
+        datasets of a page are checked against the roles of the user loaded once.
         """
+        if permission_resolver is not None:
+            return permission_resolver.can_access_dataset(dataset)
         roles = user.all_roles_exploiting_cache() if user else []
         return self.app.security_agent.can_access_dataset(roles, dataset)
 
@@ -582,6 +590,7 @@ class DatasetAssociationManager(
         elif action == "make_private":
             if not self.app.security_agent.dataset_is_private_to_user(trans, dataset):
                 private_role = self.app.security_agent.get_private_user_role(trans.user)
+                self.app.security_agent.invalidate_dataset_permissions(dataset)
                 dp = self.app.model.DatasetPermissions(
                     self.app.security_agent.permitted_actions.DATASET_ACCESS.action, dataset, private_role
                 )
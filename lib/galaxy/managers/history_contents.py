@@ -9,11 +9,14 @@ from typing import (
     Any,
     Dict,
     List,
+    Optional,
 )
 
 from sqlalchemy import (
+    and_,
     asc,
     cast,
+    DateTime,
     desc,
     false,
     func,
@@ -21,6 +24,7 @@ from sqlalchemy import (
     literal,
     nullsfirst,
     nullslast,
+    or_,
     select,
     Select,
     sql,
@@ -47,6 +51,7 @@ from galaxy.managers import (
     tools,
 )
 from galaxy.managers.job_connections import JobConnectionsManager
+from galaxy.model.security import DatasetPermissionResolver
 from galaxy.schema import ValueFilterQueryParams
 from galaxy.structured_app import MinimalManagerApp
 from galaxy.util import listify
@@ -59,6 +64,80 @@ from .base import (
 log = logging.getLogger(__name__)
 
 
+class DatasetPermissionSummary:
+    """Stand-in for a ``DatasetPermissions`` built from the role ids loaded by a ``DatasetPermissionResolver``."""
+
+    def __init__(self, session, action, role_id):
+        self._session = session
+        self.action = action
+        self.role_id = role_id
+
+    @property
+    def role(self):
+        return self._session.get(model.Role, self.role_id)
+
+
+class DatasetSummary:
+    """The parts of a ``Dataset`` needed to serialize and check access to a ``HistoryDatasetSummary``."""
+
+    def __init__(self, id, object_store_id):
+        self.id = id
+        self.object_store_id = object_store_id
+        self.actions: List[DatasetPermissionSummary] = []
+
+    @property
+    def quota_source_label(self):
+        object_store = model.Dataset.object_store
+        assert object_store
+        quota_source_map = object_store.get_quota_source_map()
+        return quota_source_map.get_quota_source_info(self.object_store_id).label
+
+
+class HistoryDatasetSummary:
+    """
+    Read-only stand-in for a ``HistoryDatasetAssociation`` built from a single row,
+    providing the attributes used by the ``summary`` view of the ``HDASerializer``.
+    """
+
+    content_type = "dataset"
+    history_content_type = "dataset"
+
+    def __init__(self, row, dataset, tags):
+        self.id = row.id
+        self.name = row.name
+        self.history_id = row.history_id
+        self.hid = row.hid
+        self.dataset_id = row.dataset_id
+        self.extension = row.extension
+        self.deleted = row.deleted
+        self.purged = row.purged
+        self.visible = row.visible
+        self.create_time = row.create_time
+        self.update_time = row.update_time
+        self.state = row.hda_state or row.dataset_state
+        self.dbkey = self._dbkey(row.metadata)
+        self.dataset = dataset
+        self.tags = tags
+
+    @property
+    def type_id(self):
+        return f"{self.content_type}-{self.id}"
+
+    @property
+    def object_store_id(self):
+        return self.dataset.object_store_id
+
+    @staticmethod
+    def _dbkey(metadata):
+        # same as DatasetInstance.get_dbkey without loading the metadata collection
+        dbkey = (metadata or {}).get("dbkey")
+        if not isinstance(dbkey, list):
+            dbkey = [dbkey]
+        if dbkey in [[None], []]:
+            return "?"
+        return dbkey[0]
+
+
 # into its own class to have it's own filters, etc.
 # TODO: but can't inherit from model manager (which assumes only one model)
 class HistoryContentsManager(base.SortableManager):
@@ -112,6 +191,36 @@ class HistoryContentsManager(base.SortableManager):
             container, filters=filters, limit=limit, offset=offset, order_by=order_by, **kwargs
         )
 
+    def contents_summaries(
+        self,
+        container,
+        filters=None,
+        limit=None,
+        offset=None,
+        order_by=None,
+        permission_resolver: Optional[DatasetPermissionResolver] = None,
+        **kwargs,
+    ):
+        """
+        Like `contents` but datasets are returned as `HistoryDatasetSummary` objects built
+        from the columns needed for the `summary` view instead of as full ORM models.
+
+        The permissions of the datasets are loaded through `permission_resolver`, pass the
+        resolver used to serialize the contents so that they are only loaded once.
+
+        Filters of type `function` are not supported since they need the models.
+        """
+        return self._union_of_contents(
+            container,
+            filters=filters,
+            limit=limit,
+            offset=offset,
+            order_by=order_by,
+            summarize_contained=True,
+            permission_resolver=permission_resolver,
+            **kwargs,
+        )
+
     def contents_count(self, container, filters=None, limit=None, offset=None, order_by=None, **kwargs):
         """
         Returns a count of both/all types of contents, based on the given filters.
@@ -152,6 +261,34 @@ class HistoryContentsManager(base.SortableManager):
             "Unknown order_by", order_by=order_by_string, available=available
         )
 
+    def parse_keyset(self, order_by_string: str, after_hid: int, after_update_time=None):
+        """
+        Return the order_by and filter to continue listing contents ordered by `order_by_string`
+        after the item with the given `hid` (and `update_time`), instead of offsetting into
+        them.
+
+        Only `hid` and `update_time` ordering are supported, the latter uses the `hid` to break ties.
+        """
+        attribute, _, direction = order_by_string.partition("-")
+        if attribute not in ("hid", "update_time") or direction not in ("", "asc", "dsc"):
+            raise glx_exceptions.RequestParameterInvalidException(
+                "Keyset pagination is only available when ordering by hid or update_time", order_by=order_by_string
+            )
+        descending = direction != "asc"
+        order = desc if descending else asc
+        hid = sql.column("hid", Integer)
+        hid_filter = hid < after_hid if descending else hid > after_hid
+        if attribute == "hid":
+            return [order("hid")], hid_filter
+        if after_update_time is None:
+            raise glx_exceptions.RequestParameterMissingException(
+                "Keyset pagination by update_time requires the update_time of the last item"
+            )
+        update_time = sql.column("update_time", DateTime)
+        update_time_filter = update_time < after_update_time if descending else update_time > after_update_time
+        keyset_filter = or_(update_time_filter, and_(update_time == after_update_time, hid_filter))
+        return [order("update_time"), order("hid")], keyset_filter
+
     # history specific methods
     def state_counts(self, history):
         """
@@ -226,7 +363,9 @@ class HistoryContentsManager(base.SortableManager):
     def _session(self):
         return self.app.model.context
 
-    def _union_of_contents(self, container, expand_models=True, **kwargs):
+    def _union_of_contents(
+        self, container, expand_models=True, summarize_contained=False, permission_resolver=None, **kwargs
+    ):
         """
         Returns a limited and offset list of both types of contents, filtered
         and in some order.
@@ -247,7 +386,12 @@ class HistoryContentsManager(base.SortableManager):
 
         # query 2 & 3: use the ids to query each component_class, returning an id->full component model map
         contained_ids = id_map[self.contained_class_type_name]
-        id_map[self.contained_class_type_name] = self._contained_id_map(contained_ids)
+        if summarize_contained:
+            id_map[self.contained_class_type_name] = self._contained_summary_map(
+                contained_ids, permission_resolver=permission_resolver
+            )
+        else:
+            id_map[self.contained_class_type_name] = self._contained_id_map(contained_ids)
         subcontainer_ids = id_map[self.subcontainer_class_type_name]
         serialization_params = kwargs.get("serialization_params", None)
         id_map[self.subcontainer_class_type_name] = self._subcontainer_id_map(
@@ -275,7 +419,15 @@ class HistoryContentsManager(base.SortableManager):
         return True
 
     def _union_of_contents_query(
-        self, container, filters=None, limit=None, offset=None, order_by=None, user_id=None, **kwargs
+        self,
+        container,
+        filters=None,
+        limit=None,
+        offset=None,
+        order_by=None,
+        user_id=None,
+        keyset_filter=None,
+        **kwargs,
     ):
         """
         Returns a query for a limited and offset list of both types of contents,
@@ -312,6 +464,8 @@ class HistoryContentsManager(base.SortableManager):
                 subcontainer_query = self._apply_orm_filter(subcontainer_query, orm_filter)
 
         contents_query = contained_query.union_all(subcontainer_query)
+        if keyset_filter is not None:
+            contents_query = contents_query.filter(keyset_filter)
         contents_query = contents_query.order_by(*order_by)
 
         if limit is not None:
@@ -422,6 +576,57 @@ class HistoryContentsManager(base.SortableManager):
         result = self._session().scalars(stmt).unique()
         return {row.id: row for row in result}
 
+    def _contained_summary_map(self, id_list, permission_resolver: Optional[DatasetPermissionResolver] = None):
+        """Return an id to `HistoryDatasetSummary` map of all contained-type items in the id_list."""
+        if not id_list:
+            return {}
+        component_class = self.contained_class
+        table = component_class.table
+        stmt = (
+            select(
+                table.c.id,
+                table.c.name,
+                table.c.history_id,
+                table.c.hid,
+                table.c.dataset_id,
+                table.c.extension,
+                table.c.deleted,
+                table.c.purged,
+                table.c.visible,
+                table.c.create_time,
+                table.c.update_time,
+                table.c._state.label("hda_state"),
+                table.c._metadata.label("metadata"),
+                model.Dataset.state.label("dataset_state"),
+                model.Dataset.object_store_id,
+            )
+            .join(model.Dataset, model.Dataset.id == table.c.dataset_id)
+            .where(table.c.id.in_(id_list))
+        )
+        rows = self._session().execute(stmt).all()
+
+        datasets = {row.dataset_id: DatasetSummary(row.dataset_id, row.object_store_id) for row in rows}
+        if permission_resolver is None:
+            permission_resolver = self.app.security_agent.permission_resolver(None, roles=[])
+        permission_resolver.prefetch(datasets.values())  # type: ignore[arg-type]
+        for dataset in datasets.values():
+            dataset.actions = [
+                DatasetPermissionSummary(self._session(), action, role_id)
+                for action, role_ids in permission_resolver.action_role_ids(dataset).items()  # type: ignore[arg-type]
+                for role_id in role_ids
+            ]
+
+        tag_class = model.HistoryDatasetAssociationTagAssociation
+        tags: Dict[int, List[model.HistoryDatasetAssociationTagAssociation]] = {row.id: [] for row in rows}
+        tags_stmt = select(tag_class).where(tag_class.history_dataset_association_id.in_(id_list))
+        for tag in self._session().scalars(tags_stmt):
+            tags[tag.history_dataset_association_id].append(tag)
+
+        summaries = {}
+        for row in rows:
+            summaries[row.id] = HistoryDatasetSummary(row, datasets[row.dataset_id], tags[row.id])
+        return summaries
+
     def _subcontainer_id_map(self, id_list, serialization_params=None):
         """Return an id to model map of all subcontainer-type models in the id_list."""
         if not id_list:
@@ -122,6 +122,7 @@ class DatasetRBACPermission(RBACPermission):
 
     # ---- private
     def _create(self, dataset, role, flush=True):
+        self.app.security_agent.invalidate_dataset_permissions(dataset)
         permission = self.permissions_class(self.action_name, dataset, role)
         self.session().add(permission)
         if flush:
@@ -141,6 +142,7 @@ class DatasetRBACPermission(RBACPermission):
 
     # TODO: list?
     def _delete(self, permissions, flush=True):
+        self.app.security_agent.invalidate_dataset_permissions(*(permission.dataset for permission in permissions))
         for permission in permissions:
             if permission in self.session().new:
                 self.session().expunge(permission)
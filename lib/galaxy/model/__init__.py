@@ -29,6 +29,7 @@ from secrets import token_hex
 from string import Template
 from typing import (
     Any,
+    BinaryIO,
     cast,
     ClassVar,
     Dict,
@@ -124,7 +125,10 @@ from sqlalchemy.orm import (
 from sqlalchemy.orm.attributes import flag_modified
 from sqlalchemy.orm.collections import attribute_keyed_dict
 from sqlalchemy.sql import exists
-from sqlalchemy.sql.expression import FromClause
+from sqlalchemy.sql.expression import (
+    BindParameter,
+    FromClause,
+)
 from typing_extensions import (
     Literal,
     Protocol,
@@ -652,9 +656,7 @@ WHERE dataset.id IN (SELECT dataset_id FROM per_hist_hdas)
 """
 
 
-def calculate_user_disk_usage_statements(user_id, quota_source_map, for_sqlite=False):
-    """Standalone function so can be reused for postgres directly in pgcleanup.py."""
-    statements = []
+def _default_source_user_usage(user_id, quota_source_map):
     default_quota_enabled = quota_source_map.default_quota_enabled
     default_exclude_ids = quota_source_map.default_usage_excluded_ids()
     default_cond = "dataset.object_store_id IS NULL" if default_quota_enabled and default_exclude_ids else ""
@@ -664,21 +666,31 @@ def calculate_user_disk_usage_statements(user_id, quota_source_map, for_sqlite=F
     if default_usage_dataset_condition.strip():
         default_usage_dataset_condition = f"AND ( {default_usage_dataset_condition} )"
     default_usage = UNIQUE_DATASET_USER_USAGE.format(and_dataset_condition=default_usage_dataset_condition)
+    params = {"id": user_id}
+    if default_exclude_ids:
+        params["exclude_object_store_ids"] = default_exclude_ids
+    return default_usage, params
+
+
+LABELED_SOURCE_USER_USAGE = UNIQUE_DATASET_USER_USAGE.format(
+    and_dataset_condition="AND ( dataset.object_store_id IN :include_object_store_ids )"
+)
+
+
+def calculate_user_disk_usage_statements(user_id, quota_source_map, for_sqlite=False):
+    """Standalone function so can be reused for postgres directly in pgcleanup.py."""
+    statements = []
+    default_usage, params = _default_source_user_usage(user_id, quota_source_map)
     default_usage = f"""
 UPDATE galaxy_user SET disk_usage = ({default_usage})
 WHERE id = :id
 """
-    params = {"id": user_id}
-    if default_exclude_ids:
-        params["exclude_object_store_ids"] = default_exclude_ids
     statements.append((default_usage, params))
     source = quota_source_map.ids_per_quota_source()
     # TODO: Merge a lot of these settings together by generating a temp table for
     # the object_store_id to quota_source_label into a temp table of values
     for quota_source_label, object_store_ids in source.items():
-        label_usage = UNIQUE_DATASET_USER_USAGE.format(
-            and_dataset_condition="AND ( dataset.object_store_id IN :include_object_store_ids )"
-        )
+        label_usage = LABELED_SOURCE_USER_USAGE
         if for_sqlite:
             # hacky alternative for older sqlite
             statement = f"""
@@ -750,6 +762,31 @@ def calculate_disk_usage_per_objectstore(sa_session, user_id: int):
     return sa_session.execute(text(statement), params).all()
 
 
+# Times the disk usage drift of a user is calculated before giving up if its recorded usage keeps changing.
+DISK_USAGE_DRIFT_ATTEMPTS = 3
+
+
+def calculate_disk_usage_per_quota_source(sa_session, user_id: int, quota_source_map) -> Dict[Optional[str], int]:
+    """Calculate the disk usage of a user for the default and every labeled quota source.
+
+    Uses the same queries as :func:`calculate_user_disk_usage_statements` but
+    only returns the result, so it can be compared to the recorded usage.
+    """
+    default_usage, params = _default_source_user_usage(user_id, quota_source_map)
+    binds: List[BindParameter] = [bindparam("id")]
+    if "exclude_object_store_ids" in params:
+        binds.append(bindparam("exclude_object_store_ids", expanding=True))
+    statement = text(default_usage).bindparams(*binds)
+    usage: Dict[Optional[str], int] = {None: int(sa_session.scalar(statement, params) or 0)}
+    statement = text(LABELED_SOURCE_USER_USAGE).bindparams(
+        bindparam("id"), bindparam("include_object_store_ids", expanding=True)
+    )
+    for quota_source_label, object_store_ids in quota_source_map.ids_per_quota_source().items():
+        params = {"id": user_id, "include_object_store_ids": object_store_ids}
+        usage[quota_source_label] = int(sa_session.scalar(statement, params) or 0)
+    return usage
+
+
 # move these to galaxy.schema.schema once galaxy-data depends on
 # galaxy-schema.
 class UserQuotaBasicUsage(BaseModel):
@@ -768,6 +805,14 @@ class UserObjectstoreUsage(BaseModel):
     total_disk_usage: float
 
 
+class UserQuotaUsageDrift(BaseModel):
+    quota_source_label: Optional[str] = None
+    recorded_disk_usage: int
+    calculated_disk_usage: int
+    # calculated - recorded, the adjustment needed to reconcile the recorded usage.
+    drift: int
+
+
 class User(Base, Dictifiable, RepresentById):
     """
     Data for a Galaxy user or admin and relations to their
@@ -1032,14 +1077,32 @@ WHERE user_id = :user_id and quota_source_label = :label
     total_disk_usage = property(get_disk_usage, set_disk_usage)
 
     def adjust_total_disk_usage(self, amount, quota_source_label):
+        """Add `amount` bytes to the recorded disk usage for the quota source label.
+
+        The usage is incremented in the database within the transaction of the
+        session of this user, so the adjustment is committed or rolled back together
+        with the dataset change causing it and concurrent adjustments don't overwrite
+        each other.
+        """
         assert amount is not None
         if amount != 0:
+            sa_session = object_session(self)
             if quota_source_label is None:
-                self.disk_usage = (self.disk_usage or 0) + amount
+                if sa_session is None or self.id is None:
+                    self.disk_usage = (self.disk_usage or 0) + amount
+                    return
+                if inspect(self).attrs.disk_usage.history.has_changes():
+                    sa_session.flush()
+                statement = """
+UPDATE galaxy_user
+SET disk_usage = COALESCE(disk_usage, 0) + :amount
+WHERE id = :user_id
+"""
+                sa_session.execute(text(statement), {"user_id": self.id, "amount": int(amount)})
+                sa_session.expire(self, ["disk_usage"])
             else:
                 # else would work on newer sqlite - 3.24.0
-                engine = object_session(self).bind
-                if "sqlite" in engine.dialect.name:
+                if "sqlite" in sa_session.bind.dialect.name:
                     # hacky alternative for older sqlite
                     statement = """
 WITH new (user_id, quota_source_label) AS ( VALUES(:user_id, :label) )
@@ -1055,14 +1118,12 @@ ON CONFLICT
     ON constraint uqsu_unique_label_per_user
     DO UPDATE SET disk_usage = user_quota_source_usage.disk_usage + :amount
 """
-                statement = text(statement)
                 params = {
                     "user_id": self.id,
                     "amount": int(amount),
                     "label": quota_source_label,
                 }
-                with engine.connect() as conn, conn.begin():
-                    conn.execute(statement, params)
+                sa_session.execute(text(statement), params)
 
     def _get_social_auth(self, provider_backend):
         if not self.social_auth:
@@ -1139,6 +1200,69 @@ ON CONFLICT
         """
         self._calculate_or_set_disk_usage(object_store=object_store)
 
+    def _recorded_disk_usage_per_quota_source(self, sa_session) -> Dict[Optional[str], int]:
+        recorded: Dict[Optional[str], int] = {
+            None: int(sa_session.scalar(select(User.disk_usage).where(User.id == self.id)) or 0)
+        }
+        stmt = select(UserQuotaSourceUsage.quota_source_label, UserQuotaSourceUsage.disk_usage).where(
+            UserQuotaSourceUsage.user_id == self.id
+        )
+        for label, disk_usage in sa_session.execute(stmt):
+            recorded[label] = int(disk_usage or 0)
+        return recorded
+
+    def calculate_disk_usage_drift(self, object_store) -> List[UserQuotaUsageDrift]:
+        """Compare the recorded disk usage to a full calculation of it.
+
+        Returns an entry for every quota source whose recorded usage is off. The
+        recorded usage is read before and after calculating, if it was adjusted in
+        between the calculation is repeated; if it keeps changing no drift is
+        reported, a later call will find it.
+        """
+        assert object_store is not None
+        sa_session = object_session(self)
+        assert sa_session
+        quota_source_map = object_store.get_quota_source_map()
+        for _ in range(DISK_USAGE_DRIFT_ATTEMPTS):
+            recorded = self._recorded_disk_usage_per_quota_source(sa_session)
+            calculated = calculate_disk_usage_per_quota_source(sa_session, self.id, quota_source_map)
+            if self._recorded_disk_usage_per_quota_source(sa_session) == recorded:
+                break
+        else:
+            log.debug("Disk usage of user %s changed while calculating its drift, skipping", self.id)
+            return []
+        sa_session.expire(self, ["disk_usage", "quota_source_usages"])
+        drifts = []
+        for label in sorted(calculated.keys() | recorded.keys(), key=lambda label: label or ""):
+            recorded_usage = recorded.get(label, 0)
+            calculated_usage = calculated.get(label, 0)
+            if recorded_usage != calculated_usage:
+                drifts.append(
+                    UserQuotaUsageDrift(
+                        quota_source_label=label,
+                        recorded_disk_usage=recorded_usage,
+                        calculated_disk_usage=calculated_usage,
+                        drift=calculated_usage - recorded_usage,
+                    )
+                )
+        return drifts
+
+    def reconcile_disk_usage(self, object_store) -> List[UserQuotaUsageDrift]:
+        """Correct the recorded disk usage where it drifted from a full calculation.
+
+        The drift is applied as an adjustment rather than overwriting the usage, so
+        adjustments made after the drift was calculated are kept. Returns the drift found.
+        """
+        drifts = self.calculate_disk_usage_drift(object_store)
+        if drifts:
+            for drift in drifts:
+                self.adjust_total_disk_usage(drift.drift, drift.quota_source_label)
+            sa_session = object_session(self)
+            assert sa_session
+            with transaction(sa_session):
+                sa_session.commit()
+        return drifts
+
     def _calculate_or_set_disk_usage(self, object_store):
         """
         Utility to calculate and return the disk usage.  If dryrun is False,
@@ -4233,6 +4357,26 @@ class Dataset(Base, StorableObject, Serializable):
         # Make filename absolute
         return os.path.abspath(filename)
 
+    def open_file(self) -> BinaryIO:
+        """Open the dataset's file for reading.
+
+        Object stores caching remote data may start returning data before the
+        file is completely available in their cache.
+        """
+        if self.purged or self.external_filename:
+            return open(self.get_file_name(), "rb")
+        return self._assert_object_store_set().open_data(self)
+
+    def open_ranged_file(self) -> BinaryIO:
+        """Open the dataset's file for random access.
+
+        Only the parts of the file that are read are fetched from object stores
+        supporting ranged reads, the file is not pulled into their cache.
+        """
+        if self.purged or self.external_filename:
+            return open(self.get_file_name(), "rb")
+        return self._assert_object_store_set().open_ranged_data(self)
+
     @property
     def quota_source_label(self):
         return self.quota_source_info.label
@@ -5428,6 +5572,8 @@ class HistoryDatasetAssociation(DatasetInstance, HasTags, Dictifiable, UsesAnnot
         session.add(library_dataset)
         # If roles were selected on the upload form, restrict access to the Dataset to those roles
         roles = roles or []
+        if roles:
+            trans.app.security_agent.invalidate_dataset_permissions(ldda.dataset)
         for role in roles:
             dp = trans.model.DatasetPermissions(
                 trans.app.security_agent.permitted_actions.DATASET_ACCESS.action, ldda.dataset, role
@@ -8808,7 +8954,7 @@ class WorkflowInvocation(Base, UsesCreateAndUpdateTime, Dictifiable, Serializabl
         return list(sa_session.scalars(stmt))
 
     @staticmethod
-    def poll_active_workflow_ids(engine, scheduler=None, handler=None):
+    def _active_workflow_conditions(scheduler=None, handler=None):
         and_conditions = [
             or_(
                 WorkflowInvocation.state == WorkflowInvocation.states.NEW,
@@ -8821,13 +8967,32 @@ class WorkflowInvocation(Base, UsesCreateAndUpdateTime, Dictifiable, Serializabl
             and_conditions.append(WorkflowInvocation.scheduler == scheduler)
         if handler is not None:
             and_conditions.append(WorkflowInvocation.handler == handler)
+        return and_(*and_conditions)
 
-        stmt = select(WorkflowInvocation.id).filter(and_(*and_conditions)).order_by(WorkflowInvocation.id.asc())
+    @staticmethod
+    def poll_active_workflow_ids(engine, scheduler=None, handler=None):
+        stmt = (
+            select(WorkflowInvocation.id)
+            .filter(WorkflowInvocation._active_workflow_conditions(scheduler, handler))
+            .order_by(WorkflowInvocation.id.asc())
+        )
         # Immediately just load all ids into memory so time slicing logic
         # is relatively intutitive.
         with engine.connect() as conn:
             return conn.scalars(stmt).all()
 
+    @staticmethod
+    def poll_active_workflow_ids_and_users(engine, scheduler=None, handler=None):
+        """Return ``(invocation_id, user_id)`` pairs of active invocations, ordered by invocation id."""
+        stmt = (
+            select(WorkflowInvocation.id, History.user_id)
+            .join(History, WorkflowInvocation.history_id == History.id)
+            .filter(WorkflowInvocation._active_workflow_conditions(scheduler, handler))
+            .order_by(WorkflowInvocation.id.asc())
+        )
+        with engine.connect() as conn:
+            return [(row.id, row.user_id) for row in conn.execute(stmt)]
+
     def add_output(self, workflow_output, step, output_object):
         if not hasattr(output_object, "history_content_type"):
             # assuming this is a simple type, just JSON-ify it and stick in the database. In the future
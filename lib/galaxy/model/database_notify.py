@@ -0,0 +1,230 @@
+"""
+Optional PostgreSQL LISTEN/NOTIFY wakeups for job handlers and workflow schedulers.
+
+Sessions created by the model mapping send a notification (delivered when the
+surrounding transaction commits) whenever a flush creates a job or workflow
+invocation, assigns it to a handler, or moves a job or dataset into a final
+state. :class:`DatabaseNotificationListener` keeps one dedicated connection per
+process listening on these channels and wakes up the monitor threads that
+subscribed to them, so that work is picked up right away instead of on the next
+polling iteration.
+"""
+
+import logging
+import os
+import select
+import threading
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from sqlalchemy import (
+    event,
+    func,
+    inspect,
+    select as sa_select,
+)
+from sqlalchemy.engine import Engine
+
+from galaxy import model
+
+log = logging.getLogger(__name__)
+
+JOB_CHANNEL = "galaxy_job"
+WORKFLOW_INVOCATION_CHANNEL = "galaxy_workflow_invocation"
+CHANNELS = (JOB_CHANNEL, WORKFLOW_INVOCATION_CHANNEL)
+# Payload of notifications that all handlers listening on the channel should act on.
+BROADCAST = ""
+
+DEFAULT_SELECT_TIMEOUT = 5
+DEFAULT_RECONNECT_DELAY = 10
+
+Notification = Tuple[str, str]
+
+
+def database_notifications_supported(engine: Engine) -> bool:
+    """Return True if notifications can be sent and received on the database bound to ``engine``."""
+    return engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2"
+
+
+def _state_changed_to(obj, states) -> bool:
+    history = inspect(obj).attrs.state.history
+    return history.has_changes() and obj.state in states
+
+
+def _handler_changed(obj) -> bool:
+    return obj.handler is not None and inspect(obj).attrs.handler.history.has_changes()
+
+
+def notifications_for_flush(session) -> Set[Notification]:
+    """Collect the notifications to send for the pending changes of ``session``."""
+    notifications: Set[Notification] = set()
+    for obj in session.new:
+        if isinstance(obj, model.Job) and obj.state == model.Job.states.NEW:
+            notifications.add((JOB_CHANNEL, obj.handler or BROADCAST))
+        elif isinstance(obj, model.WorkflowInvocation):
+            notifications.add((WORKFLOW_INVOCATION_CHANNEL, obj.handler or BROADCAST))
+    for obj in session.dirty:
+        if isinstance(obj, model.Job):
+            if _state_changed_to(obj, model.Job.terminal_states):
+                # Jobs waiting on the outputs of this job and invocations waiting on
+                # the job may be handled by any handler.
+                notifications.add((JOB_CHANNEL, BROADCAST))
+                notifications.add((WORKFLOW_INVOCATION_CHANNEL, BROADCAST))
+            elif _handler_changed(obj) or _state_changed_to(obj, (model.Job.states.NEW,)):
+                notifications.add((JOB_CHANNEL, obj.handler or BROADCAST))
+        elif isinstance(obj, model.WorkflowInvocation):
+            if _handler_changed(obj):
+                notifications.add((WORKFLOW_INVOCATION_CHANNEL, obj.handler or BROADCAST))
+        elif isinstance(obj, model.Dataset):
+            if _state_changed_to(obj, model.Dataset.ready_states):
+                notifications.add((JOB_CHANNEL, BROADCAST))
+                notifications.add((WORKFLOW_INVOCATION_CHANNEL, BROADCAST))
+    return notifications
+
+
+def _send_notifications(session, flush_context):
+    notifications = notifications_for_flush(session)
+    if notifications:
+        connection = session.connection()
+        for channel, payload in sorted(notifications):
+            # NOTIFY is transactional, listeners only see this once the transaction commits.
+            connection.execute(sa_select(func.pg_notify(channel, payload)))
+
+
+def install_database_notifications(model_mapping):
+    """Send notifications for all sessions created by ``model_mapping``."""
+    event.listen(model_mapping._SessionLocal, "after_flush", _send_notifications)
+
+
+class DatabaseNotificationListener:
+    """Listen for notifications on a dedicated connection and dispatch them to subscribers.
+
+    The listening thread is started when the first subscription is made in a
+    process. If the connection is lost it is re-established after
+    ``reconnect_delay`` seconds, subscribers can use :attr:`listening` to decide
+    whether they need to poll more frequently in the meantime.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        select_timeout: float = DEFAULT_SELECT_TIMEOUT,
+        reconnect_delay: float = DEFAULT_RECONNECT_DELAY,
+    ):
+        self._engine = engine
+        self.select_timeout = select_timeout
+        self.reconnect_delay = reconnect_delay
+        self._subscribers: Dict[str, List[Callable[[str], None]]] = {channel: [] for channel in CHANNELS}
+        self._lock = threading.Lock()
+        self.exit = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.pid: Optional[int] = None
+        self.listening = False
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]):
+        """Call ``callback`` with the payload of every notification received on ``channel``."""
+        with self._lock:
+            self._subscribers[channel].append(callback)
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.exit.clear()
+                self.thread = threading.Thread(target=self.listen, name="DatabaseNotificationListener.thread")
+                self.thread.daemon = True
+                self.thread.start()
+
+    def shutdown(self):
+        self.exit.set()
+        if self.thread and self.pid == os.getpid():
+            self.thread.join()
+
+    def dispatch(self, channel: str, payload: str):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for callback in subscribers:
+            try:
+                callback(payload)
+            except Exception:
+                log.exception("Error while dispatching database notification on channel '%s'", channel)
+
+    def listen(self):
+        while not self.exit.is_set():
+            try:
+                self._listen_on_new_connection()
+            except Exception:
+                log.exception(
+                    "Listening for database notifications failed, falling back to polling for %s seconds",
+                    self.reconnect_delay,
+                )
+            finally:
+                self.listening = False
+            self.exit.wait(self.reconnect_delay)
+
+    def _listen_on_new_connection(self):
+        connection = self._engine.raw_connection()
+        # This connection is kept in autocommit mode, don't return it to the pool.
+        connection.detach()
+        try:
+            dbapi_connection = connection.driver_connection
+            assert dbapi_connection is not None
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                for channel in CHANNELS:
+                    cursor.execute(f'LISTEN "{channel}"')
+            self.listening = True
+            log.debug("Listening for database notifications on channel(s): %s", ", ".join(CHANNELS))
+            # Anything that happened while we weren't listening has been missed, wake up all subscribers.
+            for channel in CHANNELS:
+                self.dispatch(channel, BROADCAST)
+            while not self.exit.is_set():
+                if select.select([dbapi_connection], [], [], self.select_timeout) == ([], [], []):
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    notify = dbapi_connection.notifies.pop(0)
+                    self.dispatch(notify.channel, notify.payload)
+        finally:
+            connection.close()
+
+
+class MonitorWakeup:
+    """Wake up a monitor thread on notifications addressed to its handler.
+
+    ``get_timer`` is called when the first notification after the last
+    :meth:`pop_timer` arrives, so the timer measures the latency between the
+    wakeup and the end of the monitor iteration that handles it.
+    """
+
+    def __init__(self, sleeper, handler_tags: Callable[[], Set[str]], get_timer: Callable):
+        self.sleeper = sleeper
+        self.handler_tags = handler_tags
+        self.get_timer = get_timer
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def __call__(self, payload: str):
+        if payload != BROADCAST and payload not in self.handler_tags():
+            return
+        with self._lock:
+            if self._timer is None:
+                self._timer = self.get_timer()
+        self.sleeper.wake()
+
+    def pop_timer(self):
+        with self._lock:
+            timer, self._timer = self._timer, None
+        return timer
+
+
+def monitor_sleep_interval(
+    listener: Optional[DatabaseNotificationListener], sleep: float, poll_interval: float
+) -> float:
+    """Sleep interval for a monitor loop, taking into account whether notifications can wake it up."""
+    if listener is not None and listener.listening:
+        return max(sleep, poll_interval)
+    return sleep
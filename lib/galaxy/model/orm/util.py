@@ -1,4 +1,9 @@
-from sqlalchemy import inspect
+from sqlalchemy import (
+    insert,
+    inspect,
+)
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
 
 
 def add_object_to_object_session(object, object_with_session):
@@ -31,3 +36,40 @@ def add_object_to_session(object, session):
 def get_object_session(object):
     if object:
         return inspect(object).session
+
+
+def bulk_insert(session, instances):
+    """Insert new (transient) model instances in batches and attach them to ``session``.
+
+    Rows are built from the column attributes set on the instances and inserted with
+    a single executemany ``INSERT ... RETURNING`` (batched by SQLAlchemy's
+    insertmanyvalues), bypassing the per-object bookkeeping of the unit of work.
+    Afterwards the instances are persistent in ``session`` exactly as if they had been
+    added and flushed, later changes to them are flushed as regular UPDATEs.
+
+    All instances must be of the same class. Relationships are not followed, foreign
+    key columns have to be set explicitly on the instances. Columns set on some but not
+    all of the instances are inserted as NULL for the remaining ones.
+    """
+    if not instances:
+        return
+    mapper = inspect(instances[0]).mapper
+    table = mapper.local_table
+    assert table is mapper.persist_selectable, f"{mapper.class_} is not mapped to a single table"
+    states = [inspect(instance) for instance in instances]
+    keys = {column: mapper.get_property_by_column(column).key for column in table.columns}
+    present = [
+        column
+        for column in table.columns
+        if not column.primary_key and any(keys[column] in state.dict for state in states)
+    ]
+    rows = [{column.key: state.dict.get(keys[column]) for column in present} for state in states]
+    stmt = insert(table).returning(*table.columns, sort_by_parameter_order=True)
+    result = session.execute(stmt, rows)
+    for instance, state, row in zip(instances, states, result):
+        for column, value in zip(table.columns, row):
+            # Fill in the primary key and server/column defaults so accessing them doesn't trigger a load.
+            if column.primary_key or keys[column] not in state.dict:
+                set_committed_value(instance, keys[column], value)
+        make_transient_to_detached(instance)
+        session.add(instance)
@@ -1,13 +1,19 @@
 import logging
 import socket
 import sqlite3
+import threading
+import time
 from datetime import (
     datetime,
     timedelta,
 )
 from typing import (
+    Dict,
+    FrozenSet,
+    Iterable,
     List,
     Optional,
+    Tuple,
 )
 
 from sqlalchemy import (
@@ -64,12 +70,25 @@ from galaxy.util.bunch import Bunch
 
 log = logging.getLogger(__name__)
 
+# Seconds the security agent caches the permissions of a dataset. Changes made through the
+# agent of this process are visible immediately, changes made by other processes after this long.
+DATASET_PERMISSIONS_CACHE_TTL = 5.0
+# The cache is cleared when it holds the permissions of more datasets than this.
+DATASET_PERMISSIONS_CACHE_SIZE = 100000
+
+# Maps a dataset action (e.g. "access") to the ids of the roles associated with it.
+DatasetActionRoleIdsT = Dict[str, FrozenSet[int]]
+
 
 class GalaxyRBACAgent(RBACAgent):
     def __init__(self, sa_session, permitted_actions=None):
         self.sa_session = sa_session
         if permitted_actions:
             self.permitted_actions = permitted_actions
+        self._dataset_permissions_cache: Dict[int, Tuple[float, DatasetActionRoleIdsT]] = {}
+        self._dataset_permissions_cache_lock = threading.Lock()
+        # Incremented on every invalidation, so permissions loaded concurrently with a change are not cached.
+        self._dataset_permissions_generation = 0
         # List of "library_item" objects and their associated permissions and info template objects
         self.library_item_assocs = (
             (Library, LibraryPermissions),
@@ -528,6 +547,61 @@ class GalaxyRBACAgent(RBACAgent):
 
         return True
 
+    def get_dataset_action_role_ids(self, dataset_ids: Iterable[int]) -> Dict[int, DatasetActionRoleIdsT]:
+        """
+        Map the given dataset ids to the role ids associated with each action on the dataset.
+        Permissions not found in the short lived cache of this agent are loaded with a single query.
+
+        The cache is local to this process: changes are visible immediately only if they went
+        through ``invalidate_dataset_permissions`` of this agent, other processes (web workers,
+        job handlers) see them once their entry is older than ``DATASET_PERMISSIONS_CACHE_TTL``.
+        """
+        now = time.monotonic()
+        action_role_ids: Dict[int, DatasetActionRoleIdsT] = {}
+        missing = []
+        with self._dataset_permissions_cache_lock:
+            generation = self._dataset_permissions_generation
+            for dataset_id in set(dataset_ids):
+                cached = self._dataset_permissions_cache.get(dataset_id)
+                if cached and now - cached[0] < DATASET_PERMISSIONS_CACHE_TTL:
+                    action_role_ids[dataset_id] = cached[1]
+                else:
+                    missing.append(dataset_id)
+        if not missing:
+            return action_role_ids
+
+        loaded: Dict[int, Dict[str, set]] = {dataset_id: {} for dataset_id in missing}
+        stmt = select(DatasetPermissions.dataset_id, DatasetPermissions.action, DatasetPermissions.role_id).where(
+            DatasetPermissions.dataset_id.in_(missing)
+        )
+        for dataset_id, action, role_id in self.sa_session.execute(stmt):
+            loaded[dataset_id].setdefault(action, set()).add(role_id)
+        with self._dataset_permissions_cache_lock:
+            cache = generation == self._dataset_permissions_generation
+            if len(self._dataset_permissions_cache) > DATASET_PERMISSIONS_CACHE_SIZE:
+                self._dataset_permissions_cache.clear()
+            for dataset_id, roles_by_action in loaded.items():
+                action_role_ids[dataset_id] = {action: frozenset(ids) for action, ids in roles_by_action.items()}
+                if cache:
+                    self._dataset_permissions_cache[dataset_id] = (now, action_role_ids[dataset_id])
+        return action_role_ids
+
+    def invalidate_dataset_permissions(self, *datasets: Dataset) -> None:
+        """Drop cached permissions of datasets whose permissions are being changed.
+
+        Anything adding or deleting ``DatasetPermissions`` must call this, the agent's own
+        setters already do. Only the cache of this process is invalidated.
+        """
+        with self._dataset_permissions_cache_lock:
+            self._dataset_permissions_generation += 1
+            for dataset in datasets:
+                self._dataset_permissions_cache.pop(dataset.id, None)
+
+    def permission_resolver(
+        self, user: Optional[User], roles: Optional[Iterable[Role]] = None
+    ) -> "DatasetPermissionResolver":
+        return DatasetPermissionResolver(self, user, roles=roles)
+
     def can_access_collection(self, user_roles: List[Role], collection: DatasetCollection):
         action_tuples = collection.dataset_action_tuples
         if not self.can_access_datasets(user_roles, action_tuples):
@@ -732,6 +806,7 @@ WHERE history.user_id != :user_id and history_dataset_association.dataset_id = :
         return assoc
 
     def associate_action_dataset_role(self, action, dataset, role):
+        self.invalidate_dataset_permissions(dataset)
         assoc = DatasetPermissions(action, dataset, role)
         self.sa_session.add(assoc)
         with transaction(self.sa_session):
@@ -922,6 +997,7 @@ WHERE history.user_id != :user_id and history_dataset_association.dataset_id = :
                 return galaxy.model.CANNOT_SHARE_PRIVATE_DATASET_MESSAGE
 
         flush_needed = False
+        self.invalidate_dataset_permissions(dataset)
         # Delete all of the current permissions on the dataset
         if not new:
             for dp in dataset.actions:
@@ -944,6 +1020,31 @@ WHERE history.user_id != :user_id and history_dataset_association.dataset_id = :
                 self.sa_session.commit()
         return ""
 
+    def set_new_datasets_permissions(self, datasets, permissions):
+        """
+        Set full permissions on many new datasets using a single bulk insert.
+        Permission looks like: { Action : [ Role, Role ] }
+        """
+        for _ in _walk_action_roles(permissions, self.permitted_actions.DATASET_MANAGE_PERMISSIONS):
+            break
+        else:
+            return "At least 1 role must be associated with manage permissions on this dataset."
+        action_role_ids = []
+        for action, roles in permissions.items():
+            if isinstance(action, Action):
+                action = action.action
+            for role in roles:
+                action_role_ids.append((action, role.id if hasattr(role, "id") else role))
+        rows = [
+            {"action": action, "dataset_id": dataset.id, "role_id": role_id}
+            for dataset in datasets
+            for action, role_id in action_role_ids
+        ]
+        if rows:
+            self.invalidate_dataset_permissions(*datasets)
+            self.sa_session.execute(insert(DatasetPermissions), rows)
+        return ""
+
     def set_dataset_permission(self, dataset, permission=None):
         """
         Set a specific permission on a dataset, leaving all other current permissions on the dataset alone.
@@ -957,6 +1058,7 @@ WHERE history.user_id != :user_id and history_dataset_association.dataset_id = :
             break
 
         flush_needed = False
+        self.invalidate_dataset_permissions(dataset)
         for action, roles in permission.items():
             if isinstance(action, Action):
                 action = action.action
@@ -1222,6 +1324,7 @@ WHERE history.user_id != :user_id and history_dataset_association.dataset_id = :
         dataset.ensure_shareable()
 
         flush_needed = False
+        self.invalidate_dataset_permissions(dataset)
         for dp in dataset.actions:
             if dp.action == self.permitted_actions.DATASET_ACCESS.action:
                 self.sa_session.delete(dp)
@@ -1672,6 +1775,56 @@ WHERE history.user_id != :user_id and history_dataset_association.dataset_id = :
         return False, hidden_folder_ids
 
 
+class DatasetPermissionResolver:
+    """
+    Check the permissions of one user on many datasets, e.g. while serializing a page of a listing.
+
+    The roles of the user are loaded once and the permissions of the datasets passed to
+    :meth:`prefetch` are loaded together (through the permission cache of the security agent)
+    instead of one query per dataset. Meant to live for the duration of a single request.
+    """
+
+    def __init__(self, security_agent: GalaxyRBACAgent, user: Optional[User], roles: Optional[Iterable[Role]] = None):
+        self.security_agent = security_agent
+        self.permitted_actions = security_agent.permitted_actions
+        if roles is None:
+            roles = user.all_roles_exploiting_cache() if user else []
+        roles = list(roles)
+        self.role_ids = frozenset(role.id for role in roles)
+        self.private_role_ids = frozenset(role.id for role in roles if role.type == Role.types.PRIVATE)
+        self._action_role_ids: Dict[int, DatasetActionRoleIdsT] = {}
+
+    def prefetch(self, datasets: Iterable[Dataset]) -> None:
+        """Load the permissions of ``datasets`` not loaded yet."""
+        dataset_ids = {dataset.id for dataset in datasets}
+        dataset_ids.difference_update(self._action_role_ids)
+        if dataset_ids:
+            self._action_role_ids.update(self.security_agent.get_dataset_action_role_ids(dataset_ids))
+
+    def action_role_ids(self, dataset: Dataset) -> DatasetActionRoleIdsT:
+        """Return the role ids associated with each action on ``dataset``."""
+        if dataset.id not in self._action_role_ids:
+            self.prefetch([dataset])
+        return self._action_role_ids[dataset.id]
+
+    def _role_ids(self, dataset: Dataset, action: Action) -> FrozenSet[int]:
+        return self.action_role_ids(dataset).get(action.action, frozenset())
+
+    def dataset_is_public(self, dataset: Dataset) -> bool:
+        return not self._role_ids(dataset, self.permitted_actions.DATASET_ACCESS)
+
+    def can_access_dataset(self, dataset: Dataset) -> bool:
+        # For DATASET_ACCESS the user must have ALL associated roles
+        return self._role_ids(dataset, self.permitted_actions.DATASET_ACCESS) <= self.role_ids
+
+    def can_manage_dataset(self, dataset: Dataset) -> bool:
+        return bool(self._role_ids(dataset, self.permitted_actions.DATASET_MANAGE_PERMISSIONS) & self.role_ids)
+
+    def dataset_is_private_to_user(self, dataset: Dataset) -> bool:
+        access_role_ids = self._role_ids(dataset, self.permitted_actions.DATASET_ACCESS)
+        return len(access_role_ids) == 1 and access_role_ids <= self.private_role_ids
+
+
 class HostAgent(RBACAgent):
     """
     A simple security agent which allows access to datasets based on host.
@@ -6,7 +6,15 @@ import os
 import shutil
 import tarfile
 import tempfile
-from collections import defaultdict
+from collections import (
+    defaultdict,
+    deque,
+)
+from concurrent.futures import (
+    as_completed,
+    Future,
+    ThreadPoolExecutor,
+)
 from dataclasses import dataclass
 from enum import Enum
 from json import (
@@ -24,6 +32,7 @@ from typing import (
     Iterable,
     Iterator,
     List,
+    NamedTuple,
     Optional,
     Set,
     Tuple,
@@ -75,7 +84,7 @@ from galaxy.model.tags import GalaxyTagHandler
 from galaxy.objectstore import (
     BaseObjectStore,
     ObjectStore,
-    persist_extra_files,
+    persist_extra_files_for_dataset,
 )
 from galaxy.schema.bco import (
     BioComputeObjectCore,
@@ -149,6 +158,12 @@ ATTRS_FILENAME_INVOCATIONS = "invocation_attrs.txt"
 ATTRS_FILENAME_CONVERSIONS = "implicit_dataset_conversions.txt"
 TRACEBACK = "traceback.txt"
 GALAXY_EXPORT_VERSION = "2"
+# Number of datasets created and committed together when importing a model store.
+DEFAULT_IMPORT_BATCH_SIZE = 500
+# Number of threads copying dataset files into the object store when importing a model store.
+DEFAULT_IMPORT_COPY_WORKERS = 4
+# Number of threads resolving (and for remote object stores fetching) dataset files ahead of the export.
+DEFAULT_EXPORT_PREFETCH_WORKERS = 4
 
 DICT_STORE_ATTRS_KEY_HISTORY = "history"
 DICT_STORE_ATTRS_KEY_DATASETS = "datasets"
@@ -197,6 +212,8 @@ class DatasetAttributeImportModel(BaseModel):
 
 
 DEFAULT_DISCARDED_DATA_TYPE = ImportDiscardedDataType.FORBID
+# dataset instance, path of its file and of its extra files in the model store
+PendingDatasetFileT = Tuple[model.DatasetInstance, str, Optional[str]]
 
 
 class ImportOptions:
@@ -204,6 +221,8 @@ class ImportOptions:
     allow_library_creation: bool
     allow_dataset_object_edit: bool
     discarded_data: ImportDiscardedDataType
+    batch_size: int
+    copy_workers: int
 
     def __init__(
         self,
@@ -211,6 +230,8 @@ class ImportOptions:
         allow_library_creation: bool = False,
         allow_dataset_object_edit: Optional[bool] = None,
         discarded_data: ImportDiscardedDataType = DEFAULT_DISCARDED_DATA_TYPE,
+        batch_size: int = DEFAULT_IMPORT_BATCH_SIZE,
+        copy_workers: int = DEFAULT_IMPORT_COPY_WORKERS,
     ) -> None:
         self.allow_edit = allow_edit
         self.allow_library_creation = allow_library_creation
@@ -219,6 +240,8 @@ class ImportOptions:
         else:
             self.allow_dataset_object_edit = allow_dataset_object_edit
         self.discarded_data = discarded_data
+        self.batch_size = max(batch_size, 1)
+        self.copy_workers = copy_workers
 
 
 class SessionlessContext:
@@ -489,7 +512,22 @@ class ModelImportStore(metaclass=abc.ABCMeta):
                 if job:
                     dataset_instance.dataset.job_id = job.id
 
-        for dataset_attrs in datasets_attrs:
+        # Datasets are created in batches, each batch is flushed once to assign ids to all of its
+        # datasets, then their files are copied into the object store in parallel and their
+        # metadata is regenerated before the batch is committed.
+        pending_files: List[PendingDatasetFileT] = []
+        pending_metadata: List[model.DatasetInstance] = []
+
+        def finish_batch():
+            self.sa_session.flush()
+            self._import_dataset_files(pending_files)
+            for dataset_instance in pending_metadata:
+                self._regenerate_imported_metadata(dataset_instance, history, job)
+            self._flush()
+            pending_files.clear()
+            pending_metadata.clear()
+
+        for i, dataset_attrs in enumerate(datasets_attrs):
             if "state" not in dataset_attrs:
                 self.dataset_state_serialized = False
 
@@ -659,19 +697,13 @@ class ModelImportStore(metaclass=abc.ABCMeta):
                         if not self.object_store:
                             raise Exception(f"self.object_store is missing from {self}.")
                         if not dataset_instance.dataset.purged:
-                            self.object_store.update_from_file(
-                                dataset_instance.dataset, file_name=temp_dataset_file_name, create=True
-                            )
-
                             # Import additional files if present. Histories exported previously might not have this attribute set.
                             dataset_extra_files_path = dataset_attrs.get("extra_files_path", None)
                             if dataset_extra_files_path:
                                 assert file_source_root
                                 dataset_extra_files_path = os.path.join(file_source_root, dataset_extra_files_path)
-                                persist_extra_files(self.object_store, dataset_extra_files_path, dataset_instance)
-                            # Only trust file size if the dataset is purged. If we keep the data we should check the file size.
-                            dataset_instance.dataset.file_size = None
-                            dataset_instance.dataset.set_total_size()  # update the filesize record in the database
+                            # Files are copied into the object store once the batch has been flushed.
+                            pending_files.append((dataset_instance, temp_dataset_file_name, dataset_extra_files_path))
 
                     if dataset_instance.deleted:
                         dataset_instance.dataset.deleted = True
@@ -690,38 +722,7 @@ class ModelImportStore(metaclass=abc.ABCMeta):
                             user=self.user, item=dataset_instance, new_tags_list=tag_list, flush=False
                         )
 
-                if self.app:
-                    # If dataset instance is discarded or deferred, don't attempt to regenerate
-                    # metadata for it.
-                    if dataset_instance.state == dataset_instance.states.OK:
-                        regenerate_kwds: Dict[str, Any] = {}
-                        if job:
-                            regenerate_kwds["user"] = job.user
-                            regenerate_kwds["session_id"] = job.session_id
-                        elif history:
-                            user = history.user
-                            regenerate_kwds["user"] = user
-                            if user is None:
-                                regenerate_kwds["session_id"] = history.galaxy_sessions[0].galaxy_session.id
-                            else:
-                                regenerate_kwds["session_id"] = None
-                        else:
-                            # Need a user to run library jobs to generate metadata...
-                            pass
-                        if not self.import_options.allow_edit:
-                            # external import, metadata files need to be regenerated (as opposed to extended metadata dataset import)
-                            if self.app.datatypes_registry.set_external_metadata_tool:
-                                self.app.datatypes_registry.set_external_metadata_tool.regenerate_imported_metadata_if_needed(
-                                    dataset_instance, history, **regenerate_kwds
-                                )
-                            else:
-                                # Try to set metadata directly. @mvdbeek thinks we should only record the datasets
-                                try:
-                                    if dataset_instance.has_metadata_files:
-                                        dataset_instance.datatype.set_meta(dataset_instance)  # type:ignore[arg-type]
-                                except Exception:
-                                    log.debug(f"Metadata setting failed on {dataset_instance}", exc_info=True)
-                                    dataset_instance.state = dataset_instance.dataset.states.FAILED_METADATA
+                pending_metadata.append(dataset_instance)
 
                 if model_class == "HistoryDatasetAssociation":
                     if not isinstance(dataset_instance, model.HistoryDatasetAssociation):
@@ -746,6 +747,90 @@ class ModelImportStore(metaclass=abc.ABCMeta):
                         assert "id" in dataset_attrs
                         object_import_tracker.lddas_by_key[dataset_attrs["id"]] = dataset_instance
 
+            if len(pending_metadata) >= self.import_options.batch_size:
+                finish_batch()
+                log.info("Imported %d of %d datasets", i + 1, len(datasets_attrs))
+        if pending_metadata or pending_files:
+            finish_batch()
+
+    def _import_dataset_files(self, pending_files: List[PendingDatasetFileT]) -> None:
+        """Copy the files of a batch of flushed datasets into the object store.
+
+        Workers only copy bytes, everything touching the ORM objects (assigning
+        the object store, recording sizes) happens on the calling thread.
+        """
+        if not pending_files:
+            return
+        object_store = self.object_store
+        assert object_store
+        copies: List[Tuple[model.Dataset, str, Optional[str], Optional[str]]] = []
+        for dataset_instance, file_name, extra_files_path in pending_files:
+            dataset = dataset_instance.dataset
+            # assigns object_store_id if needed, the copies below then only read loaded attributes
+            object_store.create(dataset)
+            extra_files_path_name = None
+            if extra_files_path and not dataset.purged and os.path.exists(extra_files_path):
+                extra_files_path_name = dataset.extra_files_path_name_from(object_store)
+                assert extra_files_path_name
+            copies.append((dataset, file_name, extra_files_path, extra_files_path_name))
+
+        def copy_files(dataset: model.Dataset, file_name: str, extra_files_path, extra_files_path_name) -> None:
+            object_store.update_from_file(dataset, file_name=file_name)
+            if extra_files_path and extra_files_path_name:
+                persist_extra_files_for_dataset(object_store, extra_files_path, dataset, extra_files_path_name)
+
+        copy_workers = self.import_options.copy_workers
+        if copy_workers > 1 and len(copies) > 1:
+            with ThreadPoolExecutor(max_workers=copy_workers, thread_name_prefix="ImportCopy") as executor:
+                futures = [executor.submit(copy_files, *copy) for copy in copies]
+                for future in as_completed(futures):
+                    # re-raise the first exception
+                    future.result()
+        else:
+            for copy in copies:
+                copy_files(*copy)
+
+        for dataset, _, _, _ in copies:
+            # Only trust file size if the dataset is purged. If we keep the data we should check the file size.
+            dataset.file_size = None
+            dataset.set_total_size()  # update the filesize record in the database
+
+    def _regenerate_imported_metadata(
+        self, dataset_instance: model.DatasetInstance, history: Optional[model.History], job: Optional[model.Job]
+    ) -> None:
+        if self.app:
+            # If dataset instance is discarded or deferred, don't attempt to regenerate
+            # metadata for it.
+            if dataset_instance.state == dataset_instance.states.OK:
+                regenerate_kwds: Dict[str, Any] = {}
+                if job:
+                    regenerate_kwds["user"] = job.user
+                    regenerate_kwds["session_id"] = job.session_id
+                elif history:
+                    user = history.user
+                    regenerate_kwds["user"] = user
+                    if user is None:
+                        regenerate_kwds["session_id"] = history.galaxy_sessions[0].galaxy_session.id
+                    else:
+                        regenerate_kwds["session_id"] = None
+                else:
+                    # Need a user to run library jobs to generate metadata...
+                    pass
+                if not self.import_options.allow_edit:
+                    # external import, metadata files need to be regenerated (as opposed to extended metadata dataset import)
+                    if self.app.datatypes_registry.set_external_metadata_tool:
+                        self.app.datatypes_registry.set_external_metadata_tool.regenerate_imported_metadata_if_needed(
+                            dataset_instance, history, **regenerate_kwds
+                        )
+                    else:
+                        # Try to set metadata directly. @mvdbeek thinks we should only record the datasets
+                        try:
+                            if dataset_instance.has_metadata_files:
+                                dataset_instance.datatype.set_meta(dataset_instance)  # type:ignore[arg-type]
+                        except Exception:
+                            log.debug(f"Metadata setting failed on {dataset_instance}", exc_info=True)
+                            dataset_instance.state = dataset_instance.dataset.states.FAILED_METADATA
+
     def _import_libraries(self, object_import_tracker: "ObjectImportTracker") -> None:
         object_key = self.object_key
 
@@ -1871,6 +1956,112 @@ class ModelExportStore(metaclass=abc.ABCMeta):
         """Export store should be used as context manager."""
 
 
+DatasetFilePathsT = Tuple[Optional[str], Optional[str]]
+
+
+class DatasetFileRef(NamedTuple):
+    """Plain copy of the dataset attributes object stores locate files by.
+
+    Prefetch workers address the object store through these instead of the
+    session-bound :class:`galaxy.model.Dataset`.
+    """
+
+    id: int
+    uuid: Any
+    object_store_id: Optional[str]
+
+
+class DatasetFilePrefetcher:
+    """Resolve the file and extra files paths of datasets ahead of their export.
+
+    Resolving a path may fetch the file from a remote object store into its
+    cache, this is done by a bounded number of threads while earlier datasets
+    are written. At most ``2 * workers`` datasets are resolved ahead, so
+    the object store cache is not filled with the whole history at once.
+    Everything read from the datasets is resolved on the calling thread,
+    workers only get plain values.
+    """
+
+    def __init__(self, datasets: Iterable[model.DatasetInstance], workers: int = DEFAULT_EXPORT_PREFETCH_WORKERS):
+        self._datasets = iter(datasets)
+        self._window = 2 * workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ExportPrefetch")
+        self._futures: Dict[int, Future] = {}
+        self._order: deque = deque()
+        self._fill()
+
+    def _fill(self) -> None:
+        while len(self._order) < self._window:
+            dataset_instance = next(self._datasets, None)
+            if dataset_instance is None:
+                return
+            dataset = dataset_instance.dataset
+            if dataset.id in self._futures:
+                continue
+            if (
+                dataset.purged
+                or dataset.uuid is None
+                or dataset.external_filename
+                or getattr(dataset, "external_extra_files_path", None)
+            ):
+                # not (only) addressed through the object store, resolved when requested
+                continue
+            ref = DatasetFileRef(dataset.id, dataset.uuid, dataset.object_store_id)
+            object_store = dataset._assert_object_store_set()
+            extra_files_rel_path = dataset._extra_files_rel_path
+            self._futures[dataset.id] = self._executor.submit(
+                object_store_file_paths, object_store, ref, extra_files_rel_path
+            )
+            self._order.append(dataset.id)
+
+    def get(self, dataset: model.DatasetInstance) -> DatasetFilePathsT:
+        future = self._futures.pop(dataset.dataset.id, None)
+        if future is None:
+            return dataset_file_paths(dataset)
+        self._order.remove(dataset.dataset.id)
+        self._fill()
+        return future.result()
+
+    def shutdown(self) -> None:
+        for future in self._futures.values():
+            future.cancel()
+        # cancel_futures of Executor.shutdown requires Python >= 3.9
+        self._executor.shutdown(wait=True)
+
+
+def dataset_file_paths(dataset: model.DatasetInstance) -> DatasetFilePathsT:
+    """Return the path of the file and extra files directory of ``dataset`` if they exist."""
+    file_name, extra_files_path = None, None
+    try:
+        _file_name = dataset.get_file_name()
+        if os.path.exists(_file_name):
+            file_name = _file_name
+    except ObjectNotFound:
+        pass
+
+    if dataset.extra_files_path_exists():
+        extra_files_path = dataset.extra_files_path
+    return file_name, extra_files_path
+
+
+def object_store_file_paths(
+    object_store: BaseObjectStore, ref: DatasetFileRef, extra_files_rel_path: Optional[str]
+) -> DatasetFilePathsT:
+    """Like :func:`dataset_file_paths` for datasets kept in ``object_store``."""
+    file_name, extra_files_path = None, None
+    try:
+        if object_store.exists(ref):
+            _file_name = object_store.get_filename(ref)
+            if os.path.exists(_file_name):
+                file_name = _file_name
+    except ObjectNotFound:
+        pass
+
+    if object_store.exists(ref, extra_dir=extra_files_rel_path, dir_only=True):
+        extra_files_path = object_store.get_filename(ref, dir_only=True, extra_dir=extra_files_rel_path)
+    return file_name, extra_files_path
+
+
 class DirectoryModelExportStore(ModelExportStore):
     app: Optional[StoreAppProtocol]
     file_sources: Optional[ConfiguredFileSources]
@@ -1886,6 +2077,7 @@ class DirectoryModelExportStore(ModelExportStore):
         strip_metadata_files: bool = True,
         serialize_jobs: bool = True,
         user_context=None,
+        prefetch_workers: int = DEFAULT_EXPORT_PREFETCH_WORKERS,
     ) -> None:
         """
         :param export_directory: path to export directory. Will be created if it does not exist.
@@ -1895,6 +2087,7 @@ class DirectoryModelExportStore(ModelExportStore):
         :param export_files: How files should be exported, can be 'symlink', 'copy' or None, in which case files
                              will not be serialized.
         :param serialize_jobs: Include job data in model export. Not needed for set_metadata script.
+        :param prefetch_workers: Number of threads resolving dataset files ahead of their export.
         """
         if not os.path.exists(export_directory):
             os.makedirs(export_directory)
@@ -1935,6 +2128,8 @@ class DirectoryModelExportStore(ModelExportStore):
         self.dataset_id_to_path: Dict[int, Tuple[Optional[str], Optional[str]]] = {}
 
         self.job_output_dataset_associations: Dict[int, Dict[str, model.DatasetInstance]] = {}
+        self.prefetch_workers = prefetch_workers
+        self._file_prefetcher: Optional[DatasetFilePrefetcher] = None
 
     @property
     def workflows_directory(self) -> str:
@@ -1944,41 +2139,19 @@ class DirectoryModelExportStore(ModelExportStore):
         if self.export_files is None:
             return None
 
-        add: Callable[[str, str], None]
-        if self.export_files == "symlink":
-            add = os.symlink
-        elif self.export_files == "copy":
-
-            def add(src, dest):
-                if os.path.isdir(src):
-                    shutil.copytree(src, dest)
-                else:
-                    shutil.copyfile(src, dest)
-
-        else:
+        if self.export_files not in ("symlink", "copy"):
             raise Exception(f"Unknown export_files parameter type encountered {self.export_files}")
 
-        export_directory = self.export_directory
-
         _, include_files = self.included_datasets[dataset]
         if not include_files:
             return
 
-        file_name, extra_files_path = None, None
-        try:
-            _file_name = dataset.get_file_name()
-            if os.path.exists(_file_name):
-                file_name = _file_name
-        except ObjectNotFound:
-            pass
-
-        if dataset.extra_files_path_exists():
-            extra_files_path = dataset.extra_files_path
+        if self._file_prefetcher:
+            file_name, extra_files_path = self._file_prefetcher.get(dataset)
         else:
-            pass
+            file_name, extra_files_path = dataset_file_paths(dataset)
 
         dir_name = "datasets"
-        dir_path = os.path.join(export_directory, dir_name)
 
         if dataset.dataset.id in self.dataset_id_to_path:
             file_name, extra_files_path = self.dataset_id_to_path[dataset.dataset.id]
@@ -1989,9 +2162,6 @@ class DirectoryModelExportStore(ModelExportStore):
             return
 
         if file_name:
-            if not os.path.exists(dir_path):
-                os.makedirs(dir_path)
-
             conversion = self.dataset_implicit_conversions.get(dataset)
             conversion_key = (
                 self.serialization_options.get_identifier(self.security, conversion) if conversion else None
@@ -2000,9 +2170,7 @@ class DirectoryModelExportStore(ModelExportStore):
                 as_dict["name"], as_dict["extension"], as_dict["encoded_id"], conversion_key=conversion_key
             )
             arcname = os.path.join(dir_name, target_filename)
-            src = file_name
-            dest = os.path.join(export_directory, arcname)
-            add(src, dest)
+            self._export_file(file_name, arcname)
             as_dict["file_name"] = arcname
 
         if extra_files_path:
@@ -2016,13 +2184,34 @@ class DirectoryModelExportStore(ModelExportStore):
                     as_dict["encoded_id"], conversion_key=conversion_key
                 )
                 arcname = os.path.join(dir_name, extra_files_target_filename)
-                add(extra_files_path, os.path.join(export_directory, arcname))
+                self._export_file(extra_files_path, arcname)
                 as_dict["extra_files_path"] = arcname
             else:
                 as_dict["extra_files_path"] = ""
 
         self.dataset_id_to_path[dataset.dataset.id] = (as_dict.get("file_name"), as_dict.get("extra_files_path"))
 
+    def _export_file(self, src: str, arcname: str) -> None:
+        """Add the file or directory ``src`` to the export as ``arcname``."""
+        dest = os.path.join(self.export_directory, arcname)
+        safe_makedirs(os.path.dirname(dest))
+        if self.export_files == "symlink":
+            os.symlink(src, dest)
+        elif os.path.isdir(src):
+            shutil.copytree(src, dest)
+        else:
+            shutil.copyfile(src, dest)
+
+    def _write_attrs(self, filename: str, attributes: Iterable) -> None:
+        """Serialize ``attributes`` into a JSON list one item at a time."""
+        with open(os.path.join(self.export_directory, filename), "w") as attrs_out:
+            attrs_out.write("[")
+            for i, attribute in enumerate(attributes):
+                if i:
+                    attrs_out.write(", ")
+                attrs_out.write(json_encoder.encode(attribute.serialize(self.security, self.serialization_options)))
+            attrs_out.write("]")
+
     def exported_key(
         self,
         obj: model.RepresentById,
@@ -2342,31 +2531,21 @@ class DirectoryModelExportStore(ModelExportStore):
             else:
                 provenance_attrs.append(dataset)
 
-        def to_json(attributes):
-            return json_encoder.encode([a.serialize(self.security, self.serialization_options) for a in attributes])
-
-        datasets_attrs_filename = os.path.join(export_directory, ATTRS_FILENAME_DATASETS)
-        with open(datasets_attrs_filename, "w") as datasets_attrs_out:
-            datasets_attrs_out.write(to_json(datasets_attrs))
-
-        with open(f"{datasets_attrs_filename}.provenance", "w") as provenance_attrs_out:
-            provenance_attrs_out.write(to_json(provenance_attrs))
-
-        libraries_attrs_filename = os.path.join(export_directory, ATTRS_FILENAME_LIBRARIES)
-        with open(libraries_attrs_filename, "w") as libraries_attrs_out:
-            libraries_attrs_out.write(to_json(self.included_libraries))
-
-        library_folders_attrs_filename = os.path.join(export_directory, ATTRS_FILENAME_LIBRARY_FOLDERS)
-        with open(library_folders_attrs_filename, "w") as library_folder_attrs_out:
-            library_folder_attrs_out.write(to_json(self.included_library_folders))
-
-        collections_attrs_filename = os.path.join(export_directory, ATTRS_FILENAME_COLLECTIONS)
-        with open(collections_attrs_filename, "w") as collections_attrs_out:
-            collections_attrs_out.write(to_json(self.collections_attrs))
-
-        conversions_attrs_filename = os.path.join(export_directory, ATTRS_FILENAME_CONVERSIONS)
-        with open(conversions_attrs_filename, "w") as conversions_attrs_out:
-            conversions_attrs_out.write(to_json(self.dataset_implicit_conversions.values()))
+        if self.export_files is not None and self.prefetch_workers > 0:
+            self._file_prefetcher = DatasetFilePrefetcher(
+                (d for d in datasets_attrs if self.included_datasets[d][1]), workers=self.prefetch_workers
+            )
+        try:
+            self._write_attrs(ATTRS_FILENAME_DATASETS, datasets_attrs)
+        finally:
+            if self._file_prefetcher:
+                self._file_prefetcher.shutdown()
+                self._file_prefetcher = None
+        self._write_attrs(f"{ATTRS_FILENAME_DATASETS}.provenance", provenance_attrs)
+        self._write_attrs(ATTRS_FILENAME_LIBRARIES, self.included_libraries)
+        self._write_attrs(ATTRS_FILENAME_LIBRARY_FOLDERS, self.included_library_folders)
+        self._write_attrs(ATTRS_FILENAME_COLLECTIONS, self.collections_attrs)
+        self._write_attrs(ATTRS_FILENAME_CONVERSIONS, self.dataset_implicit_conversions.values())
 
         jobs_attrs = []
         for job_id, job_output_dataset_associations in self.job_output_dataset_associations.items():
@@ -2868,8 +3047,16 @@ class ROCrateArchiveModelExportStore(DirectoryModelExportStore, WriteCrates):
 
 
 class TarModelExportStore(DirectoryModelExportStore):
+    """Export to a (gzipped) tar archive.
+
+    Dataset files are streamed into the archive as they are serialized instead
+    of being staged in the export directory first, only the (small) attribute
+    files are written to the export directory and added when finalizing.
+    """
+
     file_source_uri: Optional[StrPath]
     out_file: StrPath
+    _archive: Optional[tarfile.TarFile] = None
 
     def __init__(self, uri: StrPath, gzip: bool = True, **kwds) -> None:
         self.gzip = gzip
@@ -2885,9 +3072,27 @@ class TarModelExportStore(DirectoryModelExportStore):
             export_directory = temp_output_dir
         super().__init__(export_directory, **kwds)
 
+    @property
+    def archive(self) -> tarfile.TarFile:
+        if self._archive is None:
+            if self.gzip:
+                self._archive = tarfile.open(self.out_file, "w:gz", dereference=True)
+            else:
+                self._archive = tarfile.open(self.out_file, "w", dereference=True)
+        return self._archive
+
+    def _export_file(self, src: str, arcname: str) -> None:
+        self.archive.add(src, arcname=arcname)
+
     def _finalize(self) -> None:
-        super()._finalize()
-        tar_export_directory(self.export_directory, self.out_file, self.gzip)
+        try:
+            super()._finalize()
+            for export_path in sorted(os.listdir(self.export_directory)):
+                self.archive.add(os.path.join(self.export_directory, export_path), arcname=export_path)
+        finally:
+            if self._archive is not None:
+                self._archive.close()
+                self._archive = None
         if self.file_source_uri:
             if not self.file_sources:
                 raise Exception(f"Need self.file_sources but {type(self)} is missing it: {self.file_sources}.")
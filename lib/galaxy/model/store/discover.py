@@ -20,12 +20,19 @@ from typing import (
     Union,
 )
 
+from sqlalchemy import (
+    insert,
+    inspect,
+)
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.orm.scoping import ScopedSession
 
 import galaxy.model
 from galaxy import util
 from galaxy.exceptions import RequestParameterInvalidException
 from galaxy.model.dataset_collections import builder
+from galaxy.model.metadata import FileParameter
+from galaxy.model.orm.util import bulk_insert
 from galaxy.model.tags import GalaxySessionlessTagHandler
 from galaxy.objectstore import (
     ObjectStore,
@@ -227,6 +234,16 @@ class ModelPersistenceContext(metaclass=abc.ABCMeta):
             primary_data.dataset.file_size = 0
             primary_data.dataset.total_size = 0
             return
+        self.store_dataset_contents(primary_data, extra_files, filename, link_data, output_name)
+        if init_from:
+            self.permission_provider.copy_dataset_permissions(init_from, primary_data)
+        else:
+            self.permission_provider.set_default_hda_permissions(primary_data)
+
+        # TODO: this might run set_meta after copying the file to the object store, which could be inefficient if job working directory is closer to the node.
+        self.set_datasets_metadata(datasets=[primary_data], datasets_attributes=[dataset_attributes])
+
+    def store_dataset_contents(self, primary_data, extra_files, filename, link_data, output_name):
         # Move data from temp location to dataset location
         if not link_data:
             dataset = primary_data.dataset
@@ -243,14 +260,6 @@ class ModelPersistenceContext(metaclass=abc.ABCMeta):
             # We are sure there are no extra files, so optimize things that follow by settting total size also.
             primary_data.set_size(no_extra_files=True)
 
-        if init_from:
-            self.permission_provider.copy_dataset_permissions(init_from, primary_data)
-        else:
-            self.permission_provider.set_default_hda_permissions(primary_data)
-
-        # TODO: this might run set_meta after copying the file to the object store, which could be inefficient if job working directory is closer to the node.
-        self.set_datasets_metadata(datasets=[primary_data], datasets_attributes=[dataset_attributes])
-
     @staticmethod
     def set_datasets_metadata(datasets, datasets_attributes=None):
         datasets_attributes = datasets_attributes or [{} for _ in datasets]
@@ -309,7 +318,17 @@ class ModelPersistenceContext(metaclass=abc.ABCMeta):
             name = "unnamed output"
         if change_datatype_actions is None:
             change_datatype_actions = {}
-        if self.flush_per_n_datasets and self.flush_per_n_datasets > 0:
+        if self.bulk_persistence:
+            self._populate_elements_bulk(
+                collection=collection,
+                root_collection_builder=root_collection_builder,
+                discovered_files=discovered_files,
+                name=name,
+                metadata_source_name=metadata_source_name,
+                final_job_state=final_job_state,
+                change_datatype_actions=change_datatype_actions,
+            )
+        elif self.flush_per_n_datasets and self.flush_per_n_datasets > 0:
             for chunk in chunk_iterable(discovered_files, size=self.flush_per_n_datasets):
                 self._populate_elements(
                     chunk=chunk,
@@ -427,6 +446,165 @@ class ModelPersistenceContext(metaclass=abc.ABCMeta):
         )
         self.set_datasets_metadata(datasets=element_datasets["datasets"])
 
+    def _populate_elements_bulk(
+        self,
+        collection,
+        root_collection_builder,
+        discovered_files,
+        name,
+        metadata_source_name,
+        final_job_state,
+        change_datatype_actions,
+    ):
+        sa_session = self.sa_session
+        assert sa_session is not None
+        ext_override = change_datatype_actions.get(name)
+        collection_elements = None
+        if BulkCollectionElements.supports(collection):
+            collection_elements = BulkCollectionElements(sa_session, collection)
+        for chunk in chunk_iterable(discovered_files, size=self.bulk_chunk_size):
+            create_datasets_timer = ExecutionTimer()
+            new_datasets = []
+            for discovered_file in chunk:
+                fields_match = discovered_file.match
+                if not fields_match:
+                    raise Exception(f"Problem parsing metadata fields for file {discovered_file.path}")
+                effective_state = fields_match.effective_state
+                if final_job_state == "ok" and effective_state != "ok":
+                    final_job_state = effective_state
+                dbkey = fields_match.dbkey
+                if dbkey == "__input__":
+                    dbkey = self.input_dbkey
+                new_datasets.append(
+                    NewDataset(
+                        ext=ext_override or fields_match.ext,
+                        designation=fields_match.designation,
+                        visible=fields_match.visible,
+                        dbkey=dbkey,
+                        name=fields_match.name or fields_match.designation,
+                        path=discovered_file.path,
+                        extra_files=fields_match.extra_files,
+                        sources=fields_match.sources,
+                        hashes=fields_match.hashes,
+                        created_from_basename=fields_match.created_from_basename,
+                        state=final_job_state,
+                        tag_list=fields_match.tag_list,
+                    )
+                )
+            datasets = self.persist_new_datasets(
+                new_datasets, output_name=name, metadata_source_name=metadata_source_name
+            )
+            element_identifiers = [discovered_file.match.element_identifiers for discovered_file in chunk]
+            self.add_output_dataset_associations(
+                [
+                    (f"__new_primary_file_{name}|{':'.join(identifiers)}__", dataset)
+                    for identifiers, dataset in zip(element_identifiers, datasets)
+                ]
+            )
+            if collection_elements is not None:
+                collection_elements.add_datasets(element_identifiers, datasets)
+            else:
+                for identifiers, dataset in zip(element_identifiers, datasets):
+                    current_builder = root_collection_builder
+                    for element_identifier in identifiers[:-1]:
+                        current_builder = current_builder.get_level(element_identifier)
+                    current_builder.add_dataset(identifiers[-1], dataset)
+                root_collection_builder.populate_partial()
+            sa_session.flush()
+            if collection_elements is not None:
+                # The datasets aren't referenced by any pending object, drop them from the session to bound its size.
+                self.expunge_datasets(datasets)
+            log.debug(
+                "(%s) Created %d dynamic collection datasets for output [%s] %s",
+                self.job_id(),
+                len(datasets),
+                name,
+                create_datasets_timer,
+            )
+
+    def persist_new_datasets(self, new_datasets: List["NewDataset"], output_name=None, metadata_source_name=None):
+        """Create, store and persist HDAs for ``new_datasets`` in the history of the job using bulk inserts.
+
+        Contents are stored and metadata is set before the HDA rows are inserted,
+        so no further updates (and HDA history versions) are needed. Datatypes with
+        file metadata (e.g. BAM indices) are the exception, a MetadataFile can only
+        be created for an HDA that has an id, their metadata is set after the insert.
+        """
+        sa_session = self.sa_session
+        job = self.job
+        assert sa_session is not None and job is not None
+        history = job.history
+        assert history is not None
+        # Ensure the job, its history and the target collection have ids to refer to.
+        sa_session.flush()
+        implicit_collection_jobs_association_id = self.get_implicit_collection_jobs_association_id()
+        datasets = []
+        for new_dataset in new_datasets:
+            dataset = galaxy.model.Dataset(state=new_dataset.state)
+            dataset.created_from_basename = new_dataset.created_from_basename
+            datasets.append(dataset)
+        bulk_insert(sa_session, datasets)
+
+        base_hid = history._next_hid(n=len(new_datasets))
+        hdas = []
+        stored_hdas = []
+        for i, (new_dataset, dataset) in enumerate(zip(new_datasets, datasets)):
+            visible = new_dataset.visible
+            if new_dataset.state == galaxy.model.Job.states.ERROR and not implicit_collection_jobs_association_id:
+                visible = True
+            hda = galaxy.model.HistoryDatasetAssociation(
+                extension=new_dataset.ext,
+                designation=new_dataset.designation,
+                visible=visible,
+                dbkey=new_dataset.dbkey,
+                info=new_dataset.info,
+            )
+            if new_dataset.name is not None:
+                hda.name = new_dataset.name
+            # Set relationships without triggering backrefs, the HDA is inserted below.
+            set_committed_value(hda, "dataset", dataset)
+            set_committed_value(hda, "history", history)
+            hda.dataset_id = dataset.id  # type: ignore[attr-defined]
+            hda.history_id = history.id
+            hda.hid = base_hid + i
+            if metadata_source_name:
+                hda.init_meta(copy_from=self.metadata_source_provider.get_metadata_source(metadata_source_name))
+            else:
+                hda.init_meta()
+            if new_dataset.path:
+                self.store_dataset_contents(
+                    hda, new_dataset.extra_files, new_dataset.path, new_dataset.link_data, output_name
+                )
+                stored_hdas.append(hda)
+            hdas.append(hda)
+        file_metadata_hdas = [hda for hda in stored_hdas if _has_file_metadata(hda)]
+        self.set_datasets_metadata(datasets=[hda for hda in stored_hdas if not _has_file_metadata(hda)])
+        bulk_insert(sa_session, hdas)
+        self.set_datasets_metadata(datasets=file_metadata_hdas)
+        if stored_hdas:
+            self.permission_provider.set_default_hdas_permissions(stored_hdas)
+
+        for new_dataset, dataset in zip(new_datasets, datasets):
+            for source_dict in new_dataset.sources:
+                source = galaxy.model.DatasetSource()
+                source.source_uri = source_dict["source_uri"]
+                source.transform = source_dict.get("transform")
+                dataset.sources.append(source)
+            for hash_dict in new_dataset.hashes:
+                hash_object = galaxy.model.DatasetHash()
+                hash_object.hash_function = hash_dict["hash_function"]
+                hash_object.hash_value = hash_dict["hash_value"]
+                dataset.hashes.append(hash_object)
+        self.add_tags_to_datasets(datasets=hdas, tag_lists=[new_dataset.tag_list for new_dataset in new_datasets])
+        return hdas
+
+    def expunge_datasets(self, datasets):
+        sa_session = self.sa_session
+        assert sa_session is not None
+        for dataset in datasets:
+            sa_session.expunge(dataset.dataset)
+            sa_session.expunge(dataset)
+
     def add_tags_to_datasets(self, datasets, tag_lists):
         if any(tag_lists):
             for dataset, tags in zip(datasets, tag_lists):
@@ -478,6 +656,21 @@ class ModelPersistenceContext(metaclass=abc.ABCMeta):
         """No-op, no job context."""
         return None
 
+    @property
+    def bulk_persistence(self) -> bool:
+        """Create new datasets with batched inserts (see ``persist_new_datasets``) rather than one ORM object at a time.
+
+        Requires a database bound context with a job.
+        """
+        return False
+
+    @property
+    def bulk_chunk_size(self) -> int:
+        flush_per_n_datasets = self.flush_per_n_datasets
+        if flush_per_n_datasets and flush_per_n_datasets > 0:
+            return flush_per_n_datasets
+        return DEFAULT_CHUNK_SIZE
+
     @property
     @abc.abstractmethod
     def job(self) -> Optional[galaxy.model.Job]:
@@ -525,6 +718,11 @@ class ModelPersistenceContext(metaclass=abc.ABCMeta):
     def add_output_dataset_association(self, name, dataset):
         """If discovering outputs for a job, persist output dataset association."""
 
+    def add_output_dataset_associations(self, associations):
+        """Persist output dataset associations for a list of (name, dataset) tuples."""
+        for name, dataset in associations:
+            self.add_output_dataset_association(name, dataset)
+
     @abc.abstractmethod
     def add_datasets_to_history(self, datasets, for_output_dataset=None):
         """Add datasets to the history this context points at."""
@@ -551,6 +749,106 @@ class ModelPersistenceContext(metaclass=abc.ABCMeta):
             )
 
 
+def _has_file_metadata(hda) -> bool:
+    return any(isinstance(spec.param, FileParameter) for spec in hda.metadata.spec.values())
+
+
+class NewDataset(NamedTuple):
+    """Attributes of a discovered dataset to create with ``ModelPersistenceContext.persist_new_datasets``."""
+
+    ext: str
+    designation: Optional[str]
+    visible: bool
+    dbkey: str
+    name: Optional[str]
+    path: Optional[str]
+    state: str
+    extra_files: Optional[Any] = None
+    link_data: bool = False
+    info: Optional[str] = None
+    sources: List[Dict[str, Any]] = []
+    hashes: List[Dict[str, Any]] = []
+    created_from_basename: Optional[str] = None
+    tag_list: List[str] = []
+
+
+class BulkCollectionElements:
+    """Insert dataset collection elements for discovered datasets in batches.
+
+    Only supports collections made up of ``list`` levels, other collection types
+    (e.g. ``paired``) constrain and order their elements and are populated with
+    a ``CollectionBuilder`` instead.
+    """
+
+    def __init__(self, sa_session, collection):
+        self.sa_session = sa_session
+        self.collection = collection
+        self.depth = len(collection.collection_type.split(":"))
+        root = _BulkCollectionLevel(collection, collection.element_count or 0)
+        self._levels: Dict[tuple, _BulkCollectionLevel] = {(): root}
+
+    @staticmethod
+    def supports(collection) -> bool:
+        return all(level == "list" for level in collection.collection_type.split(":"))
+
+    def add_datasets(self, element_identifiers_list, datasets):
+        new_levels = []
+        for element_identifiers in element_identifiers_list:
+            if len(element_identifiers) != self.depth:
+                raise AssertionError(
+                    f"Element identifiers {element_identifiers} do not match collection type [{self.collection.collection_type}]"
+                )
+            for depth in range(1, self.depth):
+                prefix = tuple(element_identifiers[:depth])
+                if prefix not in self._levels:
+                    child_collection = galaxy.model.DatasetCollection(
+                        collection_type=":".join(["list"] * (self.depth - depth)), element_count=0
+                    )
+                    self._levels[prefix] = _BulkCollectionLevel(child_collection, 0)
+                    new_levels.append(prefix)
+        bulk_insert(self.sa_session, [self._levels[prefix].collection for prefix in new_levels])
+
+        rows = []
+        for prefix in new_levels:
+            level = self._levels[prefix]
+            row = self._levels[prefix[:-1]].element_row(prefix[-1])
+            if row is not None:
+                row["child_collection_id"] = level.collection.id
+                rows.append(row)
+        for element_identifiers, dataset in zip(element_identifiers_list, datasets):
+            row = self._levels[tuple(element_identifiers[:-1])].element_row(element_identifiers[-1])
+            if row is not None:
+                row["hda_id"] = dataset.id
+                rows.append(row)
+        if rows:
+            self.sa_session.execute(insert(galaxy.model.DatasetCollectionElement), rows)
+        for level in self._levels.values():
+            level.collection.element_count = level.element_count
+        if "elements" not in inspect(self.collection).unloaded:
+            self.sa_session.expire(self.collection, ["elements"])
+
+
+class _BulkCollectionLevel:
+    def __init__(self, collection, element_count: int):
+        self.collection = collection
+        self.element_count = element_count
+        self.identifiers: set = set()
+
+    def element_row(self, element_identifier) -> Optional[Dict[str, Any]]:
+        if element_identifier in self.identifiers:
+            return None
+        self.identifiers.add(element_identifier)
+        row = {
+            "dataset_collection_id": self.collection.id,
+            "element_index": self.element_count,
+            "element_identifier": element_identifier,
+            "hda_id": None,
+            "child_collection_id": None,
+        }
+        self.element_count += 1
+        return row
+
+
 class PermissionProvider(metaclass=abc.ABCMeta):
     """Interface for working with permissions while importing datasets with ModelPersistenceContext."""
 
@@ -561,6 +859,10 @@ class PermissionProvider(metaclass=abc.ABCMeta):
     def set_default_hda_permissions(self, primary_data):
         return
 
+    def set_default_hdas_permissions(self, hdas):
+        for primary_data in hdas:
+            self.set_default_hda_permissions(primary_data)
+
     @abc.abstractmethod
     def copy_dataset_permissions(self, init_from, primary_data):
         """Copy dataset permissions from supplied input dataset."""
@@ -816,6 +1118,9 @@ def persist_elements_to_folder(model_persistence_context, elements, library_fold
 
 
 def persist_hdas(elements, model_persistence_context, final_job_state="ok"):
+    if model_persistence_context.bulk_persistence:
+        persist_hdas_bulk(elements, model_persistence_context, final_job_state=final_job_state)
+        return
     # discover files as individual datasets for the target history
     datasets = []
     storage_callbacks: List[Callable] = []
@@ -893,6 +1198,67 @@ def persist_hdas(elements, model_persistence_context, final_job_state="ok"):
         pass
 
 
+def persist_hdas_bulk(elements, model_persistence_context: ModelPersistenceContext, final_job_state="ok"):
+    """Variant of ``persist_hdas`` creating new datasets in batches with ``persist_new_datasets``."""
+
+    def new_datasets_for_elements(elements):
+        for element in elements:
+            if "elements" in element:
+                yield from new_datasets_for_elements(element["elements"])
+                continue
+            discovered_file = discovered_file_for_element(element, model_persistence_context)
+            fields_match = discovered_file.match
+            info, state = discovered_file.discovered_state(element, final_job_state)
+            hda_id = fields_match.object_id
+            if hda_id:
+                # Populating an existing dataset, nothing to insert.
+                sa_session = model_persistence_context.sa_session
+                assert sa_session is not None
+                primary_dataset = sa_session.get(galaxy.model.HistoryDatasetAssociation, hda_id)
+                dataset = model_persistence_context.create_dataset(
+                    ext=fields_match.ext,
+                    designation=fields_match.designation,
+                    visible=fields_match.visible,
+                    dbkey=fields_match.dbkey,
+                    name=fields_match.name or fields_match.designation,
+                    filename=discovered_file.path,
+                    extra_files=fields_match.extra_files,
+                    info=info,
+                    tag_list=element.get("tags"),
+                    link_data=fields_match.link_data,
+                    primary_data=primary_dataset,
+                    sources=fields_match.sources,
+                    hashes=fields_match.hashes,
+                    created_from_basename=fields_match.created_from_basename,
+                    final_job_state=state,
+                )
+                dataset.discovered = True
+                continue
+            yield NewDataset(
+                ext=fields_match.ext,
+                designation=fields_match.designation,
+                visible=fields_match.visible,
+                dbkey=fields_match.dbkey,
+                name=fields_match.name or fields_match.designation,
+                path=discovered_file.path,
+                state=state,
+                extra_files=fields_match.extra_files,
+                link_data=fields_match.link_data,
+                info=info,
+                sources=fields_match.sources,
+                hashes=fields_match.hashes,
+                created_from_basename=fields_match.created_from_basename,
+                tag_list=element.get("tags") or [],
+            )
+
+    for chunk in chunk_iterable(new_datasets_for_elements(elements), size=model_persistence_context.bulk_chunk_size):
+        datasets = model_persistence_context.persist_new_datasets(list(chunk))
+        sa_session = model_persistence_context.sa_session
+        assert sa_session is not None
+        sa_session.flush()
+        model_persistence_context.expunge_datasets(datasets)
+
+
 def get_required_item(from_dict, key, message):
     if key not in from_dict:
         raise RequestParameterInvalidException(message)
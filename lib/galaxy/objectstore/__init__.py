@@ -14,6 +14,7 @@ import threading
 import time
 from typing import (
     Any,
+    BinaryIO,
     Dict,
     List,
     NamedTuple,
@@ -278,6 +279,44 @@ class ObjectStore(metaclass=abc.ABCMeta):
         """
         raise NotImplementedError()
 
+    @abc.abstractmethod
+    def open_data(
+        self,
+        obj,
+        base_dir=None,
+        extra_dir=None,
+        extra_dir_at_root=False,
+        alt_name=None,
+        obj_dir: bool = False,
+    ) -> BinaryIO:
+        """
+        Open the object with id `obj.id` for reading as a binary file object.
+
+        Unlike opening the path returned by `get_filename`, object stores that
+        cache remote data may start returning data before the object has been
+        completely pulled into the cache.
+        """
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def open_ranged_data(
+        self,
+        obj,
+        base_dir=None,
+        extra_dir=None,
+        extra_dir_at_root=False,
+        alt_name=None,
+        obj_dir: bool = False,
+    ) -> BinaryIO:
+        """
+        Open the object with id `obj.id` as a seekable binary file object for random access.
+
+        Object stores that cache remote data and support ranged reads don't
+        pull the object into the cache, but only read the parts of the object
+        that are actually accessed.
+        """
+        raise NotImplementedError()
+
     @abc.abstractmethod
     def update_from_file(
         self,
@@ -634,6 +673,44 @@ class BaseObjectStore(ObjectStore):
             sync_cache=sync_cache,
         )
 
+    def open_data(
+        self,
+        obj,
+        base_dir=None,
+        extra_dir=None,
+        extra_dir_at_root=False,
+        alt_name=None,
+        obj_dir: bool = False,
+    ) -> BinaryIO:
+        return self._invoke(
+            "open_data",
+            obj,
+            base_dir=base_dir,
+            extra_dir=extra_dir,
+            extra_dir_at_root=extra_dir_at_root,
+            alt_name=alt_name,
+            obj_dir=obj_dir,
+        )
+
+    def open_ranged_data(
+        self,
+        obj,
+        base_dir=None,
+        extra_dir=None,
+        extra_dir_at_root=False,
+        alt_name=None,
+        obj_dir: bool = False,
+    ) -> BinaryIO:
+        return self._invoke(
+            "open_ranged_data",
+            obj,
+            base_dir=base_dir,
+            extra_dir=extra_dir,
+            extra_dir_at_root=extra_dir_at_root,
+            alt_name=alt_name,
+            obj_dir=obj_dir,
+        )
+
     def update_from_file(
         self,
         obj,
@@ -801,6 +878,12 @@ class ConcreteObjectStore(BaseObjectStore):
     def _is_private(self, obj) -> bool:
         return self.private
 
+    def _open_data(self, obj, **kwargs) -> BinaryIO:
+        return open(self._invoke("get_filename", obj, **kwargs), "rb")
+
+    def _open_ranged_data(self, obj, **kwargs) -> BinaryIO:
+        return self._invoke("open_data", obj, **kwargs)
+
     @property
     def cache_target(self) -> Optional[CacheTarget]:
         return None
@@ -1209,6 +1292,14 @@ class NestedObjectStore(BaseObjectStore):
         """For the first backend that has this `obj`, get its filename."""
         return self._call_method("_get_filename", obj, ObjectNotFound, True, **kwargs)
 
+    def _open_data(self, obj, **kwargs) -> BinaryIO:
+        """For the first backend that has this `obj`, open it."""
+        return self._call_method("_open_data", obj, ObjectNotFound, True, **kwargs)
+
+    def _open_ranged_data(self, obj, **kwargs) -> BinaryIO:
+        """For the first backend that has this `obj`, open it for random access."""
+        return self._call_method("_open_ranged_data", obj, ObjectNotFound, True, **kwargs)
+
     def _update_from_file(
         self,
         obj,
@@ -1,9 +1,13 @@
+import io
 import logging
 import os
 import shutil
+import sqlite3
+import threading
 from datetime import datetime
 from typing import (
     Any,
+    BinaryIO,
     Dict,
     Optional,
 )
@@ -18,9 +22,18 @@ from galaxy.util import (
     unlink,
 )
 from galaxy.util.path import safe_relpath
+from ._download import (
+    cache_file_lock,
+    download_ranges,
+    PartialCacheFile,
+    RangedDownloadOptions,
+    RangedReader,
+)
 from ._util import fix_permissions
 from .caching import (
+    CacheIndex,
     CacheTarget,
+    get_cache_index,
     InProcessCacheMonitor,
 )
 
@@ -36,6 +49,8 @@ class CachingConcreteObjectStore(ConcreteObjectStore):
     cache_size: int
     cache_monitor: Optional[InProcessCacheMonitor] = None
     cache_monitor_interval: int
+    # Whether _read_remote_range is implemented.
+    supports_ranged_reads: bool = False
 
     def _ensure_staging_path_writable(self):
         staging_path = self.staging_path
@@ -111,24 +126,62 @@ class CachingConcreteObjectStore(ConcreteObjectStore):
         cache_path = self._get_cache_path(rel_path)
         return os.path.exists(cache_path)
 
+    @property
+    def cache_index(self) -> CacheIndex:
+        return get_cache_index(self.staging_path)
+
+    def _update_cache_index(self, method: str, cache_path: str) -> None:
+        # The index only drives cache cleaning, failing to update it must not fail the object store operation.
+        try:
+            getattr(self.cache_index, method)(cache_path)
+        except sqlite3.Error:
+            log.warning("Failed to update cache index for '%s'", cache_path, exc_info=True)
+
     def _pull_into_cache(self, rel_path, **kwargs) -> bool:
         # Ensure the cache directory structure exists (e.g., dataset_#_files/)
         rel_path_dir = os.path.dirname(rel_path)
         if not os.path.exists(self._get_cache_path(rel_path_dir)):
             os.makedirs(self._get_cache_path(rel_path_dir), exist_ok=True)
-        # Now pull in the file
-        file_ok = self._download(rel_path)
+        # Now pull in the file, unless another thread or process is already doing so
+        with cache_file_lock(self._get_cache_path(rel_path)) as waited:
+            if waited and self._in_cache(rel_path):
+                return True
+            file_ok = self._download(rel_path)
         if file_ok:
             fix_permissions(self.config, self._get_cache_path(rel_path_dir))
+            self._update_cache_index("touch", self._get_cache_path(rel_path))
         else:
             unlink(self._get_cache_path(rel_path), ignore_errors=True)
         return file_ok
 
+    def _ranged_download_options(self, rel_path: str, remote_size: int) -> Optional[RangedDownloadOptions]:
+        """Return options for downloading ``rel_path`` with concurrent ranged reads.
+
+        Stores implementing ``_read_remote_range`` should return options for
+        objects large enough to benefit from it, ``None`` means the object is
+        downloaded with ``_download`` as a whole.
+        """
+        return None
+
+    def _read_remote_range(self, rel_path: str, start: int, end: int) -> bytes:
+        raise NotImplementedError()
+
+    def _download_ranges(self, rel_path: str, remote_size: int, options: RangedDownloadOptions) -> None:
+        log.debug("Pulling '%s' into cache using ranged reads of %d bytes", rel_path, options.part_size)
+        download_ranges(
+            self._get_cache_path(rel_path),
+            remote_size,
+            lambda start, end: self._read_remote_range(rel_path, start, end),
+            options,
+        )
+
     def _get_data(self, obj, start=0, count=-1, **kwargs):
         rel_path = self._construct_path(obj, **kwargs)
         # Check cache first and get file if not there
         if not self._in_cache(rel_path):
             self._pull_into_cache(rel_path, **kwargs)
+        else:
+            self._update_cache_index("access", self._get_cache_path(rel_path))
         # Read the file content from cache
         data_file = open(self._get_cache_path(rel_path))
         data_file.seek(start)
@@ -136,6 +189,25 @@ class CachingConcreteObjectStore(ConcreteObjectStore):
         data_file.close()
         return content
 
+    def _open_data(self, obj, **kwargs) -> BinaryIO:
+        rel_path = self._construct_path(obj, **kwargs)
+        if not self._in_cache(rel_path) and not kwargs.get("dir_only"):
+            remote_size = self._get_remote_size(rel_path)
+            if self._ranged_download_options(rel_path, remote_size) is not None:
+                # Serve the data while it is being pulled into the cache.
+                pull = threading.Thread(target=self._pull_into_cache, args=(rel_path,), name="CachePull", daemon=True)
+                pull.start()
+                return io.BufferedReader(PartialCacheFile(self._get_cache_path(rel_path), pull.is_alive))
+        return open(self._get_filename(obj, **kwargs), "rb")
+
+    def _open_ranged_data(self, obj, **kwargs) -> BinaryIO:
+        rel_path = self._construct_path(obj, **kwargs)
+        if self.supports_ranged_reads and not self._in_cache(rel_path) and not kwargs.get("dir_only"):
+            remote_size = self._get_remote_size(rel_path)
+            reader = RangedReader(remote_size, lambda start, end: self._read_remote_range(rel_path, start, end))
+            return io.BufferedReader(reader)
+        return self._open_data(obj, **kwargs)
+
     def _exists(self, obj, **kwargs) -> bool:
         in_cache = exists_remotely = False
         rel_path = self._construct_path(obj, **kwargs)
@@ -194,6 +266,7 @@ class CachingConcreteObjectStore(ConcreteObjectStore):
             if not dir_only:
                 rel_path = os.path.join(rel_path, alt_name if alt_name else f"dataset_{self._get_object_id(obj)}.dat")
                 open(os.path.join(self.staging_path, rel_path), "w").close()
+                self._update_cache_index("touch", self._get_cache_path(rel_path))
                 self._push_to_storage(rel_path, from_string="")
         return self
 
@@ -288,12 +361,14 @@ class CachingConcreteObjectStore(ConcreteObjectStore):
         # always resync the cache. Gotta make sure we're being judicious in out data.extra_files_path
         # calls I think.
         if not dir_only and self._in_cache(rel_path) and os.path.getsize(self._get_cache_path(rel_path)) > 0:
+            self._update_cache_index("access", cache_path)
             return cache_path
 
         # Check if the file exists in persistent storage and, if it does, pull it into cache
         elif self._exists(obj, **kwargs):
             if dir_only:
                 self._download_directory_into_cache(rel_path, cache_path)
+                self._update_cache_index("touch_directory", cache_path)
                 return cache_path
             else:
                 if self._pull_into_cache(rel_path, **kwargs):
@@ -329,10 +404,12 @@ class CachingConcreteObjectStore(ConcreteObjectStore):
             # but requires iterating through each individual key in S3 and deleing it.
             if entire_dir and extra_dir:
                 shutil.rmtree(self._get_cache_path(rel_path), ignore_errors=True)
+                self._update_cache_index("remove_directory", self._get_cache_path(rel_path))
                 return self._delete_remote_all(rel_path)
             else:
                 # Delete from cache first
                 unlink(self._get_cache_path(rel_path), ignore_errors=True)
+                self._update_cache_index("remove", self._get_cache_path(rel_path))
                 # Delete from S3 as well
                 if self._exists_remotely(rel_path):
                     return self._delete_existing_remote(rel_path)
@@ -364,6 +441,8 @@ class CachingConcreteObjectStore(ConcreteObjectStore):
                 source_file = self._get_cache_path(rel_path)
 
             self._push_to_storage(rel_path, source_file)
+            # Record the final size, the cache file may also have been written in place (e.g. by a job).
+            self._update_cache_index("touch", self._get_cache_path(rel_path))
 
         else:
             raise ObjectNotFound(
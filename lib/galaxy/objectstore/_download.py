@@ -0,0 +1,318 @@
+"""Helpers for reading remote objects of caching object stores.
+
+Large objects are downloaded as concurrent ranged reads into a ``.part`` file
+next to the final cache file. Completed parts are recorded in a ``.progress``
+file so that an interrupted download can be resumed, and so that readers can
+stream the object while it is still being downloaded. Concurrent pulls of the
+same object (from threads or processes sharing the cache) are serialized
+using a lock file.
+
+Readers that only need a small part of an object can use a
+:class:`RangedReader` instead, which doesn't pull the object into the cache.
+"""
+
+import fcntl
+import io
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import (
+    Callable,
+    Iterator,
+    Optional,
+    Set,
+)
+
+from typing_extensions import NamedTuple
+
+from galaxy.util import unlink
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+DEFAULT_THREADS = 10
+# How long a reader waits between checks for newly downloaded parts.
+POLL_INTERVAL = 0.1
+DEFAULT_BLOCK_SIZE = 256 * 1024
+DEFAULT_MAX_BLOCKS = 16
+
+ReadRangeT = Callable[[int, int], bytes]
+
+
+class RangedDownloadOptions(NamedTuple):
+    part_size: int = DEFAULT_PART_SIZE
+    threads: int = DEFAULT_THREADS
+
+
+def part_path(cache_path: str) -> str:
+    return f"{cache_path}.part"
+
+
+def progress_path(cache_path: str) -> str:
+    return f"{cache_path}.progress"
+
+
+@contextmanager
+def cache_file_lock(cache_path: str) -> Iterator[bool]:
+    """Hold an exclusive lock on pulling ``cache_path`` into the cache.
+
+    Yields ``True`` if the lock was held by another thread or process and had
+    to be waited for, in which case the file may have been pulled already.
+    The lock is released if the holding process dies.
+    """
+    lock_path = f"{cache_path}.lock"
+    waited = False
+    while True:
+        fd = os.open(lock_path, os.O_CREAT | os.O_RDWR, 0o666)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            waited = True
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        # The previous holder removes the lock file on release, make sure we
+        # didn't lock a file that no longer exists.
+        try:
+            if os.fstat(fd).st_ino == os.stat(lock_path).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+    try:
+        yield waited
+    finally:
+        unlink(lock_path, ignore_errors=True)
+        os.close(fd)
+
+
+def _read_progress(path: str) -> Optional[tuple]:
+    """Return ``(size, part_size, completed_parts)`` recorded in a progress file."""
+    try:
+        with open(path) as fh:
+            lines = fh.read().split("\n")
+    except FileNotFoundError:
+        return None
+    try:
+        size, part_size = (int(v) for v in lines[0].split())
+    except ValueError:
+        return None
+    # The last line is empty or a partially written entry.
+    return size, part_size, {int(line) for line in lines[1:-1]}
+
+
+def download_ranges(cache_path: str, size: int, read_range: ReadRangeT, options: RangedDownloadOptions) -> None:
+    """Download an object of ``size`` bytes into ``cache_path`` using concurrent ranged reads.
+
+    ``read_range(start, end)`` must return the bytes from ``start`` to ``end``
+    (inclusive). Parts completed by a previous, interrupted download of the
+    same object are not downloaded again. The caller is expected to hold the
+    :func:`cache_file_lock` for ``cache_path``.
+    """
+    part_file = part_path(cache_path)
+    progress_file = progress_path(cache_path)
+    part_size = options.part_size
+    progress = _read_progress(progress_file)
+    completed: Set[int] = set()
+    if progress and progress[:2] == (size, part_size) and os.path.exists(part_file):
+        completed = progress[2]
+        log.debug("Resuming download of '%s', %d part(s) already downloaded", cache_path, len(completed))
+    else:
+        with open(part_file, "wb") as part_fh:
+            part_fh.truncate(size)
+        with open(progress_file, "w") as progress_fh:
+            progress_fh.write(f"{size} {part_size}\n")
+    n_parts = (size + part_size - 1) // part_size
+    pending = [i for i in range(n_parts) if i not in completed]
+
+    fd = os.open(part_file, os.O_WRONLY)
+    progress_lock = threading.Lock()
+    failed = threading.Event()
+    try:
+        with open(progress_file, "a") as progress_fh:
+
+            def download_part(index: int) -> None:
+                if failed.is_set():
+                    # Don't download more parts once one has failed.
+                    return
+                start = index * part_size
+                end = min(start + part_size, size) - 1
+                try:
+                    data = read_range(start, end)
+                    if len(data) != end - start + 1:
+                        raise OSError(f"Expected {end - start + 1} bytes for range {start}-{end}, got {len(data)}")
+                    os.pwrite(fd, data, start)
+                except Exception:
+                    failed.set()
+                    raise
+                with progress_lock:
+                    progress_fh.write(f"{index}\n")
+                    progress_fh.flush()
+
+            with ThreadPoolExecutor(max_workers=options.threads, thread_name_prefix="RangedDownload") as executor:
+                # Parts are submitted in order so that streaming readers can start early.
+                for _ in executor.map(download_part, pending):
+                    pass
+    finally:
+        os.close(fd)
+    os.rename(part_file, cache_path)
+    unlink(progress_file, ignore_errors=True)
+
+
+class PartialCacheFile(io.RawIOBase):
+    """Read-only file object for a cache file that may still be downloading.
+
+    Reads block until the requested data has been downloaded (by this or
+    another process sharing the cache). ``downloading`` is called while
+    waiting and should return ``False`` once no download is in progress
+    anymore, in which case reading data that isn't available fails.
+    """
+
+    def __init__(self, cache_path: str, downloading: Callable[[], bool]):
+        self.cache_path = cache_path
+        self.downloading = downloading
+        self._fh: Optional[io.FileIO] = None
+        self._complete = False
+        self._position = 0
+        self._progress_offset = 0
+        self._size: Optional[int] = None
+        self._part_size = 0
+        self._completed: Set[int] = set()
+
+    def readable(self) -> bool:
+        return True
+
+    def _switch_to(self, path: str, complete: bool) -> bool:
+        try:
+            fh = io.FileIO(path, "r")
+        except FileNotFoundError:
+            return False
+        if self._fh:
+            self._fh.close()
+        self._fh = fh
+        self._complete = complete
+        return True
+
+    def _update_progress(self) -> None:
+        try:
+            with open(progress_path(self.cache_path)) as fh:
+                fh.seek(self._progress_offset)
+                new = fh.read()
+        except FileNotFoundError:
+            return
+        # Only consume complete lines.
+        new = new[: new.rfind("\n") + 1]
+        self._progress_offset += len(new)
+        lines = new.split("\n")[:-1]
+        if self._size is None and lines:
+            size, part_size = (int(v) for v in lines.pop(0).split())
+            self._size, self._part_size = size, part_size
+        self._completed.update(int(line) for line in lines)
+
+    def _available(self) -> bool:
+        """Check whether data at the current position can be read."""
+        if self._complete:
+            return True
+        if os.path.exists(self.cache_path):
+            return self._switch_to(self.cache_path, complete=True)
+        if self._fh is None and not self._switch_to(part_path(self.cache_path), complete=False):
+            return False
+        self._update_progress()
+        if self._size is None:
+            return False
+        return self._position >= self._size or self._position // self._part_size in self._completed
+
+    def readinto(self, buffer) -> int:
+        while not self._available():
+            if not self.downloading() and not self._available():
+                raise OSError(f"Download of '{self.cache_path}' is not in progress")
+            time.sleep(POLL_INTERVAL)
+        assert self._fh
+        count = len(buffer)
+        if not self._complete and self._size is not None:
+            # Don't read past the end of the current part, the next one may still be downloading.
+            part_end = min((self._position // self._part_size + 1) * self._part_size, self._size)
+            count = min(count, part_end - self._position)
+        self._fh.seek(self._position)
+        n = self._fh.readinto(memoryview(buffer)[:count])
+        self._position += n
+        return n
+
+    def close(self) -> None:
+        if self._fh:
+            self._fh.close()
+        super().close()
+
+
+class RangedReader(io.RawIOBase):
+    """Seekable read-only file object for a remote object, backed by ranged reads.
+
+    Data is fetched in blocks of ``block_size`` bytes, the ``max_blocks`` most
+    recently used blocks are kept in memory so that small reads and seeking
+    back and forth (e.g. reading line by line or index lookups) don't result
+    in a request each.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        read_range: ReadRangeT,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        max_blocks: int = DEFAULT_MAX_BLOCKS,
+    ):
+        self.size = size
+        self.read_range = read_range
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.requests = 0
+        self._blocks: OrderedDict[int, bytes] = OrderedDict()
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence ({whence})")
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+        self._position = position
+        return position
+
+    def _block(self, index: int) -> bytes:
+        block = self._blocks.get(index)
+        if block is None:
+            start = index * self.block_size
+            end = min(start + self.block_size, self.size) - 1
+            block = self.read_range(start, end)
+            self.requests += 1
+            self._blocks[index] = block
+            if len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+        else:
+            self._blocks.move_to_end(index)
+        return block
+
+    def readinto(self, buffer) -> int:
+        if self._position >= self.size:
+            return 0
+        index, offset = divmod(self._position, self.block_size)
+        data = self._block(index)[offset : offset + len(buffer)]
+        n = len(data)
+        buffer[:n] = data
+        self._position += n
+        return n
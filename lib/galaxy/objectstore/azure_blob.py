@@ -109,6 +109,7 @@ class AzureBlobObjectStore(CachingConcreteObjectStore):
 
     store_type = "azure_blob"
     cloud = True
+    supports_ranged_reads = True
 
     def __init__(self, config, config_dict):
         super().__init__(config, config_dict)
@@ -261,6 +262,9 @@ class AzureBlobObjectStore(CachingConcreteObjectStore):
         with open(local_destination, "wb") as f:
             self._blob_client(rel_path).download_blob().download_to_stream(f, **kwd)
 
+    def _read_remote_range(self, rel_path: str, start: int, end: int) -> bytes:
+        return self._blob_client(rel_path).download_blob(offset=start, length=end - start + 1).readall()
+
     def _download_directory_into_cache(self, rel_path, cache_path):
         blobs = self._blobs_from(rel_path)
         for blob in blobs:
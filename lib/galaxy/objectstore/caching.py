@@ -3,10 +3,13 @@
 
 import logging
 import os
+import sqlite3
 import threading
 import time
 from math import inf
 from typing import (
+    Dict,
+    Iterator,
     List,
     Optional,
     Tuple,
@@ -15,8 +18,10 @@ from typing import (
 from typing_extensions import NamedTuple
 
 from galaxy.util import (
+    chunk_iterable,
     nice_size,
     string_as_bool,
+    unlink,
 )
 from galaxy.util.sleeper import Sleeper
 
@@ -25,8 +30,35 @@ log = logging.getLogger(__name__)
 
 ONE_GIGA_BYTE = 1024 * 1024 * 1024
 
-
-FileListT = List[Tuple[time.struct_time, str, int]]
+# Name of the index database kept at the root of each cache directory.
+CACHE_INDEX_FILENAME = ".galaxy_cache_index.sqlite"
+CACHE_INDEX_BATCH_SIZE = 1000
+# Files of downloads in progress (see ``_download``), never indexed so they can't be evicted.
+CACHE_INDEX_SKIP_SUFFIXES = (".lock", ".part", ".progress")
+# Accesses of a cached file within this many seconds of the last recorded one are not written to the index.
+CACHE_INDEX_ACCESS_RESOLUTION = 60
+CACHE_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_file (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    atime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_cache_file_atime ON cache_file (atime);
+-- Single row holding the total size of all indexed files, only present once the index is complete.
+CREATE TABLE IF NOT EXISTS cache_total (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    size INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS cache_file_insert AFTER INSERT ON cache_file BEGIN
+    UPDATE cache_total SET size = size + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_file_update AFTER UPDATE OF size ON cache_file BEGIN
+    UPDATE cache_total SET size = size - OLD.size + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_file_delete AFTER DELETE ON cache_file BEGIN
+    UPDATE cache_total SET size = size - OLD.size;
+END;
+"""
 
 
 class CacheTarget(NamedTuple):
@@ -56,9 +88,8 @@ def check_caches(targets: List[CacheTarget]):
 
 def check_cache(cache_target: CacheTarget):
     """Run a step of the cache monitor."""
-    total_size, file_list = _get_cache_size_files(cache_target.path)
-    # Sort the file list (based on access time)
-    file_list.sort()
+    cache_index = get_cache_index(cache_target.path)
+    total_size = cache_index.total_size()
     # Initiate cleaning once we reach cache_monitor_cache_limit percentage of the defined cache size?
     # Convert GBs to bytes for comparison
     cache_size_in_gb = cache_target.size * ONE_GIGA_BYTE
@@ -74,57 +105,191 @@ def check_cache(cache_target: CacheTarget):
         # the limit - maybe delete additional #%?
         # For now, delete enough to leave at least 10% of the total cache free
         delete_this_much = total_size - cache_limit
-        _clean_cache(file_list, delete_this_much)
+        deleted_amount = cache_index.evict(delete_this_much)
+        log.debug("Cache cleaning done. Total space freed: %s", nice_size(deleted_amount))
 
 
 def reset_cache(cache_target: CacheTarget):
-    _, file_list = _get_cache_size_files(cache_target.path)
-    _clean_cache(file_list, inf)
-
-
-def _clean_cache(file_list: FileListT, delete_this_much: float) -> None:
-    """Keep deleting files from the file_list until the size of the deleted
-    files is greater than the value in delete_this_much parameter.
-    :param file_list: List of candidate files that can be deleted. This method
-        will start deleting files from the beginning of the list so the list
-        should be sorted accordingly. The list must contains 3-element tuples,
-        positioned as follows: position 0 holds file last accessed timestamp
-        (as time.struct_time), position 1 holds file path, and position 2 has
-        file size (e.g., (<access time>, /mnt/data/dataset_1.dat), 472394)
-    :param delete_this_much: Total size of files, in bytes, that should be deleted.
+    cache_index = get_cache_index(cache_target.path)
+    # Pick up files that were placed in the cache without going through the object store.
+    cache_index.rebuild()
+    cache_index.evict(inf)
+
+
+class CacheIndex:
+    """Persistent index of the files in an object store cache directory.
+
+    Tracks the size and last access time of each cached file in a SQLite
+    database at the root of the cache directory, so that the cache monitor can
+    get the total cache size without walking the directory and evict the least
+    recently used files without sorting all of them. The index is updated by
+    ``CachingConcreteObjectStore`` as files are added to, accessed in and
+    removed from the cache, and rebuilt from disk if the database is missing.
+
+    The database may be shared by several Galaxy processes using the same cache
+    directory, every thread uses its own connection.
     """
-    # Keep deleting datasets from file_list until deleted_amount does not
-    # exceed delete_this_much; start deleting from the front of the file list,
-    # which assumes the oldest files come first on the list.
-    deleted_amount = 0
-    for entry in file_list:
-        if deleted_amount < delete_this_much:
-            deleted_amount += entry[2]
-            os.remove(entry[1])
-        else:
-            log.debug("Cache cleaning done. Total space freed: %s", nice_size(deleted_amount))
+
+    def __init__(self, cache_path: str):
+        self.cache_path = os.path.abspath(cache_path)
+        self.index_path = os.path.join(self.cache_path, CACHE_INDEX_FILENAME)
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and not os.path.exists(self.index_path):
+            # The cache directory has been cleared out from under us, start over.
+            connection.close()
+            connection = None
+        if connection is None:
+            os.makedirs(self.cache_path, exist_ok=True)
+            # Autocommit mode, multi-statement updates use explicit transactions.
+            connection = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+            connection.executescript(CACHE_INDEX_SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def _relative_path(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.cache_path)
+
+    def _total_size(self) -> Optional[int]:
+        row = self._connection().execute("SELECT size FROM cache_total").fetchone()
+        return row[0] if row else None
+
+    def total_size(self) -> int:
+        """Return the total size of the files in the cache, rebuilding the index if needed."""
+        total_size = self._total_size()
+        if total_size is None:
+            self.rebuild()
+            total_size = self._total_size() or 0
+        return total_size
+
+    def touch(self, path: str) -> None:
+        """Record that the cache file at ``path`` has been written or accessed."""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            self.remove(path)
             return
+        self._connection().execute(
+            "INSERT INTO cache_file (path, size, atime) VALUES (?, ?, ?) "
+            "ON CONFLICT (path) DO UPDATE SET size = excluded.size, atime = excluded.atime",
+            (self._relative_path(path), size, time.time()),
+        )
 
+    def access(self, path: str) -> None:
+        """Record that the cache file at ``path`` has been read."""
+        relative_path = self._relative_path(path)
+        connection = self._connection()
+        row = connection.execute("SELECT atime FROM cache_file WHERE path = ?", (relative_path,)).fetchone()
+        now = time.time()
+        if row is None:
+            self.touch(path)
+        elif row[0] < now - CACHE_INDEX_ACCESS_RESOLUTION:
+            connection.execute("UPDATE cache_file SET atime = ? WHERE path = ?", (now, relative_path))
+
+    def touch_directory(self, path: str) -> None:
+        """Record all files below the cache directory ``path``."""
+        connection = self._connection()
+        for batch in chunk_iterable(self._walk(path), size=CACHE_INDEX_BATCH_SIZE):
+            with _transaction(connection):
+                connection.executemany(
+                    "INSERT INTO cache_file (path, size, atime) VALUES (?, ?, ?) "
+                    "ON CONFLICT (path) DO UPDATE SET size = excluded.size, atime = excluded.atime",
+                    batch,
+                )
+
+    def remove(self, path: str) -> None:
+        self._connection().execute("DELETE FROM cache_file WHERE path = ?", (self._relative_path(path),))
+
+    def remove_directory(self, path: str) -> None:
+        """Remove all files below the cache directory ``path`` from the index."""
+        prefix = self._relative_path(path).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        self._connection().execute("DELETE FROM cache_file WHERE path LIKE ? ESCAPE '\\'", (f"{prefix}/%",))
+
+    def evict(self, delete_this_much: float) -> int:
+        """Delete least recently used files until more than ``delete_this_much`` bytes have been freed.
+
+        Returns the number of bytes freed.
+        """
+        connection = self._connection()
+        deleted_amount = 0
+        while deleted_amount < delete_this_much:
+            entries = connection.execute(
+                "SELECT path, size FROM cache_file ORDER BY atime LIMIT ?", (CACHE_INDEX_BATCH_SIZE,)
+            ).fetchall()
+            if not entries:
+                break
+            evicted = []
+            for path, size in entries:
+                if deleted_amount >= delete_this_much:
+                    break
+                unlink(os.path.join(self.cache_path, path), ignore_errors=True)
+                evicted.append((path,))
+                deleted_amount += size
+            with _transaction(connection):
+                connection.executemany("DELETE FROM cache_file WHERE path = ?", evicted)
+        return deleted_amount
+
+    def rebuild(self) -> None:
+        """Rebuild the index from the files in the cache directory.
+
+        The directory is walked before writing to the index, which is then filled
+        in short transactions so other processes using the cache aren't blocked.
+        """
+        log.info("Building object store cache index for [%s]", self.cache_path)
+        entries = list(self._walk(self.cache_path))
+        connection = self._connection()
+        with _transaction(connection):
+            # The total is dropped first so the triggers don't need to maintain it while rebuilding.
+            connection.execute("DELETE FROM cache_total")
+            connection.execute("DELETE FROM cache_file")
+        for batch in chunk_iterable(entries, size=CACHE_INDEX_BATCH_SIZE):
+            with _transaction(connection):
+                # Files touched since the walk have been recorded with more recent values.
+                connection.executemany(
+                    "INSERT INTO cache_file (path, size, atime) VALUES (?, ?, ?) ON CONFLICT (path) DO NOTHING", batch
+                )
+        connection.execute(
+            "INSERT OR REPLACE INTO cache_total (id, size) SELECT 0, coalesce(sum(size), 0) FROM cache_file"
+        )
 
-def _get_cache_size_files(cache_path) -> Tuple[int, FileListT]:
-    """Returns cache size and cache files.
+    def _walk(self, path: str) -> Iterator[Tuple[str, int, float]]:
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                if filename.startswith(CACHE_INDEX_FILENAME) or filename.endswith(CACHE_INDEX_SKIP_SUFFIXES):
+                    continue
+                file_path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    # Removed while walking the cache.
+                    continue
+                yield self._relative_path(file_path), stat.st_size, stat.st_atime
 
-    For each file, we get last access time, file path, and file size.
-    """
-    cache_size = 0
-    file_list = []
-
-    for dirpath, _, filenames in os.walk(cache_path):
-        for filename in filenames:
-            file_path = os.path.join(dirpath, filename)
-            file_size = os.path.getsize(file_path)
-            cache_size += file_size
-            # Get the time given file was last accessed
-            last_access_time = time.localtime(os.stat(file_path)[7])
-            # Compose a tuple of the access time and the file path
-            file_tuple = last_access_time, file_path, file_size
-            file_list.append(file_tuple)
-    return cache_size, file_list
+
+class _transaction:
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.connection.execute("COMMIT" if exc_type is None else "ROLLBACK")
+
+
+_cache_indexes: Dict[str, CacheIndex] = {}
+_cache_indexes_lock = threading.Lock()
+
+
+def get_cache_index(cache_path: str) -> CacheIndex:
+    """Return the (shared) index for the cache directory ``cache_path``."""
+    cache_path = os.path.realpath(cache_path)
+    with _cache_indexes_lock:
+        if cache_path not in _cache_indexes:
+            _cache_indexes[cache_path] = CacheIndex(cache_path)
+        return _cache_indexes[cache_path]
 
 
 def parse_caching_config_dict_from_xml(config_xml):
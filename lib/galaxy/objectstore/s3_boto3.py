@@ -7,6 +7,7 @@ from typing import (
     Any,
     Callable,
     Dict,
+    Optional,
     TYPE_CHECKING,
 )
 
@@ -30,6 +31,7 @@ except ImportError:
 
 from galaxy.util import asbool
 from ._caching_base import CachingConcreteObjectStore
+from ._download import RangedDownloadOptions
 from .caching import (
     enable_cache_monitor,
     parse_caching_config_dict_from_xml,
@@ -156,6 +158,7 @@ class S3ObjectStore(CachingConcreteObjectStore):
     _client: "S3Client"
     store_type = "boto3"
     cloud = True
+    supports_ranged_reads = True
 
     def __init__(self, config, config_dict):
         super().__init__(config, config_dict)
@@ -318,15 +321,30 @@ class S3ObjectStore(CachingConcreteObjectStore):
         local_destination = self._get_cache_path(rel_path)
         try:
             log.debug("Pulling key '%s' into cache to %s", rel_path, local_destination)
-            if not self._caching_allowed(rel_path):
+            remote_size = self._get_remote_size(rel_path)
+            if not self._caching_allowed(rel_path, remote_size):
                 return False
-            config = self._transfer_config("download")
-            self._client.download_file(self.bucket, rel_path, local_destination, Config=config)
+            ranged_download_options = self._ranged_download_options(rel_path, remote_size)
+            if ranged_download_options is not None:
+                self._download_ranges(rel_path, remote_size, ranged_download_options)
+            else:
+                config = self._transfer_config("download")
+                self._client.download_file(self.bucket, rel_path, local_destination, Config=config)
             return True
-        except ClientError:
+        except (ClientError, OSError):
             log.exception("Failed to download file from S3")
         return False
 
+    def _ranged_download_options(self, rel_path: str, remote_size: int) -> Optional[RangedDownloadOptions]:
+        config = self._transfer_config("download")
+        if not config.use_threads or remote_size < config.multipart_threshold:
+            return None
+        return RangedDownloadOptions(part_size=config.multipart_chunksize, threads=config.max_concurrency)
+
+    def _read_remote_range(self, rel_path: str, start: int, end: int) -> bytes:
+        response = self._client.get_object(Bucket=self.bucket, Key=rel_path, Range=f"bytes={start}-{end}")
+        return response["Body"].read()
+
     def _push_string_to_path(self, rel_path: str, from_string: str) -> bool:
         try:
             self._client.put_object(Body=from_string.encode("utf-8"), Bucket=self.bucket, Key=rel_path)
@@ -237,7 +237,8 @@ def reload_tool_data_tables(app, **kwargs):
 
 
 def rebuild_toolbox_search_index(app, **kwargs):
-    if app.is_webapp and app.database_heartbeat.is_config_watcher:
+    # Processes using an in-memory index each need to build it
+    if app.is_webapp and (app.database_heartbeat.is_config_watcher or not app.toolbox_search.shared_index):
         if app.toolbox_search.index_count < app.toolbox._reload_count:
             app.reindex_tool_search()
     else:
@@ -71,6 +71,16 @@ class QuotaAgent:  # metaclass=abc.ABCMeta
                     usage = quota_source_usage.disk_usage
         return usage
 
+    def quota_source_label_for_destination(self, app, job_destination) -> Optional[str]:
+        """Return the label of the quota source jobs sent to ``job_destination`` are accounted to."""
+        # Doesn't work because job.object_store_id until inside handler :_(
+        # quota_source_label = job.quota_source_label
+        if job_destination is None:
+            return None
+        object_store_id = job_destination.params.get("object_store_id", None)
+        quota_source_map = app.object_store.get_quota_source_map()
+        return quota_source_map.get_quota_source_info(object_store_id).label
+
     def is_over_quota(self, app, job, job_destination):
         """Return True if the user or history is over quota for specified job.
 
@@ -101,6 +111,9 @@ class NoQuotaAgent(QuotaAgent):
     ) -> Optional[int]:
         return None
 
+    def quota_source_label_for_destination(self, app, job_destination) -> Optional[str]:
+        return None
+
     def is_over_quota(self, app, job, job_destination):
         return False
 
@@ -269,11 +282,10 @@ ON CONFLICT
 """
 
         bind = {"dataset_id": dataset.id, "adjust": int(adjust), "to_label": to_label, "from_label": from_label}
-        engine = self.sa_session.get_bind()
-        with engine.connect() as conn:
-            with conn.begin():
-                conn.execute(text(from_statement), bind)
-                conn.execute(text(to_statement), bind)
+        # Run in the session transaction so the usage is only moved if the
+        # dataset's new object store is committed as well.
+        self.sa_session.execute(text(from_statement), bind)
+        self.sa_session.execute(text(to_statement), bind)
 
     def _default_unregistered_quota(self, quota_source_label):
         return self._default_quota(self.model.DefaultQuotaAssociation.types.UNREGISTERED, quota_source_label)
@@ -378,15 +390,7 @@ WHERE default_quota_association.type = :default_type
                 self.sa_session.commit()
 
     def is_over_quota(self, app, job, job_destination):
-        # Doesn't work because job.object_store_id until inside handler :_(
-        # quota_source_label = job.quota_source_label
-        if job_destination is not None:
-            object_store_id = job_destination.params.get("object_store_id", None)
-            object_store = app.object_store
-            quota_source_map = object_store.get_quota_source_map()
-            quota_source_label = quota_source_map.get_quota_source_info(object_store_id).label
-        else:
-            quota_source_label = None
+        quota_source_label = self.quota_source_label_for_destination(app, job_destination)
         quota = self.get_quota(job.user, quota_source_label=quota_source_label)
         if quota is not None:
             try:
@@ -5,10 +5,12 @@ import os
 import string
 import time
 from collections import namedtuple
+from contextlib import contextmanager
 from errno import ENOENT
 from typing import (
     Any,
     Dict,
+    Iterator,
     List,
     Optional,
     Tuple,
@@ -81,6 +83,24 @@ _ToolConfRepository = namedtuple(
 )
 
 
+class ToolBoxLoadTimings:
+    """Wall clock time spent in each phase of loading a toolbox."""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+
+    def __str__(self) -> str:
+        return ", ".join(f"{name}: {seconds:.3f} s" for name, seconds in self.seconds.items())
+
+
 class ToolConfRepository(_ToolConfRepository):
     def get_tool_relative_path(self, *args, **kwargs):
         # This is a somewhat public function, used by data_manager_manual for instance
@@ -186,10 +206,12 @@ class AbstractToolBox(ManagesIntegratedToolPanelMixin):
         self._tool_config_watcher = self.app.watchers.tool_config_watcher
         self._filter_factory = FilterFactory(self)
         self._tool_tag_manager = self.tool_tag_manager()
+        self.load_timings = ToolBoxLoadTimings()
         self._init_tools_from_configs(config_filenames)
 
         if self.app.name == "galaxy" and self._integrated_tool_panel_config_has_contents:
-            self._load_tool_panel()
+            with self.load_timings.phase("tool_panel"):
+                self._load_tool_panel()
 
         toolbox = self
 
@@ -233,9 +255,12 @@ class AbstractToolBox(ManagesIntegratedToolPanelMixin):
             self._tool_panel_views[tool_panel_view.to_model().id] = tool_panel_view
 
         if self.app.name == "galaxy":
-            self._load_tool_panel_views()
+            with self.load_timings.phase("tool_panel_views"):
+                self._load_tool_panel_views()
         if save_integrated_tool_panel:
-            self._save_integrated_tool_panel()
+            with self.load_timings.phase("integrated_tool_panel"):
+                self._save_integrated_tool_panel()
+        log.info("Loading toolbox finished (%s)", self.load_timings)
 
     def _default_panel_view(self, trans):
         config = self.app.config
@@ -261,6 +286,13 @@ class AbstractToolBox(ManagesIntegratedToolPanelMixin):
         """Build a tool tag manager according to app's configuration and return it."""
         raise NotImplementedError()
 
+    def _preload_tool_sources(self, config_filenames):
+        """Hook to prepare the sources of the tools in ``config_filenames`` before the tools are loaded one by one."""
+
+    def _tool_paths_in_config(self, config_filename) -> List[str]:
+        """Return the paths of the tool files referenced by a tool config file, in panel order."""
+        return tool_paths_in_config(config_filename, self._tool_root_dir, self._path_template_kwds())
+
     def _init_tools_from_configs(self, config_filenames):
         """Read through all tool config files and initialize tools in each
         with init_tools_from_config below.
@@ -276,22 +308,25 @@ class AbstractToolBox(ManagesIntegratedToolPanelMixin):
             directory_contents = sorted(os.listdir(config_directory))
             directory_config_files = [config_file for config_file in directory_contents if config_file.endswith(".xml")]
             config_filenames.extend(directory_config_files)
-        for config_filename in config_filenames:
-            if not self.can_load_config_file(config_filename):
-                continue
-            try:
-                self._init_tools_from_config(config_filename)
-            except etree.ParseError:
-                # Occasionally we experience "Missing required parameter 'shed_tool_conf'."
-                # This happens if parsing the shed_tool_conf fails, so we just sleep a second and try again.
-                # TODO: figure out why this fails occasionally (try installing hundreds of tools in batch ...).
-                time.sleep(1)
+        with self.load_timings.phase("tool_sources"):
+            self._preload_tool_sources(config_filenames)
+        with self.load_timings.phase("tools"):
+            for config_filename in config_filenames:
+                if not self.can_load_config_file(config_filename):
+                    continue
                 try:
                     self._init_tools_from_config(config_filename)
+                except etree.ParseError:
+                    # Occasionally we experience "Missing required parameter 'shed_tool_conf'."
+                    # This happens if parsing the shed_tool_conf fails, so we just sleep a second and try again.
+                    # TODO: figure out why this fails occasionally (try installing hundreds of tools in batch ...).
+                    time.sleep(1)
+                    try:
+                        self._init_tools_from_config(config_filename)
+                    except Exception:
+                        raise
                 except Exception:
-                    raise
-            except Exception:
-                log.exception("Error loading tools defined in config %s", config_filename)
+                    log.exception("Error loading tools defined in config %s", config_filename)
         log.debug("Reading tools from config files finished %s", execution_timer)
 
     def _init_tools_from_config(self, config_filename):
@@ -518,15 +553,7 @@ class AbstractToolBox(ManagesIntegratedToolPanelMixin):
         return self._tool_panel.get_section_for_tool_id(tool_id)
 
     def __resolve_tool_path(self, tool_path, config_filename):
-        if not tool_path:
-            # Default to backward compatible config setting.
-            tool_path = self._tool_root_dir
-        else:
-            # Allow use of __tool_conf_dir__ in toolbox config files.
-            tool_conf_dir = os.path.dirname(config_filename)
-            tool_path_vars = {"tool_conf_dir": tool_conf_dir}
-            tool_path = string.Template(tool_path).safe_substitute(tool_path_vars)
-        return tool_path
+        return resolve_tool_path(tool_path, config_filename, self._tool_root_dir)
 
     def add_tool_to_tool_panel_view(self, tool, view_panel_component):
         self.__add_tool_to_tool_panel(tool, view_panel_component)
@@ -1396,6 +1423,35 @@ class AbstractToolBox(ManagesIntegratedToolPanelMixin):
     def _looks_like_a_tool(self, path: str) -> bool: ...
 
 
+def resolve_tool_path(tool_path, config_filename, default_tool_path):
+    """Resolve the ``tool_path`` of a tool config file, ``default_tool_path`` if it doesn't set one."""
+    if not tool_path:
+        # Default to backward compatible config setting.
+        tool_path = default_tool_path
+    else:
+        # Allow use of __tool_conf_dir__ in toolbox config files.
+        tool_conf_dir = os.path.dirname(config_filename)
+        tool_path_vars = {"tool_conf_dir": tool_conf_dir}
+        tool_path = string.Template(tool_path).safe_substitute(tool_path_vars)
+    return tool_path
+
+
+def tool_paths_in_config(config_filename, default_tool_path, template_kwds=None) -> List[str]:
+    """Return the paths of the tool files referenced by a tool config file, in panel order."""
+    tool_conf_source = get_toolbox_parser(config_filename)
+    tool_path = resolve_tool_path(tool_conf_source.parse_tool_path(), config_filename, default_tool_path)
+    paths = []
+    items = list(tool_conf_source.parse_items())
+    while items:
+        item = items.pop(0)
+        if item.type == "section":
+            items[0:0] = item.items
+        elif item.type == "tool":
+            path = string.Template(item.get("file")).safe_substitute(**(template_kwds or {}))
+            paths.append(os.path.join(tool_path, path))
+    return paths
+
+
 def _filter_for_panel(item, item_type, filters, context):
     """
     Filters tool panel elements so that only those that are compatible
@@ -11,11 +11,14 @@ import re
 import tarfile
 import tempfile
 from collections.abc import MutableMapping
+from contextlib import contextmanager
+from functools import wraps
 from pathlib import Path
 from typing import (
     Any,
     cast,
     Dict,
+    Iterator,
     List,
     NamedTuple,
     Optional,
@@ -113,7 +116,14 @@ from galaxy.tools.actions import (
 from galaxy.tools.actions.data_manager import DataManagerToolAction
 from galaxy.tools.actions.data_source import DataSourceToolAction
 from galaxy.tools.actions.model_operations import ModelOperationToolAction
-from galaxy.tools.cache import ToolDocumentCache
+from galaxy.tools.cache import (
+    estimate_size,
+    LazyToolCache,
+    parse_tool_documents,
+    ToolboxSnapshot,
+    ToolDocument,
+    ToolDocumentCache,
+)
 from galaxy.tools.evaluation import global_tool_errors
 from galaxy.tools.execution_helpers import ToolExecutionCache
 from galaxy.tools.imp_exp import JobImportHistoryArchiveWrapper
@@ -457,6 +467,13 @@ class ToolBox(AbstractToolBox):
         self._reload_count = 0
         self.tool_location_fetcher = ToolLocationFetcher()
         self.cache_regions = {}
+        # Tool documents parsed ahead of loading the tools, by config file
+        self._preloaded_tool_documents: Dict[str, ToolDocument] = {}
+        old_toolbox = getattr(app, "toolbox", None)
+        self.lazy_tools: Optional[LazyToolCache] = None
+        if app.config.enable_lazy_tool_loading:
+            # Tools are reused from the tool cache on reload, keep tracking them in the same cache
+            self.lazy_tools = getattr(old_toolbox, "lazy_tools", None) or LazyToolCache(app.config.lazy_tool_cache_size)
         # This is here to deal with the old default value, which doesn't make
         # sense in an "installed Galaxy" world.
         # FIXME: ./
@@ -479,7 +496,9 @@ class ToolBox(AbstractToolBox):
         # Load built-in converters
         if app.config.display_builtin_converters:
             self.load_builtin_converters()
-        if old_toolbox := getattr(app, "toolbox", None):
+        # Documents of tools that failed to load
+        self._preloaded_tool_documents = {}
+        if old_toolbox:
             self.dependency_manager = old_toolbox.dependency_manager
         else:
             self._init_dependency_manager()
@@ -516,13 +535,13 @@ class ToolBox(AbstractToolBox):
         """
         Persists any modified tool cache files to disk.
 
-        Set ``register_postfork`` to stop database thread queue,
-        close database connection and register re-open function
-        that re-opens the database after forking.
+        Set ``register_postfork`` to close the memory-mapped cache
+        files and register a function that re-opens them after forking.
         """
         for region in self.cache_regions.values():
             if not region.disabled:
                 region.persist()
+                log.debug("Tool document cache %s: %s", region.cache_dir, region.stats())
                 if register_postfork:
                     region.close()
                     self.app.application_stack.register_postfork_function(region.reopen_ro)
@@ -562,22 +581,97 @@ class ToolBox(AbstractToolBox):
                 self.cache_regions[tool_cache_data_dir] = ToolDocumentCache(cache_dir=tool_cache_data_dir)
             return self.cache_regions[tool_cache_data_dir]
 
+    def _preload_tool_sources(self, config_filenames):
+        """Parse the XML tool files of the toolbox up front.
+
+        Documents are read from the toolbox snapshot if enabled, the remaining
+        tool files are parsed in a pool of ``tool_parse_processes`` processes.
+        """
+        processes = self.app.config.tool_parse_processes
+        snapshot = (
+            ToolboxSnapshot(self.app.config.toolbox_snapshot_file) if self.app.config.enable_toolbox_snapshot else None
+        )
+        if processes < 2 and not snapshot:
+            return
+        paths = []
+        for config_filename in config_filenames:
+            try:
+                tool_paths = self._tool_paths_in_config(config_filename)
+            except Exception:
+                # Reported when loading the tools of the config file
+                continue
+            for path in tool_paths:
+                # Tools of a reloaded toolbox are usually in the tool cache already.
+                if path.endswith(".xml") and os.path.exists(path) and not self.load_tool_from_cache(path):
+                    paths.append(path)
+        documents = snapshot.load(paths) if snapshot else {}
+        to_parse = [path for path in paths if path not in documents]
+        if to_parse:
+            documents.update(
+                parse_tool_documents(
+                    to_parse,
+                    processes=processes,
+                    enable_beta_formats=getattr(self.app.config, "enable_beta_tool_formats", False),
+                )
+            )
+            if snapshot:
+                snapshot.update(documents)
+        log.debug(
+            "Preloaded %d tool documents, %d from toolbox snapshot, %d parsed",
+            len(documents),
+            len(paths) - len(to_parse),
+            len(to_parse),
+        )
+        self._preloaded_tool_documents = documents
+
+    def _tool_source_from_document(self, config_file, tool_document):
+        return self.get_expanded_tool_source(
+            config_file=config_file,
+            xml_tree=parse_xml_string_to_etree(tool_document["document"]),
+            macro_paths=tool_document["macro_paths"],
+        )
+
     def create_tool(self, config_file: str, tool_cache_data_dir=None, **kwds):
+        if self.lazy_tools is not None and config_file.endswith(".xml"):
+            kwds["lazy_tools"] = self.lazy_tools
+            kwds["tool_cache_data_dir"] = tool_cache_data_dir
+        if tool_document := self._preloaded_tool_documents.pop(config_file, None):
+            tool_source = self._tool_source_from_document(config_file, tool_document)
+        else:
+            tool_source = self.load_tool_source(config_file, tool_cache_data_dir=tool_cache_data_dir)
+        return self._create_tool_from_source(tool_source, config_file=config_file, **kwds)
+
+    def load_tool_source(self, config_file: str, tool_cache_data_dir=None) -> ToolSource:
+        """Parse the tool file `config_file`, using the tool document cache if enabled."""
         cache = self.get_cache_region(tool_cache_data_dir)
         if config_file.endswith(".xml") and cache and not cache.disabled:
             tool_document = cache.get(config_file)
             if tool_document:
-                tool_source = self.get_expanded_tool_source(
-                    config_file=config_file,
-                    xml_tree=parse_xml_string_to_etree(tool_document["document"]),
-                    macro_paths=tool_document["macro_paths"],
-                )
-            else:
-                tool_source = self.get_expanded_tool_source(config_file)
-                cache.set(config_file, tool_source)
-        else:
+                return self._tool_source_from_document(config_file, tool_document)
             tool_source = self.get_expanded_tool_source(config_file)
-        return self._create_tool_from_source(tool_source, config_file=config_file, **kwds)
+            cache.set(config_file, tool_source)
+            return tool_source
+        return self.get_expanded_tool_source(config_file)
+
+    def get_tool(self, tool_id, tool_version=None, get_all_versions=False, exact=False, tool_uuid=None):
+        tool = super().get_tool(
+            tool_id, tool_version=tool_version, get_all_versions=get_all_versions, exact=exact, tool_uuid=tool_uuid
+        )
+        if self.lazy_tools is not None and isinstance(tool, Tool):
+            self.lazy_tools.touch(tool)
+        return tool
+
+    def tool_memory_usage(self) -> Dict[str, Any]:
+        """Return the number of loaded tools and the memory used by materialized lazy tools."""
+        tools = [tool for _, tool in self.tools()]
+        usage: Dict[str, Any] = {
+            "lazy_tool_loading": self.lazy_tools is not None,
+            "tools": len(tools),
+            "lazy_tools": sum(1 for tool in tools if tool.is_lazy),
+        }
+        if self.lazy_tools is not None:
+            usage.update(self.lazy_tools.to_dict())
+        return usage
 
     def get_expanded_tool_source(self, config_file, **kwargs):
         try:
@@ -757,6 +851,58 @@ class _Options(Bunch):
     refresh: str
 
 
+# Attributes of lazy tools that are only parsed when the tool is first used.
+LAZY_TOOL_ATTRIBUTES = frozenset(
+    [
+        "inputs",
+        "inputs_by_page",
+        "display_by_page",
+        "display",
+        "npages",
+        "last_page",
+        "enctype",
+        "template_macro_params",
+        "input_required",
+        "input_params",
+        "check_values",
+        "nginx_upload",
+        "action",
+        "method",
+        "outputs",
+        "output_collections",
+        "raw_help",
+        "_Tool__tests",
+        "requirements",
+        "containers",
+        "resource_requirements",
+    ]
+)
+
+
+def keeps_lazy_tool_materialized(func):
+    """Keep a lazy tool materialized while the decorated method runs, see :meth:`Tool.in_use`."""
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        with self.in_use():
+            return func(self, *args, **kwargs)
+
+    return wrapper
+
+
+# Modules of the objects counted in the memory used by materialized lazy tools.
+LAZY_TOOL_SIZE_MODULES = (
+    "galaxy.tools",
+    "galaxy.tool_util.parser",
+    "galaxy.tool_util.deps.requirements",
+    "galaxy.util",
+)
+
+
+def _counts_towards_tool_size(obj) -> bool:
+    return type(obj).__module__.startswith(LAZY_TOOL_SIZE_MODULES) and not isinstance(obj, (Tool, AbstractToolBox))
+
+
 class Tool(UsesDictVisibleKeys):
     """
     Represents a computational tool that can be executed through Galaxy.
@@ -785,9 +931,24 @@ class Tool(UsesDictVisibleKeys):
         allow_code_files: bool = True,
         dynamic: bool = False,
         tool_dir: Optional[StrPath] = None,
+        lazy_tools: Optional[LazyToolCache] = None,
+        tool_cache_data_dir: Optional[str] = None,
     ):
-        """Load a tool from the config named by `config_file`"""
+        """Load a tool from the config named by `config_file`
+
+        If `lazy_tools` is set, parsing the inputs, outputs, help, tests and
+        requirements of the tool is deferred until they are first used.
+        """
         self.config_file = config_file
+        self._lazy_tools = lazy_tools if config_file is not None and not dynamic else None
+        self._tool_cache_data_dir = tool_cache_data_dir
+        self._materialized = self._lazy_tools is None
+        self._materializing = False
+        # Number of threads using the lazy tool, it isn't unloaded while in use.
+        self._users = 0
+        self._dematerialize_pending = False
+        # Help of a lazy tool kept for the tool search index
+        self._search_help: Optional[HelpContent] = None
         # Determine the full path of the directory where the tool config is
         if config_file is not None:
             tool_dir = tool_dir or os.path.dirname(config_file)
@@ -799,27 +960,14 @@ class Tool(UsesDictVisibleKeys):
         # setup initial attribute values
         self.stdio_exit_codes: List = []
         self.stdio_regexes: List = []
-        self.inputs_by_page: List[Dict] = []
-        self.display_by_page: List = []
-        self.action: Union[str, Tuple[str, str]] = "/tool_runner/index"
         self.target = "galaxy_main"
-        self.method = "post"
         self.labels: List = []
-        self.check_values = True
-        self.nginx_upload = False
-        self.input_required = False
         self.display_interface = True
         self.require_login = False
         self.rerun = False
         # This will be non-None for tools loaded from the database (DynamicTool objects).
         self.dynamic_tool = None
-        # Define a place to keep track of all input   These
-        # differ from the inputs dictionary in that inputs can be page
-        # elements like conditionals, but input_params are basic form
-        # parameters like SelectField objects.  This enables us to more
-        # easily ensure that parameter dependencies like index files or
-        # tool_data_table_conf.xml entries exist.
-        self.input_params: List[ToolParameter] = []
+        self._reset_inputs()
         # Attributes of tools installed from Galaxy tool sheds.
         self.tool_shed: Optional[str] = None
         self.repository_name = None
@@ -827,7 +975,6 @@ class Tool(UsesDictVisibleKeys):
         self.changeset_revision = None
         self.installed_changeset_revision = None
         self.sharable_url = None
-        self.npages = 0
         # The tool.id value will be the value of guid, but we'll keep the
         # guid attribute since it is useful to have.
         self.guid = guid
@@ -857,6 +1004,151 @@ class Tool(UsesDictVisibleKeys):
         # loading tools into the toolshed for validation.
         if self.app.name == "galaxy":
             self.job_search = self.app.job_search
+        if not self._materialized:
+            self._drop_deferred()
+
+    if not TYPE_CHECKING:
+
+        def __getattr__(self, name: str):
+            # Only called for attributes that aren't set, i.e. the deferred
+            # attributes of lazy tools that haven't been materialized yet.
+            lazy_tools = self.__dict__.get("_lazy_tools")
+            if lazy_tools is not None and name in LAZY_TOOL_ATTRIBUTES:
+                with lazy_tools.lock:
+                    self.materialize()
+                    if name in self.__dict__:
+                        return self.__dict__[name]
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def _reset_inputs(self):
+        self.inputs_by_page: List[Dict] = []
+        self.display_by_page: List = []
+        self.action: Union[str, Tuple[str, str]] = "/tool_runner/index"
+        self.method = "post"
+        self.check_values = True
+        self.nginx_upload = False
+        self.input_required = False
+        # Define a place to keep track of all input   These
+        # differ from the inputs dictionary in that inputs can be page
+        # elements like conditionals, but input_params are basic form
+        # parameters like SelectField objects.  This enables us to more
+        # easily ensure that parameter dependencies like index files or
+        # tool_data_table_conf.xml entries exist.
+        self.input_params: List[ToolParameter] = []
+        self.npages = 0
+
+    @property
+    def is_lazy(self) -> bool:
+        return self._lazy_tools is not None
+
+    @property
+    def is_materialized(self) -> bool:
+        return self._materialized
+
+    @property
+    def search_help(self) -> Optional[HelpContent]:
+        """Help of the tool to index for searching, doesn't materialize lazy tools."""
+        if self._materialized:
+            return self.raw_help
+        return self._search_help
+
+    def materialize(self) -> None:
+        """Parse the deferred attributes of a lazy tool if they aren't loaded.
+
+        The tool file is parsed again by the toolbox, so macros and the tool
+        document cache are handled as when the tool was loaded. The tool is
+        recorded as recently used in the toolbox's :class:`LazyToolCache`,
+        which may unload other tools.
+        """
+        lazy_tools = self._lazy_tools
+        if lazy_tools is None:
+            return
+        with lazy_tools.lock:
+            if self._materialized:
+                if self._dematerialize_pending:
+                    # Evicted while in use, track it again instead of unloading it.
+                    self._dematerialize_pending = False
+                    lazy_tools.add(self, self.materialized_size())
+                else:
+                    lazy_tools.touch(self)
+                return
+            if self._materializing:
+                # Attribute accessed while materializing, before it has been parsed.
+                return
+            self._materializing = True
+            try:
+                tool_source = self._load_tool_source()
+                self.populate_resource_parameters(tool_source)
+                self.tool_source = tool_source
+                self._reset_inputs()
+                self._parse_deferred(tool_source)
+            except Exception:
+                self._drop_deferred()
+                raise
+            finally:
+                self._materializing = False
+            mem_optimize = getattr(tool_source, "mem_optimize", None)
+            if mem_optimize is not None:
+                mem_optimize()
+            self._materialized = True
+            lazy_tools.add(self, self.materialized_size())
+
+    def _load_tool_source(self) -> ToolSource:
+        toolbox = getattr(self.app, "toolbox", None)
+        if toolbox is None:
+            return get_tool_source(self.config_file)
+        return toolbox.load_tool_source(self.config_file, tool_cache_data_dir=self._tool_cache_data_dir)
+
+    @contextmanager
+    def in_use(self) -> Iterator["Tool"]:
+        """Materialize a lazy tool and keep it materialized until the block exits.
+
+        Evicting the tool from the :class:`LazyToolCache` meanwhile only
+        unloads it once no other thread is using it.
+        """
+        lazy_tools = self._lazy_tools
+        if lazy_tools is None:
+            yield self
+            return
+        with lazy_tools.lock:
+            self._users += 1
+            try:
+                self.materialize()
+            except Exception:
+                self._users -= 1
+                raise
+        try:
+            yield self
+        finally:
+            with lazy_tools.lock:
+                self._users -= 1
+                if not self._users and self._dematerialize_pending:
+                    self._dematerialize_pending = False
+                    self._drop_deferred()
+                    self._materialized = False
+
+    def dematerialize(self) -> None:
+        """Unload the deferred attributes of a lazy tool, they are parsed again when next used.
+
+        If the tool is in use, it is unloaded when the last user is done with it.
+        """
+        if self._lazy_tools is None:
+            return
+        with self._lazy_tools.lock:
+            if self._users:
+                self._dematerialize_pending = True
+                return
+            self._drop_deferred()
+            self._materialized = False
+
+    def _drop_deferred(self) -> None:
+        for name in LAZY_TOOL_ATTRIBUTES:
+            self.__dict__.pop(name, None)
+
+    def materialized_size(self) -> int:
+        """Estimate the memory (in bytes) used by the deferred attributes of the tool."""
+        deferred = [self.__dict__[name] for name in LAZY_TOOL_ATTRIBUTES if name in self.__dict__]
+        return estimate_size(deferred, _counts_towards_tool_size)
 
     def remove_from_cache(self):
         if source_path := self.tool_source.source_path:
@@ -1167,13 +1459,12 @@ class Tool(UsesDictVisibleKeys):
         self.hidden = tool_source.parse_hidden()
         self.license = tool_source.parse_license()
         self.creator = tool_source.parse_creator()
-        self.parse_inputs(self.tool_source)
-        self.parse_outputs(self.tool_source)
-        self.raw_help = None
-
-        if self.app.is_webapp:
-            self.raw_help = self.__get_help_with_images(tool_source.parse_help())
-            self.parse_tests()
+        if self._materialized:
+            self._parse_deferred(tool_source)
+        else:
+            self._parse_panel_inputs(tool_source)
+            if self.app.is_webapp and getattr(self.app.config, "index_tool_help", True):
+                self._search_help = tool_source.parse_help()
         self.__parse_legacy_features(tool_source)
 
         # Load any tool specific options (optional)
@@ -1210,12 +1501,6 @@ class Tool(UsesDictVisibleKeys):
                     message = REQUIRES_JS_RUNTIME_MESSAGE % self.id or getattr(self, "uuid", "unknown tool id")
                     raise Exception(message)
 
-        # Requirements (dependencies)
-        requirements, containers, resource_requirements = tool_source.parse_requirements_and_containers()
-        self.requirements = requirements
-        self.containers = containers
-        self.resource_requirements = resource_requirements
-
         required_files = tool_source.parse_required_files()
         if required_files is None:
             old_id = self.old_id
@@ -1249,6 +1534,32 @@ class Tool(UsesDictVisibleKeys):
 
         self._is_workflow_compatible = self.check_workflow_compatible(self.tool_source)
 
+    def _parse_deferred(self, tool_source: ToolSource) -> None:
+        """Parse the inputs, outputs, help, tests and requirements of the tool.
+
+        For lazy tools this happens when they are first used.
+        """
+        self.parse_inputs(tool_source)
+        self.parse_outputs(tool_source)
+        self.raw_help = None
+        self.__tests = None
+        if self.app.is_webapp:
+            self.raw_help = self.__get_help_with_images(tool_source.parse_help())
+            self.parse_tests()
+
+        # Requirements (dependencies)
+        requirements, containers, resource_requirements = tool_source.parse_requirements_and_containers()
+        self.requirements = requirements
+        self.containers = containers
+        self.resource_requirements = resource_requirements
+
+    def _parse_panel_inputs(self, tool_source: ToolSource) -> None:
+        """Parse the input form attributes needed to list a lazy tool without parsing its inputs."""
+        pages = tool_source.parse_input_pages()
+        if (input_elem := getattr(pages, "input_elem", None)) is not None:
+            self.target = input_elem.get("target", self.target)
+        self.has_multiple_pages = pages.inputs_defined and len(pages.page_sources) > 1
+
     def __parse_legacy_features(self, tool_source: ToolSource):
         self.code_namespace: Dict[str, str] = {}
         self.hook_map: Dict[str, str] = {}
@@ -1932,6 +2243,7 @@ class Tool(UsesDictVisibleKeys):
                 completed_jobs[i] = None
         return completed_jobs
 
+    @keeps_lazy_tool_materialized
     def handle_input(
         self,
         trans,
@@ -2005,6 +2317,7 @@ class Tool(UsesDictVisibleKeys):
                 ", ".join(msg for msg in err_data.values()), err_data=err_data, param_errors=param_errors
             )
 
+    @keeps_lazy_tool_materialized
     def handle_single_execution(
         self,
         trans,
@@ -2387,6 +2700,7 @@ class Tool(UsesDictVisibleKeys):
             final_job_state=final_job_state,
             flush_per_n_datasets=tool.app.config.flush_per_n_datasets,
             max_discovered_files=tool.app.config.max_discovered_files,
+            bulk_persistence=tool.app.config.bulk_insert_discovered_datasets,
         )
         collected = output_collect.collect_primary_datasets(
             job_context,
@@ -2574,6 +2888,7 @@ class Tool(UsesDictVisibleKeys):
 
         return tool_dict
 
+    @keeps_lazy_tool_materialized
     def to_json(self, trans, kwd=None, job=None, workflow_building_mode=False, history=None):
         """
         Recursively creates a tool dictionary containing repeats, dynamic options and updated states.
@@ -3066,6 +3381,10 @@ class DataSourceTool(OutputParameterJSONTool):
             self.inputs["GALAXY_URL"] = self._build_GALAXY_URL_parameter()
             self.inputs_by_page[0]["GALAXY_URL"] = self.inputs["GALAXY_URL"]
 
+    def _parse_panel_inputs(self, tool_source):
+        super()._parse_panel_inputs(tool_source)
+        self.target = "_top"
+
     def exec_before_job(self, app, inp_data, out_data, param_dict=None):
         if param_dict is None:
             param_dict = {}
@@ -251,6 +251,7 @@ def __new_library_upload(trans, cntrller, uploaded_dataset, library_bunch, tag_h
             trans.sa_session.commit()
     # If roles were selected upon upload, restrict access to the Dataset to those roles
     if library_bunch.roles:
+        trans.app.security_agent.invalidate_dataset_permissions(ldda.dataset)
         for role in library_bunch.roles:
             dp = trans.app.model.DatasetPermissions(
                 trans.app.security_agent.permitted_actions.DATASET_ACCESS.action, ldda.dataset, role
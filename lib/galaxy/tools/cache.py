@@ -1,133 +1,551 @@
+import fcntl
+import gzip
+import hashlib
 import json
 import logging
+import mmap
+import multiprocessing
 import os
-import shutil
-import sqlite3
+import struct
+import sys
 import tempfile
 import zlib
-from threading import Lock
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from threading import (
+    Lock,
+    RLock,
+)
 from typing import (
+    Any,
+    Callable,
     Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
     Optional,
+    Tuple,
 )
 
-from sqlitedict import SqliteDict
-
-from galaxy.util import unicodify
+from galaxy.tool_util.parser import get_tool_source
+from galaxy.util import (
+    unicodify,
+    unlink,
+)
 from galaxy.util.hash_util import md5_hash_file
 
 log = logging.getLogger(__name__)
 
 CURRENT_TOOL_CACHE_VERSION = 0
-
-
-def encoder(obj):
-    return sqlite3.Binary(zlib.compress(json.dumps(obj).encode("utf-8")))
-
-
-def decoder(obj):
-    return json.loads(zlib.decompress(bytes(obj)).decode("utf-8"))
+TOOLBOX_SNAPSHOT_VERSION = 1
+TOOL_DOCUMENT_CACHE_MAGIC = b"galaxy-tool-documents-1\n"
+# Records are a kind, the length of the payload, the payload and its crc32.
+_RECORD_HEADER = struct.Struct(">cI")
+_RECORD_CRC = struct.Struct(">I")
+_DOCUMENT_RECORD = b"D"
+_ENTRY_RECORD = b"E"
+_DIGEST_SIZE = 32
+
+ToolDocument = Dict[str, Any]
+
+
+def tool_document(tool_source) -> ToolDocument:
+    """Serializable, macro-expanded representation of an XML tool source."""
+    return {
+        "document": tool_source.to_string(),
+        "macro_paths": tool_source.macro_paths,
+        "paths_and_modtimes": tool_source.paths_and_modtimes(),
+        "tool_cache_version": CURRENT_TOOL_CACHE_VERSION,
+    }
+
+
+def _parse_tool_document(config_file: str, enable_beta_formats: bool) -> Optional[ToolDocument]:
+    try:
+        return tool_document(get_tool_source(config_file, enable_beta_formats=enable_beta_formats))
+    except Exception:
+        # Errors are reported when the tool is loaded.
+        return None
+
+
+def parse_tool_documents(
+    config_files: List[str], processes: int = 0, enable_beta_formats: bool = False
+) -> Dict[str, ToolDocument]:
+    """Parse the XML tool files ``config_files`` and expand their macros.
+
+    If ``processes`` is greater than 1 the files are parsed in a pool of that
+    many processes. Files that fail to parse are left out of the result.
+    """
+    parse = partial(_parse_tool_document, enable_beta_formats=enable_beta_formats)
+    if processes > 1 and len(config_files) > 1:
+        chunksize = max(1, len(config_files) // (processes * 4))
+        # Don't fork a (threaded) Galaxy process.
+        mp_context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=processes, mp_context=mp_context) as executor:
+            documents = executor.map(parse, config_files, chunksize=chunksize)
+            return {path: document for path, document in zip(config_files, documents) if document}
+    return {path: document for path in config_files if (document := parse(path))}
 
 
 class ToolDocumentCache:
+    """Macro-expanded tool documents shared by the Galaxy processes using ``cache_dir``.
+
+    Documents are stored once per distinct macro-expanded source, keyed by
+    the sha256 hash of the source, in an append-only file that readers
+    memory-map without locking. Entries map a tool config file to the hash
+    of its document and record the modification times and hashes of the tool
+    and macro files it was built from.
+
+    New entries are kept in memory until :meth:`persist` appends them to the
+    file, while holding a lock file. The process holding the lock compacts
+    the file when most of it is taken up by replaced entries, by writing a
+    new file that replaces the old one. Readers pick up the new file the
+    next time they look up a document.
+    """
+
     def __init__(self, cache_dir):
         self.cache_dir = cache_dir
-        if not os.path.exists(self.cache_dir):
-            os.makedirs(self.cache_dir)
-        self.cache_file = os.path.join(self.cache_dir, "cache.sqlite")
-        self.writeable_cache_file = None
-        self._cache = None
+        self.cache_file = os.path.join(cache_dir, "tool_documents.bin")
+        self.lock_file = os.path.join(cache_dir, "tool_documents.lock")
         self.disabled = False
-        self._get_cache(create_if_necessary=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._pending: Dict[str, Optional[ToolDocument]] = {}
+        self._reset()
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._refresh()
+        except (OSError, ValueError) as e:
+            log.warning("Tool document cache %s unavailable: %s", cache_dir, unicodify(e))
+            self.disabled = True
+
+    def _reset(self) -> None:
+        self._mmap: Optional[mmap.mmap] = None
+        self._stat: Optional[Tuple[int, int]] = None
+        self._scanned = 0
+        # Offsets of the compressed documents and sizes of their records, by hash
+        self._documents: Dict[str, Tuple[int, int, int]] = {}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._entry_sizes: Dict[str, int] = {}
 
     def close(self):
-        self._cache and self._cache.close()
+        with self._lock:
+            if self._mmap:
+                self._mmap.close()
+            self._reset()
 
-    def _get_cache(self, flag="r", create_if_necessary=False):
-        try:
-            if create_if_necessary and not os.path.exists(self.cache_file):
-                # Create database if necessary using 'c' flag
-                self._cache = SqliteDict(self.cache_file, flag="c", encode=encoder, decode=decoder, autocommit=False)
-                if flag == "r":
-                    self._cache.flag = flag
-            else:
-                cache_file = self.writeable_cache_file.name if self.writeable_cache_file else self.cache_file
-                self._cache = SqliteDict(cache_file, flag=flag, encode=encoder, decode=decoder, autocommit=False)
-        except (sqlite3.OperationalError, RuntimeError):
-            log.warning("Tool document cache unavailable")
-            self._cache = None
-            self.disabled = True
+    def reopen_ro(self):
+        with self._lock:
+            self._refresh()
 
     @property
     def cache_file_is_writeable(self):
-        return os.access(self.cache_file, os.W_OK)
+        return os.access(self.cache_dir, os.W_OK)
 
-    def reopen_ro(self):
-        self._get_cache(flag="r")
-        self.writeable_cache_file = None
+    def _refresh(self) -> None:
+        """Read the records that have been added to the cache file since the last refresh."""
+        try:
+            stat = os.stat(self.cache_file)
+        except FileNotFoundError:
+            if self._mmap:
+                self._mmap.close()
+            self._reset()
+            return
+        if self._stat and stat.st_ino == self._stat[0] and stat.st_size == self._stat[1]:
+            return
+        if not self._stat or stat.st_ino != self._stat[0] or stat.st_size < self._stat[1]:
+            # New or compacted cache file
+            if self._mmap:
+                self._mmap.close()
+            self._reset()
+        if stat.st_size == 0:
+            return
+        with open(self.cache_file, "rb") as fh:
+            stat = os.fstat(fh.fileno())
+            new_mmap = mmap.mmap(fh.fileno(), stat.st_size, access=mmap.ACCESS_READ)
+        if self._mmap:
+            self._mmap.close()
+        self._mmap = new_mmap
+        self._stat = (stat.st_ino, stat.st_size)
+        self._scan()
+
+    def _scan(self) -> None:
+        data = self._mmap
+        assert data is not None
+        offset = self._scanned
+        if offset == 0:
+            if data[: len(TOOL_DOCUMENT_CACHE_MAGIC)] != TOOL_DOCUMENT_CACHE_MAGIC:
+                # Not a cache file, it is replaced on the next write.
+                return
+            offset = len(TOOL_DOCUMENT_CACHE_MAGIC)
+        while offset + _RECORD_HEADER.size <= len(data):
+            kind, length = _RECORD_HEADER.unpack_from(data, offset)
+            start = offset + _RECORD_HEADER.size
+            end = start + length
+            if end + _RECORD_CRC.size > len(data):
+                # Record still being written, or left over by an interrupted write.
+                break
+            payload = data[start:end]
+            if zlib.crc32(payload) != _RECORD_CRC.unpack_from(data, end)[0]:
+                break
+            record_size = end + _RECORD_CRC.size - offset
+            if kind == _DOCUMENT_RECORD:
+                digest = payload[:_DIGEST_SIZE].hex()
+                self._documents[digest] = (start + _DIGEST_SIZE, end, record_size)
+            elif kind == _ENTRY_RECORD:
+                entry = json.loads(payload)
+                config_file = entry.pop("config_file")
+                if entry.get("digest"):
+                    self._entries[config_file] = entry
+                    self._entry_sizes[config_file] = record_size
+                else:
+                    self._entries.pop(config_file, None)
+                    self._entry_sizes.pop(config_file, None)
+            offset = end + _RECORD_CRC.size
+        self._scanned = offset
+
+    def _document(self, entry: Dict[str, Any]) -> Optional[ToolDocument]:
+        location = self._documents.get(entry["digest"])
+        if location is None or self._mmap is None:
+            return None
+        start, end, _ = location
+        return {
+            "document": zlib.decompress(self._mmap[start:end]).decode("utf-8"),
+            "macro_paths": entry["macro_paths"],
+            "paths_and_modtimes": entry["paths_and_modtimes"],
+            "tool_cache_version": entry["tool_cache_version"],
+        }
 
     def get(self, config_file):
+        tool_document = None
         try:
-            tool_document = self._cache.get(config_file)
-        except sqlite3.OperationalError:
-            log.debug("Tool document cache unavailable")
-            return None
-        if not tool_document:
-            return None
-        if tool_document.get("tool_cache_version") != CURRENT_TOOL_CACHE_VERSION:
-            return None
-        if self.cache_file_is_writeable:
-            for path, modtime in tool_document["paths_and_modtimes"].items():
-                if os.path.getmtime(path) != modtime:
-                    return None
+            with self._lock:
+                if config_file in self._pending:
+                    tool_document = self._pending[config_file]
+                else:
+                    self._refresh()
+                    entry = self._entries.get(config_file)
+                    if entry and entry.get("tool_cache_version") == CURRENT_TOOL_CACHE_VERSION:
+                        tool_document = self._document(entry)
+                        # Read-only caches are assumed to be kept up to date by the admin
+                        if (
+                            tool_document
+                            and self.cache_file_is_writeable
+                            and not tool_files_unchanged(entry["paths_and_modtimes"], entry["hashes"])
+                        ):
+                            tool_document = None
+        except (OSError, ValueError) as e:
+            log.debug("Tool document cache unavailable: %s", unicodify(e))
+            tool_document = None
+        if tool_document:
+            self.hits += 1
+        else:
+            self.misses += 1
         return tool_document
 
-    def _make_writable(self):
-        if not self.writeable_cache_file:
-            self.writeable_cache_file = tempfile.NamedTemporaryFile(
-                dir=self.cache_dir, suffix="cache.sqlite.tmp", delete=False
-            )
-            if os.path.exists(self.cache_file):
-                shutil.copy(self.cache_file, self.writeable_cache_file.name)
-            self._get_cache(flag="c")
-
-    def persist(self):
-        if self.writeable_cache_file:
-            self._cache.commit()
-            os.rename(self.writeable_cache_file.name, self.cache_file)
-            self.reopen_ro()
-
     def set(self, config_file, tool_source):
-        try:
-            if self.cache_file_is_writeable:
-                self._make_writable()
-                to_persist = {
-                    "document": tool_source.to_string(),
-                    "macro_paths": tool_source.macro_paths,
-                    "paths_and_modtimes": tool_source.paths_and_modtimes(),
-                    "tool_cache_version": CURRENT_TOOL_CACHE_VERSION,
-                }
-                try:
-                    self._cache[config_file] = to_persist
-                except RuntimeError:
-                    log.debug("Tool document cache not writeable")
-        except sqlite3.OperationalError:
-            log.debug("Tool document cache unavailable")
+        self.set_documents({config_file: tool_document(tool_source)})
+
+    def set_documents(self, documents: Dict[str, ToolDocument]) -> None:
+        """Add the tool ``documents``, by config file, on the next :meth:`persist`."""
+        if self.cache_file_is_writeable:
+            with self._lock:
+                self._pending.update(documents)
 
     def delete(self, config_file):
         if self.cache_file_is_writeable:
-            self._make_writable()
-            try:
-                del self._cache[config_file]
-            except (KeyError, RuntimeError):
-                pass
+            with self._lock:
+                self._pending[config_file] = None
 
-    def __del__(self):
-        if self.writeable_cache_file:
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        with open(self.lock_file, "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
             try:
-                os.unlink(self.writeable_cache_file.name)
-            except Exception:
-                pass
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def persist(self, compact: bool = False):
+        """Write documents added since the last call to the cache file.
+
+        The file is compacted if ``compact`` is set or if less than half of it is
+        used by current entries and their documents.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not (pending or compact) or self.disabled:
+            return
+        try:
+            with self._write_lock(), self._lock:
+                self._refresh()
+                self._write(pending, compact)
+                self._refresh()
+        except (OSError, ValueError) as e:
+            log.warning("Failed to write tool document cache %s: %s", self.cache_dir, unicodify(e))
+
+    def _write(self, pending: Dict[str, Optional[ToolDocument]], compact: bool) -> None:
+        documents: Dict[str, bytes] = {}
+        entries: Dict[str, Optional[Dict[str, Any]]] = {}
+        for config_file, document in pending.items():
+            if document is None:
+                if config_file in self._entries:
+                    entries[config_file] = None
+                continue
+            hashes = {}
+            for path, modtime in document["paths_and_modtimes"].items():
+                if os.path.getmtime(path) != modtime:
+                    # Changed since the document was built
+                    break
+                hashes[path] = ToolHash(path, modtime).hash
+            else:
+                source = document["document"].encode("utf-8")
+                digest = hashlib.sha256(source).hexdigest()
+                if digest not in self._documents:
+                    documents[digest] = zlib.compress(source)
+                entry = {
+                    "digest": digest,
+                    "macro_paths": document["macro_paths"],
+                    "paths_and_modtimes": document["paths_and_modtimes"],
+                    "hashes": hashes,
+                    "tool_cache_version": document["tool_cache_version"],
+                }
+                if self._entries.get(config_file) != entry:
+                    entries[config_file] = entry
+        if not (documents or entries or compact):
+            return
+        size = self._stat[1] if self._stat else 0
+        if compact or not size or self._scanned != size or self._live_size() * 2 < size:
+            self._compact(documents, entries)
+        else:
+            with open(self.cache_file, "ab") as fh:
+                fh.write(_records(documents, entries))
+
+    def _live_size(self) -> int:
+        size = len(TOOL_DOCUMENT_CACHE_MAGIC) + sum(self._entry_sizes.values())
+        digests = {entry["digest"] for entry in self._entries.values()}
+        return size + sum(self._documents[digest][2] for digest in digests if digest in self._documents)
+
+    def _compact(self, documents: Dict[str, bytes], entries: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """Replace the cache file by a file containing only the current entries and their documents."""
+        all_entries: Dict[str, Optional[Dict[str, Any]]] = dict(self._entries)
+        all_entries.update(entries)
+        live_entries = {config_file: entry for config_file, entry in all_entries.items() if entry}
+        live_documents = {}
+        for entry in live_entries.values():
+            digest = entry["digest"]
+            if digest in documents:
+                live_documents[digest] = documents[digest]
+            elif digest in self._documents and self._mmap is not None:
+                start, end, _ = self._documents[digest]
+                live_documents[digest] = self._mmap[start:end]
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix=".tmp", delete=False) as tmp:
+                tmp_path = tmp.name
+                tmp.write(TOOL_DOCUMENT_CACHE_MAGIC)
+                tmp.write(_records(live_documents, live_entries))
+            os.replace(tmp_path, self.cache_file)
+        except OSError:
+            if tmp_path:
+                unlink(tmp_path, ignore_errors=True)
+            raise
+        log.debug("Compacted tool document cache %s, %d entries", self.cache_dir, len(live_entries))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "documents": len(self._documents),
+                "size": self._stat[1] if self._stat else 0,
+            }
+
+
+def _record(kind: bytes, payload: bytes) -> bytes:
+    return _RECORD_HEADER.pack(kind, len(payload)) + payload + _RECORD_CRC.pack(zlib.crc32(payload))
+
+
+def _records(documents: Mapping[str, bytes], entries: Mapping[str, Optional[Dict[str, Any]]]) -> bytes:
+    """Serialize documents (by hash) and entries (by config file, ``None`` to delete the entry)."""
+    records = [_record(_DOCUMENT_RECORD, bytes.fromhex(digest) + document) for digest, document in documents.items()]
+    for config_file, entry in entries.items():
+        payload = dict(entry or {"digest": None}, config_file=config_file)
+        records.append(_record(_ENTRY_RECORD, json.dumps(payload).encode("utf-8")))
+    return b"".join(records)
+
+
+def tool_files_unchanged(paths_and_modtimes: Dict[str, float], hashes: Dict[str, str]) -> bool:
+    """Check that the tool and macro files a tool document was built from are unchanged.
+
+    Files with a different modification time are compared using their md5 hash.
+    """
+    try:
+        for path, modtime in paths_and_modtimes.items():
+            new_modtime = os.path.getmtime(path)
+            if new_modtime != modtime and not ToolHash(path, new_modtime, lazy_hash=True).hash_equals(hashes.get(path)):
+                return False
+    except FileNotFoundError:
+        return False
+    return True
+
+
+class ToolboxSnapshot:
+    """Macro-expanded documents of all tools of a toolbox, stored in a single file.
+
+    The snapshot is written by the first process loading the toolbox and read
+    by other processes (e.g. web workers and job handlers) to skip parsing tool
+    files and expanding their macros. Each document records the modification
+    times and hashes of the tool and macro files it was built from and is only
+    used if these files are unchanged.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _read(self) -> Dict[str, ToolDocument]:
+        try:
+            with gzip.open(self.path, "rt") as fh:
+                snapshot = json.load(fh)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            log.warning("Ignoring invalid toolbox snapshot %s: %s", self.path, unicodify(e))
+            return {}
+        if snapshot.get("version") != TOOLBOX_SNAPSHOT_VERSION:
+            return {}
+        return snapshot["tools"]
+
+    def load(self, config_files: Iterable[str]) -> Dict[str, ToolDocument]:
+        """Return the current documents of ``config_files`` in the snapshot."""
+        tools = self._read()
+        documents = {}
+        for config_file in config_files:
+            document = tools.get(config_file)
+            if document and self._is_current(document):
+                documents[config_file] = document
+        return documents
+
+    def _is_current(self, document: ToolDocument) -> bool:
+        if document.get("tool_cache_version") != CURRENT_TOOL_CACHE_VERSION:
+            return False
+        return tool_files_unchanged(document["paths_and_modtimes"], document["hashes"])
+
+    def update(self, documents: Dict[str, ToolDocument]) -> None:
+        """Add or replace ``documents`` in the snapshot, dropping documents of tool files that don't exist anymore."""
+        tools = {config_file: document for config_file, document in self._read().items() if os.path.exists(config_file)}
+        for config_file, document in documents.items():
+            hashes = document.get("hashes") or {path: ToolHash(path).hash for path in document["paths_and_modtimes"]}
+            tools[config_file] = dict(document, hashes=hashes)
+        snapshot_dir = os.path.dirname(self.path)
+        tmp_path = None
+        try:
+            os.makedirs(snapshot_dir, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=snapshot_dir, suffix=".tmp", delete=False) as tmp:
+                tmp_path = tmp.name
+                with gzip.open(tmp, "wt") as fh:
+                    json.dump({"version": TOOLBOX_SNAPSHOT_VERSION, "tools": tools}, fh)
+            # Readers in other processes see either the old or the new snapshot.
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning("Failed to write toolbox snapshot %s: %s", self.path, unicodify(e))
+            if tmp_path:
+                unlink(tmp_path, ignore_errors=True)
+
+
+def estimate_size(obj: Any, descend: Callable[[Any], bool]) -> int:
+    """Estimate the memory used by ``obj`` and the objects it references.
+
+    Containers are always followed, other objects only if ``descend(obj)`` is
+    true. Objects referenced more than once are counted once.
+    """
+    seen = set()
+    stack = [obj]
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif descend(obj):
+            if hasattr(obj, "__dict__"):
+                stack.append(vars(obj))
+            for slot in getattr(type(obj), "__slots__", ()):
+                if hasattr(obj, slot):
+                    stack.append(getattr(obj, slot))
+    return size
+
+
+class LazyToolCache:
+    """Keep track of the lazy tools whose deferred attributes are loaded.
+
+    At most ``size`` tools are kept materialized, materializing another tool
+    evicts the least recently used one. Evicted tools that are still in use
+    are only unloaded once their last user is done with them. Materialization
+    and eviction happen while holding ``lock``.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.lock = RLock()
+        self._tool_sizes: OrderedDict[Any, int] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._tool_sizes)
+
+    def __contains__(self, tool) -> bool:
+        return tool in self._tool_sizes
+
+    def touch(self, tool) -> None:
+        """Mark ``tool`` as recently used if it is materialized."""
+        with self.lock:
+            if tool in self._tool_sizes:
+                self._tool_sizes.move_to_end(tool)
+                self.hits += 1
+
+    def add(self, tool, size: int) -> None:
+        """Record that ``tool`` has been materialized, using an estimated ``size`` bytes."""
+        with self.lock:
+            self.misses += 1
+            while self._tool_sizes and len(self._tool_sizes) >= max(self.size, 1):
+                evicted, _ = self._tool_sizes.popitem(last=False)
+                evicted.dematerialize()
+                self.evictions += 1
+            self._tool_sizes[tool] = size
+
+    def discard(self, tool) -> None:
+        with self.lock:
+            self._tool_sizes.pop(tool, None)
+
+    def to_dict(self, largest: int = 10) -> Dict[str, Any]:
+        with self.lock:
+            tool_sizes: List[Tuple[Any, int]] = list(self._tool_sizes.items())
+            stats: Dict[str, Any] = {
+                "size": self.size,
+                "materialized": len(tool_sizes),
+                "materialized_bytes": sum(size for _, size in tool_sizes),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+        tool_sizes.sort(key=lambda item: item[1], reverse=True)
+        stats["largest"] = [
+            {"id": tool.id, "version": tool.version, "bytes": size} for tool, size in tool_sizes[:largest]
+        ]
+        return stats
 
 
 class ToolCache:
@@ -8,6 +8,7 @@ import collections
 import logging
 import typing
 from abc import abstractmethod
+from contextlib import nullcontext
 from typing import (
     Any,
     Callable,
@@ -183,18 +184,37 @@ def execute(
     execution_slice = None
     job_datasets: Dict[str, List[model.DatasetInstance]] = {}  # job: list of dataset instances created by job
 
-    for i, execution_slice in enumerate(execution_tracker.new_execution_slices()):
-        if max_num_jobs is not None and jobs_executed >= max_num_jobs:
-            has_remaining_jobs = True
-            break
-        else:
-            skip = execution_slice.param_combination.pop("__when_value__", None) is False
-            execute_single_job(execution_slice, completed_jobs[i], skip=skip)
-            history = execution_slice.history or history
-            jobs_executed += 1
+    # When creating many jobs, outputs of a batch of jobs are added to the history
+    # at once (allocating their hids with a single update) and the jobs are flushed
+    # together, so SQLAlchemy can insert the rows of each table in bulk.
+    batch_execution = job_count > 1
+    flush_batch_size = trans.app.config.tool_execution_flush_batch_size if batch_execution else 0
+    execution_cache.defer_history_additions = batch_execution
+    histories = [history]
+
+    def flush_batch():
+        for batch_history in histories:
+            batch_history.add_pending_items()
+        trans.sa_session.flush()
+
+    with trans.sa_session.no_autoflush if batch_execution else nullcontext():
+        for i, execution_slice in enumerate(execution_tracker.new_execution_slices()):
+            if max_num_jobs is not None and jobs_executed >= max_num_jobs:
+                has_remaining_jobs = True
+                break
+            else:
+                skip = execution_slice.param_combination.pop("__when_value__", None) is False
+                execute_single_job(execution_slice, completed_jobs[i], skip=skip)
+                history = execution_slice.history or history
+                if history not in histories:
+                    histories.append(history)
+                jobs_executed += 1
+                if flush_batch_size and jobs_executed % flush_batch_size == 0:
+                    flush_batch()
 
     if execution_slice:
-        history.add_pending_items()
+        for batch_history in histories:
+            batch_history.add_pending_items()
     # Make sure collections, implicit jobs etc are flushed even if there are no precreated output datasets
     with transaction(trans.sa_session):
         trans.sa_session.commit()
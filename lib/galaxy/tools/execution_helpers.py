@@ -5,7 +5,13 @@ tool execution code, and tool action code.
 """
 
 import logging
-from typing import Collection
+from typing import (
+    Any,
+    Collection,
+    Dict,
+    Set,
+    Tuple,
+)
 
 log = logging.getLogger(__name__)
 
@@ -20,6 +26,27 @@ class ToolExecutionCache:
         self.current_user_roles = trans.get_current_user_roles()
         self.chrom_info = {}
         self.cached_collection_elements = {}
+        self.derived_permissions: Dict[Tuple[Tuple[str, Tuple[Any, ...]], ...], Dict] = {}
+        self.history_default_permissions: Dict[Any, Dict] = {}
+        # Set while executing many jobs at once, outputs are then added to
+        # the history (and assigned hids) by the caller in batches.
+        self.defer_history_additions = False
+
+    def get_output_permissions(self, all_permissions: Dict[str, Set[Any]], history) -> Dict:
+        """Return the permissions of new outputs derived from input permissions or the history defaults.
+
+        All jobs of a map-over usually share these, so they are only computed once.
+        """
+        security_agent = self.trans.app.security_agent
+        if all_permissions:
+            key = tuple(sorted((action, tuple(sorted(role_ids))) for action, role_ids in all_permissions.items()))
+            if key not in self.derived_permissions:
+                self.derived_permissions[key] = security_agent.guess_derived_permissions(all_permissions)
+            return self.derived_permissions[key]
+        # No valid inputs, we will use history defaults
+        if history not in self.history_default_permissions:
+            self.history_default_permissions[history] = security_agent.history_get_default_permissions(history)
+        return self.history_default_permissions[history]
 
     def get_chrom_info(self, tool_id, input_dbkey):
         genome_builds = self.trans.app.genome_builds
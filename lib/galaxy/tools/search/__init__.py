@@ -25,13 +25,20 @@ Filters - various filters are available for processing content as the index is
 
 """
 
+import hashlib
+import json
 import logging
 import os
 import re
 import shutil
+from threading import Lock
 from typing import (
+    Any,
     Dict,
+    Iterator,
     List,
+    Optional,
+    Tuple,
     Union,
 )
 
@@ -55,7 +62,7 @@ from whoosh.scoring import (
     Frequency,
     MultiWeighting,
 )
-from whoosh.writing import AsyncWriter
+from whoosh.searching import Searcher
 
 from galaxy.config import GalaxyAppConfiguration
 from galaxy.util import (
@@ -67,6 +74,89 @@ log = logging.getLogger(__name__)
 
 CanConvertToFloat = Union[str, int, float]
 CanConvertToInt = Union[str, int, float]
+REGEX_TOKENIZER = analysis.RegexTokenizer()
+
+# Seconds to wait for another process to finish updating an index
+INDEX_WRITER_TIMEOUT = 600.0
+SEARCH_FIELDS = [
+    "id",
+    "id_exact",
+    "name",
+    "name_exact",
+    "description",
+    "section",
+    "edam_operations",
+    "edam_topics",
+    "repository",
+    "owner",
+    "help",
+    "labels",
+    "stub",
+]
+
+
+def tool_search_schema(config: GalaxyAppConfiguration) -> Schema:
+    """Return the search schema, with the field boosts configured in ``config``."""
+    schema_conf = {
+        # The stored ID field is not searchable
+        "id": ID(stored=True, unique=True),
+        # This exact field is searchable by exact matches only
+        "id_exact": NGRAMWORDS(
+            minsize=config.tool_ngram_minsize,
+            maxsize=config.tool_ngram_maxsize,
+            field_boost=(config.tool_id_boost * config.tool_name_exact_multiplier),
+        ),
+        # The primary name field is searchable by exact match only, and is
+        # eligible for massive score boosting. A secondary ngram or text
+        # field for name is added below
+        "name_exact": TEXT(
+            field_boost=(config.tool_name_boost * config.tool_name_exact_multiplier),
+            analyzer=analysis.IDTokenizer() | analysis.LowercaseFilter(),
+        ),
+        # The owner/repo/tool_id parsed from the GUID
+        "stub": KEYWORD(field_boost=float(config.tool_stub_boost)),
+        # The section where the tool is listed in the tool panel
+        "section": TEXT(field_boost=float(config.tool_section_boost)),
+        # The edam operations section where the tool is listed in the tool panel
+        "edam_operations": TEXT(field_boost=float(config.tool_section_boost)),
+        # The edam topics section where the tool is listed in the tool panel
+        "edam_topics": TEXT(field_boost=float(config.tool_section_boost)),
+        # The name of the repository the tool belongs to
+        "repository": TEXT(field_boost=float(config.tool_section_boost)),
+        # The owner id of the repository the tool belongs to
+        "owner": TEXT(field_boost=float(config.tool_section_boost)),
+        # Short description defined in the tool XML
+        "description": TEXT(
+            field_boost=config.tool_description_boost,
+            analyzer=analysis.StemmingAnalyzer(),
+        ),
+        # Help text parsed from the tool XML
+        "help": TEXT(field_boost=config.tool_help_boost, analyzer=analysis.StemmingAnalyzer()),
+        "labels": KEYWORD(field_boost=float(config.tool_label_boost)),
+        # Hash of the tool metadata the document was built from, to only
+        # update documents of tools that have changed
+        "content_hash": ID(stored=True),
+    }
+
+    if config.tool_enable_ngram_search:
+        schema_conf.update(
+            {
+                "name": NGRAMWORDS(
+                    minsize=config.tool_ngram_minsize,
+                    maxsize=config.tool_ngram_maxsize,
+                    field_boost=(float(config.tool_name_boost) * config.tool_ngram_factor),
+                ),
+            }
+        )
+    else:
+        schema_conf.update(
+            {
+                "name": TEXT(
+                    field_boost=float(config.tool_name_boost),
+                ),
+            }
+        )
+    return Schema(**schema_conf)
 
 
 def get_or_create_index(index_dir, schema):
@@ -84,12 +174,115 @@ def get_or_create_index(index_dir, schema):
     return index.create_in(index_dir, schema=schema)
 
 
+def indexable_tools(toolbox, tool_cache) -> Iterator[Tuple[Any, Any]]:
+    """Yield the latest version of each tool in ``tool_cache`` and the version of the tool to index for it.
+
+    Hidden tools are replaced by their most recent version that isn't hidden, data managers are skipped.
+    """
+    for tool_id in list(tool_cache._tool_paths_by_id):
+        latest_tool = tool = toolbox.get_tool(tool_id)
+        if tool and tool.is_latest_version:
+            if tool.hidden:
+                # Check if there is an older tool we can return
+                if tool.lineage:
+                    tool_versions = reversed(tool.lineage.get_versions())
+                    for tool_version in tool_versions:
+                        tool = tool_cache.get_tool_by_id(tool_version.id)
+                        if tool and not tool.hidden:
+                            break
+                else:
+                    continue
+            if tool and tool.tool_type != "manage_data":
+                # Data managers are not added to the public index
+                yield latest_tool, tool
+
+
+def tool_document_hash(tool, index_help: bool) -> str:
+    """Hash the attributes of ``tool`` its document is built from.
+
+    Help text is parsed from the tool source, instead of parsing it the
+    modification times of the tool and macro files are hashed.
+    """
+    section = tool.get_panel_section()
+    content = [
+        tool.id,
+        tool.version,
+        tool.name,
+        tool.description,
+        section[1] if len(section) == 2 else "",
+        tool.edam_operations,
+        tool.edam_topics,
+        tool.repository_name,
+        tool.repository_owner,
+        tool.guid,
+        sorted(tool.labels or []),
+    ]
+    if index_help:
+        for path in [tool.config_file, *tool._macro_paths]:
+            try:
+                content.append([path, os.path.getmtime(path)])
+            except (OSError, TypeError):
+                content.append([path, None])
+    return hashlib.md5(json.dumps(content, default=str).encode("utf-8")).hexdigest()
+
+
+def create_tool_document(tool, index_help: bool = True) -> Dict[str, str]:
+    """Return the values of the search fields for ``tool``, empty for data managers."""
+
+    def clean(string):
+        """Remove hyphens as they are Whoosh wildcards."""
+        if "-" in string:
+            return (" ").join(token.text for token in REGEX_TOKENIZER(unicodify(tool.name)))
+        else:
+            return string
+
+    if tool.tool_type == "manage_data":
+        #  Do not add data managers to the public index
+        return {}
+    add_doc_kwds = {
+        "id": unicodify(tool.id),
+        "id_exact": unicodify(tool.id),
+        "name": clean(tool.name),
+        "description": unicodify(tool.description),
+        "section": unicodify(tool.get_panel_section()[1] if len(tool.get_panel_section()) == 2 else ""),
+        "edam_operations": clean(tool.edam_operations),
+        "edam_topics": clean(tool.edam_topics),
+        "repository": unicodify(tool.repository_name),
+        "owner": unicodify(tool.repository_owner),
+        "help": unicodify(""),
+    }
+    if tool.guid:
+        # Create a stub consisting of owner, repo, and tool from guid
+        slash_indexes = [m.start() for m in re.finditer("/", tool.guid)]
+        id_stub = tool.guid[(slash_indexes[1] + 1) : slash_indexes[4]]
+        add_doc_kwds["stub"] = clean(id_stub)
+    else:
+        add_doc_kwds["stub"] = unicodify(id)
+    if tool.labels:
+        add_doc_kwds["labels"] = unicodify(" ".join(tool.labels))
+    if index_help:
+        raw_help = tool.search_help
+        if raw_help:
+            try:
+                add_doc_kwds["help"] = unicodify(raw_help)
+            except Exception:
+                # Don't fail to build index when help fails to parse
+                pass
+
+    add_doc_kwds["name_exact"] = add_doc_kwds["name"]
+
+    return add_doc_kwds
+
+
 class ToolBoxSearch:
     """Support searching across all fixed panel views in a toolbox.
 
     Search is delegated off to ToolPanelViewSearch for each panel object.
     """
 
+    # The index is stored on disk and shared by all Galaxy processes
+    shared_index = True
+
     def __init__(self, toolbox, index_dir: str, index_help: bool = True):
         panel_searches = {}
         for panel_view in toolbox.panel_views():
@@ -110,8 +303,10 @@ class ToolBoxSearch:
 
     def build_index(self, tool_cache, toolbox, index_help: bool = True) -> None:
         self.index_count += 1
+        # Document hashes don't depend on the panel view, compute them once per tool.
+        document_hashes: Dict[str, str] = {}
         for panel_search in self.panel_searches.values():
-            panel_search.build_index(tool_cache, toolbox, index_help=index_help)
+            panel_search.build_index(tool_cache, toolbox, index_help=index_help, document_hashes=document_hashes)
 
     def search(self, *args, **kwd) -> List[str]:
         panel_view = kwd.pop("panel_view")
@@ -135,232 +330,124 @@ class ToolPanelViewSearch:
         index_help: bool = True,
     ):
         """Build the schema and validate against the index."""
-        schema_conf = {
-            # The stored ID field is not searchable
-            "id": ID(stored=True, unique=True),
-            # This exact field is searchable by exact matches only
-            "id_exact": NGRAMWORDS(
-                minsize=config.tool_ngram_minsize,
-                maxsize=config.tool_ngram_maxsize,
-                field_boost=(config.tool_id_boost * config.tool_name_exact_multiplier),
-            ),
-            # The primary name field is searchable by exact match only, and is
-            # eligible for massive score boosting. A secondary ngram or text
-            # field for name is added below
-            "name_exact": TEXT(
-                field_boost=(config.tool_name_boost * config.tool_name_exact_multiplier),
-                analyzer=analysis.IDTokenizer() | analysis.LowercaseFilter(),
-            ),
-            # The owner/repo/tool_id parsed from the GUID
-            "stub": KEYWORD(field_boost=float(config.tool_stub_boost)),
-            # The section where the tool is listed in the tool panel
-            "section": TEXT(field_boost=float(config.tool_section_boost)),
-            # The edam operations section where the tool is listed in the tool panel
-            "edam_operations": TEXT(field_boost=float(config.tool_section_boost)),
-            # The edam topics section where the tool is listed in the tool panel
-            "edam_topics": TEXT(field_boost=float(config.tool_section_boost)),
-            # The name of the repository the tool belongs to
-            "repository": TEXT(field_boost=float(config.tool_section_boost)),
-            # The owner id of the repository the tool belongs to
-            "owner": TEXT(field_boost=float(config.tool_section_boost)),
-            # Short description defined in the tool XML
-            "description": TEXT(
-                field_boost=config.tool_description_boost,
-                analyzer=analysis.StemmingAnalyzer(),
-            ),
-            # Help text parsed from the tool XML
-            "help": TEXT(field_boost=config.tool_help_boost, analyzer=analysis.StemmingAnalyzer()),
-            "labels": KEYWORD(field_boost=float(config.tool_label_boost)),
-        }
-
-        if config.tool_enable_ngram_search:
-            schema_conf.update(
-                {
-                    "name": NGRAMWORDS(
-                        minsize=config.tool_ngram_minsize,
-                        maxsize=config.tool_ngram_maxsize,
-                        field_boost=(float(config.tool_name_boost) * config.tool_ngram_factor),
-                    ),
-                }
-            )
-        else:
-            schema_conf.update(
-                {
-                    "name": TEXT(
-                        field_boost=float(config.tool_name_boost),
-                    ),
-                }
-            )
-
-        self.schema = Schema(**schema_conf)
+        self.schema = tool_search_schema(config)
         self.rex = analysis.RegexTokenizer()
         self.index_dir = index_dir
         self.panel_view_id = panel_view_id
         self.index = self._index_setup()
+        self.parser = MultifieldParser(SEARCH_FIELDS, schema=self.schema, group=OrGroup)
+        self._searcher: Optional[Searcher] = None
+        self._searcher_k1: Optional[float] = None
+        self._searcher_lock = Lock()
 
     def _index_setup(self) -> index.Index:
         """Get or create a reference to the index."""
         return get_or_create_index(self.index_dir, self.schema)
 
-    def build_index(self, tool_cache, toolbox, index_help: bool = True) -> None:
-        """Prepare search index for tools loaded in toolbox.
+    def build_index(
+        self, tool_cache, toolbox, index_help: bool = True, document_hashes: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Update the search index for tools loaded in toolbox.
 
-        Use `tool_cache` to determine which tools need indexing and which
-        should be removed.
+        The index on disk is shared by all Galaxy processes, it is updated
+        while holding the index write lock. Only documents of tools whose
+        hash differs from the hash stored in the index are (re)indexed, and
+        documents of tools no longer in the panel view are removed.
         """
-        log.debug(f"Starting to build toolbox index of panel {self.panel_view_id}.")
+        log.debug(f"Starting to update toolbox index of panel {self.panel_view_id}.")
         execution_timer = ExecutionTimer()
-
-        with self.index.reader() as reader:
-            # Index ocasionally contains empty stored fields
-            self.indexed_tool_ids = {f["id"] for f in reader.all_stored_fields() if f}
-
-        tool_ids_to_remove = self._get_tools_to_remove(tool_cache)
-        tools_to_index = self._get_tool_list(
-            toolbox,
-            tool_cache,
-        )
-
-        with AsyncWriter(self.index) as writer:
+        if document_hashes is None:
+            document_hashes = {}
+        tools_to_index = self._get_tool_list(toolbox, tool_cache)
+
+        writer = self.index.writer(timeout=INDEX_WRITER_TIMEOUT)
+        try:
+            with writer.reader() as reader:
+                # Index ocasionally contains empty stored fields
+                indexed_hashes = {f["id"]: f.get("content_hash") for f in reader.all_stored_fields() if f}
+            self.indexed_tool_ids = set(indexed_hashes)
+            tool_ids_to_remove = self.indexed_tool_ids - set(tools_to_index)
             for tool_id in tool_ids_to_remove:
                 writer.delete_by_term("id", tool_id)
-            for tool in tools_to_index:
-                add_doc_kwds = self._create_doc(
-                    tool=tool,
-                    index_help=index_help,
-                )
+            updated = 0
+            for tool_id, tool in tools_to_index.items():
+                if tool_id not in document_hashes:
+                    document_hashes[tool_id] = tool_document_hash(tool, index_help)
+                content_hash = document_hashes[tool_id]
+                if indexed_hashes.get(tool_id) == content_hash:
+                    continue
+                add_doc_kwds = self._create_doc(tool=tool, index_help=index_help)
+                add_doc_kwds["content_hash"] = content_hash
                 # Add tool document to index (or overwrite if existing)
                 writer.update_document(**add_doc_kwds)
-
-        log.debug("Toolbox index of panel %s finished %s", self.panel_view_id, execution_timer)
-
-    def _get_tools_to_remove(self, tool_cache) -> list:
-        """Return list of tool IDs to be removed from index."""
-        tool_ids_to_remove = (self.indexed_tool_ids - set(tool_cache._tool_paths_by_id.keys())).union(
-            tool_cache._removed_tool_ids
+                updated += 1
+        except BaseException:
+            writer.cancel()
+            raise
+        if updated or tool_ids_to_remove:
+            writer.commit()
+        else:
+            # Don't create a new index generation readers would have to reopen
+            writer.cancel()
+
+        log.debug(
+            "Toolbox index of panel %s finished, %d documents updated and %d removed %s",
+            self.panel_view_id,
+            updated,
+            len(tool_ids_to_remove),
+            execution_timer,
         )
 
-        for indexed_tool_id in self.indexed_tool_ids:
-            indexed_tool = tool_cache.get_tool_by_id(indexed_tool_id)
-            if indexed_tool:
-                if indexed_tool.is_latest_version:
-                    continue
-                latest_version = indexed_tool.latest_version
-                if latest_version and latest_version.hidden:
-                    continue
-            tool_ids_to_remove.add(indexed_tool_id)
-
-        return list(tool_ids_to_remove)
-
-    def _get_tool_list(self, toolbox, tool_cache) -> list:
-        """Return list of tools to add and remove from index."""
-        tools_to_index = []
-
-        for tool_id in tool_cache._new_tool_ids - self.indexed_tool_ids:
-            tool = toolbox.get_tool(tool_id)
-            if tool and tool.is_latest_version and toolbox.panel_has_tool(tool, self.panel_view_id):
-                if tool.hidden:
-                    # Check if there is an older tool we can return
-                    if tool.lineage:
-                        tool_versions = reversed(tool.lineage.get_versions())
-                        for tool_version in tool_versions:
-                            tool = tool_cache.get_tool_by_id(tool_version.id)
-                            if tool and not tool.hidden:
-                                break
-                    else:
-                        continue
-                tools_to_index.append(tool)
-
-        return tools_to_index
+    def _get_tool_list(self, toolbox, tool_cache) -> Dict[str, Any]:
+        """Return the tools that should be in the index of the panel view, by id."""
+        return {
+            tool.id: tool
+            for latest_tool, tool in indexable_tools(toolbox, tool_cache)
+            if toolbox.panel_has_tool(latest_tool, self.panel_view_id)
+        }
 
     def _create_doc(
         self,
         tool,
         index_help: bool = True,
     ) -> Dict[str, str]:
-        def clean(string):
-            """Remove hyphens as they are Whoosh wildcards."""
-            if "-" in string:
-                return (" ").join(token.text for token in self.rex(unicodify(tool.name)))
-            else:
-                return string
-
-        if tool.tool_type == "manage_data":
-            #  Do not add data managers to the public index
-            return {}
-        add_doc_kwds = {
-            "id": unicodify(tool.id),
-            "id_exact": unicodify(tool.id),
-            "name": clean(tool.name),
-            "description": unicodify(tool.description),
-            "section": unicodify(tool.get_panel_section()[1] if len(tool.get_panel_section()) == 2 else ""),
-            "edam_operations": clean(tool.edam_operations),
-            "edam_topics": clean(tool.edam_topics),
-            "repository": unicodify(tool.repository_name),
-            "owner": unicodify(tool.repository_owner),
-            "help": unicodify(""),
-        }
-        if tool.guid:
-            # Create a stub consisting of owner, repo, and tool from guid
-            slash_indexes = [m.start() for m in re.finditer("/", tool.guid)]
-            id_stub = tool.guid[(slash_indexes[1] + 1) : slash_indexes[4]]
-            add_doc_kwds["stub"] = clean(id_stub)
-        else:
-            add_doc_kwds["stub"] = unicodify(id)
-        if tool.labels:
-            add_doc_kwds["labels"] = unicodify(" ".join(tool.labels))
-        if index_help:
-            raw_help = tool.raw_help
-            if raw_help:
-                try:
-                    add_doc_kwds["help"] = unicodify(raw_help)
-                except Exception:
-                    # Don't fail to build index when help fails to parse
-                    pass
-
-        add_doc_kwds["name_exact"] = add_doc_kwds["name"]
-
-        return add_doc_kwds
+        return create_tool_document(tool, index_help=index_help)
 
     def search(
         self,
         q: str,
         config: GalaxyAppConfiguration,
     ) -> List[str]:
-        """Perform search on the in-memory index."""
-        # Change field boosts for searcher
-        self.searcher = self.index.searcher(
-            weighting=MultiWeighting(
-                Frequency(),
-                help=BM25F(K1=config.tool_help_bm25f_k1),
-            )
-        )
-        fields = [
-            "id",
-            "id_exact",
-            "name",
-            "name_exact",
-            "description",
-            "section",
-            "edam_operations",
-            "edam_topics",
-            "repository",
-            "owner",
-            "help",
-            "labels",
-            "stub",
-        ]
-        self.parser = MultifieldParser(
-            fields,
-            schema=self.schema,
-            group=OrGroup,
-        )
-        parsed_query = self.parser.parse(q)
-        hits = self.searcher.search(
-            parsed_query,
+        """Perform search on the index.
+
+        The searcher is reused until another process updates the index.
+        """
+        hits = self._get_searcher(config).search(
+            self.parser.parse(q),
             limit=None,
             sortedby="",
             terms=True,
         )
 
         return [hit["id"] for hit in hits]
+
+    def _get_searcher(self, config: GalaxyAppConfiguration) -> Searcher:
+        k1 = config.tool_help_bm25f_k1
+        with self._searcher_lock:
+            searcher = self._searcher
+            if (
+                searcher is None
+                or self._searcher_k1 != k1
+                or searcher.reader().generation() != self.index.latest_generation()
+            ):
+                # Change field boosts for searcher. The previous searcher may
+                # still be in use by other threads, it is closed once unreferenced.
+                searcher = self.index.searcher(
+                    weighting=MultiWeighting(
+                        Frequency(),
+                        help=BM25F(K1=k1),
+                    )
+                )
+                self._searcher = searcher
+                self._searcher_k1 = k1
+        return searcher
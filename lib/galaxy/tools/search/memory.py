@@ -0,0 +1,248 @@
+"""
+In-memory tool search backend.
+
+The documents of all tools are analyzed with the fields of the Whoosh schema
+used by :class:`ToolPanelViewSearch`, so tools are tokenized, n-grammed,
+stemmed and boosted the same way, and the resulting posting lists are kept in
+memory as arrays of document numbers and precomputed weights. A search adds
+the weights of the posting lists matching the query terms, restricts the
+scores to the tools of the panel view and sorts the matching tools.
+
+Terms of fields that aren't n-grammed (e.g. description, EDAM terms and help)
+can also be matched by a prefix, so partially typed words find tools.
+
+Every Galaxy process builds its own index when the toolbox is loaded,
+documents of tools that haven't changed since the previous build are not
+analyzed again.
+"""
+
+import bisect
+import logging
+import math
+import re
+from array import array
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+import numpy as np
+from whoosh.fields import (
+    FieldType,
+    NGRAMWORDS,
+)
+
+from galaxy.config import GalaxyAppConfiguration
+from galaxy.util import ExecutionTimer
+from . import (
+    create_tool_document,
+    indexable_tools,
+    SEARCH_FIELDS,
+    tool_document_hash,
+    tool_search_schema,
+    ToolBoxSearch,
+)
+
+log = logging.getLogger(__name__)
+
+# Weight of terms matched by a prefix of the query term, relative to exact matches
+PREFIX_MATCH_FACTOR = 0.5
+# Minimum length of a query term to match terms by prefix, and maximum number of terms it matches
+PREFIX_MIN_LENGTH = 2
+PREFIX_MAX_TERMS = 64
+# BM25F length normalization of the help field, as in whoosh.scoring.BM25F
+BM25F_B = 0.75
+QUERY_WORDS_RE = re.compile(r"[^\s\"'()]+")
+
+# Terms and weights of the fields of a tool document
+AnalyzedDocument = Dict[str, List[Tuple[str, float]]]
+Postings = Tuple[np.ndarray, np.ndarray]
+
+
+class FieldIndex:
+    """Posting lists of one search field."""
+
+    def __init__(self, name: str, field_type: FieldType, postings: Dict[str, Postings]):
+        self.name = name
+        self.field_type = field_type
+        self.postings = postings
+        self.ngram = isinstance(field_type, NGRAMWORDS)
+        # Exact fields (id, name_exact) only match whole values
+        self.prefix = not self.ngram and name not in ("id", "name_exact")
+        self.terms = sorted(postings) if self.prefix else []
+
+    def query_terms(self, word: str) -> List[str]:
+        return list(self.field_type.process_text(word, mode="query"))
+
+    def matching_postings(self, term: str) -> List[Tuple[Postings, float]]:
+        """Return the posting lists of ``term`` and of the terms it is a prefix of, with their weight factor."""
+        matches = []
+        if term in self.postings:
+            matches.append((self.postings[term], 1.0))
+        if self.prefix and len(term) >= PREFIX_MIN_LENGTH:
+            start = bisect.bisect_right(self.terms, term)
+            for other_term in self.terms[start : start + PREFIX_MAX_TERMS]:
+                if not other_term.startswith(term):
+                    break
+                matches.append((self.postings[other_term], PREFIX_MATCH_FACTOR))
+        return matches
+
+
+class InMemoryToolIndex:
+    """Immutable index of the tools of a toolbox, replaced as a whole when the toolbox is reloaded."""
+
+    def __init__(
+        self,
+        tool_ids: List[str],
+        documents: List[AnalyzedDocument],
+        panel_views: Dict[str, np.ndarray],
+        config: GalaxyAppConfiguration,
+    ):
+        self.tool_ids = tool_ids
+        self.panel_views = panel_views
+        schema = tool_search_schema(config)
+        self.fields = {
+            name: FieldIndex(name, schema[name], self._field_postings(name, documents, config))
+            for name in SEARCH_FIELDS
+        }
+
+    @staticmethod
+    def _field_postings(name: str, documents: List[AnalyzedDocument], config) -> Dict[str, Postings]:
+        docnums: Dict[str, array] = {}
+        weights: Dict[str, array] = {}
+        for docnum, document in enumerate(documents):
+            for term, weight in document.get(name, []):
+                if term not in docnums:
+                    docnums[term] = array("I")
+                    weights[term] = array("f")
+                docnums[term].append(docnum)
+                weights[term].append(weight)
+        if name == "help" and docnums:
+            # Score help with BM25F like the Whoosh searcher, everything else by weighted frequency
+            k1 = config.tool_help_bm25f_k1
+            lengths = [sum(weight for _, weight in document.get(name, [])) for document in documents]
+            average_length = (sum(lengths) / len(lengths)) or 1.0
+            for term, term_docnums in docnums.items():
+                idf = math.log(len(documents) / (len(term_docnums) + 1)) + 1
+                term_weights = weights[term]
+                for i, docnum in enumerate(term_docnums):
+                    tf = term_weights[i]
+                    norm = (1 - BM25F_B) + BM25F_B * lengths[docnum] / average_length
+                    term_weights[i] = idf * (tf * (k1 + 1)) / (tf + k1 * norm)
+        return {
+            term: (np.frombuffer(docnums[term], dtype=np.uint32), np.frombuffer(weights[term], dtype=np.float32))
+            for term in docnums
+        }
+
+    def search(self, q: str, panel_view: str) -> List[str]:
+        mask = self.panel_views[panel_view]
+        scores = np.zeros(len(self.tool_ids), dtype=np.float32)
+        words = QUERY_WORDS_RE.findall(q)
+        for field in self.fields.values():
+            # Exact names can consist of several words
+            field_words = [*words, q.strip()] if field.name == "name_exact" and len(words) > 1 else words
+            for word in field_words:
+                self._score_word(field, word, scores)
+        matches = np.flatnonzero((scores > 0) & mask)
+        order = np.argsort(-scores[matches], kind="stable")
+        return [self.tool_ids[docnum] for docnum in matches[order]]
+
+    def _score_word(self, field: FieldIndex, word: str, scores: np.ndarray) -> None:
+        """Add the scores of the documents matching all terms of ``word`` in ``field``."""
+        terms = field.query_terms(word)
+        if not terms:
+            return
+        if len(terms) == 1:
+            for (docnums, weights), factor in field.matching_postings(terms[0]):
+                scores[docnums] += weights * factor
+            return
+        word_scores = np.zeros_like(scores)
+        matched = np.ones(len(scores), dtype=bool)
+        for term in terms:
+            term_scores = np.zeros_like(scores)
+            for (docnums, weights), factor in field.matching_postings(term):
+                term_scores[docnums] += weights * factor
+            matched &= term_scores > 0
+            word_scores += term_scores
+        scores += word_scores * matched
+
+
+class InMemoryToolBoxSearch(ToolBoxSearch):
+    """Search tools of all panel views using an in-memory index of the toolbox."""
+
+    shared_index = False
+
+    def __init__(self, toolbox, index_help: bool = True):
+        self.panel_view_ids = [panel_view.id for panel_view in toolbox.panel_views()]
+        self.index_help = index_help
+        self.index: Optional[InMemoryToolIndex] = None
+        # Analyzed documents and their hashes by tool id, reused for unchanged tools.
+        self._documents: Dict[str, Tuple[str, AnalyzedDocument]] = {}
+        self.index_count = -1
+
+    def build_index(self, tool_cache, toolbox, index_help: bool = True) -> None:
+        self.index_count += 1
+        execution_timer = ExecutionTimer()
+        index_help = index_help and self.index_help
+        config = toolbox.app.config
+        schema = tool_search_schema(config)
+        panel_view_ids = [panel_view.id for panel_view in toolbox.panel_views()]
+        tool_ids: List[str] = []
+        documents: List[AnalyzedDocument] = []
+        panel_views: Dict[str, List[bool]] = {panel_view_id: [] for panel_view_id in panel_view_ids}
+        previous_documents, self._documents = self._documents, {}
+        docnums: Dict[str, int] = {}
+        analyzed = 0
+        for latest_tool, tool in indexable_tools(toolbox, tool_cache):
+            if tool.id in docnums:
+                # An older version indexed in place of a hidden tool
+                for panel_view_id in panel_view_ids:
+                    if toolbox.panel_has_tool(latest_tool, panel_view_id):
+                        panel_views[panel_view_id][docnums[tool.id]] = True
+                continue
+            content_hash = tool_document_hash(tool, index_help)
+            previous = previous_documents.get(tool.id)
+            if previous and previous[0] == content_hash:
+                document = previous[1]
+            else:
+                document = self._analyze(schema, create_tool_document(tool, index_help=index_help))
+                analyzed += 1
+            self._documents[tool.id] = (content_hash, document)
+            docnums[tool.id] = len(tool_ids)
+            tool_ids.append(tool.id)
+            documents.append(document)
+            for panel_view_id in panel_view_ids:
+                panel_views[panel_view_id].append(toolbox.panel_has_tool(latest_tool, panel_view_id))
+        self.index = InMemoryToolIndex(
+            tool_ids,
+            documents,
+            {panel_view_id: np.array(in_view, dtype=bool) for panel_view_id, in_view in panel_views.items()},
+            config,
+        )
+        self.panel_view_ids = panel_view_ids
+        log.debug(
+            "In-memory tool search index built, %d of %d tools analyzed %s", analyzed, len(tool_ids), execution_timer
+        )
+
+    @staticmethod
+    def _analyze(schema, tool_document: Dict[str, Any]) -> AnalyzedDocument:
+        return {
+            name: [(term.decode("utf-8"), weight) for term, _, weight, _ in schema[name].index(value)]
+            for name, value in tool_document.items()
+            if name in SEARCH_FIELDS and value
+        }
+
+    def search(self, *args, **kwd) -> List[str]:
+        panel_view = kwd.pop("panel_view")
+        if panel_view not in self.panel_view_ids:
+            raise KeyError(f"Unknown panel_view specified {panel_view}")
+        return self._search(panel_view, *args, **kwd)
+
+    def _search(self, panel_view: str, q: str, config: Optional[GalaxyAppConfiguration] = None) -> List[str]:
+        index = self.index
+        if index is None or panel_view not in index.panel_views:
+            return []
+        return index.search(q, panel_view)
@@ -129,6 +129,16 @@ class FastAPIConfiguration:
         """Return tool lineages for tools that have them."""
         return self.configuration_manager.tool_lineages()
 
+    @router.get(
+        "/api/configuration/toolbox/memory",
+        require_admin=True,
+        summary="Return the memory used by the tools of the toolbox",
+        response_description="Number of loaded tools and memory used by fully loaded lazy tools",
+    )
+    def tool_memory_usage(self) -> Dict[str, Any]:
+        """Return the number of loaded tools and the estimated memory used by fully loaded lazy tools."""
+        return self.configuration_manager.tool_memory_usage()
+
     @router.put(
         "/api/configuration/toolbox", require_admin=True, summary="Reload the Galaxy toolbox (but not individual tools)"
     )
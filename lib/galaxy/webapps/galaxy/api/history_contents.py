@@ -3,6 +3,7 @@ API operations on the contents of a history.
 """
 
 import logging
+from datetime import datetime
 from typing import (
     List,
     Literal,
@@ -180,18 +181,39 @@ def get_index_query_params(
         ),
         deprecated=True,  # TODO: remove 'dataset_details' when the UI doesn't need it
     ),
+    after_hid: Optional[int] = Query(
+        default=None,
+        title="After HID",
+        description=(
+            "Only return contents following the item with this `hid` in the requested order. "
+            "Pass the `hid` of the last item of the previous page instead of an `offset` to page through "
+            "large histories. Only `hid` and `update_time` ordering are supported."
+        ),
+    ),
+    after_update_time: Optional[datetime] = Query(
+        default=None,
+        title="After Update Time",
+        description=(
+            "The `update_time` of the last item of the previous page, required together with `after_hid` "
+            "when ordering by `update_time`."
+        ),
+    ),
 ) -> HistoryContentsIndexParams:
     """This function is meant to be used as a dependency to render the OpenAPI documentation
     correctly"""
     return parse_index_query_params(
         v=v,
         dataset_details=dataset_details,
+        after_hid=after_hid,
+        after_update_time=after_update_time,
     )
 
 
 def parse_index_query_params(
     v: Optional[str] = None,
     dataset_details: Optional[str] = None,
+    after_hid: Optional[int] = None,
+    after_update_time: Optional[datetime] = None,
     **_,  # Additional params are ignored
 ) -> HistoryContentsIndexParams:
     """Parses query parameters for the history contents `index` operation
@@ -200,6 +222,8 @@ def parse_index_query_params(
         return HistoryContentsIndexParams(
             v=v,
             dataset_details=parse_dataset_details(dataset_details),
+            after_hid=after_hid,
+            after_update_time=after_update_time,
         )
     except ValidationError as e:
         raise validation_error_to_message_exception(e)
@@ -260,6 +260,7 @@ class LibraryDatasetsController(BaseGalaxyAPIController, UsesVisualizationMixin,
         elif action == "make_private":
             if not trans.app.security_agent.dataset_is_private_to_user(trans, dataset):
                 private_role = trans.app.security_agent.get_private_user_role(trans.user)
+                trans.app.security_agent.invalidate_dataset_permissions(dataset)
                 dp = trans.app.model.DatasetPermissions(
                     trans.app.security_agent.permitted_actions.DATASET_ACCESS.action, dataset, private_role
                 )
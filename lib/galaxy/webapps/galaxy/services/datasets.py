@@ -350,10 +350,19 @@ class DatasetsService(ServiceBase, UsesVisualizationMixin):
             filters=filters,
             user_id=user.id,
         )
+        permission_resolver = trans.app.security_agent.permission_resolver(user)
+        permission_resolver.prefetch(
+            content.dataset for content in contents if content.history_content_type == "dataset"
+        )
         return (
             [
                 self.serializer_by_type[content.history_content_type].serialize_to_view(
-                    content, user=user, trans=trans, encode_id=False, **serialization_params.model_dump()
+                    content,
+                    user=user,
+                    trans=trans,
+                    encode_id=False,
+                    permission_resolver=permission_resolver,
+                    **serialization_params.model_dump(),
                 )
                 for content in contents
             ],
@@ -638,9 +647,9 @@ class DatasetsService(ServiceBase, UsesVisualizationMixin):
                     file_path = object_store.get_filename(
                         dataset_instance.dataset, extra_dir=dir_name, alt_name=filename
                     )
+                    rval = open(file_path, "rb")
                 else:
-                    file_path = dataset_instance.get_file_name()
-                rval = open(file_path, "rb")
+                    rval = dataset_instance.dataset.open_file()
             else:
                 if offset is not None:
                     kwd["offset"] = offset
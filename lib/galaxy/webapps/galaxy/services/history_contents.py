@@ -1,6 +1,7 @@
 import logging
 import os
 import re
+from datetime import datetime
 from typing import (
     Any,
     cast,
@@ -52,6 +53,7 @@ from galaxy.managers.genomes import GenomesManager
 from galaxy.managers.history_contents import (
     HistoryContentsFilters,
     HistoryContentsManager,
+    HistoryDatasetSummary,
 )
 from galaxy.managers.jobs import (
     fetch_job_states,
@@ -66,7 +68,10 @@ from galaxy.model import (
     User,
 )
 from galaxy.model.base import transaction
-from galaxy.model.security import GalaxyRBACAgent
+from galaxy.model.security import (
+    DatasetPermissionResolver,
+    GalaxyRBACAgent,
+)
 from galaxy.objectstore import BaseObjectStore
 from galaxy.schema import (
     FilterQueryParams,
@@ -141,6 +146,8 @@ class HistoryContentsIndexParams(Model):
 
     v: Optional[Literal["dev"]]
     dataset_details: Optional[DatasetDetailsType]
+    after_hid: Optional[int] = None
+    after_update_time: Optional[datetime] = None
 
 
 class LegacyHistoryContentsIndexParams(Model):
@@ -989,20 +996,46 @@ class HistoriesContentsService(ServiceBase, ServesExportStores, ConsumesModelSto
         serialization_params = self._handle_extra_serialization_for_media_type(serialization_params, accept)
         filter_query_params.order = filter_query_params.order or "hid-asc"
         order_by = self.build_order_by(self.history_contents_manager, filter_query_params.order)
-        contents = self.history_contents_manager.contents(
-            history,
+        keyset_filter = None
+        if params.after_hid is not None:
+            order_by, keyset_filter = self.history_contents_manager.parse_keyset(
+                filter_query_params.order, params.after_hid, params.after_update_time
+            )
+        # The default summary view can be serialized without loading the datasets as models
+        summaries_only = (
+            not params.dataset_details
+            and serialization_params.view in (None, "summary")
+            and not serialization_params.keys
+            and not self.history_contents_filters.contains_non_orm_filter(filters)
+        )
+        permission_resolver = trans.app.security_agent.permission_resolver(
+            trans.user, roles=trans.get_current_user_roles()
+        )
+        contents_kwargs = dict(
             filters=filters,
             limit=filter_query_params.limit,
             offset=filter_query_params.offset,
             order_by=order_by,
+            keyset_filter=keyset_filter,
             serialization_params=serialization_params,
         )
+        if summaries_only:
+            # The permissions of the summarized datasets are loaded through the resolver
+            contents = self.history_contents_manager.contents_summaries(
+                history, permission_resolver=permission_resolver, **contents_kwargs
+            )
+        else:
+            contents = self.history_contents_manager.contents(history, **contents_kwargs)
+            permission_resolver.prefetch(
+                content.dataset for content in contents if content.history_content_type == "dataset"
+            )
         items = [
             self._serialize_content_item(
                 trans,
                 content,
                 dataset_details=params.dataset_details,
                 serialization_params=serialization_params,
+                permission_resolver=permission_resolver,
             )
             for content in contents
         ]
@@ -1050,6 +1083,7 @@ class HistoriesContentsService(ServiceBase, ServesExportStores, ConsumesModelSto
         dataset_details: Optional[DatasetDetailsType],
         serialization_params: SerializationParams,
         default_view: str = "summary",
+        permission_resolver: Optional[DatasetPermissionResolver] = None,
     ):
         """
         Returns a dictionary with the appropriate values depending on the
@@ -1059,7 +1093,7 @@ class HistoriesContentsService(ServiceBase, ServesExportStores, ConsumesModelSto
         view = serialization_params_dict.pop("view", default_view) or default_view
 
         serializer: Optional[ModelSerializer] = None
-        if isinstance(content, HistoryDatasetAssociation):
+        if isinstance(content, (HistoryDatasetAssociation, HistoryDatasetSummary)):
             serializer = self.hda_serializer
             if dataset_details and (dataset_details == "all" or content.id in dataset_details):
                 view = "detailed"
@@ -1070,7 +1104,13 @@ class HistoriesContentsService(ServiceBase, ServesExportStores, ConsumesModelSto
             raise exceptions.UnknownContentsType(f"Unknown contents type: {content.content_type}")
 
         rval = serializer.serialize_to_view(
-            content, user=trans.user, trans=trans, view=view, encode_id=False, **serialization_params_dict
+            content,
+            user=trans.user,
+            trans=trans,
+            view=view,
+            encode_id=False,
+            permission_resolver=permission_resolver,
+            **serialization_params_dict,
         )
         # Override URL generation to use UrlBuilder
         if trans.url_builder:
@@ -12,7 +12,10 @@ from galaxy.managers.context import ProvidesUserContext
 from galaxy.managers.folders import FolderManager
 from galaxy.managers.hdas import HDAManager
 from galaxy.model import tags
-from galaxy.model.security import GalaxyRBACAgent
+from galaxy.model.security import (
+    DatasetPermissionResolver,
+    GalaxyRBACAgent,
+)
 from galaxy.schema.fields import LibraryFolderDatabaseIdField
 from galaxy.schema.schema import (
     AnyLibraryFolderItem,
@@ -74,13 +77,20 @@ class LibraryFolderContentsService(ServiceBase, UsesLibraryMixinItems):
 
         folder_contents: List[AnyLibraryFolderItem] = []
         contents, total_rows = self.folder_manager.get_contents(trans, folder, payload)
+        security_agent: GalaxyRBACAgent = trans.app.security_agent
+        permission_resolver = security_agent.permission_resolver(trans.user, roles=current_user_roles)
+        permission_resolver.prefetch(
+            content_item.library_dataset_dataset_association.dataset
+            for content_item in contents
+            if isinstance(content_item, model.LibraryDataset)
+        )
         for content_item in contents:
             if isinstance(content_item, model.LibraryFolder):
                 folder_contents.append(self._serialize_library_folder(user_permissions, content_item))
 
             elif isinstance(content_item, model.LibraryDataset):
                 folder_contents.append(
-                    self._serialize_library_dataset(trans, current_user_roles, tag_manager, content_item)
+                    self._serialize_library_dataset(trans, permission_resolver, tag_manager, content_item)
                 )
 
         metadata = self._serialize_library_folder_metadata(trans, folder, user_permissions, total_rows)
@@ -153,16 +163,15 @@ class LibraryFolderContentsService(ServiceBase, UsesLibraryMixinItems):
     def _serialize_library_dataset(
         self,
         trans: ProvidesUserContext,
-        current_user_roles: List[model.Role],
+        permission_resolver: DatasetPermissionResolver,
         tag_manager: tags.GalaxyTagHandler,
         library_dataset: model.LibraryDataset,
     ) -> FileLibraryFolderItem:
-        security_agent = trans.app.security_agent
         is_admin = trans.user_is_admin
         ldda = library_dataset.library_dataset_dataset_association
         dataset = ldda.dataset
         #  Access rights are checked on the dataset level, not on the ld or ldda level to maintain consistency
-        is_unrestricted = security_agent.dataset_is_public(dataset)
+        is_unrestricted = permission_resolver.dataset_is_public(dataset)
         raw_size = int(ldda.get_size())
         library_dataset_dict = library_dataset.to_dict()
         dataset_item = FileLibraryFolderItem(
@@ -171,14 +180,14 @@ class LibraryFolderContentsService(ServiceBase, UsesLibraryMixinItems):
             type="file",
             create_time=library_dataset.create_time.isoformat(),
             update_time=ldda.update_time.isoformat(),
-            can_manage=is_admin or bool(trans.user and security_agent.can_manage_dataset(current_user_roles, dataset)),
+            can_manage=is_admin or bool(trans.user and permission_resolver.can_manage_dataset(dataset)),
             deleted=library_dataset.deleted,
             file_ext=library_dataset_dict["file_ext"],
             date_uploaded=library_dataset_dict["date_uploaded"],
             #  Is the dataset public or private?
             #  When both are False the dataset is 'restricted'
             is_unrestricted=is_unrestricted,
-            is_private=not is_unrestricted and trans.user and security_agent.dataset_is_private_to_user(trans, dataset),
+            is_private=not is_unrestricted and trans.user and permission_resolver.dataset_is_private_to_user(dataset),
             state=library_dataset_dict["state"],
             file_size=util.nice_size(raw_size),
             raw_size=raw_size,
@@ -222,6 +222,7 @@ class WorkflowInvoker:
                 )
             )
 
+        iteration_timer = ExecutionTimer()
         remaining_steps = self.progress.remaining_steps()
         delayed_steps = False
         max_jobs_per_iteration_reached = False
@@ -244,6 +245,7 @@ class WorkflowInvoker:
                     workflow_invocation_step.state = "new"
 
                     workflow_invocation.steps.append(workflow_invocation_step)
+                    self.progress.step_invocations_by_step_id[step.id] = workflow_invocation_step
 
                 assert workflow_invocation_step
                 incomplete_or_none = self._invoke_step(workflow_invocation_step)
@@ -284,6 +286,13 @@ class WorkflowInvoker:
         else:
             state = model.WorkflowInvocation.states.SCHEDULED
         workflow_invocation.set_state(state)
+        log.debug(
+            "Workflow invocation [%s] scheduling iteration complete, %d steps remaining, outputs of %d previously scheduled steps loaded %s",
+            workflow_invocation.id,
+            len(remaining_steps),
+            self.progress.recovered_step_count,
+            iteration_timer,
+        )
 
         # All jobs ran successfully, so we can save now
         self.trans.sa_session.add(workflow_invocation)
@@ -303,7 +312,7 @@ class WorkflowInvoker:
                 self.__check_implicitly_dependent_step(output_id, step.id)
 
     def __check_implicitly_dependent_step(self, output_id: int, step_id: int):
-        step_invocation = self.workflow_invocation.step_invocation_for_step_id(output_id)
+        step_invocation = self.progress.step_invocations_by_step_id.get(output_id)
 
         # No steps created yet - have to delay evaluation.
         if not step_invocation:
@@ -344,6 +353,10 @@ class WorkflowInvoker:
 
 
 STEP_OUTPUT_DELAYED = object()
+# Types of steps whose outputs are recovered from the database (using the
+# default WorkflowModule.recover_mapping) without side effects on the
+# progress, these are only loaded once a step scheduled later needs them.
+LAZILY_RECOVERED_STEP_TYPES = ("tool", "subworkflow")
 
 
 class ModuleInjector(Protocol):
@@ -387,6 +400,11 @@ class WorkflowProgress:
         self.subworkflow_collection_info = subworkflow_collection_info
         self.subworkflow_structure = subworkflow_collection_info.structure if subworkflow_collection_info else None
         self.when_values = when_values
+        self.step_invocations_by_step_id: Dict[int, WorkflowInvocationStep] = {}
+        # Steps scheduled in previous iterations whose outputs haven't been loaded yet.
+        self._unrecovered_steps: Dict[int, WorkflowInvocationStep] = {}
+        self._step_states: Dict[int, model.WorkflowRequestStepState] = {}
+        self.recovered_step_count = 0
 
     @property
     def maximum_jobs_to_schedule_or_none(self) -> Optional[int]:
@@ -401,35 +419,58 @@ class WorkflowProgress:
     def remaining_steps(
         self,
     ) -> List[Tuple["WorkflowStep", Optional[WorkflowInvocationStep]]]:
+        """Return steps that haven't been scheduled yet, with their invocation step if one exists.
+
+        Only these steps (and scheduled steps whose outputs can't be recovered
+        lazily) get their module and runtime state populated, so the work done
+        on each scheduling iteration grows with the steps left to schedule
+        rather than with the size of the workflow.
+        """
         # Previously computed and persisted step states.
-        step_states = self.workflow_invocation.step_states_by_step_id()
-        steps = self.workflow_invocation.workflow.steps
+        self._step_states = self.workflow_invocation.step_states_by_step_id()
+        workflow = self.workflow_invocation.workflow
+        steps = workflow.steps
 
-        # TODO: Wouldn't a generator be much better here so we don't have to reason about
-        # steps we are no where near ready to schedule?
         remaining_steps = []
         step_invocations_by_id = self.workflow_invocation.step_invocations_by_step_id()
-        self.module_injector.inject_all(self.workflow_invocation.workflow, param_map=self.param_map)
+        self.step_invocations_by_step_id = step_invocations_by_id
         for step in steps:
-            step_id = step.id
-            step_args = self.param_map.get(step_id, {})
-            self.module_injector.compute_runtime_state(step, step_args=step_args)
-            if step_id not in step_states:
-                # Can this ever happen?
-                public_message = f"Workflow invocation has no step state for step {step.order_index + 1}"
-                log.error(f"{public_message}. State is known for these step ids: {list(step_states.keys())}.")
-                raise MessageException(public_message)
-            runtime_state = step_states[step_id].value
-            assert step.module
-            step.state = step.module.decode_runtime_state(step, runtime_state)
-
-            invocation_step = step_invocations_by_id.get(step_id, None)
-            if invocation_step and invocation_step.state == "scheduled":
+            invocation_step = step_invocations_by_id.get(step.id, None)
+            scheduled = invocation_step is not None and invocation_step.state == "scheduled"
+            if scheduled and step.type in LAZILY_RECOVERED_STEP_TYPES:
+                assert invocation_step
+                self._unrecovered_steps[step.id] = invocation_step
+                continue
+            self._populate_step(step, steps)
+            if scheduled:
+                assert invocation_step
                 self._recover_mapping(invocation_step)
             else:
                 remaining_steps.append((step, invocation_step))
         return remaining_steps
 
+    def _populate_step(self, step, steps) -> None:
+        step_id = step.id
+        step_args = self.param_map.get(step_id, {})
+        self.module_injector.inject(step, steps=steps, step_args=step_args)
+        self.module_injector.compute_runtime_state(step, step_args=step_args)
+        if step_id not in self._step_states:
+            # Can this ever happen?
+            public_message = f"Workflow invocation has no step state for step {step.order_index + 1}"
+            log.error(f"{public_message}. State is known for these step ids: {list(self._step_states.keys())}.")
+            raise MessageException(public_message)
+        runtime_state = self._step_states[step_id].value
+        assert step.module
+        step.state = step.module.decode_runtime_state(step, runtime_state)
+
+    def _recover_step_outputs(self, step_id: int) -> None:
+        """Load the outputs of a step scheduled in a previous iteration, if not yet loaded."""
+        invocation_step = self._unrecovered_steps.pop(step_id, None)
+        if invocation_step is not None:
+            self._populate_step(invocation_step.workflow_step, self.workflow_invocation.workflow.steps)
+            self._recover_mapping(invocation_step)
+            self.recovered_step_count += 1
+
     def replacement_for_input(self, trans, step: "WorkflowStep", input_dict: Dict[str, Any]):
         replacement: Union[
             modules.NoReplacement,
@@ -470,6 +511,7 @@ class WorkflowProgress:
     def replacement_for_connection(self, connection: "WorkflowStepConnection", is_data: bool = True):
         output_step_id = connection.output_step.id
         output_name = connection.output_name
+        self._recover_step_outputs(output_step_id)
         if output_step_id not in self.outputs:
             raise modules.FailWorkflowEvaluation(
                 why=InvocationFailureOutputNotFound(
@@ -553,6 +595,7 @@ class WorkflowProgress:
     def get_replacement_workflow_output(self, workflow_output: "WorkflowOutput"):
         step = workflow_output.workflow_step
         output_name = workflow_output.output_name
+        self._recover_step_outputs(step.id)
         step_outputs = self.outputs[step.id]
         if step_outputs is STEP_OUTPUT_DELAYED:
             delayed_why = f"depends on workflow output [{output_name}] but that output has not been created yet"
@@ -7,6 +7,11 @@ from galaxy import model
 from galaxy.exceptions import HandlerAssignmentError
 from galaxy.jobs.handler import InvocationGrabber
 from galaxy.model.base import transaction
+from galaxy.model.database_notify import (
+    monitor_sleep_interval,
+    MonitorWakeup,
+    WORKFLOW_INVOCATION_CHANNEL,
+)
 from galaxy.schema.invocation import (
     FailureReason,
     InvocationFailureDatasetFailed,
@@ -23,6 +28,7 @@ from galaxy.util.monitors import Monitors
 from galaxy.util.xml_macros import load
 from galaxy.web_stack.handlers import ConfiguresHandlers
 from galaxy.web_stack.message import WorkflowSchedulingMessage
+from galaxy.workflow.scheduling_pool import InvocationSchedulingPool
 
 log = get_logger(__name__)
 
@@ -308,10 +314,19 @@ class WorkflowRequestMonitor(Monitors):
                 self_handler_tags=self_handler_tags,
                 handler_tags=self_handler_tags,
             )
+        self.self_handler_tags = self_handler_tags
+        self.notification_listener = getattr(app, "database_notification_listener", None)
+        self.notification_wakeup = None
+        self.scheduling_pool = None
+        if app.config.workflow_scheduling_workers:
+            self.scheduling_pool = InvocationSchedulingPool(
+                app.config.workflow_scheduling_workers, app.execution_timer_factory.get_timer
+            )
 
     def __monitor(self):
         to_monitor = self.workflow_scheduling_manager.active_workflow_schedulers
         while self.monitor_running:
+            wake_to_schedule_timer = self.notification_wakeup.pop_timer() if self.notification_wakeup else None
             try:
                 if self.invocation_grabber:
                     self.invocation_grabber.grab_unhandled_items()
@@ -326,11 +341,37 @@ class WorkflowRequestMonitor(Monitors):
 
                     self.__schedule(workflow_scheduler_id, workflow_scheduler)
                 log.trace(monitor_step_timer.to_str())
+                if wake_to_schedule_timer is not None:
+                    log.debug(wake_to_schedule_timer.to_str())
             except Exception:
                 log.exception("An exception occured scheduling while scheduling workflows")
-            self._monitor_sleep(self.app.config.workflow_monitor_sleep)
+            self._monitor_sleep(
+                monitor_sleep_interval(
+                    self.notification_listener,
+                    self.app.config.workflow_monitor_sleep,
+                    self.app.config.database_notifications_poll_interval,
+                )
+            )
+
+    def __notification_handler_tags(self):
+        return {self.app.config.server_name, *self.self_handler_tags}
 
     def __schedule(self, workflow_scheduler_id, workflow_scheduler):
+        if self.scheduling_pool:
+            invocations = model.WorkflowInvocation.poll_active_workflow_ids_and_users(
+                self.app.model.engine,
+                scheduler=workflow_scheduler_id,
+                handler=self.app.config.server_name,
+            )
+            submitted = self.scheduling_pool.submit(
+                invocations, partial(self.__attempt_schedule, workflow_scheduler=workflow_scheduler)
+            )
+            log.trace(
+                "Submitted %d workflow invocation(s) for scheduling, scheduling pool state %s",
+                submitted,
+                self.scheduling_pool.metrics(),
+            )
+            return
         invocation_ids = self.__active_invocation_ids(workflow_scheduler_id)
         for invocation_id in invocation_ids:
             log.debug("Attempting to schedule workflow invocation [%s]", invocation_id)
@@ -424,6 +465,19 @@ class WorkflowRequestMonitor(Monitors):
 
     def start(self):
         self.monitor_thread.start()
+        if self.notification_listener is not None:
+            self.notification_wakeup = MonitorWakeup(
+                self.sleeper,
+                handler_tags=self.__notification_handler_tags,
+                get_timer=partial(
+                    self.app.execution_timer_factory.get_timer,
+                    "internal.galaxy.workflows.scheduling_manager.wake_to_schedule",
+                    "Workflow scheduling manager monitor step after database notification complete.",
+                ),
+            )
+            self.notification_listener.subscribe(WORKFLOW_INVOCATION_CHANNEL, self.notification_wakeup)
 
     def shutdown(self):
         self.shutdown_monitor()
+        if self.scheduling_pool:
+            self.scheduling_pool.shutdown()
@@ -0,0 +1,149 @@
+"""
+Schedule independent workflow invocations of a handler concurrently.
+
+By default the workflow request monitor of a handler schedules its active
+invocations one after another, so a single slow invocation (e.g. one mapping
+over a large collection or materializing deferred inputs) delays the
+invocations of every other user on that handler. If
+``workflow_scheduling_workers`` is set, invocations are handed to an
+:class:`InvocationSchedulingPool` instead, which schedules up to that many
+invocations at once.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor,
+)
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+log = logging.getLogger(__name__)
+
+# Invocations waiting longer than this for a scheduling thread are reported as starved.
+STARVED_INVOCATION_SECONDS = 60.0
+
+ActiveInvocationsT = Sequence[Tuple[int, Optional[int]]]
+
+
+def fair_order(
+    invocations: ActiveInvocationsT,
+    last_served: Dict[Optional[int], float],
+    waiting_since: Dict[int, float],
+) -> List[Tuple[int, Optional[int]]]:
+    """Order ``(invocation_id, user_id)`` pairs round-robin across users.
+
+    Users whose invocations got a thread least recently come first, the
+    invocations of each user are ordered by how long they have been waiting.
+    """
+    by_user: Dict[Optional[int], List[int]] = {}
+    for invocation_id, user_id in invocations:
+        by_user.setdefault(user_id, []).append(invocation_id)
+    users = sorted(by_user, key=lambda user_id: last_served.get(user_id, 0.0))
+    for invocation_ids in by_user.values():
+        invocation_ids.sort(key=lambda invocation_id: (waiting_since.get(invocation_id, 0.0), invocation_id))
+    ordered = []
+    for row in itertools.zip_longest(*(by_user[user_id] for user_id in users)):
+        for user_id, invocation_id in zip(users, row):
+            if invocation_id is not None:
+                ordered.append((invocation_id, user_id))
+    return ordered
+
+
+class InvocationSchedulingPool:
+    """Bounded pool of threads scheduling workflow invocations.
+
+    An invocation is only ever scheduled by one thread at a time, and free
+    threads are handed out round-robin across the users owning the active
+    invocations.
+    """
+
+    def __init__(self, nworkers: int, get_timer: Callable):
+        self.nworkers = nworkers
+        self._get_timer = get_timer
+        self._executor = ThreadPoolExecutor(max_workers=nworkers, thread_name_prefix="WorkflowSchedulingPool")
+        self._lock = threading.Lock()
+        # Start time of invocations being scheduled.
+        self._running: Dict[int, float] = {}
+        # Time since active invocations are waiting for a thread.
+        self._waiting_since: Dict[int, float] = {}
+        # Last time a thread started scheduling an invocation of a user.
+        self._last_served: Dict[Optional[int], float] = {}
+        # Futures of invocations submitted to the executor, until they complete.
+        self._futures: Dict[int, Future] = {}
+
+    def submit(self, invocations: ActiveInvocationsT, schedule: Callable[[int], object]) -> int:
+        """Start scheduling active ``(invocation_id, user_id)`` pairs on free threads.
+
+        Returns the number of invocations submitted, invocations not submitted
+        are considered again on the next call.
+        """
+        now = time.monotonic()
+        with self._lock:
+            active_ids = {invocation_id for invocation_id, _ in invocations}
+            for invocation_id in list(self._waiting_since):
+                if invocation_id not in active_ids:
+                    del self._waiting_since[invocation_id]
+            waiting = [(i, user_id) for i, user_id in invocations if i not in self._running]
+            for invocation_id, _ in waiting:
+                self._waiting_since.setdefault(invocation_id, now)
+            free = self.nworkers - len(self._running)
+            selected = fair_order(waiting, self._last_served, self._waiting_since)[: max(free, 0)]
+            for invocation_id, user_id in selected:
+                self._running[invocation_id] = now
+                self._last_served[user_id] = now
+                waited = now - self._waiting_since.pop(invocation_id)
+                if waited > STARVED_INVOCATION_SECONDS:
+                    log.warning(
+                        "Workflow invocation [%s] waited %.1f seconds for a scheduling thread", invocation_id, waited
+                    )
+                self._futures[invocation_id] = self._executor.submit(self._run, invocation_id, schedule)
+        return len(selected)
+
+    def _run(self, invocation_id: int, schedule: Callable[[int], object]) -> None:
+        timer = self._get_timer(
+            "internal.galaxy.workflows.scheduling_manager.schedule_invocation",
+            "Workflow invocation [${invocation_id}] scheduling attempt complete.",
+        )
+        try:
+            schedule(invocation_id)
+        except Exception:
+            log.exception("Unhandled exception scheduling workflow invocation [%s]", invocation_id)
+        finally:
+            with self._lock:
+                del self._running[invocation_id]
+                self._futures.pop(invocation_id, None)
+                self._waiting_since[invocation_id] = time.monotonic()
+            log.debug(timer.to_str(invocation_id=invocation_id))
+
+    def metrics(self) -> Dict[str, float]:
+        """Return the current queue depth, running invocations and waiting times."""
+        now = time.monotonic()
+        with self._lock:
+            waits = [now - since for since in self._waiting_since.values()]
+            return {
+                "queue_depth": len(waits),
+                "running": len(self._running),
+                "max_wait_seconds": round(max(waits, default=0.0), 3),
+                "starved": sum(1 for wait in waits if wait > STARVED_INVOCATION_SECONDS),
+                "max_running_seconds": round(max((now - s for s in self._running.values()), default=0.0), 3),
+            }
+
+    def shutdown(self):
+        log.info("Shutting down workflow scheduling pool, %d invocation(s) being scheduled", len(self._running))
+        # Invocations are picked up again on the next startup. Cancel those not
+        # started yet by hand, shutdown only accepts cancel_futures on Python >= 3.9.
+        with self._lock:
+            futures = list(self._futures.values())
+        for future in futures:
+            future.cancel()
+        self._executor.shutdown(wait=True)
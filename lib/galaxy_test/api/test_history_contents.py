@@ -871,6 +871,25 @@ class TestHistoryContentsApi(ApiTestCase):
         contents_response = self._get(f"histories/{history_id}/contents?types=dataset&types=dataset_collection").json()
         assert len(contents_response) == expected_num_datasets + expected_num_collections
 
+    def test_index_keyset_pagination(self, history_id):
+        for _ in range(3):
+            self.dataset_populator.new_dataset(history_id)
+        self.dataset_collection_populator.create_list_in_history(history_id=history_id, wait=True)
+        contents = self._get(f"histories/{history_id}/contents?v=dev&order=hid-dsc").json()
+        hids = [c["hid"] for c in contents]
+
+        page = self._get(f"histories/{history_id}/contents?v=dev&order=hid-dsc&limit=2").json()
+        paged_hids = [c["hid"] for c in page]
+        while page:
+            page = self._get(
+                f"histories/{history_id}/contents?v=dev&order=hid-dsc&limit=2&after_hid={paged_hids[-1]}"
+            ).json()
+            paged_hids.extend(c["hid"] for c in page)
+        assert paged_hids == hids
+
+        response = self._get(f"histories/{history_id}/contents?v=dev&order=name-asc&after_hid=1")
+        self._assert_status_code_is(response, 400)
+
     def test_index_filter_by_name_ignores_case(self, history_id):
         self.dataset_populator.new_dataset(history_id, name="AC")
         self.dataset_populator.new_dataset(history_id, name="ac")
@@ -2386,6 +2386,14 @@ class WorkflowPopulator(GalaxyInteractorHttpMixin, BaseWorkflowPopulator, Import
             return self._scale_workflow_dict_two_outputs(**kwd)
         elif workflow_type == "wave_simple":
             return self._scale_workflow_dict_wave(**kwd)
+        elif workflow_type == "wide_wave":
+            return self._scale_workflow_dict_wide_wave(**kwd)
+        elif workflow_type == "fan_out":
+            return self._scale_workflow_dict_fan_out(**kwd)
+        elif workflow_type == "nested_subworkflow":
+            return self._scale_workflow_dict_nested_subworkflow(**kwd)
+        elif workflow_type == "conditional":
+            return self._scale_workflow_dict_conditional(**kwd)
         else:
             return self._scale_workflow_dict_simple(**kwd)
 
@@ -2462,6 +2470,117 @@ class WorkflowPopulator(GalaxyInteractorHttpMixin, BaseWorkflowPopulator, Import
         }
         return workflow_dict
 
+    def _scale_workflow_dict_wide_wave(self, **kwd) -> Dict[str, Any]:
+        # workflow_width independent branches of the wave workflow, each scheduling
+        # iteration only makes progress on a few steps of every branch.
+        collection_size = kwd.get("collection_size", 10)
+        workflow_depth = kwd.get("workflow_depth", 10)
+        workflow_width = kwd.get("workflow_width", 10)
+
+        scale_workflow_steps = [
+            {"tool_id": "create_input_collection", "state": {"collection_size": collection_size}, "label": "wf_input"},
+        ]
+        for branch in range(workflow_width):
+            scale_workflow_steps.append(
+                {
+                    "tool_id": "cat_list",
+                    "state": {"input1": self._link("wf_input", "output")},
+                    "label": f"branch_{branch}_step_1",
+                }
+            )
+            for i in range(workflow_depth):
+                step = i + 2
+                previous = f"branch_{branch}_step_{step - 1}"
+                if step % 2 == 1:
+                    step_dict = {"tool_id": "cat_list", "state": {"input1": self._link(previous, "output")}}
+                else:
+                    step_dict = {"tool_id": "split", "state": {"input1": self._link(previous, "out_file1")}}
+                step_dict["label"] = f"branch_{branch}_step_{step}"
+                scale_workflow_steps.append(step_dict)
+
+        workflow_dict = {
+            "class": "GalaxyWorkflow",
+            "inputs": {},
+            "steps": scale_workflow_steps,
+        }
+        return workflow_dict
+
+    def _scale_workflow_dict_fan_out(self, **kwd) -> Dict[str, Any]:
+        # workflow_width steps mapping over the same input collection, all ready in the first iteration.
+        collection_size = kwd.get("collection_size", 10)
+        workflow_width = kwd.get("workflow_width", 10)
+
+        scale_workflow_steps = [
+            {"tool_id": "create_input_collection", "state": {"collection_size": collection_size}, "label": "wf_input"},
+        ]
+        for branch in range(workflow_width):
+            scale_workflow_steps.append(
+                {"tool_id": "cat", "state": {"input1": self._link("wf_input", "output")}, "label": f"cat_{branch}"}
+            )
+
+        workflow_dict = {
+            "class": "GalaxyWorkflow",
+            "inputs": {},
+            "steps": scale_workflow_steps,
+        }
+        return workflow_dict
+
+    def _scale_workflow_dict_nested_subworkflow(self, **kwd) -> Dict[str, Any]:
+        # workflow_depth levels of subworkflows, each mapping cat over the collection passed in.
+        collection_size = kwd.get("collection_size", 10)
+        workflow_depth = kwd.get("workflow_depth", 3)
+
+        subworkflow: Optional[Dict[str, Any]] = None
+        for _ in range(workflow_depth):
+            steps: List[Dict[str, Any]] = [{"tool_id": "cat", "in": {"input1": "inner_input"}, "label": "cat"}]
+            output_source = "cat/out_file1"
+            if subworkflow is not None:
+                steps.append({"run": subworkflow, "in": {"inner_input": "cat/out_file1"}, "label": "nested"})
+                output_source = "nested/inner_output"
+            subworkflow = {
+                "class": "GalaxyWorkflow",
+                "inputs": {"inner_input": {"type": "collection", "collection_type": "list"}},
+                "outputs": {"inner_output": {"outputSource": output_source}},
+                "steps": steps,
+            }
+
+        scale_workflow_steps = [
+            {"tool_id": "create_input_collection", "state": {"collection_size": collection_size}, "label": "wf_input"},
+            {"run": subworkflow, "in": {"inner_input": "wf_input/output"}, "label": "nested"},
+        ]
+        workflow_dict = {
+            "class": "GalaxyWorkflow",
+            "inputs": {},
+            "steps": scale_workflow_steps,
+        }
+        return workflow_dict
+
+    def _scale_workflow_dict_conditional(self, **kwd) -> Dict[str, Any]:
+        # workflow_width conditional steps mapping over the input collection, every other
+        # one is skipped depending on the boolean should_run input.
+        collection_size = kwd.get("collection_size", 10)
+        workflow_width = kwd.get("workflow_width", 10)
+
+        scale_workflow_steps = [
+            {"tool_id": "create_input_collection", "state": {"collection_size": collection_size}, "label": "wf_input"},
+        ]
+        for branch in range(workflow_width):
+            scale_workflow_steps.append(
+                {
+                    "tool_id": "cat",
+                    "in": {"input1": "wf_input/output", "should_run": "should_run"},
+                    "when": "$(inputs.should_run)" if branch % 2 == 0 else "$(!inputs.should_run)",
+                    "label": f"cat_{branch}",
+                }
+            )
+
+        workflow_dict = {
+            "class": "GalaxyWorkflow",
+            "inputs": {"should_run": {"type": "boolean"}},
+            "steps": scale_workflow_steps,
+        }
+        return workflow_dict
+
     @staticmethod
     def _link(link: str, output_name: Optional[str] = None) -> Dict[str, Any]:
         if output_name is not None:
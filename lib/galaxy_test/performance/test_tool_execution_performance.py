@@ -0,0 +1,49 @@
+import os
+import time
+
+from galaxy_test.base.populators import (
+    DatasetCollectionPopulator,
+    DatasetPopulator,
+)
+from ._framework import PerformanceTestCase
+
+GALAXY_TEST_PERFORMANCE_TIMEOUT_DEFAULT = 5000
+GALAXY_TEST_PERFORMANCE_TIMEOUT = int(
+    os.environ.get("GALAXY_TEST_PERFORMANCE_TIMEOUT", GALAXY_TEST_PERFORMANCE_TIMEOUT_DEFAULT)
+)
+GALAXY_TEST_PERFORMANCE_MAP_OVER_SIZE_DEFAULT = 100
+GALAXY_TEST_PERFORMANCE_MAP_OVER_SIZE = int(
+    os.environ.get("GALAXY_TEST_PERFORMANCE_MAP_OVER_SIZE", GALAXY_TEST_PERFORMANCE_MAP_OVER_SIZE_DEFAULT)
+)
+
+
+class TestToolExecutionPerformance(PerformanceTestCase):
+    framework_tool_and_types = True
+
+    def setUp(self):
+        super().setUp()
+        self.dataset_populator = DatasetPopulator(self.galaxy_interactor)
+        self.dataset_collection_populator = DatasetCollectionPopulator(self.galaxy_interactor)
+
+    def test_map_over_list(self):
+        self._run_map_over("cat1", "input1")
+
+    def test_map_over_list_two_outputs(self):
+        self._run_map_over("collection_creates_pair", "input1")
+
+    def _run_map_over(self, tool_id, input_name):
+        with self.dataset_populator.test_history() as history_id:
+            contents = [f"{i}\n" for i in range(GALAXY_TEST_PERFORMANCE_MAP_OVER_SIZE)]
+            hdca_id = self.dataset_collection_populator.create_list_in_history(
+                history_id, contents=contents, wait=True
+            ).json()["outputs"][0]["id"]
+            inputs = {input_name: {"batch": True, "values": [{"src": "hdca", "id": hdca_id}]}}
+            start = time.perf_counter()
+            response = self.dataset_populator.run_tool(tool_id, inputs, history_id)
+            elapsed = time.perf_counter() - start
+            job_count = len(response["jobs"])
+            assert job_count == GALAXY_TEST_PERFORMANCE_MAP_OVER_SIZE
+            print(f"Created {job_count} {tool_id} jobs in {elapsed:.3f} seconds ({job_count / elapsed:.1f} jobs/s)")
+            self.dataset_populator.wait_for_history_jobs(
+                history_id, assert_ok=True, timeout=GALAXY_TEST_PERFORMANCE_TIMEOUT
+            )
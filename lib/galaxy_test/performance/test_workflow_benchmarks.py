@@ -0,0 +1,192 @@
+"""Benchmark workflow scheduling of synthetic topologies.
+
+Every test invokes one parameterized topology and records how long each phase
+took - uploading the workflow, creating the invocation, scheduling it, creating
+and running its jobs and listing its outputs. Results are printed as JSON and,
+if ``GALAXY_TEST_PERFORMANCE_RESULTS_DIRECTORY`` is set, written to
+``workflow_benchmark_<topology>.json`` in that directory so that results of
+different Galaxy releases can be compared.
+"""
+
+import json
+import os
+import time
+from typing import Optional
+
+from galaxy_test.base.populators import (
+    DatasetPopulator,
+    WorkflowPopulator,
+)
+from ._framework import PerformanceTestCase
+
+GALAXY_TEST_PERFORMANCE_TIMEOUT_DEFAULT = 5000
+GALAXY_TEST_PERFORMANCE_TIMEOUT = int(
+    os.environ.get("GALAXY_TEST_PERFORMANCE_TIMEOUT", GALAXY_TEST_PERFORMANCE_TIMEOUT_DEFAULT)
+)
+GALAXY_TEST_PERFORMANCE_COLLECTION_SIZE_DEFAULT = 4
+GALAXY_TEST_PERFORMANCE_COLLECTION_SIZE = int(
+    os.environ.get("GALAXY_TEST_PERFORMANCE_COLLECTION_SIZE", GALAXY_TEST_PERFORMANCE_COLLECTION_SIZE_DEFAULT)
+)
+GALAXY_TEST_PERFORMANCE_WORKFLOW_DEPTH_DEFAULT = 20
+GALAXY_TEST_PERFORMANCE_WORKFLOW_DEPTH = int(
+    os.environ.get("GALAXY_TEST_PERFORMANCE_WORKFLOW_DEPTH", GALAXY_TEST_PERFORMANCE_WORKFLOW_DEPTH_DEFAULT)
+)
+GALAXY_TEST_PERFORMANCE_WORKFLOW_WIDTH_DEFAULT = 20
+GALAXY_TEST_PERFORMANCE_WORKFLOW_WIDTH = int(
+    os.environ.get("GALAXY_TEST_PERFORMANCE_WORKFLOW_WIDTH", GALAXY_TEST_PERFORMANCE_WORKFLOW_WIDTH_DEFAULT)
+)
+GALAXY_TEST_PERFORMANCE_SUBWORKFLOW_DEPTH_DEFAULT = 4
+GALAXY_TEST_PERFORMANCE_SUBWORKFLOW_DEPTH = int(
+    os.environ.get("GALAXY_TEST_PERFORMANCE_SUBWORKFLOW_DEPTH", GALAXY_TEST_PERFORMANCE_SUBWORKFLOW_DEPTH_DEFAULT)
+)
+GALAXY_TEST_PERFORMANCE_MAP_OVER_SIZE_DEFAULT = 100
+GALAXY_TEST_PERFORMANCE_MAP_OVER_SIZE = int(
+    os.environ.get("GALAXY_TEST_PERFORMANCE_MAP_OVER_SIZE", GALAXY_TEST_PERFORMANCE_MAP_OVER_SIZE_DEFAULT)
+)
+GALAXY_TEST_PERFORMANCE_RESULTS_DIRECTORY = os.environ.get("GALAXY_TEST_PERFORMANCE_RESULTS_DIRECTORY")
+POLL_INTERVAL = 0.1
+TERMINAL_JOB_STATES = {"ok", "skipped", "error", "failed", "deleted", "paused"}
+
+
+class TestWorkflowBenchmarks(PerformanceTestCase):
+    framework_tool_and_types = True
+
+    def setUp(self):
+        super().setUp()
+        self.dataset_populator = DatasetPopulator(self.galaxy_interactor)
+        self.workflow_populator = WorkflowPopulator(self.galaxy_interactor)
+
+    def test_deep_chain(self):
+        self._benchmark(
+            "deep_chain",
+            workflow_type="simple",
+            collection_size=GALAXY_TEST_PERFORMANCE_COLLECTION_SIZE,
+            workflow_depth=GALAXY_TEST_PERFORMANCE_WORKFLOW_DEPTH,
+        )
+
+    def test_wide_fan_out(self):
+        self._benchmark(
+            "wide_fan_out",
+            workflow_type="fan_out",
+            collection_size=GALAXY_TEST_PERFORMANCE_COLLECTION_SIZE,
+            workflow_width=GALAXY_TEST_PERFORMANCE_WORKFLOW_WIDTH,
+        )
+
+    def test_nested_subworkflows(self):
+        self._benchmark(
+            "nested_subworkflows",
+            workflow_type="nested_subworkflow",
+            collection_size=GALAXY_TEST_PERFORMANCE_COLLECTION_SIZE,
+            workflow_depth=GALAXY_TEST_PERFORMANCE_SUBWORKFLOW_DEPTH,
+        )
+
+    def test_collection_map_over(self):
+        self._benchmark(
+            "collection_map_over",
+            workflow_type="simple",
+            collection_size=GALAXY_TEST_PERFORMANCE_MAP_OVER_SIZE,
+            workflow_depth=1,
+        )
+
+    def test_conditional_steps(self):
+        self._benchmark(
+            "conditional_steps",
+            inputs={"should_run": True},
+            workflow_type="conditional",
+            collection_size=GALAXY_TEST_PERFORMANCE_COLLECTION_SIZE,
+            workflow_width=GALAXY_TEST_PERFORMANCE_WORKFLOW_WIDTH,
+        )
+
+    def _benchmark(self, topology, inputs=None, **parameters):
+        phases = {}
+        workflow_yaml = self.workflow_populator.scaling_workflow_yaml(**parameters)
+        start = time.perf_counter()
+        workflow_id = self.workflow_populator.upload_yaml_workflow(workflow_yaml)
+        phases["workflow_upload"] = time.perf_counter() - start
+
+        history_id = self.dataset_populator.new_history()
+        request = {"history": f"hist_id={history_id}"}
+        if inputs:
+            request["inputs"] = json.dumps(inputs)
+            request["inputs_by"] = "name"
+        start = time.perf_counter()
+        invocation_id = self.workflow_populator.invoke_workflow_raw(workflow_id, request, assert_ok=True).json()["id"]
+        phases["invocation_creation"] = time.perf_counter() - start
+
+        progress = self._record_progress(invocation_id, history_id)
+        phases.update(progress.pop("phases"))
+
+        start = time.perf_counter()
+        invocation = self.workflow_populator.get_invocation(invocation_id, step_details=True)
+        contents = self.dataset_populator.get_history_contents(history_id)
+        phases["outputs"] = time.perf_counter() - start
+
+        assert invocation["state"] == "scheduled", invocation
+        job_states = {job["state"] for job in self.dataset_populator.history_jobs(history_id)}
+        assert job_states <= {"ok", "skipped"}, job_states
+        result = {
+            "topology": topology,
+            "galaxy_version": self._get("version").json(),
+            "parameters": parameters,
+            "steps": len(invocation["steps"]),
+            "history_contents": len(contents),
+            "phases": {phase: round(seconds, 3) for phase, seconds in phases.items()},
+            **progress,
+        }
+        self._store(topology, result)
+
+    def _record_progress(self, invocation_id, history_id):
+        """Poll the invocation and the jobs of its history until all jobs have finished.
+
+        Job creation is measured from the first job seen until the last one,
+        scheduling iterations are attributed to the poll in which the number of
+        scheduled steps changed, so all timings are upper bounds with a
+        resolution of ``POLL_INTERVAL``.
+        """
+        iterations = []
+        scheduled_steps = 0
+        job_count = 0
+        scheduled_at: Optional[float] = None
+        first_job_at: Optional[float] = None
+        last_job_at: Optional[float] = None
+        finished_at: Optional[float] = None
+        start = last_change = time.perf_counter()
+        while time.perf_counter() - start < GALAXY_TEST_PERFORMANCE_TIMEOUT:
+            if scheduled_at is None:
+                invocation = self.workflow_populator.get_invocation(invocation_id)
+            jobs = self.dataset_populator.history_jobs(history_id)
+            now = time.perf_counter()
+            if scheduled_at is None:
+                scheduled = sum(1 for step in invocation["steps"] if step["state"] == "scheduled")
+                if scheduled != scheduled_steps:
+                    iterations.append({"scheduled_steps": scheduled, "seconds": round(now - last_change, 3)})
+                    scheduled_steps = scheduled
+                    last_change = now
+                assert invocation["state"] not in ("failed", "cancelled"), invocation
+                if invocation["state"] == "scheduled":
+                    scheduled_at = now
+            if len(jobs) != job_count:
+                first_job_at = first_job_at or now
+                last_job_at = now
+                job_count = len(jobs)
+            if scheduled_at is not None and all(job["state"] in TERMINAL_JOB_STATES for job in jobs):
+                finished_at = now
+                break
+            time.sleep(POLL_INTERVAL)
+        assert (
+            scheduled_at is not None and finished_at is not None
+        ), f"Invocation {invocation_id} did not finish in time"
+        phases = {"scheduling": scheduled_at - start}
+        if first_job_at is not None and last_job_at is not None:
+            phases["job_creation"] = last_job_at - first_job_at
+            phases["job_completion"] = finished_at - last_job_at
+        return {"phases": phases, "jobs": job_count, "scheduling_iterations": iterations}
+
+    def _store(self, topology, result):
+        result_json = json.dumps(result, indent=2)
+        print(result_json)
+        if GALAXY_TEST_PERFORMANCE_RESULTS_DIRECTORY:
+            os.makedirs(GALAXY_TEST_PERFORMANCE_RESULTS_DIRECTORY, exist_ok=True)
+            path = os.path.join(GALAXY_TEST_PERFORMANCE_RESULTS_DIRECTORY, f"workflow_benchmark_{topology}.json")
+            with open(path, "w") as f:
+                f.write(result_json)
@@ -0,0 +1,92 @@
+import json
+import os
+import time
+
+from galaxy_test.base.populators import WorkflowPopulator
+from ._framework import PerformanceTestCase
+
+GALAXY_TEST_PERFORMANCE_TIMEOUT_DEFAULT = 5000
+GALAXY_TEST_PERFORMANCE_TIMEOUT = int(
+    os.environ.get("GALAXY_TEST_PERFORMANCE_TIMEOUT", GALAXY_TEST_PERFORMANCE_TIMEOUT_DEFAULT)
+)
+GALAXY_TEST_PERFORMANCE_COLLECTION_SIZE_DEFAULT = 4
+GALAXY_TEST_PERFORMANCE_COLLECTION_SIZE = int(
+    os.environ.get("GALAXY_TEST_PERFORMANCE_COLLECTION_SIZE", GALAXY_TEST_PERFORMANCE_COLLECTION_SIZE_DEFAULT)
+)
+GALAXY_TEST_PERFORMANCE_WORKFLOW_DEPTH_DEFAULT = 6
+GALAXY_TEST_PERFORMANCE_WORKFLOW_DEPTH = int(
+    os.environ.get("GALAXY_TEST_PERFORMANCE_WORKFLOW_DEPTH", GALAXY_TEST_PERFORMANCE_WORKFLOW_DEPTH_DEFAULT)
+)
+# Comma separated numbers of independent branches, per-iteration times of wider
+# invocations should not grow with the number of steps already scheduled.
+GALAXY_TEST_PERFORMANCE_WORKFLOW_WIDTHS_DEFAULT = "1,10,50"
+GALAXY_TEST_PERFORMANCE_WORKFLOW_WIDTHS = [
+    int(width)
+    for width in os.environ.get(
+        "GALAXY_TEST_PERFORMANCE_WORKFLOW_WIDTHS", GALAXY_TEST_PERFORMANCE_WORKFLOW_WIDTHS_DEFAULT
+    ).split(",")
+]
+POLL_INTERVAL = 0.1
+
+
+class TestWorkflowSchedulingScaling(PerformanceTestCase):
+    framework_tool_and_types = True
+
+    def setUp(self):
+        super().setUp()
+        self.workflow_populator = WorkflowPopulator(self.galaxy_interactor)
+
+    def test_wide_wave_scheduling_iterations(self):
+        results = []
+        for width in GALAXY_TEST_PERFORMANCE_WORKFLOW_WIDTHS:
+            workflow_yaml = self.workflow_populator.scaling_workflow_yaml(
+                workflow_type="wide_wave",
+                collection_size=GALAXY_TEST_PERFORMANCE_COLLECTION_SIZE,
+                workflow_depth=GALAXY_TEST_PERFORMANCE_WORKFLOW_DEPTH,
+                workflow_width=width,
+            )
+            run_summary = self.workflow_populator.run_workflow(workflow_yaml, test_data={}, wait=False)
+            iterations = self._record_iterations(run_summary.invocation_id)
+            self.workflow_populator.wait_for_workflow(
+                run_summary.workflow_id,
+                run_summary.invocation_id,
+                run_summary.history_id,
+                assert_ok=True,
+                timeout=GALAXY_TEST_PERFORMANCE_TIMEOUT,
+            )
+            results.append(
+                {
+                    "width": width,
+                    "steps": 1 + width * (GALAXY_TEST_PERFORMANCE_WORKFLOW_DEPTH + 1),
+                    "iterations": iterations,
+                }
+            )
+        print(json.dumps(results, indent=2))
+
+    def _record_iterations(self, invocation_id):
+        """Poll the invocation and record how long each batch of newly scheduled steps took.
+
+        Steps scheduled between two polls are attributed to the same
+        scheduling iteration, so this is an upper bound of the iteration time.
+        """
+        iterations = []
+        scheduled_steps = 0
+        start = last_change = time.perf_counter()
+        while time.perf_counter() - start < GALAXY_TEST_PERFORMANCE_TIMEOUT:
+            invocation = self.workflow_populator.get_invocation(invocation_id)
+            now = time.perf_counter()
+            scheduled = sum(1 for step in invocation["steps"] if step["state"] == "scheduled")
+            if scheduled != scheduled_steps:
+                iterations.append(
+                    {
+                        "scheduled_steps": scheduled,
+                        "new_steps": scheduled - scheduled_steps,
+                        "seconds": round(now - last_change, 3),
+                    }
+                )
+                scheduled_steps = scheduled
+                last_change = now
+            if invocation["state"] in ("scheduled", "failed", "cancelled"):
+                break
+            time.sleep(POLL_INTERVAL)
+        return iterations
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Build the tool document caches of tool config files, e.g. in CI before
+deploying a toolbox.
+
+Only tool config files with a ``tool_cache_data_dir`` attribute are
+processed. Tool paths are resolved like Galaxy does, so run this script
+from the Galaxy root directory (or set ``--tool-path``).
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), os.pardir, "lib"))
+
+from galaxy.tool_util.toolbox.base import tool_paths_in_config
+from galaxy.tool_util.toolbox.parser import get_toolbox_parser
+from galaxy.tools import MODEL_TOOLS_PATH
+from galaxy.tools.cache import (
+    parse_tool_documents,
+    ToolDocumentCache,
+)
+
+log = logging.getLogger(__name__)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("tool_config_files", nargs="+", help="Tool config files to build the caches of")
+    parser.add_argument("--tool-path", default="tools", help="Tool path of tool config files without one")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="Number of processes parsing tools")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    for config_filename in args.tool_config_files:
+        tool_conf_source = get_toolbox_parser(config_filename)
+        cache_dir = tool_conf_source.parse_tool_cache_data_dir()
+        if not cache_dir:
+            log.warning("Skipping %s, it does not set a tool_cache_data_dir", config_filename)
+            continue
+        paths = tool_paths_in_config(config_filename, args.tool_path, {"model_tools_path": MODEL_TOOLS_PATH})
+        paths = [path for path in paths if path.endswith(".xml")]
+        cache = ToolDocumentCache(cache_dir)
+        if cache.disabled:
+            return 1
+        documents = parse_tool_documents(paths, processes=args.processes)
+        cache.set_documents(documents)
+        cache.persist(compact=True)
+        stats = cache.stats()
+        log.info(
+            "Cached %d of %d tools of %s in %s (%d distinct documents, %d bytes)",
+            len(documents),
+            len(paths),
+            config_filename,
+            cache_dir,
+            stats["documents"],
+            stats["size"],
+        )
+        cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
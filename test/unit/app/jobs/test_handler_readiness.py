@@ -0,0 +1,188 @@
+import pytest
+from sqlalchemy import event
+
+import galaxy.datatypes.registry as registry
+import galaxy.model.mapping as mapping
+from galaxy import model
+from galaxy.jobs.readiness import (
+    order_jobs_for_dispatch,
+    WaitingJobsIndex,
+)
+from galaxy.model.base import transaction
+from galaxy.quota import NoQuotaAgent
+from galaxy.util.bunch import Bunch
+
+
+@pytest.fixture(scope="module")
+def datatypes_registry():
+    r = registry.Registry()
+    r.load_datatypes()
+    model.set_datatypes_registry(r)
+
+
+@pytest.fixture
+def sa_session(datatypes_registry):
+    return mapping.init("/tmp", "sqlite:///:memory:", create_tables=True).session
+
+
+def _seed_jobs(sa_session, n_jobs, n_users=1, dataset_state=model.Dataset.states.OK):
+    users = [model.User(email=f"user{i}@example.org", password="password") for i in range(n_users)]
+    history = model.History(user=users[0])
+    sa_session.add_all(users)
+    sa_session.add(history)
+    jobs = []
+    for i in range(n_jobs):
+        hda = model.HistoryDatasetAssociation(history=history, create_dataset=True, sa_session=sa_session)
+        hda.hid = i + 1
+        hda.name = f"input {i}"
+        hda.dataset.state = dataset_state
+        job = model.Job()
+        job.user = users[i % n_users]
+        job.tool_id = "cat1"
+        job.state = model.Job.states.NEW
+        job.add_input_dataset("input1", hda)
+        sa_session.add(job)
+        jobs.append(job)
+    with transaction(sa_session):
+        sa_session.commit()
+    return jobs
+
+
+def test_ready_inputs(sa_session):
+    jobs = _seed_jobs(sa_session, 3)
+    index = WaitingJobsIndex(sa_session, jobs)
+    problems = index.invalid_input_states()
+    assert not problems.pause and not problems.fail and not problems.ignore
+    assert all(len(index.inputs[job.id]) == 1 for job in jobs)
+    for job in jobs:
+        assert index.in_memory_input_state(job, "__SET_METADATA__") == (None, None)
+
+
+def test_invalid_inputs(sa_session):
+    deleted, purged, errored, queued = _seed_jobs(sa_session, 4)
+    deleted.input_datasets[0].dataset.deleted = True
+    purged.input_datasets[0].dataset.dataset.deleted = True
+    purged.input_datasets[0].dataset.dataset.purged = True
+    errored.input_datasets[0].dataset.dataset.state = model.Dataset.states.ERROR
+    queued.input_datasets[0].dataset.dataset.state = model.Dataset.states.QUEUED
+    with transaction(sa_session):
+        sa_session.commit()
+    index = WaitingJobsIndex(sa_session, [deleted, purged, errored, queued])
+    problems = index.invalid_input_states()
+    assert set(problems.pause) == {deleted.id, errored.id}
+    assert set(problems.fail) == {purged.id}
+    assert set(problems.ignore) == {queued.id}
+    assert index.in_memory_input_state(deleted, None)[0] == "deleted"
+    assert index.in_memory_input_state(errored, None)[0] == "error"
+    assert index.in_memory_input_state(queued, None) == ("wait", None)
+
+
+def test_deferred_inputs_are_ready(sa_session):
+    (job,) = _seed_jobs(sa_session, 1, dataset_state=model.Dataset.states.DEFERRED)
+    index = WaitingJobsIndex(sa_session, [job])
+    assert not index.invalid_input_states().ignore
+    assert index.in_memory_input_state(job, None) == (None, None)
+
+
+def test_record_input_dataset_versions(sa_session):
+    (job,) = _seed_jobs(sa_session, 1)
+    hda = job.input_datasets[0].dataset
+    hda.name = "renamed input"
+    with transaction(sa_session):
+        sa_session.commit()
+    assert hda.version > 0
+    WaitingJobsIndex(sa_session, [job]).record_input_dataset_versions([job.id])
+    with transaction(sa_session):
+        sa_session.commit()
+    sa_session.expire_all()
+    assert job.input_datasets[0].dataset_version == hda.version
+
+
+def test_load_jobs_preserves_order(sa_session):
+    jobs = _seed_jobs(sa_session, 3)
+    job_ids = [jobs[2].id, jobs[0].id, -1, jobs[1].id]
+    assert [job.id for job in WaitingJobsIndex.load_jobs(sa_session, job_ids)] == [
+        jobs[2].id,
+        jobs[0].id,
+        jobs[1].id,
+    ]
+
+
+def test_order_jobs_for_dispatch_interleaves_users(sa_session):
+    jobs = _seed_jobs(sa_session, 6, n_users=2)
+    heavy_user_jobs = [job for job in jobs if job.user_id == jobs[0].user_id]
+    light_user_job = next(job for job in jobs if job.user_id != jobs[0].user_id)
+    ordered = order_jobs_for_dispatch(heavy_user_jobs + [light_user_job])
+    assert ordered[:2] == [heavy_user_jobs[0], light_user_job]
+    assert ordered[2:] == heavy_user_jobs[1:]
+
+
+def test_session_job_count(sa_session):
+    galaxy_session = model.GalaxySession()
+    sa_session.add(galaxy_session)
+    for state in (model.Job.states.QUEUED, model.Job.states.RUNNING, model.Job.states.NEW):
+        job = model.Job()
+        job.galaxy_session = galaxy_session
+        job.state = state
+        sa_session.add(job)
+    waiting_job = job
+    with transaction(sa_session):
+        sa_session.commit()
+    index = WaitingJobsIndex(sa_session, [waiting_job])
+    assert index.session_job_count(galaxy_session.id) == 2
+    index.increase_session_job_count(galaxy_session.id)
+    assert index.session_job_count(galaxy_session.id) == 3
+
+
+def test_is_over_quota_once_per_user_and_label(sa_session):
+    jobs = _seed_jobs(sa_session, 6, n_users=2)
+    quota_agent = CountingQuotaAgent(over_quota_user_ids={jobs[0].user_id})
+    index = WaitingJobsIndex(sa_session, jobs)
+    assert [index.is_over_quota(quota_agent, None, job, None) for job in jobs] == [True, False] * 3
+    assert quota_agent.checks == 2
+    assert (index.quota_check_hits, index.quota_check_misses) == (4, 2)
+
+    # a different quota source label is checked separately
+    labeled_destination = Bunch(params={"object_store_id": "labeled"})
+    assert index.is_over_quota(quota_agent, None, jobs[0], labeled_destination)
+    assert quota_agent.checks == 3
+
+
+class CountingQuotaAgent(NoQuotaAgent):
+    def __init__(self, over_quota_user_ids):
+        self.over_quota_user_ids = over_quota_user_ids
+        self.checks = 0
+
+    def quota_source_label_for_destination(self, app, job_destination):
+        return job_destination and job_destination.params["object_store_id"]
+
+    def is_over_quota(self, app, job, job_destination):
+        self.checks += 1
+        return job.user_id in self.over_quota_user_ids
+
+
+def test_readiness_cycle_query_count_independent_of_job_count(sa_session):
+    def readiness_cycle(job_ids):
+        sa_session.expunge_all()
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = sa_session.get_bind()
+        event.listen(engine, "before_cursor_execute", count_statement)
+        try:
+            jobs = WaitingJobsIndex.load_jobs(sa_session, job_ids)
+            index = WaitingJobsIndex(sa_session, jobs)
+            problems = index.invalid_input_states()
+            ordered = order_jobs_for_dispatch(jobs)
+            index.record_input_dataset_versions(job.id for job in ordered)
+        finally:
+            event.remove(engine, "before_cursor_execute", count_statement)
+        assert not problems.pause and not problems.fail and not problems.ignore
+        assert sorted(job.id for job in ordered) == sorted(job.id for job in jobs)
+        assert len(jobs) == len(job_ids)
+        return len(statements)
+
+    job_ids = [job.id for job in _seed_jobs(sa_session, 50, n_users=5)]
+    assert readiness_cycle(job_ids[:5]) == readiness_cycle(job_ids)
@@ -1,8 +1,18 @@
 import os
+import shutil
 import tempfile
+import time
+
+import pytest
+from sqlalchemy import (
+    func,
+    select,
+)
 
 from galaxy import model
+from galaxy.job_execution import output_collect
 from galaxy.job_execution.output_collect import (
+    collect_dynamic_outputs,
     dataset_collector,
     JobContext,
 )
@@ -10,8 +20,14 @@ from galaxy.model.base import transaction
 from galaxy.model.dataset_collections import builder
 from galaxy.tool_util.parser.output_collection_def import FilePatternDatasetCollectionDescription
 from galaxy.tool_util.provided_metadata import NullToolProvidedMetadata
+from galaxy.util import galaxy_directory
 from ..tools.test_history_imp_exp import _mock_app
 
+# GALAXY_TEST_DISCOVERY_BENCHMARK_FILES=10000,100000 pytest -s test/unit/app/jobs/test_job_context.py -k benchmark
+GALAXY_TEST_DISCOVERY_BENCHMARK_FILES = [
+    int(n) for n in os.environ.get("GALAXY_TEST_DISCOVERY_BENCHMARK_FILES", "").split(",") if n
+]
+
 
 class PermissionProvider:
     def __init__(self):
@@ -20,6 +36,9 @@ class PermissionProvider:
     def set_default_hda_permissions(self, primary_data):
         pass
 
+    def set_default_hdas_permissions(self, hdas):
+        pass
+
     def copy_dataset_permissions(self, init_from, primary_data):
         pass
 
@@ -35,9 +54,17 @@ class Tool:
         self.sa_session = app.model.context
 
 
-def setup_data(job_working_directory):
-    for i in range(10):
-        with open(os.path.join(job_working_directory, f"datasets_{i}.txt"), "w") as out:
+class UnnamedOutputsMetadata(NullToolProvidedMetadata):
+    def __init__(self, unnamed_outputs):
+        self.unnamed_outputs = unnamed_outputs
+
+    def get_unnamed_outputs(self):
+        return self.unnamed_outputs
+
+
+def setup_data(job_working_directory, n=10, pattern="datasets_{i}.txt"):
+    for i in range(n):
+        with open(os.path.join(job_working_directory, pattern.format(i=i)), "w") as out:
             out.write(str(i))
 
 
@@ -98,3 +125,181 @@ def test_job_context_discover_outputs_flushes_once(mocker):
         sa_session.commit()
     assert len(collection.dataset_instances) == 10
     assert collection.dataset_instances[0].dataset.file_size == 1
+
+
+def _bulk_job_context(app, job_working_directory, tool_provided_metadata=None, flush_per_n_datasets=None):
+    sa_session = app.model.context
+    u = model.User(email="bulk@example.com", password="password")
+    h = model.History(name="Test History", user=u)
+    job = model.Job()
+    job.history = h
+    job.user = u
+    sa_session.add(job)
+    with transaction(sa_session):
+        sa_session.commit()
+    return JobContext(
+        Tool(app),
+        tool_provided_metadata or NullToolProvidedMetadata(),
+        job,
+        job_working_directory,
+        PermissionProvider(),
+        MetadataSourceProvider(),
+        "?",
+        app.object_store,
+        "ok",
+        max_discovered_files=None,
+        flush_per_n_datasets=flush_per_n_datasets,
+        bulk_persistence=True,
+    )
+
+
+def _discover_into_collection(job_context, collection_type, pattern):
+    sa_session = job_context.sa_session
+    collection = model.DatasetCollection(collection_type=collection_type, populated=False)
+    sa_session.add(collection)
+    collection_builder = builder.BoundCollectionBuilder(collection)
+    dataset_collectors = [dataset_collector(FilePatternDatasetCollectionDescription(pattern=pattern))]
+    discovered_files = job_context.find_files("output", collection, dataset_collectors)
+    job_context.populate_collection_elements(
+        collection,
+        collection_builder,
+        discovered_files,
+        name="output",
+        metadata_source_name="",
+        final_job_state=job_context.final_job_state,
+    )
+    collection_builder.populate()
+    with transaction(sa_session):
+        sa_session.commit()
+    return collection
+
+
+def test_job_context_bulk_discover_list():
+    app = _mock_app()
+    job_working_directory = tempfile.mkdtemp()
+    setup_data(job_working_directory, n=25)
+    job_context = _bulk_job_context(app, job_working_directory, flush_per_n_datasets=10)
+    collection = _discover_into_collection(job_context, "list", "__name_and_ext__")
+    assert collection.populated
+    assert collection.element_count == 25
+    identifiers = [element.element_identifier for element in collection.elements]
+    assert identifiers == sorted(identifiers)
+    assert [element.element_index for element in collection.elements] == list(range(25))
+    hdas = collection.dataset_instances
+    assert sorted(hda.hid for hda in hdas) == list(range(1, 26))
+    assert {hda.history_id for hda in hdas} == {job_context.job.history.id}
+    hda = collection.elements[3].hda
+    content = hda.name.split("_")[1]
+    assert hda.dataset.file_size == len(content)
+    assert hda.state == "ok"
+    assert hda.peek is not None
+    assert hda.metadata.data_lines == 1
+    with open(hda.get_file_name()) as f:
+        assert f.read() == content
+    assert len(job_context.job.output_datasets) == 25
+    assert job_context.job.output_datasets[0].name.startswith("__new_primary_file_output|datasets_")
+    sa_session = job_context.sa_session
+    # Metadata is set before the HDAs are inserted, so no HDA history versions are created.
+    assert sa_session.scalar(select(func.count(model.HistoryDatasetAssociationHistory.id))) == 0
+
+
+def test_job_context_bulk_discover_nested_list():
+    app = _mock_app()
+    job_working_directory = tempfile.mkdtemp()
+    setup_data(job_working_directory, n=6, pattern="sample{i}.txt")
+    for i in range(6):
+        os.rename(
+            os.path.join(job_working_directory, f"sample{i}.txt"),
+            os.path.join(job_working_directory, f"{'ab'[i % 2]}_{i}.txt"),
+        )
+    job_context = _bulk_job_context(app, job_working_directory, flush_per_n_datasets=4)
+    collection = _discover_into_collection(
+        job_context, "list:list", r"(?P<identifier_0>[^_]+)_(?P<identifier_1>[^_]+)\.txt"
+    )
+    assert collection.element_count == 2
+    outer = {element.element_identifier: element for element in collection.elements}
+    assert sorted(outer) == ["a", "b"]
+    inner = outer["a"].child_collection
+    assert inner.collection_type == "list"
+    assert inner.element_count == 3
+    assert [element.element_identifier for element in inner.elements] == ["0", "2", "4"]
+    assert len(collection.dataset_instances) == 6
+
+
+def test_job_context_bulk_discover_paired_uses_builder():
+    app = _mock_app()
+    job_working_directory = tempfile.mkdtemp()
+    for identifier in ["reverse", "forward"]:
+        with open(os.path.join(job_working_directory, f"{identifier}.txt"), "w") as out:
+            out.write(identifier)
+    job_context = _bulk_job_context(app, job_working_directory)
+    collection = _discover_into_collection(job_context, "paired", "__name_and_ext__")
+    assert [element.element_identifier for element in collection.elements] == ["forward", "reverse"]
+    assert collection.elements[0].hda.dataset.file_size == len("forward")
+
+
+def test_job_context_bulk_persist_hdas():
+    app = _mock_app()
+    job_working_directory = tempfile.mkdtemp()
+    setup_data(job_working_directory, n=3)
+    elements = [
+        {"filename": f"datasets_{i}.txt", "name": f"dataset {i}", "ext": "txt", "tags": ["name:foo"]} for i in range(3)
+    ]
+    elements.append({"error_message": "failed to fetch"})
+    tool_provided_metadata = UnnamedOutputsMetadata([{"destination": {"type": "hdas"}, "elements": elements}])
+    job_context = _bulk_job_context(app, job_working_directory, tool_provided_metadata=tool_provided_metadata)
+    security_agent = app.security_agent
+    job = job_context.job
+    private_role = security_agent.create_private_user_role(job.user)
+    security_agent.history_set_default_permissions(
+        job.history, permissions={security_agent.permitted_actions.DATASET_MANAGE_PERMISSIONS: [private_role]}
+    )
+    job_context._permission_provider = output_collect.PermissionProvider({}, security_agent, job)
+    collect_dynamic_outputs(job_context, {})
+    sa_session = job_context.sa_session
+    with transaction(sa_session):
+        sa_session.commit()
+    history = job_context.job.history
+    hdas = sorted(history.datasets, key=lambda hda: hda.hid)
+    assert [hda.name for hda in hdas] == ["dataset 0", "dataset 1", "dataset 2", "Unnamed dataset"]
+    assert [hda.state for hda in hdas] == ["ok", "ok", "ok", "error"]
+    assert hdas[3].info == "failed to fetch"
+    assert hdas[0].extension == "txt"
+    assert hdas[0].dataset.file_size == 1
+    assert [tag.user_value for tag in hdas[1].tags] == ["foo"]
+    assert [(action.action, action.role) for action in hdas[2].dataset.actions] == [
+        (security_agent.permitted_actions.DATASET_MANAGE_PERMISSIONS.action, private_role)
+    ]
+
+
+def test_job_context_bulk_discover_file_metadata():
+    app = _mock_app()
+    job_working_directory = tempfile.mkdtemp()
+    for i in range(2):
+        shutil.copy(
+            os.path.join(galaxy_directory(), "test-data", "1.bam"), os.path.join(job_working_directory, f"{i}.bam")
+        )
+    job_context = _bulk_job_context(app, job_working_directory)
+    collection = _discover_into_collection(job_context, "list", "__name_and_ext__")
+    assert collection.element_count == 2
+    for hda in collection.dataset_instances:
+        assert hda.extension == "bam"
+        assert isinstance(hda.metadata.bam_index, model.MetadataFile)
+        assert hda.state == "ok"
+
+
+@pytest.mark.skipif(not GALAXY_TEST_DISCOVERY_BENCHMARK_FILES, reason="GALAXY_TEST_DISCOVERY_BENCHMARK_FILES not set")
+@pytest.mark.parametrize("n_files", GALAXY_TEST_DISCOVERY_BENCHMARK_FILES)
+@pytest.mark.parametrize("bulk_persistence", [False, True])
+def test_benchmark_discover_collection(n_files, bulk_persistence):
+    app = _mock_app()
+    job_working_directory = tempfile.mkdtemp()
+    setup_data(job_working_directory, n=n_files)
+    job_context = _bulk_job_context(app, job_working_directory, flush_per_n_datasets=1000)
+    job_context._bulk_persistence = bulk_persistence
+    start = time.time()
+    collection = _discover_into_collection(job_context, "list", "__name_and_ext__")
+    elapsed = time.time() - start
+    assert collection.element_count == n_files
+    mode = "bulk" if bulk_persistence else "ORM"
+    print(f"Discovered {n_files} files into a list ({mode}) in {elapsed:.3f}s")
@@ -0,0 +1,123 @@
+import pytest
+
+import galaxy.model.mapping as mapping
+from galaxy import model
+from galaxy.jobs.job_counts import JobCountStore
+from galaxy.model.base import transaction
+
+NEW = model.Job.states.NEW
+QUEUED = model.Job.states.QUEUED
+RUNNING = model.Job.states.RUNNING
+RESUBMITTED = model.Job.states.RESUBMITTED
+OK = model.Job.states.OK
+ERROR = model.Job.states.ERROR
+
+
+@pytest.fixture
+def sa_session():
+    return mapping.init("/tmp", "sqlite:///:memory:", create_tables=True).session
+
+
+def _add_jobs(sa_session, user, *jobs):
+    added = []
+    for state, destination_id in jobs:
+        job = model.Job()
+        job.user = user
+        job.state = state
+        job.destination_id = destination_id
+        sa_session.add(job)
+        added.append(job)
+    with transaction(sa_session):
+        sa_session.commit()
+    return added
+
+
+@pytest.fixture
+def users(sa_session):
+    users = [model.User(email=f"user{i}@example.org", password="password") for i in range(2)]
+    sa_session.add_all(users)
+    _add_jobs(sa_session, users[0], (QUEUED, "local"), (RUNNING, "local"), (RESUBMITTED, None), (OK, "local"))
+    _add_jobs(sa_session, users[1], (RUNNING, "cluster"))
+    return [user.id for user in users]
+
+
+def test_reconcile(sa_session, users):
+    store = JobCountStore(reconcile_interval=60)
+    assert store.user_job_count(sa_session, users[0]) == 3
+    assert store.user_job_count(sa_session, users[1]) == 1
+    assert store.user_job_count_per_destination(sa_session, users[0]) == {"local": 2}
+    assert store.total_job_count_per_destination(sa_session) == {"local": 2, "cluster": 1}
+
+
+def test_incremental_updates_between_reconciles(sa_session, users):
+    store = JobCountStore(reconcile_interval=60)
+    store.reconcile(sa_session)
+    store.job_dispatched(users[1], "local")
+    assert store.user_job_count(sa_session, users[1]) == 2
+    assert store.user_job_count_per_destination(sa_session, users[1]) == {"cluster": 1, "local": 1}
+    assert store.total_job_count_per_destination(sa_session)["local"] == 3
+    # queued -> running doesn't change anything, running -> ok frees a slot
+    store.job_state_changed(users[1], "local", QUEUED, RUNNING)
+    assert store.user_job_count(sa_session, users[1]) == 2
+    store.job_state_changed(users[1], "local", RUNNING, OK)
+    assert store.user_job_count(sa_session, users[1]) == 1
+    assert store.total_job_count_per_destination(sa_session)["local"] == 2
+    # resubmitted jobs still count against the user, but not against the destination
+    store.job_state_changed(users[0], "local", RUNNING, RESUBMITTED)
+    assert store.user_job_count(sa_session, users[0]) == 3
+    assert store.user_job_count_per_destination(sa_session, users[0]) == {"local": 1}
+    # drift is corrected by the next reconciliation
+    store.reconcile(sa_session)
+    assert store.user_job_count_per_destination(sa_session, users[0]) == {"local": 2}
+
+
+def test_counts_never_negative(sa_session, users):
+    store = JobCountStore(reconcile_interval=60)
+    store.reconcile(sa_session)
+    store.job_state_changed(users[1], "cluster", RUNNING, OK)
+    store.job_state_changed(users[1], "cluster", RUNNING, OK)
+    assert store.user_job_count(sa_session, users[1]) == 0
+    assert store.total_job_count_per_destination(sa_session)["cluster"] == 0
+
+
+def test_reconcile_counts_dispatched_new_jobs(sa_session, users):
+    store = JobCountStore(reconcile_interval=60)
+    store.reconcile(sa_session)
+    user = sa_session.get(model.User, users[1])
+    job, failing_job = _add_jobs(sa_session, user, (NEW, None), (NEW, None))
+    store.job_dispatched(users[1], "local", job_id=job.id)
+    store.job_dispatched(users[1], "local", job_id=failing_job.id)
+    # still new in the database until the runner queues them
+    store.reconcile(sa_session)
+    assert store.user_job_count(sa_session, users[1]) == 3
+    assert store.total_job_count_per_destination(sa_session)["local"] == 4
+
+    job.state = QUEUED
+    job.destination_id = "local"
+    with transaction(sa_session):
+        sa_session.commit()
+    store.job_state_changed(users[1], "local", NEW, QUEUED, job_id=job.id)
+    store.job_state_changed(users[1], None, NEW, ERROR, job_id=failing_job.id)
+    assert store.user_job_count(sa_session, users[1]) == 2
+    store.reconcile(sa_session)
+    assert store.user_job_count(sa_session, users[1]) == 2
+    store.job_state_changed(users[1], "local", QUEUED, OK, job_id=job.id)
+    assert store.user_job_count(sa_session, users[1]) == 1
+    assert store.total_job_count_per_destination(sa_session)["local"] == 2
+
+
+def test_reconcile_interval(sa_session, users):
+    store = JobCountStore(reconcile_interval=0)
+    store.reconcile(sa_session)
+    store.job_dispatched(users[1], "local")
+    # with an interval of 0, every lookup recounts from the database
+    assert store.user_job_count(sa_session, users[1]) == 1
+
+
+def test_without_user_counts(sa_session, users):
+    store = JobCountStore(count_users=False)
+    store.job_dispatched(users[1], "local")
+    assert store.user_job_count(sa_session, users[1]) == 1
+    assert store.total_job_count_per_destination(sa_session) == {"local": 2, "cluster": 1}
+    store.clear()
+    assert store.user_job_count(sa_session, users[1]) == 0
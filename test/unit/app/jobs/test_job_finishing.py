@@ -0,0 +1,112 @@
+import threading
+import time
+from queue import Queue
+from unittest import mock
+
+from galaxy import model
+from galaxy.jobs.finishing import (
+    DISCOVERY,
+    FINISHING_METRICS_PLUGIN,
+    FinishingStageTimer,
+    JobFinishingExecutor,
+    OBJECT_STORE_PUSH,
+)
+from galaxy.jobs.runners import (
+    AsynchronousJobRunner,
+    STOP_SIGNAL,
+)
+from galaxy.util import bunch
+
+
+def test_nested_stages_are_not_double_counted():
+    timer = FinishingStageTimer()
+    with mock.patch("galaxy.jobs.finishing.time") as mock_time:
+        # Clock readings when entering and leaving the stages.
+        mock_time.perf_counter.side_effect = [10.0, 10.5, 12.0, 12.25]
+        with timer.stage(DISCOVERY):
+            with timer.stage(OBJECT_STORE_PUSH):
+                pass
+    assert timer.seconds[DISCOVERY] == 0.75
+    assert timer.seconds[OBJECT_STORE_PUSH] == 1.5
+    job = model.Job()
+    timer.add_metrics(job)
+    recorded = {(m.plugin, m.metric_name) for m in job.numeric_metrics}
+    assert recorded == {
+        (FINISHING_METRICS_PLUGIN, "discovery_seconds"),
+        (FINISHING_METRICS_PLUGIN, "object_store_push_seconds"),
+    }
+
+
+class MockSession:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class MockAsyncRunner(AsynchronousJobRunner):
+    runner_name = "MockAsyncRunner"
+
+    def __init__(self, app):
+        super().__init__(app, 1)
+        self.work_queue = Queue()
+        self.finish_started = threading.Event()
+        self.release_finish = threading.Event()
+        self.queued = []
+
+    def _ensure_db_session(self, arg):
+        pass
+
+    def finish_job(self, job_state):
+        self.finish_started.set()
+        self.release_finish.wait(5)
+
+    def queue_job(self, job_wrapper):
+        self.queued.append(job_wrapper)
+
+
+def test_finish_job_runs_on_finishing_executor():
+    app = bunch.Bunch(
+        config=bunch.Bunch(redact_email_in_job_name=False),
+        model=bunch.Bunch(context=None, session=MockSession),
+        execution_timer_factory=bunch.Bunch(get_timer=lambda *args: bunch.Bunch(to_str=lambda **kwd: "")),
+    )
+    runner = MockAsyncRunner(app)
+    executor = JobFinishingExecutor(1)
+    runner.finishing_executor = executor
+    job_wrapper = bunch.Bunch(get_id_tag=lambda: "1")
+    runner.work_queue.put((runner.finish_job, job_wrapper))
+    runner.work_queue.put((runner.queue_job, job_wrapper))
+    runner.work_queue.put((STOP_SIGNAL, None))
+    worker = threading.Thread(target=runner.run_next)
+    worker.start()
+    # The runner's only worker moves on to queueing the next job while the first one is finishing.
+    worker.join(5)
+    assert not worker.is_alive()
+    assert runner.finish_started.wait(5)
+    assert runner.queued == [job_wrapper]
+    assert executor.pending == 1
+    runner.release_finish.set()
+    executor.shutdown()
+    assert executor.pending == 0
+
+
+def test_shutdown_cancels_pending_work_items():
+    executor = JobFinishingExecutor(1)
+    release = threading.Event()
+    finished = []
+    executor.submit(release.wait, 5)
+    pending = executor.submit(finished.append, "pending")
+    shutdown = threading.Thread(target=executor.shutdown)
+    shutdown.start()
+    # Shutdown waits for the running work item, the queued one is cancelled right away.
+    for _ in range(50):
+        if pending.cancelled():
+            break
+        time.sleep(0.1)
+    release.set()
+    shutdown.join(5)
+    assert pending.cancelled()
+    assert finished == []
+    assert executor.pending == 0
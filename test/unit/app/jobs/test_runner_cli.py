@@ -0,0 +1,151 @@
+from queue import Queue
+
+from galaxy import model
+from galaxy.jobs.runners import AsynchronousJobState
+from galaxy.jobs.runners.cli import ShellJobRunner
+from galaxy.jobs.runners.util.cli.job import (
+    BaseJobExec,
+    job_states,
+)
+from galaxy.util import bunch
+
+FAKE_STATES = {"Q": job_states.QUEUED, "R": job_states.RUNNING, "E": job_states.ERROR}
+
+
+class FakeCluster:
+    """In-memory scheduler state shared by the fake shell and job plugins."""
+
+    def __init__(self):
+        self.jobs = {}
+        self.commands = []
+
+    def execute(self, cmd):
+        self.commands.append(cmd)
+        command, *job_ids = cmd.split()
+        if command == "fakestat":
+            lines = [f"{job_id} {state}" for job_id, state in self.jobs.items()]
+        else:
+            lines = [f"{job_id} {self.jobs[job_id]}" for job_id in job_ids if job_id in self.jobs]
+        return bunch.Bunch(stdout="\n".join(lines), stderr="", returncode=0)
+
+
+CLUSTER = FakeCluster()
+
+
+class FakeShell:
+    def __init__(self, **kwds):
+        pass
+
+    def execute(self, cmd, **kwds):
+        return CLUSTER.execute(cmd)
+
+
+class FakeScheduler(BaseJobExec):
+    """Fake scheduler plugin, ``fakestat`` lists all jobs while ``fakestat1`` lists a single job."""
+
+    def submit(self, script_file):
+        return f"fakesub {script_file}"
+
+    def delete(self, job_id):
+        return f"fakedel {job_id}"
+
+    def get_status(self, job_ids=None):
+        return "fakestat"
+
+    def get_single_status(self, job_id):
+        return f"fakestat1 {job_id}"
+
+    def get_failure_reason(self, job_id):
+        return f"fakereason {job_id}"
+
+    def parse_status(self, status, job_ids):
+        rval = {}
+        for line in status.splitlines():
+            job_id, state = line.split()
+            if job_id in job_ids:
+                rval[job_id] = FAKE_STATES[state]
+        return rval
+
+    def parse_single_status(self, status, job_id):
+        if status.strip():
+            return FAKE_STATES[status.split()[1]]
+        # Finished jobs are no longer known to the scheduler.
+        return job_states.OK
+
+
+class MockJobWrapper:
+    def __init__(self, app, job_id, destination_params):
+        self.app = app
+        self.job_id = job_id
+        self.state = model.Job.states.QUEUED
+        self.tool = bunch.Bunch(old_id="cat1")
+        self.user = None
+        self.job_destination = bunch.Bunch(id="fake", params=destination_params)
+
+    def get_id_tag(self):
+        return self.job_id
+
+    def get_state(self):
+        return self.state
+
+    def change_state(self, state, **kwds):
+        self.state = state
+
+
+def _runner():
+    app = bunch.Bunch(config=bunch.Bunch(redact_email_in_job_name=False), model=bunch.Bunch(context=None))
+    runner = ShellJobRunner(app, 1)
+    runner.cli_interface.cli_shells["FakeShell"] = FakeShell
+    runner.cli_interface.cli_job_interfaces["FakeScheduler"] = FakeScheduler
+    runner.work_queue = Queue()
+    return runner
+
+
+def _watch(runner, n_jobs, **destination_params):
+    params = {"shell_plugin": "FakeShell", "job_plugin": "FakeScheduler", **destination_params}
+    for _ in range(n_jobs):
+        external_id = str(len(runner.watched) + 1)
+        CLUSTER.jobs[external_id] = "Q"
+        ajs = AsynchronousJobState(
+            files_dir="/tmp",
+            job_wrapper=MockJobWrapper(runner.app, external_id, params),
+            job_id=external_id,
+            job_destination=bunch.Bunch(id=f"dynamic_{external_id}", params=params),
+        )
+        ajs.old_state = model.Job.states.QUEUED
+        runner.watched.append(ajs)
+
+
+def setup_function():
+    CLUSTER.jobs.clear()
+    CLUSTER.commands.clear()
+
+
+def test_single_status_call_per_scheduler():
+    runner = _runner()
+    _watch(runner, 50)
+    _watch(runner, 50, job_partition="other")
+    CLUSTER.jobs["1"] = "R"
+    runner.check_watched_items()
+    # One call per distinct plugin configuration, not per job or (dynamic) destination.
+    assert CLUSTER.commands == ["fakestat", "fakestat"]
+    assert len(runner.watched) == 100
+    assert runner.watched[0].running
+    assert runner.watched[0].job_wrapper.get_state() == model.Job.states.RUNNING
+    # The per-cycle cache is discarded at the end of the cycle.
+    assert runner.watched_item_states == {}
+
+
+def test_finished_jobs_checked_individually():
+    runner = _runner()
+    _watch(runner, 3)
+    del CLUSTER.jobs["2"]
+    CLUSTER.jobs["3"] = "E"
+    runner.check_watched_items()
+    assert CLUSTER.commands == ["fakestat", "fakestat1 2", "fakereason 3"]
+    assert [ajs.job_id for ajs in runner.watched] == ["1"]
+    queued = []
+    while not runner.work_queue.empty():
+        method, ajs = runner.work_queue.get()
+        queued.append((method.__name__, ajs.job_id))
+    assert sorted(queued) == [("finish_job", "2"), ("mark_as_failed", "3")]
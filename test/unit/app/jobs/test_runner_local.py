@@ -10,6 +10,7 @@ from galaxy import (
     model,
 )
 from galaxy.app_unittest_utils.tools_support import UsesTools
+from galaxy.jobs.finishing import FinishingStageTimer
 from galaxy.jobs.runners import local
 from galaxy.util import bunch
 from galaxy.util.unittest import TestCase
@@ -133,6 +134,7 @@ class MockJobWrapper:
         self.tool_working_directory = tool_working_directory
         self.requires_setting_metadata = True
         self.job_destination = bunch.Bunch(id="default", params={})
+        self.finishing_stage_timer = FinishingStageTimer()
         self.galaxy_lib_dir = os.path.abspath("lib")
         self.job = model.Job()
         self.job_id = 1
@@ -196,6 +196,23 @@ class TestDatasetManager(BaseTestCase):
         self.log("a private dataset shouldn't be accessible by an anonymous user")
         assert not self.dataset_manager.permissions.access.is_permitted(dataset, None)
 
+    def test_access_permissions_invalidate_cached_permissions(self):
+        owner = self.user_manager.create(**user2_data)
+        owner_private_role = self.user_manager.private_role(owner)
+        dataset = self.dataset_manager.create()
+        security_agent = self.app.security_agent
+
+        self.log("cached permissions of a dataset should be dropped when setting its access roles")
+        assert security_agent.get_dataset_action_role_ids([dataset.id])[dataset.id] == {}
+        self.dataset_manager.permissions.access.set(dataset, [owner_private_role])
+        access_action = security_agent.permitted_actions.DATASET_ACCESS.action
+        role_ids = security_agent.get_dataset_action_role_ids([dataset.id])[dataset.id]
+        assert role_ids == {access_action: frozenset([owner_private_role.id])}
+
+        self.log("and when clearing them")
+        self.dataset_manager.permissions.access.clear(dataset)
+        assert security_agent.get_dataset_action_role_ids([dataset.id])[dataset.id] == {}
+
 
 @mock.patch("galaxy.managers.datasets.DatasetSerializer.url_for", mock_url_builder)
 class TestDatasetSerializer(BaseTestCase):
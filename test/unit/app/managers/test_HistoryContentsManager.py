@@ -3,7 +3,9 @@
 
 import datetime
 import random
+from unittest import mock
 
+import pytest
 from sqlalchemy import (
     column,
     desc,
@@ -11,10 +13,12 @@ from sqlalchemy import (
     true,
 )
 
+from galaxy import exceptions as glx_exceptions
 from galaxy.managers import (
     base,
     collections,
     hdas,
+    hdas as hdas_module,
     history_contents,
 )
 from galaxy.managers.histories import HistoryManager
@@ -321,6 +325,99 @@ class TestHistoryAsContainer(HistoryAsContainerBaseTestCase):
         filters = [parsed_filter("orm", column("type_id").in_(["dataset-2", "dataset_collection-2"]))]
         assert self.contents_manager.contents(history, filters=filters) == [contents[1], contents[6]]
 
+    def test_keyset_pagination(self):
+        user2 = self.user_manager.create(**user2_data)
+        self.trans.set_user(user2)
+        history = self.history_manager.create(name="history", user=user2)
+        contents = []
+        contents.extend([self.add_hda_to_history(history, name=("hda-" + str(x))) for x in range(3)])
+        contents.append(self.add_list_collection_to_history(history, contents[:3]))
+        contents.extend([self.add_hda_to_history(history, name=("hda-" + str(x))) for x in range(4, 6)])
+
+        self.log("should page through contents by hid")
+        order_by, keyset_filter = self.contents_manager.parse_keyset("hid-asc", contents[1].hid)
+        results = self.contents_manager.contents(history, order_by=order_by, keyset_filter=keyset_filter, limit=2)
+        assert results == contents[2:4]
+        order_by, keyset_filter = self.contents_manager.parse_keyset("hid-dsc", contents[4].hid)
+        results = self.contents_manager.contents(history, order_by=order_by, keyset_filter=keyset_filter)
+        assert results == contents[3::-1]
+
+        self.log("should break update_time ties by hid")
+        for item in contents:
+            item.update_time = datetime.datetime(2024, 1, 1)
+        contents[0].update_time = datetime.datetime(2024, 1, 2)
+        session = self.app.model.context
+        with transaction(session):
+            session.commit()
+        update_time = contents[2].update_time
+        order_by, keyset_filter = self.contents_manager.parse_keyset("update_time-dsc", contents[2].hid, update_time)
+        results = self.contents_manager.contents(history, order_by=order_by, keyset_filter=keyset_filter)
+        assert results == [contents[1]]
+        order_by, keyset_filter = self.contents_manager.parse_keyset("update_time-asc", contents[2].hid, update_time)
+        results = self.contents_manager.contents(history, order_by=order_by, keyset_filter=keyset_filter)
+        assert results == [contents[3], contents[4], contents[5], contents[0]]
+
+        with pytest.raises(glx_exceptions.RequestParameterInvalidException):
+            self.contents_manager.parse_keyset("name-asc", 1)
+        with pytest.raises(glx_exceptions.RequestParameterMissingException):
+            self.contents_manager.parse_keyset("update_time-asc", 1)
+
+    def test_contents_summaries(self):
+        user2 = self.user_manager.create(**user2_data)
+        self.trans.set_user(user2)
+        history = self.history_manager.create(name="history", user=user2)
+        hdas = [self.add_hda_to_history(history, name=("hda-" + str(x))) for x in range(2)]
+        hdca = self.add_list_collection_to_history(history, hdas)
+        self.app.tag_handler.apply_item_tag(user2, hdas[1], "name", "group")
+        hdas[1].visible = False
+        session = self.app.model.context
+        with transaction(session):
+            session.commit()
+
+        summaries = self.contents_manager.contents_summaries(history)
+        assert [type(summary) for summary in summaries] == [
+            history_contents.HistoryDatasetSummary,
+            history_contents.HistoryDatasetSummary,
+            type(hdca),
+        ]
+        assert summaries[2] == hdca
+        for hda, summary in zip(hdas, summaries):
+            for attribute in ("id", "type_id", "hid", "name", "state", "dbkey", "visible", "update_time"):
+                assert getattr(summary, attribute) == getattr(hda, attribute), attribute
+        assert [tag.user_tname for tag in summaries[1].tags] == ["name"]
+
+        self.log("the summary view should serialize identically")
+        hda_serializer = self.app[hdas_module.HDASerializer]
+        keys = [key for key in hda_serializer.views["summary"] if key != "url"]
+        for hda, summary in zip(hdas, summaries):
+            serialized = hda_serializer.serialize_to_view(summary, user=user2, keys=keys, encode_id=False)
+            assert serialized == hda_serializer.serialize_to_view(hda, user=user2, keys=keys, encode_id=False)
+
+    def test_contents_summaries_permissions(self):
+        user2 = self.user_manager.create(**user2_data)
+        self.trans.set_user(user2)
+        history = self.history_manager.create(name="history", user=user2)
+        private_hda, public_hda = (self.add_hda_to_history(history, name=f"hda-{x}") for x in range(2))
+        private_role = self.user_manager.private_role(user2)
+        self.hda_manager.dataset_manager.permissions.access.set(private_hda.dataset, [private_role])
+        security_agent = self.app.security_agent
+
+        resolver = security_agent.permission_resolver(user2)
+        summaries = self.contents_manager.contents_summaries(history, permission_resolver=resolver)
+        access_action = security_agent.permitted_actions.DATASET_ACCESS.action
+        assert [(action.action, action.role) for action in summaries[0].dataset.actions] == [
+            (access_action, private_role)
+        ]
+        assert summaries[1].dataset.actions == []
+
+        self.log("the permissions loaded for the summaries should be used when serializing them")
+        with mock.patch.object(security_agent, "get_dataset_action_role_ids") as get_dataset_action_role_ids:
+            resolver.prefetch(summary.dataset for summary in summaries)
+            assert all(resolver.can_access_dataset(summary.dataset) for summary in summaries)
+        get_dataset_action_role_ids.assert_not_called()
+        user3 = self.user_manager.create(**user3_data)
+        assert not security_agent.permission_resolver(user3).can_access_dataset(summaries[0].dataset)
+
 
 class TestHistoryContentsFilterParser(HistoryAsContainerBaseTestCase):
     def set_up_managers(self):
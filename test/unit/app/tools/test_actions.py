@@ -1,8 +1,10 @@
 import string
 from typing import (
+    Any,
     cast,
     Optional,
 )
+from unittest import mock
 
 from galaxy import model
 from galaxy.app_unittest_utils import tools_support
@@ -15,7 +17,14 @@ from galaxy.tools.actions import (
     DefaultToolAction,
     determine_output_format,
 )
-from galaxy.tools.execution_helpers import on_text_for_names
+from galaxy.tools.execute import (
+    execute,
+    MappingParameters,
+)
+from galaxy.tools.execution_helpers import (
+    on_text_for_names,
+    ToolExecutionCache,
+)
 from galaxy.util import XML
 from galaxy.util.unittest import TestCase
 
@@ -123,6 +132,55 @@ class TestDefaultToolAction(TestCase, tools_support.UsesTools):
             return
         raise AssertionError("Tool execution succeeded for inactive user!")
 
+    def test_deferred_history_additions(self):
+        self._init_tool(TWO_OUTPUTS)
+        execution_cache = ToolExecutionCache(self.trans)
+        execution_cache.defer_history_additions = True
+        security_agent = self.app.security_agent
+        history_get_default_permissions = mock.patch.object(
+            security_agent, "history_get_default_permissions", wraps=security_agent.history_get_default_permissions
+        )
+        outputs = []
+        with history_get_default_permissions as default_permissions_mock:
+            for i in range(3):
+                _, out_data, *_ = self.action.execute(
+                    tool=self.tool,
+                    trans=self.trans,
+                    history=self.history,
+                    incoming=dict(param1=f"moo{i}"),
+                    execution_cache=execution_cache,
+                )
+                outputs.extend(out_data.values())
+        # Outputs are only added to the history by the caller, all at once
+        assert all(output.hid is None for output in outputs)
+        assert len(self.history._pending_additions) == 6
+        self.history.add_pending_items()
+        assert [output.hid for output in outputs] == list(range(1, 7))
+        # Output permissions are shared by all jobs
+        default_permissions_mock.assert_called_once_with(self.history)
+
+    def test_batch_execution(self):
+        self._init_tool(TWO_OUTPUTS)
+        self.tool.tool_action = self.action
+        self.app.job_manager = cast(Any, MockJobManager())
+        self.app.config.tool_execution_flush_batch_size = 2
+        params = [dict(param1=f"moo{i}") for i in range(5)]
+        with mock.patch.object(self.history, "_next_hid", wraps=self.history._next_hid) as next_hid_mock:
+            execution_tracker = execute(
+                self.trans,
+                self.tool,
+                MappingParameters({}, params),
+                self.history,
+                completed_jobs=dict.fromkeys(range(len(params))),
+            )
+        assert not execution_tracker.execution_errors
+        assert len(execution_tracker.successful_jobs) == 5
+        assert all(job.id for job in execution_tracker.successful_jobs)
+        hids = [output.hid for _, output in execution_tracker.output_datasets]
+        assert hids == list(range(1, 11))
+        # hids are allocated once per batch of 2 jobs
+        assert next_hid_mock.call_args_list == [mock.call(n=4), mock.call(n=4), mock.call(n=2)]
+
     def __add_dataset(self, state="ok"):
         hda = model.HistoryDatasetAssociation()
         hda.dataset = model.Dataset()
@@ -290,6 +348,14 @@ class MockTrans:
         pass
 
 
+class MockJobManager:
+    def __init__(self):
+        self.enqueued_jobs = []
+
+    def enqueue(self, job, tool=None, flush=True):
+        self.enqueued_jobs.append(job)
+
+
 class MockObjectStore:
     def __init__(self):
         self.created_datasets = []
@@ -0,0 +1,140 @@
+import os
+
+from galaxy.tool_util.parser import get_tool_source
+from galaxy.tools.cache import ToolDocumentCache
+
+TOOL_CONTENTS = """<tool id="{tool_id}" name="Test Tool" version="1.0">
+    <command>echo "$param1" > "$out1"</command>
+    <inputs>
+        <param type="text" name="param1" value="" />
+    </inputs>
+    <outputs>
+        <data name="out1" format="txt" />
+    </outputs>
+</tool>
+"""
+
+
+def _write_tool(tmp_path, name, tool_id=None):
+    path = tmp_path / "tools" / name
+    path.parent.mkdir(exist_ok=True)
+    path.write_text(TOOL_CONTENTS.format(tool_id=tool_id or name[: -len(".xml")]))
+    return str(path)
+
+
+def _cache_tool(cache, path):
+    cache.set(path, get_tool_source(path))
+
+
+def test_shared_between_instances(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    path = _write_tool(tmp_path, "tool1.xml")
+    cache = ToolDocumentCache(cache_dir)
+    assert cache.get(path) is None
+    _cache_tool(cache, path)
+    cache.persist()
+    other_cache = ToolDocumentCache(cache_dir)
+    tool_document = other_cache.get(path)
+    assert tool_document
+    assert 'id="tool1"' in tool_document["document"]
+    assert other_cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_identical_documents_stored_once(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    paths = [_write_tool(tmp_path, f"tool{i}.xml", tool_id="tool") for i in range(3)]
+    cache = ToolDocumentCache(cache_dir)
+    for path in paths:
+        _cache_tool(cache, path)
+    cache.persist()
+    stats = ToolDocumentCache(cache_dir).stats()
+    assert stats["entries"] == 3
+    assert stats["documents"] == 1
+
+
+def test_readers_see_appended_entries(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    path1 = _write_tool(tmp_path, "tool1.xml")
+    path2 = _write_tool(tmp_path, "tool2.xml")
+    writer = ToolDocumentCache(cache_dir)
+    _cache_tool(writer, path1)
+    writer.persist()
+    reader = ToolDocumentCache(cache_dir)
+    assert reader.get(path2) is None
+    _cache_tool(writer, path2)
+    writer.persist()
+    assert reader.get(path2)
+    writer.delete(path1)
+    writer.persist()
+    assert reader.get(path1) is None
+
+
+def test_changed_tool_files(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    path = _write_tool(tmp_path, "tool1.xml")
+    cache = ToolDocumentCache(cache_dir)
+    _cache_tool(cache, path)
+    cache.persist()
+    # Same content, the entry is still valid
+    os.utime(path, (1, 1))
+    assert ToolDocumentCache(cache_dir).get(path)
+    _write_tool(tmp_path, "tool1.xml", tool_id="changed")
+    os.utime(path, (2, 2))
+    assert ToolDocumentCache(cache_dir).get(path) is None
+
+
+def test_compaction(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    path = _write_tool(tmp_path, "tool1.xml")
+    cache = ToolDocumentCache(cache_dir)
+    for i in range(4):
+        _write_tool(tmp_path, "tool1.xml", tool_id=f"tool{i}")
+        os.utime(path, (i, i))
+        _cache_tool(cache, path)
+        cache.persist()
+    # Replaced documents are dropped once they make up more than half of the file
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["documents"] < 4
+    cache.persist(compact=True)
+    assert cache.stats()["documents"] == 1
+    assert 'id="tool3"' in ToolDocumentCache(cache_dir).get(path)["document"]
+
+
+def test_incomplete_record_ignored(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    path1 = _write_tool(tmp_path, "tool1.xml")
+    path2 = _write_tool(tmp_path, "tool2.xml")
+    cache = ToolDocumentCache(cache_dir)
+    _cache_tool(cache, path1)
+    cache.persist()
+    with open(cache.cache_file, "ab") as fh:
+        fh.write(b"E\x00\x00\x10\x00{")
+    reader = ToolDocumentCache(cache_dir)
+    assert reader.get(path1)
+    # The next write replaces the file without the incomplete record
+    _cache_tool(reader, path2)
+    reader.persist()
+    cache = ToolDocumentCache(cache_dir)
+    assert cache.get(path1) and cache.get(path2)
+    assert cache.stats()["size"] == os.path.getsize(cache.cache_file)
+
+
+def test_read_only_cache_dir(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    path = _write_tool(tmp_path, "tool1.xml")
+    cache = ToolDocumentCache(cache_dir)
+    _cache_tool(cache, path)
+    cache.persist()
+    os.chmod(cache_dir, 0o555)
+    try:
+        read_only_cache = ToolDocumentCache(cache_dir)
+        if read_only_cache.cache_file_is_writeable:
+            return  # running as root
+        assert read_only_cache.get(path)
+        read_only_cache.delete(path)
+        read_only_cache.persist()
+        assert read_only_cache.get(path)
+    finally:
+        os.chmod(cache_dir, 0o755)
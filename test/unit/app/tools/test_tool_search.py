@@ -0,0 +1,244 @@
+import os
+import statistics
+import time
+
+import pytest
+
+from galaxy.tools.search import (
+    ToolBoxSearch,
+    ToolPanelViewSearch,
+)
+from galaxy.tools.search.memory import InMemoryToolBoxSearch
+from galaxy.util.bunch import Bunch
+
+TOOL_SEARCH_BENCHMARK = os.environ.get("GALAXY_TEST_TOOL_SEARCH_BENCHMARK")
+CONFIG = Bunch(
+    tool_ngram_minsize=3,
+    tool_ngram_maxsize=4,
+    tool_id_boost=20.0,
+    tool_name_exact_multiplier=10.0,
+    tool_stub_boost=2.0,
+    tool_section_boost=3.0,
+    tool_description_boost=8.0,
+    tool_help_boost=1.0,
+    tool_label_boost=1.0,
+    tool_enable_ngram_search=True,
+    tool_name_boost=20.0,
+    tool_ngram_factor=0.2,
+    tool_help_bm25f_k1=0.5,
+)
+WORDS = ["align", "filter", "sort", "merge", "convert", "count", "trim", "assemble", "annotate", "plot"]
+
+
+class MockTool:
+    tool_type = "default"
+    is_latest_version = True
+    hidden = False
+    lineage = None
+    edam_operations = ""
+    edam_topics = ""
+    repository_name = None
+    repository_owner = None
+    guid = None
+    labels = None
+    config_file = None
+    _macro_paths = []
+
+    def __init__(self, tool_id, name, description="", section="Tools", raw_help=""):
+        self.id = tool_id
+        self.version = "1.0"
+        self.name = name
+        self.description = description
+        self.section = section
+        self.raw_help = raw_help
+
+    @property
+    def search_help(self):
+        return self.raw_help
+
+    def get_panel_section(self):
+        return (self.section.lower(), self.section)
+
+
+class MockToolBox:
+    def __init__(self, tools):
+        self.tools_by_id = {tool.id: tool for tool in tools}
+        self.app = Bunch(config=CONFIG)
+
+    def get_tool(self, tool_id):
+        return self.tools_by_id.get(tool_id)
+
+    def panel_has_tool(self, tool, panel_view_id):
+        return panel_view_id == "default" or tool.section == panel_view_id
+
+    def panel_views(self):
+        return [Bunch(id="default"), Bunch(id="Text")]
+
+    @property
+    def tool_cache(self):
+        return Bunch(
+            _tool_paths_by_id={tool_id: tool_id for tool_id in self.tools_by_id},
+            get_tool_by_id=self.get_tool,
+        )
+
+
+def _tools():
+    return [
+        MockTool("cat1", "Concatenate datasets", "tail-to-head", section="Text"),
+        MockTool("sort1", "Sort", "data in ascending or descending order", section="Text"),
+        MockTool("bowtie2", "Bowtie2", "map reads against reference genome", section="Mapping"),
+    ]
+
+
+def _search(panel_search, q):
+    return panel_search.search(q, config=CONFIG)
+
+
+def _build(panel_search, toolbox):
+    panel_search.build_index(toolbox.tool_cache, toolbox)
+
+
+def test_incremental_index(tmp_path):
+    toolbox = MockToolBox(_tools())
+    panel_search = ToolPanelViewSearch("default", str(tmp_path), config=CONFIG)
+    _build(panel_search, toolbox)
+    assert _search(panel_search, "bowtie2") == ["bowtie2"]
+    generation = panel_search.index.latest_generation()
+
+    # Nothing changed, no new index generation
+    _build(panel_search, toolbox)
+    assert panel_search.index.latest_generation() == generation
+
+    with panel_search.index.searcher() as searcher:
+        hashes = {f["id"]: f["content_hash"] for f in searcher.all_stored_fields()}
+    toolbox.tools_by_id["sort1"].name = "Reorder"
+    del toolbox.tools_by_id["cat1"]
+    _build(panel_search, toolbox)
+    assert panel_search.index.latest_generation() == generation + 1
+    with panel_search.index.searcher() as searcher:
+        new_hashes = {f["id"]: f["content_hash"] for f in searcher.all_stored_fields()}
+    assert set(new_hashes) == {"sort1", "bowtie2"}
+    assert new_hashes["bowtie2"] == hashes["bowtie2"]
+    assert new_hashes["sort1"] != hashes["sort1"]
+    assert _search(panel_search, "reorder") == ["sort1"]
+    assert _search(panel_search, "concatenate") == []
+
+
+def test_index_shared_between_processes(tmp_path):
+    toolbox = MockToolBox(_tools())
+    writer_search = ToolBoxSearch(toolbox, index_dir=str(tmp_path))
+    reader_search = ToolBoxSearch(toolbox, index_dir=str(tmp_path))
+    writer_search.build_index(toolbox.tool_cache, toolbox)
+    assert reader_search.search("sort", config=CONFIG, panel_view="Text") == ["sort1"]
+    assert reader_search.search("bowtie2", config=CONFIG, panel_view="Text") == []
+    toolbox.tools_by_id["cat2"] = MockTool("cat2", "Concatenate multiple datasets", section="Text")
+    writer_search.build_index(toolbox.tool_cache, toolbox)
+    # The reader picks up the new index generation
+    assert set(reader_search.search("concatenate", config=CONFIG, panel_view="Text")) == {"cat1", "cat2"}
+
+
+def test_data_managers_not_indexed(tmp_path):
+    tools = _tools()
+    tools[0].tool_type = "manage_data"
+    toolbox = MockToolBox(tools)
+    panel_search = ToolPanelViewSearch("default", str(tmp_path), config=CONFIG)
+    _build(panel_search, toolbox)
+    assert _search(panel_search, "concatenate") == []
+
+
+def test_in_memory_search():
+    toolbox = MockToolBox(_tools())
+    toolbox.tools_by_id["bowtie2"].raw_help = "Bowtie2 aligns sequencing reads to long reference sequences."
+    search = InMemoryToolBoxSearch(toolbox)
+    assert search.search("bowtie2", config=CONFIG, panel_view="default") == []
+    search.build_index(toolbox.tool_cache, toolbox)
+    assert search.search("bowtie2", config=CONFIG, panel_view="default") == ["bowtie2"]
+    assert search.search("Concatenate datasets", config=CONFIG, panel_view="default")[0] == "cat1"
+    # Help is stemmed and matched by prefix
+    assert search.search("aligning", config=CONFIG, panel_view="default") == ["bowtie2"]
+    assert search.search("sequenc", config=CONFIG, panel_view="default") == ["bowtie2"]
+    # n-grams of the name
+    assert search.search("owti", config=CONFIG, panel_view="default") == ["bowtie2"]
+    # Results are restricted to the panel view
+    assert search.search("bowtie2 sort", config=CONFIG, panel_view="Text") == ["sort1"]
+    with pytest.raises(KeyError):
+        search.search("sort", config=CONFIG, panel_view="unknown")
+
+
+def test_in_memory_search_matches_whoosh(tmp_path):
+    toolbox = MockToolBox(_tools())
+    whoosh_search = ToolBoxSearch(toolbox, index_dir=str(tmp_path))
+    memory_search = InMemoryToolBoxSearch(toolbox)
+    whoosh_search.build_index(toolbox.tool_cache, toolbox)
+    memory_search.build_index(toolbox.tool_cache, toolbox)
+    for q in ["sort", "concatenate", "bowtie2", "Sort", "map reads", "cat1"]:
+        for panel_view in ("default", "Text"):
+            kwds = dict(config=CONFIG, panel_view=panel_view)
+            assert memory_search.search(q, **kwds) == whoosh_search.search(q, **kwds), q
+
+
+def test_in_memory_index_reuses_documents(monkeypatch):
+    toolbox = MockToolBox(_tools())
+    search = InMemoryToolBoxSearch(toolbox)
+    search.build_index(toolbox.tool_cache, toolbox)
+    analyzed = []
+    analyze = search._analyze
+    monkeypatch.setattr(
+        search, "_analyze", lambda schema, document: analyzed.append(document["id"]) or analyze(schema, document)
+    )
+    toolbox.tools_by_id["sort1"].name = "Reorder"
+    search.build_index(toolbox.tool_cache, toolbox)
+    assert analyzed == ["sort1"]
+    assert search.search("reorder", config=CONFIG, panel_view="default") == ["sort1"]
+    assert search.search("concatenate", config=CONFIG, panel_view="default") == ["cat1"]
+
+
+@pytest.mark.skipif(not TOOL_SEARCH_BENCHMARK, reason="GALAXY_TEST_TOOL_SEARCH_BENCHMARK not set")
+def test_tool_search_benchmark(tmp_path):
+    tools = []
+    for i in range(int(TOOL_SEARCH_BENCHMARK) if TOOL_SEARCH_BENCHMARK.isdigit() else 5000):
+        words = [WORDS[(i + j) % len(WORDS)] for j in range(3)]
+        tools.append(
+            MockTool(
+                f"tool_{i}",
+                f"{words[0].title()} {words[1]} {i}",
+                description=f"{words[2]} datasets",
+                section=WORDS[i % len(WORDS)].title(),
+                raw_help=" ".join(words * 20),
+            )
+        )
+    toolbox = MockToolBox(tools)
+    panel_search = ToolPanelViewSearch("default", str(tmp_path), config=CONFIG)
+    start = time.perf_counter()
+    _build(panel_search, toolbox)
+    print(f"Indexed {len(tools)} tools in {time.perf_counter() - start:.3f} seconds")
+    tools[0].name = "Renamed tool"
+    start = time.perf_counter()
+    _build(panel_search, toolbox)
+    print(f"Updated index after changing 1 tool in {time.perf_counter() - start:.3f} seconds")
+
+    memory_search = InMemoryToolBoxSearch(toolbox)
+    start = time.perf_counter()
+    memory_search.build_index(toolbox.tool_cache, toolbox)
+    print(f"Built in-memory index of {len(tools)} tools in {time.perf_counter() - start:.3f} seconds")
+
+    queries = [*WORDS, "tool_42", "sort merge", "ali", "renamed"]
+    for backend, search in [
+        ("whoosh", lambda q: _search(panel_search, q)),
+        ("memory", lambda q: memory_search.search(q, config=CONFIG, panel_view="default")),
+    ]:
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(10):
+            for q in queries:
+                query_start = time.perf_counter()
+                search(q)
+                latencies.append(time.perf_counter() - query_start)
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        print(
+            f"{backend}: {len(latencies)} searches, {len(latencies) / elapsed:.1f} queries/s, "
+            f"median {statistics.median(latencies) * 1000:.2f} ms, "
+            f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.2f} ms"
+        )
+        assert search("renamed")[0] == "tool_0"
@@ -1,17 +1,24 @@
 import logging
+import os
 import time
+from unittest import mock
 
 import pytest
 import routes
 
 from galaxy import model
 from galaxy.app_unittest_utils.toolbox_support import BaseToolBoxTestCase
+from galaxy.app_unittest_utils.tools_support import SIMPLE_TOOL_CONTENTS
 from galaxy.model.base import transaction
 from galaxy.tool_util.unittest_utils import mock_trans
 from galaxy.tool_util.unittest_utils.sample_data import (
     SIMPLE_MACRO,
     SIMPLE_TOOL_WITH_MACRO,
 )
+from galaxy.tools.cache import (
+    parse_tool_documents,
+    ToolCache,
+)
 
 log = logging.getLogger(__name__)
 
@@ -112,6 +119,130 @@ class TestToolBox(BaseToolBoxTestCase):
         if e:
             raise e
 
+    def _reload_toolbox(self):
+        self.app.tool_cache = ToolCache()
+        self._toolbox = None
+        return self.toolbox
+
+    def test_toolbox_snapshot(self):
+        self.app.config.enable_toolbox_snapshot = True
+        self._init_tool(
+            filename="tool_with_macro.xml",
+            tool_contents=SIMPLE_TOOL_WITH_MACRO,
+            extra_file_contents=SIMPLE_MACRO.substitute(tool_version="2.0"),
+            extra_file_path="external.xml",
+        )
+        self._add_config("""<toolbox><tool file="tool_with_macro.xml"/></toolbox>""")
+        assert self.toolbox.get_tool("tool_with_macro").version == "2.0"
+        assert os.path.exists(self.app.config.toolbox_snapshot_file)
+        assert set(self.toolbox.load_timings.seconds) >= {"tool_sources", "tools"}
+
+        with mock.patch("galaxy.tools.parse_tool_documents") as parse_tool_documents:
+            assert self._reload_toolbox().get_tool("tool_with_macro").version == "2.0"
+        # All tools are loaded from the snapshot
+        parse_tool_documents.assert_not_called()
+
+        macro_path = os.path.join(self.test_directory, "external.xml")
+        with open(macro_path, "w") as macro_out:
+            macro_out.write(SIMPLE_MACRO.substitute(tool_version="3.0"))
+        os.utime(macro_path, (time.time() + 10, time.time() + 10))
+        assert self._reload_toolbox().get_tool("tool_with_macro").version == "3.0"
+
+    def test_parse_tool_sources_in_processes(self):
+        self.app.config.tool_parse_processes = 2
+        self._init_tool()
+        self._init_tool(filename="tool_2.xml", tool_id="test_tool_2")
+        self._add_config("""<toolbox><tool file="tool.xml"/><tool file="tool_2.xml"/></toolbox>""")
+        with mock.patch("galaxy.tools.parse_tool_documents", wraps=parse_tool_documents) as parse:
+            toolbox = self.toolbox
+        assert parse.call_count == 1
+        assert toolbox.get_tool("test_tool") is not None
+        assert toolbox.get_tool("test_tool_2") is not None
+        assert not toolbox._preloaded_tool_documents
+
+    def test_lazy_tools(self):
+        self.app.config.enable_lazy_tool_loading = True
+        self.app.config.lazy_tool_cache_size = 2
+        tool_contents = SIMPLE_TOOL_CONTENTS.replace("</tool>", "<help>Prints the parameter.</help></tool>")
+        for tool_id in ["tool_1", "tool_2", "tool_3"]:
+            self._init_tool(tool_contents=tool_contents, filename=f"{tool_id}.xml", tool_id=tool_id)
+        self._add_config(
+            """<toolbox><section id="t" name="t">
+            <tool file="tool_1.xml"/><tool file="tool_2.xml"/><tool file="tool_3.xml"/>
+            </section></toolbox>"""
+        )
+        toolbox = self.toolbox
+        tool_1, tool_2, tool_3 = (toolbox.get_tool(tool_id) for tool_id in ["tool_1", "tool_2", "tool_3"])
+        self._find_section(toolbox.to_dict(mock_trans()), "t")
+        assert tool_1.is_lazy and not tool_1.is_materialized
+        assert "inputs" not in vars(tool_1)
+        assert tool_1.get_panel_section() == ("t", "t")
+        # help is indexed for searching without loading the tool
+        assert tool_1.search_help.content == "Prints the parameter."
+        assert not tool_1.is_materialized
+
+        assert list(tool_1.inputs) == ["param1"]
+        assert list(tool_1.outputs) == ["out1"]
+        assert tool_1.is_materialized
+        assert list(tool_2.inputs) == ["param1"]
+        # Least recently used tool is unloaded
+        toolbox.get_tool("tool_1")
+        assert tool_3.command
+        assert list(tool_3.outputs) == ["out1"]
+        assert tool_1.is_materialized and not tool_2.is_materialized
+        assert list(tool_2.inputs) == ["param1"]
+        assert not tool_1.is_materialized
+
+        usage = toolbox.tool_memory_usage()
+        assert usage["tools"] == usage["lazy_tools"] == 3
+        assert usage["materialized"] == 2
+        assert usage["misses"] == 4 and usage["evictions"] == 2
+        assert usage["materialized_bytes"] > 0
+        assert {tool["id"] for tool in usage["largest"]} == {"tool_2", "tool_3"}
+
+    def test_lazy_tool_in_use_not_unloaded(self):
+        self.app.config.enable_lazy_tool_loading = True
+        self.app.config.lazy_tool_cache_size = 1
+        for tool_id in ["tool_1", "tool_2"]:
+            self._init_tool(filename=f"{tool_id}.xml", tool_id=tool_id)
+        self._add_config("""<toolbox><tool file="tool_1.xml"/><tool file="tool_2.xml"/></toolbox>""")
+        toolbox = self.toolbox
+        tool_1, tool_2 = toolbox.get_tool("tool_1"), toolbox.get_tool("tool_2")
+        with tool_1.in_use():
+            inputs = tool_1.inputs
+            assert list(tool_2.inputs) == ["param1"]
+            # Evicted, but kept while in use
+            assert tool_1.is_materialized and tool_1.inputs is inputs
+            assert tool_1 not in toolbox.lazy_tools
+        assert not tool_1.is_materialized
+        assert "inputs" not in vars(tool_1)
+
+        with tool_1.in_use():
+            assert list(tool_2.inputs) == ["param1"]
+            # Used again after being evicted, tracked again by the cache
+            tool_1.materialize()
+            assert tool_1 in toolbox.lazy_tools
+        assert tool_1.is_materialized and not tool_2.is_materialized
+
+    def test_lazy_tool_materialized_with_macros(self):
+        self.app.config.enable_lazy_tool_loading = True
+        self._init_tool(
+            filename="tool_with_macro.xml",
+            tool_contents=SIMPLE_TOOL_WITH_MACRO,
+            extra_file_contents=SIMPLE_MACRO.substitute(tool_version="2.0").replace(
+                "<inputs/>", '<inputs><param name="param1" type="text"/></inputs>'
+            ),
+            extra_file_path="external.xml",
+        )
+        self._add_config("""<toolbox><tool file="tool_with_macro.xml"/></toolbox>""")
+        toolbox = self.toolbox
+        tool = toolbox.get_tool("tool_with_macro")
+        assert tool.is_lazy and not tool.is_materialized
+        with mock.patch.object(toolbox, "load_tool_source", wraps=toolbox.load_tool_source) as load_tool_source:
+            assert list(tool.inputs) == ["param1"]
+        load_tool_source.assert_called_once_with(tool.config_file, tool_cache_data_dir=None)
+        assert tool.is_materialized
+
     def test_enforce_tool_profile(self):
         self._init_tool(filename="old_tool.xml", version="1.0", profile="17.01", tool_id="test_old_tool_profile")
         with self.assertRaisesRegex(Exception, r"The tool \[test_new_tool_profile\] targets version 37\.01 of Galaxy"):
@@ -1,4 +1,6 @@
+import os
 import tempfile
+import time
 
 import pytest
 
@@ -7,9 +9,20 @@ from galaxy.datatypes.sniff import (
     convert_newlines,
     convert_newlines_sep2tabs,
     convert_sep2tabs,
+    FilePrefix,
     get_test_fname,
+    guess_ext,
+    SniffIndex,
+    SniffTimings,
 )
 
+GALAXY_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, os.pardir, os.pardir))
+SNIFF_BENCHMARK = os.environ.get("GALAXY_TEST_SNIFF_BENCHMARK")
+SNIFF_BENCHMARK_DIRECTORIES = [
+    os.path.join(GALAXY_ROOT, "test-data"),
+    os.path.join(GALAXY_ROOT, "lib", "galaxy", "datatypes", "test"),
+]
+
 
 def assert_converts_to_1234_convert_sep2tabs(content, expected="1\t2\n3\t4\n"):
     with tempfile.NamedTemporaryFile(delete=False, mode="w") as tf:
@@ -109,3 +122,66 @@ def test_infer_from_filename():
     assert datatypes_registry.get_datatype_from_filename("mycool.fq").file_ext == "fastqsanger"
     assert datatypes_registry.get_datatype_from_filename("mycool.fq.gz").file_ext == "fastqsanger.gz"
     assert datatypes_registry.get_datatype_from_filename("mycool.fastq").file_ext == "fastqsanger"
+
+
+@pytest.mark.parametrize(
+    "fname",
+    [
+        "test.ncbitaxonomy.sqlite",
+        "test.mz5",
+        "test.loom",
+        "1.bam",
+        "454Score.pdf",
+        "brukerbaf.d.tar",
+        "1.fastqsanger.gz",
+        "1.sam",
+        "interval.interval",
+    ],
+)
+def test_sniff_index_preconditions(fname):
+    registry = example_datatype_registry_for_sample()
+    path = get_test_fname(fname)
+    with_preconditions = SniffIndex(registry.sniff_order, timings=SniffTimings())
+    without_preconditions = SniffIndex(registry.sniff_order, use_preconditions=False, timings=SniffTimings())
+    file_prefix = FilePrefix(path)
+    assert with_preconditions.sniff(file_prefix) == without_preconditions.sniff(file_prefix)
+    assert len(list(with_preconditions.candidates(file_prefix))) <= len(
+        list(without_preconditions.candidates(file_prefix))
+    )
+
+
+def test_sniff_index_skips_datatypes_with_unmet_preconditions(tmp_path):
+    registry = example_datatype_registry_for_sample()
+    timings = SniffTimings()
+    index = SniffIndex(registry.sniff_order, timings=timings)
+    path = tmp_path / "unknown.bin"
+    path.write_bytes(bytes(range(256)) * 4)
+    assert index.sniff(FilePrefix(str(path))) is None
+    # sniffers of datatypes with magic bytes the file doesn't start with aren't run ...
+    for file_ext in ("sqlite", "h5", "loom", "unsorted.bam", "pdf", "brukerbaf.d.tar", "fast5.tar"):
+        assert file_ext not in timings.calls
+    # ... but those of datatypes without preconditions are
+    assert timings.calls["twobit"] == 1
+    assert len(timings.slowest(3)) == 3
+
+
+@pytest.mark.skipif(not SNIFF_BENCHMARK, reason="GALAXY_TEST_SNIFF_BENCHMARK not set")
+def test_sniff_benchmark():
+    registry = example_datatype_registry_for_sample()
+    paths = sorted(
+        os.path.join(directory, name)
+        for directory in SNIFF_BENCHMARK_DIRECTORIES
+        for name in os.listdir(directory)
+        if os.path.isfile(os.path.join(directory, name))
+    )
+    results = {}
+    for use_preconditions in (False, True):
+        timings = SniffTimings()
+        index = SniffIndex(registry.sniff_order, use_preconditions=use_preconditions, timings=timings)
+        start = time.perf_counter()
+        results[use_preconditions] = [guess_ext(path, index) for path in paths]
+        elapsed = time.perf_counter() - start
+        print(f"Sniffed {len(paths)} files in {elapsed:.3f} seconds (preconditions: {use_preconditions})")
+        for file_ext, seconds, calls in timings.slowest(10):
+            print(f"  {file_ext}: {seconds:.3f} seconds in {calls} call(s)")
+    assert results[True] == results[False]
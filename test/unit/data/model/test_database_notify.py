@@ -0,0 +1,123 @@
+import threading
+
+import pytest
+from sqlalchemy import event
+
+import galaxy.model.mapping as mapping
+from galaxy import model
+from galaxy.model.base import transaction
+from galaxy.model.database_notify import (
+    BROADCAST,
+    DatabaseNotificationListener,
+    JOB_CHANNEL,
+    monitor_sleep_interval,
+    MonitorWakeup,
+    notifications_for_flush,
+    WORKFLOW_INVOCATION_CHANNEL,
+)
+from galaxy.util.sleeper import Sleeper
+
+
+@pytest.fixture
+def sa_session():
+    return mapping.init("/tmp", "sqlite:///:memory:", create_tables=True).session()
+
+
+@pytest.fixture
+def flushed_notifications(sa_session):
+    notifications = []
+
+    def after_flush(session, flush_context):
+        notifications.append(notifications_for_flush(session))
+
+    event.listen(sa_session, "after_flush", after_flush)
+    return notifications
+
+
+def _commit(sa_session):
+    with transaction(sa_session):
+        sa_session.commit()
+
+
+def test_new_job_notifies_handler(sa_session, flushed_notifications):
+    job = model.Job()
+    job.state = model.Job.states.NEW
+    job.handler = "handler0"
+    sa_session.add(job)
+    _commit(sa_session)
+    assert flushed_notifications[-1] == {(JOB_CHANNEL, "handler0")}
+
+
+def test_job_state_changes(sa_session, flushed_notifications):
+    job = model.Job()
+    job.state = model.Job.states.QUEUED
+    sa_session.add(job)
+    _commit(sa_session)
+    assert flushed_notifications[-1] == set()
+    job.state = model.Job.states.RUNNING
+    _commit(sa_session)
+    assert flushed_notifications[-1] == set()
+    job.state = model.Job.states.OK
+    _commit(sa_session)
+    assert flushed_notifications[-1] == {(JOB_CHANNEL, BROADCAST), (WORKFLOW_INVOCATION_CHANNEL, BROADCAST)}
+
+
+def test_handler_assignment(sa_session, flushed_notifications):
+    invocation = model.WorkflowInvocation()
+    invocation.workflow = model.Workflow()
+    sa_session.add(invocation)
+    _commit(sa_session)
+    assert flushed_notifications[-1] == {(WORKFLOW_INVOCATION_CHANNEL, BROADCAST)}
+    invocation.handler = "handler1"
+    _commit(sa_session)
+    assert flushed_notifications[-1] == {(WORKFLOW_INVOCATION_CHANNEL, "handler1")}
+
+
+def test_dataset_ready(sa_session, flushed_notifications):
+    dataset = model.Dataset(state=model.Dataset.states.QUEUED)
+    sa_session.add(dataset)
+    _commit(sa_session)
+    dataset.state = model.Dataset.states.OK
+    _commit(sa_session)
+    assert flushed_notifications[-1] == {(JOB_CHANNEL, BROADCAST), (WORKFLOW_INVOCATION_CHANNEL, BROADCAST)}
+
+
+class MockTimer:
+    def __init__(self):
+        self.created = threading.get_ident()
+
+
+def test_monitor_wakeup():
+    sleeper = Sleeper()
+    wakeup = MonitorWakeup(sleeper, handler_tags=lambda: {"handler0", "_default_"}, get_timer=MockTimer)
+    wakeup("handler1")
+    assert wakeup.pop_timer() is None
+    wakeup("_default_")
+    timer = wakeup.pop_timer()
+    assert isinstance(timer, MockTimer)
+    assert wakeup.pop_timer() is None
+    wakeup(BROADCAST)
+    assert wakeup.pop_timer() is not None
+
+
+def test_sleeper_remembers_wakeup():
+    sleeper = Sleeper()
+    sleeper.wake()
+    thread = threading.Thread(target=sleeper.sleep, args=(60,))
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_listener_dispatch_and_sleep_interval():
+    listener = DatabaseNotificationListener(engine=None)
+    received = []
+    with listener._lock:
+        listener._subscribers[JOB_CHANNEL].append(received.append)
+    listener.dispatch(JOB_CHANNEL, "handler0")
+    listener.dispatch(WORKFLOW_INVOCATION_CHANNEL, "handler0")
+    assert received == ["handler0"]
+    assert monitor_sleep_interval(None, 1.0, 10.0) == 1.0
+    assert monitor_sleep_interval(listener, 1.0, 10.0) == 1.0
+    listener.listening = True
+    assert monitor_sleep_interval(listener, 1.0, 10.0) == 10.0
@@ -4,6 +4,8 @@ import json
 import os
 import pathlib
 import shutil
+import tarfile
+import time
 from tempfile import (
     mkdtemp,
     NamedTemporaryFile,
@@ -46,6 +48,8 @@ TEST_PATH_1 = TESTCASE_DIRECTORY / "1.txt"
 TEST_PATH_2 = TESTCASE_DIRECTORY / "2.bed"
 TEST_PATH_2_CONVERTED = TESTCASE_DIRECTORY / "2.txt"
 DEFAULT_OBJECT_STORE_BY = "id"
+# Set to a number of datasets to benchmark exporting and importing a history of that size.
+GALAXY_TEST_MODEL_STORE_BENCHMARK_DATASETS = int(os.environ.get("GALAXY_TEST_MODEL_STORE_BENCHMARK_DATASETS", 0))
 
 
 def test_import_export_history():
@@ -239,6 +243,95 @@ def test_import_export_history_with_implicit_conversion_and_extra_files():
     )
 
 
+def test_export_history_streams_datasets_into_tar():
+    app, sa_session, u, h = setup_fixture_context_with_history()
+    datasets = _create_datasets(sa_session, h, 20)
+    for i, dataset in enumerate(datasets):
+        dataset.state = "ok"
+        app.write_primary_file(dataset, f"contents {i}\n")
+    app.commit()
+
+    dest_export = os.path.join(mkdtemp(), "moo.tgz")
+    with store.TarModelExportStore(dest_export, app=app, export_files="copy", prefetch_workers=2) as export_store:
+        export_store.export_history(h)
+        # dataset files are not staged next to the attribute files
+        assert not os.path.exists(os.path.join(export_store.export_directory, "datasets"))
+
+    with tarfile.open(dest_export) as archive:
+        names = archive.getnames()
+    assert len([name for name in names if name.startswith("datasets/")]) == 20
+    assert store.ATTRS_FILENAME_DATASETS in names
+
+    imported_history = import_archive(dest_export, app, u)
+    assert len(imported_history.active_datasets) == 20
+    with open(imported_history.active_datasets[-1].get_file_name()) as f:
+        assert f.read() == "contents 19\n"
+
+
+def test_dataset_file_prefetcher_matches_dataset_file_paths():
+    app, sa_session, u, h = setup_fixture_context_with_history()
+    datasets = _create_datasets(sa_session, h, 5)
+    for i, dataset in enumerate(datasets):
+        dataset.state = "ok"
+        app.write_primary_file(dataset, f"contents {i}\n")
+    app.commit()
+
+    prefetcher = store.DatasetFilePrefetcher(datasets, workers=2)
+    try:
+        for dataset in datasets:
+            assert prefetcher.get(dataset) == store.dataset_file_paths(dataset)
+    finally:
+        prefetcher.shutdown()
+
+
+def test_import_history_in_batches():
+    app, sa_session, u, h = setup_fixture_context_with_history()
+    datasets = _create_datasets(sa_session, h, 10)
+    for i, dataset in enumerate(datasets):
+        dataset.state = "ok"
+        app.write_primary_file(dataset, f"contents {i}\n")
+    app.commit()
+
+    dest_export = os.path.join(mkdtemp(), "moo.tgz")
+    with store.TarModelExportStore(dest_export, app=app, export_files="copy") as export_store:
+        export_store.export_history(h)
+
+    import_options = store.ImportOptions(batch_size=3, copy_workers=2)
+    imported_history = import_archive(dest_export, app, u, import_options=import_options)
+    assert [d.hid for d in imported_history.active_datasets] == list(range(1, 11))
+    for i, dataset in enumerate(imported_history.active_datasets):
+        assert dataset.dataset.id
+        assert dataset.get_size() == len(f"contents {i}\n")
+        with open(dataset.get_file_name()) as f:
+            assert f.read() == f"contents {i}\n"
+
+
+@pytest.mark.skipif(not GALAXY_TEST_MODEL_STORE_BENCHMARK_DATASETS, reason="model store benchmark not enabled")
+def test_benchmark_export_import_history():
+    app, sa_session, u, h = setup_fixture_context_with_history()
+    datasets = _create_datasets(sa_session, h, GALAXY_TEST_MODEL_STORE_BENCHMARK_DATASETS)
+    for dataset in datasets:
+        dataset.state = "ok"
+        app.write_primary_file(dataset, "benchmark\n")
+    app.commit()
+
+    dest_export = os.path.join(mkdtemp(), "moo.tgz")
+    for prefetch_workers in (0, store.DEFAULT_EXPORT_PREFETCH_WORKERS):
+        start = time.perf_counter()
+        with store.TarModelExportStore(
+            dest_export, app=app, export_files="copy", prefetch_workers=prefetch_workers
+        ) as export_store:
+            export_store.export_history(h)
+        print(
+            f"Exported {len(datasets)} datasets with {prefetch_workers} prefetch workers "
+            f"in {time.perf_counter() - start:.2f} seconds"
+        )
+    start = time.perf_counter()
+    imported_history = import_archive(dest_export, app, u)
+    print(f"Imported {len(datasets)} datasets in {time.perf_counter() - start:.2f} seconds")
+    assert len(imported_history.active_datasets) == len(datasets)
+
+
 def test_import_export_bag_archive():
     """Test a simple job import/export using a BagIt archive."""
     dest_parent = mkdtemp()
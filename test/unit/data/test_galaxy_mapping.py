@@ -569,6 +569,41 @@ class TestMappings(BaseModelTestCase):
         assert security_agent.can_manage_dataset(u_from.all_roles(), d1.dataset)
         assert not security_agent.can_manage_dataset(u_other.all_roles(), d1.dataset)
 
+    def test_dataset_permission_resolver(self):
+        security_agent = GalaxyRBACAgent(self.model.session)
+        u_from, u_to, u_other = self._three_users("permission_resolver")
+
+        h = model.History(name="History for Permission Resolver", user=u_from)
+        d1, d2, d3 = (
+            model.HistoryDatasetAssociation(
+                extension="txt", history=h, create_dataset=True, sa_session=self.model.session
+            )
+            for _ in range(3)
+        )
+        self.persist(h, d1, d2, d3)
+        self._make_private(security_agent, u_from, d1)
+        security_agent.privately_share_dataset(d2.dataset, [u_to])
+
+        datasets = [d1.dataset, d2.dataset, d3.dataset]
+        from_resolver = security_agent.permission_resolver(u_from)
+        from_resolver.prefetch(datasets)
+        assert [from_resolver.can_access_dataset(d) for d in datasets] == [True, False, True]
+        assert [from_resolver.dataset_is_public(d) for d in datasets] == [False, False, True]
+        assert [from_resolver.dataset_is_private_to_user(d) for d in datasets] == [True, False, False]
+        assert from_resolver.can_manage_dataset(d1.dataset)
+        to_resolver = security_agent.permission_resolver(u_to)
+        assert [to_resolver.can_access_dataset(d) for d in datasets] == [False, True, True]
+        for user in (u_from, u_to, u_other):
+            resolver = security_agent.permission_resolver(user)
+            for dataset in datasets:
+                assert resolver.can_access_dataset(dataset) == security_agent.can_access_dataset(
+                    user.all_roles(), dataset
+                )
+
+        # changes made through the security agent invalidate cached permissions
+        security_agent.make_dataset_public(d1.dataset)
+        assert security_agent.permission_resolver(u_other).can_access_dataset(d1.dataset)
+
     def test_cannot_make_private_objectstore_dataset_public(self):
         security_agent = GalaxyRBACAgent(self.model.session)
         u_from, u_to, _ = self._three_users("cannot_make_private_public")
@@ -1,4 +1,5 @@
 import uuid
+from unittest import mock
 
 from galaxy import model
 from galaxy.model.unittest_utils.utils import random_email
@@ -341,6 +342,61 @@ class TestCalculateUsage(BaseModelTestCase):
         self._refresh_user_and_assert_disk_usage_is(25, "alt_source")
         self._refresh_user_and_assert_disk_usage_is(0, None)
 
+    def test_reconcile_disk_usage(self):
+        model = self.model
+        u = self.u
+
+        self._add_dataset(10)
+        self._add_dataset(15, "alt_source_store")
+
+        quota_source_map = QuotaSourceMap(None, True)
+        alt_source = QuotaSourceMap("alt_source", True)
+        quota_source_map.backends["alt_source_store"] = alt_source
+
+        object_store = MockObjectStore(quota_source_map)
+        u.calculate_and_set_disk_usage(object_store)
+        assert u.calculate_disk_usage_drift(object_store) == []
+
+        # simulate adjustments that got lost
+        u.adjust_total_disk_usage(-4, None)
+        u.adjust_total_disk_usage(7, "alt_source")
+        model.session.commit()
+
+        drifts = u.calculate_disk_usage_drift(object_store)
+        assert [(d.quota_source_label, d.recorded_disk_usage, d.calculated_disk_usage, d.drift) for d in drifts] == [
+            (None, 6, 10, 4),
+            ("alt_source", 22, 15, -7),
+        ]
+
+        assert u.reconcile_disk_usage(object_store) == drifts
+        self._refresh_user_and_assert_disk_usage_is(10)
+        self._refresh_user_and_assert_disk_usage_is(15, "alt_source")
+        assert u.calculate_disk_usage_drift(object_store) == []
+
+    def test_disk_usage_drift_ignores_adjustments_while_calculating(self):
+        u = self.u
+
+        self._add_dataset(10)
+        object_store = MockObjectStore(QuotaSourceMap(None, True))
+        u.calculate_and_set_disk_usage(object_store)
+
+        calculate = model.calculate_disk_usage_per_quota_source
+
+        def calculate_then_add_dataset(*args, **kwds):
+            usage = calculate(*args, **kwds)
+            if calculate_mock.call_count == 1:
+                # a dataset added and accounted for after the calculation read the datasets
+                self._add_dataset(5)
+                u.adjust_total_disk_usage(5, None)
+                self.model.session.commit()
+            return usage
+
+        with mock.patch(
+            "galaxy.model.calculate_disk_usage_per_quota_source", side_effect=calculate_then_add_dataset
+        ) as calculate_mock:
+            assert u.calculate_disk_usage_drift(object_store) == []
+        assert calculate_mock.call_count == 2
+
     def _refresh_user_and_assert_disk_usage_is(self, usage, label=None):
         u = self.u
         self.model.context.refresh(u)
@@ -489,3 +545,18 @@ class TestUsage(BaseModelTestCase):
         assert len(usages) == 2
         assert usages[1].quota_source_label == "foobar"
         assert usages[1].total_disk_usage == 247
+
+    def test_usage_adjustments_are_transactional(self):
+        model = self.model
+        u = model.User(email="transactional.usage@example.com", password="password")
+        u.disk_usage = 10
+        self.persist(u)
+
+        u.adjust_total_disk_usage(5, None)
+        u.adjust_total_disk_usage(7, "foobar")
+        assert u.get_disk_usage() == 15
+        assert u.get_disk_usage(quota_source_label="foobar") == 7
+        self.model.context.rollback()
+
+        assert u.get_disk_usage() == 10
+        assert u.get_disk_usage(quota_source_label="foobar") == 0
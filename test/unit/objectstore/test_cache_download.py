@@ -0,0 +1,220 @@
+import os
+import shutil
+import threading
+
+import pytest
+
+from galaxy.datatypes.tabular import Tabular
+from galaxy.objectstore._caching_base import CachingConcreteObjectStore
+from galaxy.objectstore._download import (
+    download_ranges,
+    part_path,
+    progress_path,
+    RangedDownloadOptions,
+    RangedReader,
+)
+from galaxy.util.bunch import Bunch
+
+PART_SIZE = 16
+CONTENT = bytes(range(256)) * 2
+
+
+class LocalRemoteObjectStore(CachingConcreteObjectStore):
+    """Caching object store using a local directory as remote storage."""
+
+    store_type = "local_remote"
+    supports_ranged_reads = True
+
+    def __init__(self, tmp_path):
+        config = Bunch(
+            object_store_check_old_style=False,
+            enable_quotas=False,
+            jobs_directory=str(tmp_path / "jobs"),
+            new_file_path=str(tmp_path / "tmp"),
+            umask=0o022,
+            gid=os.getgid(),
+        )
+        super().__init__(config, {})
+        self.remote_path = tmp_path / "remote"
+        self.staging_path = str(tmp_path / "cache")
+        self.cache_size = -1
+        self.cache_updated_data = True
+        self.enable_cache_monitor = False
+        self.downloads = 0
+        self.ranges = []
+        # Cleared to hold up downloading anything but the first part.
+        self.range_gate = threading.Event()
+        self.range_gate.set()
+
+    def _get_remote_size(self, rel_path: str) -> int:
+        return os.path.getsize(self.remote_path / rel_path)
+
+    def _exists_remotely(self, rel_path: str) -> bool:
+        return os.path.exists(self.remote_path / rel_path)
+
+    def _download(self, rel_path: str) -> bool:
+        self.downloads += 1
+        remote_size = self._get_remote_size(rel_path)
+        options = self._ranged_download_options(rel_path, remote_size)
+        self._download_ranges(rel_path, remote_size, options)
+        return True
+
+    def _ranged_download_options(self, rel_path, remote_size):
+        return RangedDownloadOptions(part_size=PART_SIZE, threads=2)
+
+    def _push_string_to_path(self, rel_path: str, from_string: str) -> bool:
+        remote_file = self.remote_path / rel_path
+        remote_file.parent.mkdir(parents=True, exist_ok=True)
+        remote_file.write_text(from_string)
+        return True
+
+    def _push_file_to_path(self, rel_path: str, target_file: str) -> bool:
+        remote_file = self.remote_path / rel_path
+        remote_file.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(target_file, remote_file)
+        return True
+
+    def _read_remote_range(self, rel_path: str, start: int, end: int) -> bytes:
+        self.ranges.append((start, end))
+        if start > 0:
+            assert self.range_gate.wait(5)
+        with open(self.remote_path / rel_path, "rb") as fh:
+            fh.seek(start)
+            return fh.read(end - start + 1)
+
+
+@pytest.fixture
+def object_store(tmp_path):
+    object_store = LocalRemoteObjectStore(tmp_path)
+    remote_file = object_store.remote_path / "000" / "dataset_1.dat"
+    remote_file.parent.mkdir(parents=True)
+    remote_file.write_bytes(CONTENT)
+    return object_store
+
+
+def test_download_ranges_resumes(tmp_path):
+    cache_path = str(tmp_path / "dataset_1.dat")
+    requested = []
+    fail = True
+
+    def read_range(start, end):
+        requested.append(start)
+        if start == 5 * PART_SIZE and fail:
+            raise OSError("connection reset")
+        return CONTENT[start : end + 1]
+
+    options = RangedDownloadOptions(part_size=PART_SIZE, threads=1)
+    with pytest.raises(OSError):
+        download_ranges(cache_path, len(CONTENT), read_range, options)
+    assert not os.path.exists(cache_path)
+    assert os.path.exists(part_path(cache_path))
+    requested.clear()
+    fail = False
+    download_ranges(cache_path, len(CONTENT), read_range, options)
+    # Only the parts not downloaded before are requested again.
+    assert requested == [i * PART_SIZE for i in range(5, len(CONTENT) // PART_SIZE)]
+    with open(cache_path, "rb") as fh:
+        assert fh.read() == CONTENT
+    assert not os.path.exists(part_path(cache_path))
+    assert not os.path.exists(progress_path(cache_path))
+
+
+def test_update_from_file_records_size_of_file_written_in_place(object_store):
+    obj = Bunch(id=2)
+    object_store.create(obj)
+    assert object_store.cache_index.total_size() == 0
+    # e.g. a job writing its output directly into the cache
+    cache_file = os.path.join(object_store.staging_path, "000", "dataset_2.dat")
+    with open(cache_file, "wb") as fh:
+        fh.write(b"x" * 1000)
+    object_store.update_from_file(obj)
+    assert object_store.cache_index.total_size() == 1000
+    assert os.path.getsize(object_store.remote_path / "000" / "dataset_2.dat") == 1000
+
+
+def test_concurrent_pulls_download_once(object_store):
+    obj = Bunch(id=1)
+    object_store.range_gate.clear()
+    filenames = []
+    threads = [threading.Thread(target=lambda: filenames.append(object_store.get_filename(obj))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    object_store.range_gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(set(filenames)) == 1 and len(filenames) == 3
+    assert object_store.downloads == 1
+    with open(filenames[0], "rb") as fh:
+        assert fh.read() == CONTENT
+    assert not os.path.exists(f"{filenames[0]}.lock")
+
+
+def test_open_data_while_downloading(object_store):
+    obj = Bunch(id=1)
+    object_store.range_gate.clear()
+    with object_store.open_data(obj) as fh:
+        # The first part is served before the rest has been downloaded.
+        assert fh.read(PART_SIZE) == CONTENT[:PART_SIZE]
+        assert not os.path.exists(object_store.get_filename(obj, sync_cache=False))
+        object_store.range_gate.set()
+        assert fh.read() == CONTENT[PART_SIZE:]
+    assert object_store.downloads == 1
+    with object_store.open_data(obj) as fh:
+        assert fh.read() == CONTENT
+    assert object_store.downloads == 1
+
+
+def test_ranged_reader_block_cache():
+    requested = []
+
+    def read_range(start, end):
+        requested.append((start, end))
+        return CONTENT[start : end + 1]
+
+    reader = RangedReader(len(CONTENT), read_range, block_size=100, max_blocks=2)
+    reader.seek(150)
+    assert reader.read(100) == CONTENT[150:200]
+    assert reader.read(100) == CONTENT[200:300]
+    reader.seek(-12, 2)
+    assert reader.read() == CONTENT[-12:]
+    reader.seek(210)
+    assert reader.read(10) == CONTENT[210:220]
+    # block 1 was evicted by block 5, block 2 was still cached
+    assert requested == [(100, 199), (200, 299), (500, 511)]
+    assert reader.read(0) == b""
+    reader.seek(len(CONTENT))
+    assert reader.read() == b""
+
+
+def test_open_ranged_data_reads_only_needed_bytes(object_store):
+    obj = Bunch(id=1)
+    with object_store.open_ranged_data(obj) as fh:
+        fh.seek(300)
+        assert fh.read(10) == CONTENT[300:310]
+    assert object_store.ranges == [(0, len(CONTENT) - 1)]
+    assert object_store.downloads == 0
+    assert not os.path.exists(object_store.get_filename(obj, sync_cache=False))
+
+
+def test_tabular_chunk_from_remote_object_store(tmp_path):
+    object_store = LocalRemoteObjectStore(tmp_path)
+    lines = [f"{i}\tvalue_{i}\n" for i in range(100000)]
+    remote_file = object_store.remote_path / "000" / "dataset_1.dat"
+    remote_file.parent.mkdir(parents=True)
+    remote_file.write_text("".join(lines))
+    obj = Bunch(id=1)
+
+    class MockHda:
+        dataset = Bunch(open_ranged_file=lambda: object_store.open_ranged_data(obj))
+
+        def get_file_name(self, sync_cache=True):
+            raise AssertionError("Dataset should not be pulled into the cache")
+
+    offset = len("".join(lines[:50000]))
+    trans = Bunch(app=Bunch(config=Bunch(display_chunk_size=20)))
+    ck_data, last_read = Tabular()._read_chunk(trans, MockHda(), offset, 20)
+    assert ck_data == lines[50000] + lines[50001].rstrip("\n")
+    assert last_read == offset + len(ck_data) + 1
+    assert object_store.downloads == 0
+    # Only the magic bytes and a block around the requested offset were read.
+    assert len(object_store.ranges) == 2
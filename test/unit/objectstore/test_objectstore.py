@@ -16,9 +16,12 @@ from galaxy.exceptions import ObjectInvalid
 from galaxy.objectstore import persist_extra_files_for_dataset
 from galaxy.objectstore.azure_blob import AzureBlobObjectStore
 from galaxy.objectstore.caching import (
+    CACHE_INDEX_FILENAME,
     CacheTarget,
     check_cache,
+    get_cache_index,
     InProcessCacheMonitor,
+    ONE_GIGA_BYTE,
     reset_cache,
 )
 from galaxy.objectstore.cloud import Cloud
@@ -966,6 +969,50 @@ def test_check_cache_sanity(tmp_path):
     assert not path.exists()
 
 
+def test_cache_index(tmp_path):
+    cache_dir = tmp_path
+    (cache_dir / "000").mkdir()
+    for i in range(3):
+        path = cache_dir / "000" / f"dataset_{i}.dat"
+        path.write_text("x" * 10)
+        os.utime(path, (1000 + i, 1000 + i))
+    cache_index = get_cache_index(str(cache_dir))
+    # built from the files on disk if missing, ignoring the index itself
+    assert cache_index.total_size() == 30
+    assert (cache_dir / CACHE_INDEX_FILENAME).exists()
+
+    new_path = cache_dir / "001" / "dataset_3.dat"
+    new_path.parent.mkdir()
+    new_path.write_text("x" * 100)
+    cache_index.touch(str(new_path))
+    assert cache_index.total_size() == 130
+    # recently used files are evicted last
+    cache_index.access(str(cache_dir / "000" / "dataset_0.dat"))
+    check_cache(CacheTarget(cache_dir, 1, 110 / ONE_GIGA_BYTE))
+    assert sorted(p.name for p in cache_dir.glob("*/*.dat")) == ["dataset_0.dat", "dataset_3.dat"]
+    assert cache_index.total_size() == 110
+
+    cache_index.remove_directory(str(cache_dir / "001"))
+    assert cache_index.total_size() == 10
+    # the index is rebuilt if the cache directory is cleared
+    shutil.rmtree(cache_dir / "000")
+    os.unlink(cache_dir / CACHE_INDEX_FILENAME)
+    assert cache_index.total_size() == 100
+
+
+def test_cache_index_skips_downloads_in_progress(tmp_path):
+    cache_dir = tmp_path
+    (cache_dir / "000").mkdir()
+    (cache_dir / "000" / "dataset_1.dat").write_text("x" * 10)
+    in_progress = ["dataset_2.dat.part", "dataset_2.dat.progress", "dataset_2.dat.lock"]
+    for name in in_progress:
+        (cache_dir / "000" / name).write_text("x" * 100)
+    cache_index = get_cache_index(str(cache_dir))
+    assert cache_index.total_size() == 10
+    check_cache(CacheTarget(cache_dir, 1, 0))
+    assert sorted(p.name for p in (cache_dir / "000").iterdir()) == sorted(in_progress)
+
+
 def test_fits_in_cache_check(tmp_path):
     cache_dir = tmp_path
     big_cache_target = CacheTarget(cache_dir, 1, 0.2)
@@ -0,0 +1,94 @@
+import threading
+import time
+
+from galaxy.util.bunch import Bunch
+from galaxy.workflow import scheduling_pool
+from galaxy.workflow.scheduling_pool import (
+    fair_order,
+    InvocationSchedulingPool,
+)
+
+
+def _get_timer(*args):
+    return Bunch(to_str=lambda **kwd: "")
+
+
+def test_fair_order_round_robin_across_users():
+    invocations = [(1, 1), (2, 1), (3, 1), (4, 2), (5, 3)]
+    assert fair_order(invocations, {}, {}) == [(1, 1), (4, 2), (5, 3), (2, 1), (3, 1)]
+    # The user served least recently comes first
+    assert fair_order(invocations, {1: 2.0, 2: 1.0}, {})[:3] == [(5, 3), (4, 2), (1, 1)]
+    # Within a user the longest waiting invocation comes first
+    assert fair_order(invocations, {}, {3: 1.0, 1: 2.0, 2: 3.0})[::3] == [(3, 1), (1, 1)]
+
+
+def test_pool_bounds_and_deduplicates():
+    release = threading.Event()
+    started = []
+    lock = threading.Lock()
+
+    def schedule(invocation_id):
+        with lock:
+            started.append(invocation_id)
+        release.wait(5)
+
+    pool = InvocationSchedulingPool(2, _get_timer)
+    try:
+        invocations = [(1, 1), (2, 1), (3, 2)]
+        assert pool.submit(invocations, schedule) == 2
+        # Both threads are busy, nothing gets submitted and running invocations are never resubmitted
+        assert pool.submit(invocations, schedule) == 0
+        metrics = pool.metrics()
+        assert metrics["running"] == 2
+        assert metrics["queue_depth"] == 1
+        assert metrics["starved"] == 0
+        release.set()
+        _wait_for(lambda: pool.metrics()["running"] == 0)
+        assert sorted(started) == [1, 3]
+        # Invocation 2 waited longest
+        assert pool.submit(invocations, schedule) == 2
+        _wait_for(lambda: pool.metrics()["running"] == 0)
+        assert sorted(started) == [1, 2, 3, 3]
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_pool_reports_starvation(monkeypatch):
+    monkeypatch.setattr(scheduling_pool, "STARVED_INVOCATION_SECONDS", 0.0)
+    release = threading.Event()
+    pool = InvocationSchedulingPool(1, _get_timer)
+    try:
+        pool.submit([(1, 1), (2, 2)], lambda invocation_id: release.wait(5))
+        time.sleep(0.01)
+        metrics = pool.metrics()
+        assert metrics["queue_depth"] == 1
+        assert metrics["starved"] == 1
+        assert metrics["max_wait_seconds"] > 0
+        # Invocations no longer active are dropped from the queue
+        pool.submit([(1, 1)], lambda invocation_id: None)
+        assert pool.metrics()["queue_depth"] == 0
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_pool_survives_scheduling_exceptions():
+    pool = InvocationSchedulingPool(1, _get_timer)
+
+    def schedule(invocation_id):
+        raise Exception("Scheduling failed")
+
+    try:
+        assert pool.submit([(1, 1)], schedule) == 1
+        _wait_for(lambda: pool.metrics()["running"] == 0)
+        assert pool.submit([(1, 1)], schedule) == 1
+    finally:
+        pool.shutdown()
+
+
+def _wait_for(condition, timeout=5):
+    start = time.monotonic()
+    while not condition():
+        assert time.monotonic() - start < timeout
+        time.sleep(0.01)
@@ -76,13 +76,14 @@ class TestWorkflowProgress(TestCase):
         self.inputs_by_step_id = {}
         self.invocation = model.WorkflowInvocation()
         self.progress = {}
+        self.injected_step_ids = []
 
     def _setup_workflow(self, workflow_yaml):
         workflow = yaml_to_model(workflow_yaml)
         self.invocation.workflow = workflow
 
     def _new_workflow_progress(self):
-        mock_injector: ModuleInjector = cast(ModuleInjector, MockModuleInjector(self.progress))
+        mock_injector: ModuleInjector = cast(ModuleInjector, MockModuleInjector(self.progress, self.injected_step_ids))
         return WorkflowProgress(self.invocation, self.inputs_by_step_id, mock_injector, {})
 
     def _set_previous_progress(self, outputs):
@@ -179,6 +180,36 @@ class TestWorkflowProgress(TestCase):
         replacement = progress.replacement_for_input(None, self._step(4), step_dict)
         assert replacement is hda3
 
+    def test_remaining_steps_lazily_recover_outputs(self):
+        self._setup_workflow(TEST_WORKFLOW_YAML)
+        hda3 = model.HistoryDatasetAssociation()
+        self._set_previous_progress(
+            [
+                (100, {"output": model.HistoryDatasetAssociation()}),
+                (101, {"output": model.HistoryDatasetAssociation()}),
+                (102, {"out_file1": hda3}),
+                (103, {"out_file1": model.HistoryDatasetAssociation()}),
+                (104, UNSCHEDULED_STEP),
+            ]
+        )
+        progress = self._new_workflow_progress()
+        steps = progress.remaining_steps()
+        assert [step.id for step, _ in steps] == [104]
+        # Outputs of scheduled tool steps are only loaded when needed
+        assert 102 not in progress.outputs
+        assert 103 not in progress.outputs
+        assert self.injected_step_ids == [100, 101, 104]
+        step_dict = {
+            "name": "input1",
+            "input_type": "dataset",
+            "multiple": False,
+        }
+        assert progress.replacement_for_input(None, self._step(4), step_dict) is hda3
+        assert progress.outputs[102] == {"out_file1": hda3}
+        assert 103 not in progress.outputs
+        assert self.injected_step_ids == [100, 101, 104, 102]
+        assert progress.recovered_step_count == 1
+
     # TODO: Replace multiple true HDA with HDCA
     # TODO: Test explicit delay
     # TODO: Test cancel on collection invalid
@@ -230,11 +261,13 @@ class TestWorkflowProgress(TestCase):
 
 
 class MockModuleInjector:
-    def __init__(self, progress):
+    def __init__(self, progress, injected_step_ids):
         self.progress = progress
+        self.injected_step_ids = injected_step_ids
 
     def inject(self, step, step_args=None, steps=None, **kwargs):
         step.module = MockModule(self.progress)
+        self.injected_step_ids.append(step.id)
 
     def inject_all(self, workflow, param_map=None, ignore_tool_missing_exception=True, **kwargs):
         param_map = param_map or {}